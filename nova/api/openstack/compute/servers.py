@@ -116,6 +116,7 @@ class ServersController(wsgi.Controller):
         super(ServersController, self).__init__()
         self.compute_api = compute.API()
 
+    @wsgi.stream_response
     @wsgi.expected_errors((400, 403))
     @validation.query_schema(schema.index_query, '2.1', '2.25')
     @validation.query_schema(schema.index_query_v226, '2.26', '2.65')
@@ -134,6 +135,7 @@ class ServersController(wsgi.Controller):
             raise exc.HTTPBadRequest(explanation=err.format_message())
         return servers
 
+    @wsgi.stream_response
     @wsgi.expected_errors((400, 403))
     @validation.query_schema(schema.index_query, '2.1', '2.25')
     @validation.query_schema(schema.index_query_v226, '2.26', '2.65')
@@ -103,7 +103,7 @@ class ViewBuilder(common.ViewBuilder):
               show_extended_attr=None, show_host_status=None,
               show_sec_grp=None, bdms=None, cell_down_support=False,
               show_user_data=False, provided_az=None,
-              provided_sched_hints=None):
+              provided_sched_hints=None, azs=None):
         """Generic, non-detailed view of an instance."""
         if cell_down_support and 'display_name' not in instance:
             # NOTE(tssurya): If the microversion is >= 2.69, this boolean will
@@ -227,6 +227,13 @@ class ViewBuilder(common.ViewBuilder):
             unknown_only = True
         return unknown_only
 
+    @staticmethod
+    def _get_availability_zone(context, instance, azs):
+        if azs is not None:
+            # Case the availability zones are pre fetched
+            return azs.get(instance.uuid)
+        return avail_zone.get_instance_availability_zone(context, instance)
+
     def _get_pinned_az(self, context, instance, provided_az):
         if provided_az is AZ_NOT_IN_REQUEST_SPEC:
             # Case the provided_az is pre fetched, but not specified
@@ -266,7 +273,8 @@ class ViewBuilder(common.ViewBuilder):
              show_keypair=True, show_srv_usg=True, show_sec_grp=True,
              show_extended_status=True, show_extended_volumes=True,
              bdms=None, cell_down_support=False, show_server_groups=False,
-             show_user_data=True, provided_az=None, provided_sched_hints=None):
+             show_user_data=True, provided_az=None, provided_sched_hints=None,
+             azs=None):
         """Detailed view of a single instance."""
         if show_extra_specs is None:
             # detail will pre-calculate this for us. If we're doing show,
@@ -328,7 +336,7 @@ class ViewBuilder(common.ViewBuilder):
         context = request.environ['nova.context']
 
         if show_AZ:
-            az = avail_zone.get_instance_availability_zone(context, instance)
+            az = self._get_availability_zone(context, instance, azs)
             # NOTE(mriedem): The OS-EXT-AZ prefix should not be used for new
             # attributes after v2.1. They are only in v2.1 for backward compat
             # with v2.0.
@@ -496,6 +504,11 @@ class ViewBuilder(common.ViewBuilder):
         instance_uuids = [inst['uuid'] for inst in instances]
         bdms = self._get_instance_bdms_in_multiple_cells(context,
                                                          instance_uuids)
+        # Look up the availability zones of the hosts of the whole page at
+        # once rather than one instance at a time.
+        azs = avail_zone.get_instances_availability_zones(
+            context, [inst for inst in instances
+                      if not cell_down_support or 'display_name' in inst])
 
         # NOTE(gmann): pass show_sec_grp=False in _list_view() because
         # security groups for detail method will be added by separate
@@ -507,7 +520,7 @@ class ViewBuilder(common.ViewBuilder):
                                        # We process host_status in aggregate.
                                        show_host_status=False,
                                        show_sec_grp=False,
-                                       bdms=bdms,
+                                       bdms=bdms, azs=azs,
                                        cell_down_support=cell_down_support)
 
         if api_version_request.is_supported(request, '2.16'):
@@ -524,7 +537,8 @@ class ViewBuilder(common.ViewBuilder):
 
     def _list_view(self, func, request, servers, coll_name, show_extra_specs,
                    show_extended_attr=None, show_host_status=None,
-                   show_sec_grp=False, bdms=None, cell_down_support=False):
+                   show_sec_grp=False, bdms=None, azs=None,
+                   cell_down_support=False):
         """Provide a view for a list of servers.
 
         :param func: Function used to format the server data
@@ -539,6 +553,7 @@ class ViewBuilder(common.ViewBuilder):
         :param show_sec_grp: If the security groups should be included in
                         the response dict.
         :param bdms: Instances bdms info from multiple cells.
+        :param azs: Availability zones of the instances, by instance uuid.
         :param cell_down_support: True if the API (and caller) support
                                   returning a minimal instance
                                   construct if the relevant cell is
@@ -569,6 +584,7 @@ class ViewBuilder(common.ViewBuilder):
                  show_host_status=show_host_status,
                  show_sec_grp=show_sec_grp, bdms=bdms,
                  cell_down_support=cell_down_support,
+                 azs=azs,
                  provided_az=req_specs_dict.get(
                      server.uuid, AZ_NOT_IN_REQUEST_SPEC),
                  provided_sched_hints=sched_hints_dict.get(
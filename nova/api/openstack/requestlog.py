@@ -60,7 +60,7 @@ class RequestLog(base_wsgi.Middleware):
             return False
         return True
 
-    def _log_req(self, req, res, start):
+    def _log_req(self, req, res, start, length=None):
         if not self._should_emit(req):
             return
 
@@ -76,7 +76,8 @@ class RequestLog(base_wsgi.Middleware):
             'REQUEST_METHOD': req.environ['REQUEST_METHOD'],
             'REQUEST_URI': self._get_uri(req.environ),
             'status': status,
-            'len': getattr(res, "content_length", 0),
+            'len': (length if length is not None
+                    else getattr(res, "content_length", 0)),
             'time': time.time() - start,
             'microversion': '-'
         }
@@ -85,13 +86,34 @@ class RequestLog(base_wsgi.Middleware):
             data["microversion"] = req.api_version_request.get_string()
         LOG.info(self._log_format, data)
 
+    def _log_streamed_req(self, req, res, start, app_iter):
+        """Yield the body of a streamed response, which has no
+        Content-Length, and log the request with the number of bytes sent
+        once the body is sent or the response is closed.
+        """
+        length = 0
+        try:
+            for chunk in app_iter:
+                length += len(chunk)
+                yield chunk
+        finally:
+            try:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+            finally:
+                self._log_req(req, res, start, length)
+
     @webob.dec.wsgify(RequestClass=wsgi.Request)
     def __call__(self, req):
         res = {}
         start = time.time()
         try:
             res = req.get_response(self.application)
-            self._log_req(req, res, start)
+            if res.content_length is None:
+                res.app_iter = self._log_streamed_req(
+                    req, res, start, res.app_iter)
+            else:
+                self._log_req(req, res, start)
             return res
         except Exception:
             with excutils.save_and_reraise_exception():
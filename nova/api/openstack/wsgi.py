@@ -57,6 +57,10 @@ _METHODS_WITH_BODY = [
 # support is fully merged. It does not affect the V2 API.
 DEFAULT_API_VERSION = "2.1"
 
+# The size, in bytes, from which the serialized pieces of a streamed response
+# body are sent
+STREAM_CHUNK_SIZE = 64 * 1024
+
 # Names of headers used by clients to request a specific version
 # of the REST API
 API_VERSION_REQUEST_HEADER = 'OpenStack-API-Version'
@@ -218,6 +222,52 @@ class JSONDictSerializer(ActionDispatcher):
     def default(self, data):
         return str(jsonutils.dumps(data))
 
+    def iterserialize(self, data):
+        """Generate the serialization of data in chunks of bytes.
+
+        The chunks join to the encoded serialize(data). The items of the lists
+        at the top level of data are serialized one at a time, and each is
+        dropped from its list once serialized, so that a large collection does
+        not have to be held both as objects and as one serialized string.
+        """
+        if not (isinstance(data, dict) and
+                all(isinstance(key, str) for key in data)):
+            yield self.serialize(data).encode('utf-8')
+            return
+
+        pieces = []
+        size = 0
+        for piece in self._iterserialize_pieces(data):
+            pieces.append(piece)
+            size += len(piece)
+            if size >= STREAM_CHUNK_SIZE:
+                yield ''.join(pieces).encode('utf-8')
+                pieces = []
+                size = 0
+        if pieces:
+            yield ''.join(pieces).encode('utf-8')
+
+    @staticmethod
+    def _iterserialize_pieces(data):
+        # NOTE: The separators are the ones of jsonutils.dumps(), so that the
+        # output is the same.
+        yield '{'
+        for i, (key, value) in enumerate(data.items()):
+            if i:
+                yield ', '
+            yield jsonutils.dumps(key) + ': '
+            if not isinstance(value, list):
+                yield jsonutils.dumps(value)
+                continue
+            yield '['
+            for j in range(len(value)):
+                if j:
+                    yield ', '
+                yield jsonutils.dumps(value[j])
+                value[j] = None
+            yield ']'
+        yield '}'
+
 
 class WSGICodes:
     """A microversion-aware WSGI code decorator.
@@ -268,6 +318,17 @@ def response(
     return decorator
 
 
+def stream_response(func):
+    """Attaches streaming of the response body to a method.
+
+    The dict returned by the method is serialized as the response is sent,
+    rather than at once; see JSONDictSerializer.iterserialize(). Note that the
+    function attributes are directly manipulated; the method is not wrapped.
+    """
+    func.wsgi_stream = True
+    return func
+
+
 class ResponseObject(object):
     """Bundles a response object
 
@@ -284,6 +345,7 @@ class ResponseObject(object):
         self._code = code
         self._headers = headers or {}
         self.serializer = JSONDictSerializer()
+        self.stream = False
 
     def __getitem__(self, key):
         """Retrieves a header with the given name."""
@@ -312,10 +374,15 @@ class ResponseObject(object):
 
         serializer = self.serializer
 
-        body = None
-        if self.obj is not None:
-            body = serializer.serialize(self.obj)
-        response = webob.Response(body=body)
+        if self.stream and self.obj is not None:
+            # The serialized body is generated as the response is sent
+            obj, self.obj = self.obj, None
+            response = webob.Response(app_iter=serializer.iterserialize(obj))
+        else:
+            body = None
+            if self.obj is not None:
+                body = serializer.serialize(self.obj)
+            response = webob.Response(body=body)
         response.status_int = self.code
         for hdr, val in self._headers.items():
             # In Py3.X Headers must be a str that was first safely
@@ -594,6 +661,8 @@ class Resource(wsgi.Application):
                 # Do a preserialize to set up the response object
                 if hasattr(meth, 'wsgi_codes'):
                     resp_obj._default_code = meth.wsgi_codes(request)
+                if getattr(meth, 'wsgi_stream', False):
+                    resp_obj.stream = True
 
             if resp_obj and not response:
                 response = resp_obj.serialize(request, accept)
@@ -210,3 +210,55 @@ def get_instance_availability_zone(context, instance):
         az = get_host_availability_zone(elevated, host)
         cache.set(cache_key, az)
     return az
+
+
+def get_instances_availability_zones(context, instances):
+    """Return the availability zones of the specified instances.
+
+    This is get_instance_availability_zone() for a list of instances, which
+    looks up the availability zones of the hosts missing from the cache with
+    a single query.
+
+    :returns: A dict, keyed by instance uuid, of availability zones
+    """
+    azs = {}
+    instances_by_host = collections.defaultdict(list)
+    for instance in instances:
+        host = instance.host if 'host' in instance else None
+        if host:
+            instances_by_host[host].append(instance)
+        else:
+            azs[instance.uuid] = instance.get('availability_zone')
+    if not instances_by_host:
+        return azs
+
+    cache = _get_cache()
+    hosts = list(instances_by_host)
+    host_azs = {}
+    for host, az in zip(hosts, cache.get_multi(
+            [_make_cache_key(host) for host in hosts])):
+        # NOTE: Like in get_instance_availability_zone(), the cache is wrong
+        # if an instance of the host has another availability zone.
+        if az and all(instance.get('availability_zone') in (None, az)
+                      for instance in instances_by_host[host]):
+            host_azs[host] = az
+
+    missing = set(hosts) - set(host_azs)
+    if missing:
+        aggregates = objects.AggregateList.get_by_metadata_key(
+            context.elevated(), 'availability_zone', hosts=missing)
+        found = {}
+        for aggregate in aggregates:
+            for host in aggregate.hosts:
+                if host in missing and host not in found:
+                    found[host] = aggregate.metadata['availability_zone']
+        found_azs = {host: found.get(host, CONF.default_availability_zone)
+                     for host in missing}
+        cache.set_multi({_make_cache_key(host): az
+                         for host, az in found_azs.items()})
+        host_azs.update(found_azs)
+
+    for host, host_instances in instances_by_host.items():
+        for instance in host_instances:
+            azs[instance.uuid] = host_azs[host]
+    return azs
@@ -112,5 +112,15 @@ class CacheClient(object):
     def set(self, key, value):
         return self.region.set(key, value)
 
+    def get_multi(self, keys):
+        """Return the list of the values of keys, None for the missing
+        ones.
+        """
+        return [None if value == cache.NO_VALUE else value
+                for value in self.region.get_multi(keys)]
+
+    def set_multi(self, mapping):
+        return self.region.set_multi(mapping)
+
     def delete(self, key):
         return self.region.delete(key)
@@ -83,6 +83,7 @@ from nova.objects import virtual_interface as virtual_interface_obj
 import nova.quota
 from nova import rpc
 from nova.scheduler.client import report
+from nova.scheduler import timing as scheduler_timing
 from nova.scheduler import utils as scheduler_utils
 from nova import utils
 from nova import version
@@ -3794,6 +3795,70 @@ class LimitsCommands():
             return 1
 
 
+class SchedulerCommands:
+
+    @action_description(_("""
+Show the timings of the slowest scheduling requests.
+
+The timings are read from the file periodically written by the scheduler
+service, see the [filter_scheduler] request_timing_dump_file option.
+"""))
+    @args(
+        '--file', metavar='<path>', dest='path',
+        help='Path of the file the timings were dumped to. Defaults to the '
+             '[filter_scheduler] request_timing_dump_file option.')
+    @args(
+        '--json', action='store_true',
+        default=False, dest='json', required=False,
+        help='Display output as json without a table.')
+    def show_request_timings(self, path=None, json=False):
+        """Show the timings of the slowest scheduling requests.
+
+        Return codes:
+        * 0: Command completed successfully.
+        * 1: An unexpected error happened.
+        * 2: No timings file found.
+        """
+        path = path or CONF.filter_scheduler.request_timing_dump_file
+        if not path:
+            print(_('No timings file given and the [filter_scheduler] '
+                    'request_timing_dump_file option is not set.'))
+            return 2
+        try:
+            data = scheduler_timing.load(path)
+        except FileNotFoundError:
+            print(_('Timings file %s not found.') % path)
+            return 2
+        except Exception as e:
+            print(f'Unexpected error, see nova-manage.log for the full '
+                  f'trace: {str(e)}')
+            LOG.exception('Unexpected error')
+            return 1
+
+        if json:
+            print(jsonutils.dumps(data))
+            return 0
+
+        print(_('Slowest requests of %(host)s as of %(dumped_at)s') % data)
+        t = prettytable.PrettyTable(
+            [_('Request ID'), _('Started at'), _('Instances'),
+             _('Duration (ms)'), _('Error'), _('Phase'),
+             _('Phase duration (ms)'), _('Count')])
+        t.align = 'l'
+        for request in data['requests']:
+            row = [request['request_id'], request['started_at'],
+                   request['num_instances'],
+                   '%.1f' % request['duration_ms'], request['error'] or '']
+            for phase in request['phases'] or [
+                    {'name': '', 'duration_ms': 0.0, 'count': 0}]:
+                t.add_row(row + [phase['name'],
+                                 '%.1f' % phase['duration_ms'],
+                                 phase['count']])
+                row = [''] * len(row)
+        print(t)
+        return 0
+
+
 CATEGORIES = {
     'api_db': ApiDbCommands,
     'cell_v2': CellV2Commands,
@@ -3803,6 +3868,7 @@ CATEGORIES = {
     'volume_attachment': VolumeAttachmentCommands,
     'image_property': ImagePropertyCommands,
     'limits': LimitsCommands,
+    'scheduler': SchedulerCommands,
 }
 
 
@@ -11,6 +11,7 @@
 #    under the License.
 
 import copy
+import math
 
 from nova.compute import multi_cell_list
 import nova.conf
@@ -23,6 +24,10 @@ from nova.objects import instance as instance_obj
 
 CONF = nova.conf.CONF
 
+# The minimum size of the first batch of each cell with the adaptive batch
+# strategy
+ADAPTIVE_MIN_BATCH_SIZE = 10
+
 
 class InstanceSortContext(multi_cell_list.RecordSortContext):
     def __init__(self, sort_keys, sort_dirs):
@@ -45,10 +50,11 @@ class InstanceSortContext(multi_cell_list.RecordSortContext):
 
 
 class InstanceLister(multi_cell_list.CrossCellLister):
-    def __init__(self, sort_keys, sort_dirs, cells=None, batch_size=None):
+    def __init__(self, sort_keys, sort_dirs, cells=None, batch_size=None,
+                 adaptive_batches=False):
         super(InstanceLister, self).__init__(
             InstanceSortContext(sort_keys, sort_dirs), cells=cells,
-            batch_size=batch_size)
+            batch_size=batch_size, adaptive_batches=adaptive_batches)
 
     @property
     def marker_identifier(self):
@@ -92,9 +98,12 @@ class InstanceLister(multi_cell_list.CrossCellLister):
 def get_instances_sorted(ctx, filters, limit, marker, columns_to_join,
                          sort_keys, sort_dirs, cell_mappings=None,
                          batch_size=None, cell_down_support=False):
+    adaptive_batches = (
+        CONF.api.instance_list_cells_batch_strategy == 'adaptive')
     instance_lister = InstanceLister(sort_keys, sort_dirs,
                                      cells=cell_mappings,
-                                     batch_size=batch_size)
+                                     batch_size=batch_size,
+                                     adaptive_batches=adaptive_batches)
     instance_generator = instance_lister.get_records_sorted(
         ctx, filters, limit, marker, columns_to_join=columns_to_join,
         cell_down_support=cell_down_support)
@@ -120,6 +129,12 @@ def get_instance_list_cells_batch_size(limit, cells):
         # single cell in one shot.
         return limit
 
+    if strategy == 'adaptive':
+        # Adaptive strategy, even partitioning for the first batch of every
+        # cell, the batch sizes of the cells then grow as they are consumed
+        return min(max(math.ceil(limit / len(cells)),
+                       ADAPTIVE_MIN_BATCH_SIZE), limit)
+
     if strategy == 'fixed':
         # Fixed strategy, always a static batch size
         batch_size = CONF.api.instance_list_cells_batch_fixed_size
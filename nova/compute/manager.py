@@ -26,6 +26,7 @@ terminating it.
 
 import base64
 import binascii
+import collections
 from collections.abc import Callable, Iterator
 import contextlib
 import copy
@@ -39,6 +40,7 @@ import traceback
 
 from cinderclient import exceptions as cinder_exception
 from cursive import exception as cursive_exception
+from futurist import waiters as futurist_waiters
 from keystoneauth1 import exceptions as keystone_exception
 from openstack import exceptions as sdk_exc
 import os_traits
@@ -57,6 +59,7 @@ from nova import block_device
 from nova.compute import api as compute
 from nova.compute import build_results
 from nova.compute import claims
+from nova.compute import periodic
 from nova.compute import power_state
 from nova.compute import resource_tracker
 from nova.compute import rpcapi as compute_rpcapi
@@ -105,6 +108,27 @@ CONF = nova.conf.CONF
 
 LOG = logging.getLogger(__name__)
 
+# The power states an instance in a given vm_state is expected to be in, when
+# it has no pending task. _sync_power_states leaves the instances alone when
+# they are in one of these states both in the database and on the hypervisor.
+_POWER_STATES_IN_SYNC = {
+    vm_states.ACTIVE: (power_state.RUNNING,),
+    vm_states.BUILDING: tuple(power_state.STATE_MAP),
+    vm_states.ERROR: tuple(power_state.STATE_MAP),
+    vm_states.PAUSED: (power_state.PAUSED,),
+    vm_states.RESCUED: (power_state.RUNNING,),
+    vm_states.RESIZED: (power_state.RUNNING, power_state.SHUTDOWN),
+    vm_states.SHELVED: (power_state.SHUTDOWN,),
+    vm_states.STOPPED: (power_state.NOSTATE, power_state.SHUTDOWN,
+                        power_state.CRASHED),
+    vm_states.SUSPENDED: (power_state.SUSPENDED, power_state.SHUTDOWN),
+}
+
+# The task states of the instances whose interrupted resize or live migration
+# _init_instance rolls back
+_INIT_HOST_MIGRATING_TASK_STATES = (task_states.RESIZE_MIGRATING,
+                                    task_states.MIGRATING)
+
 wrap_exception = functools.partial(
     exception_wrapper.wrap_exception, service='compute', binary='nova-compute')
 
@@ -669,6 +693,18 @@ class ComputeManager(manager.Manager):
         self.instance_events = InstanceEvents()
         self._syncs_in_progress: set[str] = set()
         self._syncs_in_progress_lock = threading.Lock()
+        # Nodenames of the compute nodes whose resources are being updated
+        # by update_available_resource
+        self._resource_updates_in_progress: set[str] = set()
+        self._resource_updates_in_progress_lock = threading.Lock()
+        # Duration in seconds of the last update_available_resource run
+        self.last_resource_update_duration = None
+        # Monotonic time of the last audit of the network info caches made by
+        # _heal_instance_info_cache with heal_instance_info_cache_stale_only
+        self._last_info_cache_audit = None
+        # Guards the list of the UUIDs of the instances to heal, which is
+        # appended to by the external events while the periodic task pops it
+        self._instance_uuids_to_heal_lock = threading.Lock()
         self.send_instance_updates = (
             CONF.filter_scheduler.track_instance_changes)
 
@@ -713,6 +749,15 @@ class ComputeManager(manager.Manager):
         # TODO(sbauza): Remove this call once we delete the V5Proxy class
         self.additional_endpoints.append(_ComputeV5Proxy(self))
 
+        # The intervals of the periodic tasks may be stretched by
+        # _adjust_periodic_spacing, so keep our own copy of them rather than
+        # update the class attribute
+        self._periodic_spacing = dict(self._periodic_spacing)
+        self._periodic_base_spacing = dict(self._periodic_spacing)
+        self._periodic_backoff = 1.0
+        if CONF.compute.periodic_task_spread:
+            self._spread_periodic_tasks()
+
         # NOTE(russellb) Load the driver last.  It may call back into the
         # compute manager via the virtapi, so we want it to be fully
         # initialized before that happens.
@@ -726,6 +771,41 @@ class ComputeManager(manager.Manager):
         with self._syncs_in_progress_lock:
             yield self._syncs_in_progress
 
+    def _spread_periodic_tasks(self):
+        """Delay the first run of each periodic task to its phase on this
+        host. See nova.compute.periodic.
+        """
+        for name, task in self._periodic_tasks:
+            # Leave alone the tasks running when the service starts
+            if self._periodic_last_run[name] is None:
+                continue
+            spacing = self._periodic_spacing[name]
+            self._periodic_last_run[name] = periodic.get_first_run(
+                self.host, name, spacing) - spacing
+
+    def _adjust_periodic_spacing(self):
+        """Stretch the intervals of the periodic tasks while the conductor
+        is slow, and restore them once it is not anymore.
+        """
+        backoff = periodic.get_backoff()
+        if backoff == self._periodic_backoff:
+            return
+        if backoff > 1:
+            LOG.warning('The calls to the conductor are slower than usual, '
+                        'stretching the intervals of the periodic tasks by '
+                        '%.1f.', backoff)
+        else:
+            LOG.info('The latency of the calls to the conductor is back to '
+                     'normal, restoring the intervals of the periodic tasks.')
+        self._periodic_backoff = backoff
+        for name, spacing in self._periodic_base_spacing.items():
+            self._periodic_spacing[name] = spacing * backoff
+
+    def periodic_tasks(self, context, raise_on_error=False):
+        self._adjust_periodic_spacing()
+        return super(ComputeManager, self).periodic_tasks(
+            context, raise_on_error=raise_on_error)
+
     def reset(self):
         LOG.info('Reloading compute RPC API')
         compute_rpcapi.reset_globals()
@@ -863,13 +943,22 @@ class ComputeManager(manager.Manager):
                                      for inst in local_instances
                                      if inst.uuid in evacuations}
 
+        # Fetch the network info of all the instances to destroy at once
+        # rather than one instance at a time. The deleted instances are left
+        # out.
+        network_infos = {}
+        if evacuated_local_instances:
+            network_infos = self.network_api.get_instances_nw_info(
+                context, list(evacuated_local_instances.values()))
+
         for instance in evacuated_local_instances.values():
             LOG.info('Destroying instance as it has been evacuated from '
                      'this host but still exists in the hypervisor',
                      instance=instance)
             try:
-                network_info = self.network_api.get_instance_nw_info(
-                    context, instance)
+                if instance.uuid not in network_infos:
+                    raise exception.InstanceNotFound(instance_id=instance.uuid)
+                network_info = network_infos[instance.uuid]
                 bdi = self._get_instance_block_device_info(context,
                                                            instance)
                 evac = evacuations[instance.uuid]
@@ -1548,6 +1637,7 @@ class ComputeManager(manager.Manager):
 
     def init_host(self, service_ref):
         """Initialization for a standalone compute service."""
+        init_host_start = time.monotonic()
 
         if CONF.pci.device_spec:
             # Simply loading the PCI passthrough spec will do a bunch of
@@ -1622,23 +1712,26 @@ class ComputeManager(manager.Manager):
             if self.driver.capabilities.get('supports_evacuate', False):
                 # Check that instances were not already evacuated to another
                 # host before asking the driver to process their state.
-                evacuated_instances = self._destroy_evacuated_instances(
-                    context, nodes_by_uuid)
+                with self._log_init_host_phase('evacuated instances cleanup'):
+                    evacuated_instances = self._destroy_evacuated_instances(
+                        context, nodes_by_uuid)
 
             # Allow the virt driver to validate and normalize the persisted
             # state of local instances before recovering them. This must stay
             # after the host rename check as drivers may mutate instance
             # records.
-            instances_to_process = objects.InstanceList(
-                context, objects=[
-                    instance for instance in instances
-                    if instance.uuid not in evacuated_instances])
-            instances_to_process = self.driver.process_instances_at_startup(
-                context, instances_to_process)
+            with self._log_init_host_phase('driver instances processing'):
+                instances_to_process = objects.InstanceList(
+                    context, objects=[
+                        instance for instance in instances
+                        if instance.uuid not in evacuated_instances])
+                instances_to_process = (
+                    self.driver.process_instances_at_startup(
+                        context, instances_to_process))
 
             # Initialise instances on the host that are not evacuating.
-            for instance in instances_to_process:
-                self._init_instance(context, instance)
+            with self._log_init_host_phase('instances initialization'):
+                self._init_instances(context, instances_to_process)
 
             # NOTE(gibi): Collect all instance UUIDs that were handled above,
             # either by init_instance or _destroy_evacuated_instances. This
@@ -1647,8 +1740,9 @@ class ComputeManager(manager.Manager):
             # handled above.
             already_handled = {instance.uuid for instance in instances}.union(
                 evacuated_instances)
-            self._error_out_instances_whose_build_was_interrupted(
-                context, already_handled, nodes_by_uuid.keys())
+            with self._log_init_host_phase('interrupted builds cleanup'):
+                self._error_out_instances_whose_build_was_interrupted(
+                    context, already_handled, nodes_by_uuid.keys())
 
         finally:
             if instances:
@@ -1660,6 +1754,68 @@ class ComputeManager(manager.Manager):
                 # _sync_scheduler_instance_info periodic task will.
                 self._update_scheduler_instance_info(context, instances)
 
+        LOG.info("Host initialization with %(count)d instances took "
+                 "%(duration).2f seconds.",
+                 {'count': len(instances),
+                  'duration': time.monotonic() - init_host_start})
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _log_init_host_phase(phase):
+        """Log how long a phase of init_host took."""
+        start = time.monotonic()
+        yield
+        LOG.info("Host initialization phase '%(phase)s' took %(duration).2f "
+                 "seconds.",
+                 {'phase': phase, 'duration': time.monotonic() - start})
+
+    @staticmethod
+    def _get_init_instance_phases(instances):
+        """Split the instances to initialize when the service starts into
+        the phases they are initialized in, one after the other.
+
+        The instances being deleted come first, so that the resources they
+        hold on the host are released before the other instances are
+        recovered. The instances whose resize or migration was interrupted
+        come next, as reverting them can claim resources on the host again.
+        """
+        deleting = []
+        migrating = []
+        others = []
+        for instance in instances:
+            if (instance.vm_state == vm_states.DELETED or
+                    instance.task_state == task_states.DELETING):
+                deleting.append(instance)
+            elif instance.task_state in _INIT_HOST_MIGRATING_TASK_STATES:
+                migrating.append(instance)
+            else:
+                others.append(instance)
+        return [phase for phase in (deleting, migrating, others) if phase]
+
+    def _init_instances(self, context, instances):
+        """Initialize the instances of the host during service init.
+
+        With init_host_pool_size greater than 1, the instances of each phase
+        returned by _get_init_instance_phases are initialized concurrently in
+        the init_host executor, and the phases one after the other.
+        """
+        if CONF.init_host_pool_size <= 1:
+            for instance in instances:
+                self._init_instance(context, instance)
+            return
+
+        for phase in self._get_init_instance_phases(instances):
+            futures = [
+                thread_pool_factory.spawn_on(
+                    thread_pool_factory.ExecutorType.INIT_HOST,
+                    self._init_instance, context, instance)
+                for instance in phase]
+            futurist_waiters.wait_for_all(futures)
+            for future in futures:
+                # Propagate the errors which must stop the service startup,
+                # as the sequential initialization does
+                future.result()
+
     def _error_out_instances_whose_build_was_interrupted(
             self, context, already_handled_instances, node_uuids):
         """If there are instances in BUILDING state that are not
@@ -4025,7 +4181,7 @@ class ComputeManager(manager.Manager):
             else:
                 # NOTE(gibi): Let the resource tracker set the instance
                 # host and drop the migration context as we need to hold the
-                # COMPUTE_RESOURCE_SEMAPHORE to avoid the race with
+                # resource tracker lock of the node to avoid the race with
                 # _update_available_resources. See bug 1896463.
                 self.rt.finish_evacuation(instance, scheduled_node, migration)
 
@@ -10764,6 +10920,11 @@ class ComputeManager(manager.Manager):
 
         LOG.debug('Starting heal instance info cache')
 
+        if (CONF.heal_instance_info_cache_stale_only and
+                not self.driver.manages_network_binding_host_id()):
+            self._heal_stale_instance_info_cache(context)
+            return
+
         if not instance_uuids:
             # The list of instances to heal is empty so rebuild it
             LOG.debug('Rebuilding the list of instances to heal')
@@ -10774,13 +10935,7 @@ class ComputeManager(manager.Manager):
                 # which are building or deleting so don't put them
                 # in the list. If they are building they will get
                 # added to the list next time we build it.
-                if (inst.vm_state == vm_states.BUILDING):
-                    LOG.debug('Skipping network cache update for instance '
-                              'because it is Building.', instance=inst)
-                    continue
-                if (inst.task_state == task_states.DELETING):
-                    LOG.debug('Skipping network cache update for instance '
-                              'because it is being deleted.', instance=inst)
+                if not self._can_heal_instance_info_cache(inst):
                     continue
 
                 if not instance:
@@ -10793,63 +10948,153 @@ class ComputeManager(manager.Manager):
             self._instance_uuids_to_heal = instance_uuids
         else:
             # Find the next valid instance on the list
-            while instance_uuids:
-                try:
-                    inst = objects.Instance.get_by_uuid(
-                            context, instance_uuids.pop(0),
-                            expected_attrs=['system_metadata', 'info_cache',
-                                            'flavor'],
-                            use_slave=True)
-                except exception.InstanceNotFound:
-                    # Instance is gone.  Try to grab another.
-                    continue
-
-                # Check the instance hasn't been migrated
-                if inst.host != self.host:
-                    LOG.debug('Skipping network cache update for instance '
-                              'because it has been migrated to another '
-                              'host.', instance=inst)
-                # Check the instance isn't being deleting
-                elif inst.task_state == task_states.DELETING:
-                    LOG.debug('Skipping network cache update for instance '
-                              'because it is being deleted.', instance=inst)
-                else:
-                    instance = inst
-                    break
+            instance = self._get_next_instance_to_heal(context,
+                                                       instance_uuids)
 
         if instance:
-            # We have an instance now to refresh
+            self._refresh_instance_info_cache(context, instance)
+        else:
+            LOG.debug("Didn't find any instances for network info cache "
+                      "update.")
+
+    @staticmethod
+    def _can_heal_instance_info_cache(instance):
+        if instance.vm_state == vm_states.BUILDING:
+            LOG.debug('Skipping network cache update for instance '
+                      'because it is Building.', instance=instance)
+            return False
+        if instance.task_state == task_states.DELETING:
+            LOG.debug('Skipping network cache update for instance '
+                      'because it is being deleted.', instance=instance)
+            return False
+        return True
+
+    def _get_next_instance_to_heal(self, context, instance_uuids):
+        """Pop the UUIDs off the list of instances to heal until one of them
+        can be healed, and return that instance, or None.
+        """
+        while True:
+            with self._instance_uuids_to_heal_lock:
+                if not instance_uuids:
+                    return None
+                instance_uuid = instance_uuids.pop(0)
             try:
-                # Fix potential mismatch in port binding if evacuation failed
-                # after reassigning the port binding to the dest host but
-                # before the instance host is changed.
-                # Do this only when instance has no pending task.
-                if instance.task_state is None and \
-                        self._require_nw_info_update(context, instance):
-                    LOG.info("Updating ports in neutron", instance=instance)
-                    self.network_api.setup_instance_network_on_host(
-                        context, instance, self.host)
-                # Call to network API to get instance info.. this will
-                # force an update to the instance's info_cache
-                self.network_api.get_instance_nw_info(
-                    context, instance, force_refresh=True)
-                LOG.debug('Updated the network info_cache for instance',
-                          instance=instance)
+                inst = objects.Instance.get_by_uuid(
+                        context, instance_uuid,
+                        expected_attrs=['system_metadata', 'info_cache',
+                                        'flavor'],
+                        use_slave=True)
             except exception.InstanceNotFound:
-                # Instance is gone.
-                LOG.debug('Instance no longer exists. Unable to refresh',
-                          instance=instance)
-                return
-            except exception.InstanceInfoCacheNotFound:
-                # InstanceInfoCache is gone.
-                LOG.debug('InstanceInfoCache no longer exists. '
-                          'Unable to refresh', instance=instance)
+                # Instance is gone.  Try to grab another.
+                continue
+
+            # Check the instance hasn't been migrated
+            if inst.host != self.host:
+                LOG.debug('Skipping network cache update for instance '
+                          'because it has been migrated to another '
+                          'host.', instance=inst)
+            # Check the instance isn't being deleting
+            elif inst.task_state == task_states.DELETING:
+                LOG.debug('Skipping network cache update for instance '
+                          'because it is being deleted.', instance=inst)
+            else:
+                return inst
+
+    def _refresh_instance_info_cache(self, context, instance):
+        try:
+            # Fix potential mismatch in port binding if evacuation failed
+            # after reassigning the port binding to the dest host but
+            # before the instance host is changed.
+            # Do this only when instance has no pending task.
+            if instance.task_state is None and \
+                    self._require_nw_info_update(context, instance):
+                LOG.info("Updating ports in neutron", instance=instance)
+                self.network_api.setup_instance_network_on_host(
+                    context, instance, self.host)
+            # Call to network API to get instance info.. this will
+            # force an update to the instance's info_cache
+            self.network_api.get_instance_nw_info(
+                context, instance, force_refresh=True)
+            LOG.debug('Updated the network info_cache for instance',
+                      instance=instance)
+        except exception.InstanceNotFound:
+            # Instance is gone.
+            LOG.debug('Instance no longer exists. Unable to refresh',
+                      instance=instance)
+        except exception.InstanceInfoCacheNotFound:
+            # InstanceInfoCache is gone.
+            LOG.debug('InstanceInfoCache no longer exists. '
+                      'Unable to refresh', instance=instance)
+        except Exception:
+            LOG.error('An error occurred while refreshing the network '
+                      'cache.', instance=instance, exc_info=True)
+
+    def _heal_stale_instance_info_cache(self, context):
+        """Heal the network info cache of the next instance known to have a
+        stale one, auditing the caches of all the instances of the host first
+        if it is time to.
+        """
+        with self._instance_uuids_to_heal_lock:
+            instance_uuids = getattr(self, '_instance_uuids_to_heal', [])
+            self._instance_uuids_to_heal = instance_uuids
+
+        audit_interval = CONF.heal_instance_info_cache_audit_interval
+        if (self._last_info_cache_audit is None or (
+                audit_interval > 0 and
+                time.monotonic() - self._last_info_cache_audit >=
+                audit_interval)):
+            self._last_info_cache_audit = time.monotonic()
+            try:
+                stale_uuids = self._get_stale_instance_info_caches(context)
             except Exception:
-                LOG.error('An error occurred while refreshing the network '
-                          'cache.', instance=instance, exc_info=True)
+                LOG.error('An error occurred while auditing the network '
+                          'info caches.', exc_info=True)
+            else:
+                with self._instance_uuids_to_heal_lock:
+                    instance_uuids.extend(uuid for uuid in stale_uuids
+                                          if uuid not in instance_uuids)
+
+        instance = self._get_next_instance_to_heal(context, instance_uuids)
+        if instance:
+            self._refresh_instance_info_cache(context, instance)
         else:
-            LOG.debug("Didn't find any instances for network info cache "
-                      "update.")
+            LOG.debug("Didn't find any instances with a stale network info "
+                      "cache.")
+
+    def _get_stale_instance_info_caches(self, context):
+        """Return the UUIDs of the instances of this host whose network info
+        cache does not match the ports bound to this host, using a single
+        port listing.
+        """
+        db_instances = objects.InstanceList.get_by_host(
+            context, self.host, expected_attrs=['info_cache'],
+            use_slave=True)
+        search_opts = {'binding:host_id': self.host,
+                       'fields': ['id', 'device_id', 'binding:vif_type']}
+        ports = self.network_api.list_ports(context, **search_opts)['ports']
+
+        port_ids = collections.defaultdict(set)
+        unbound = set()
+        for port in ports:
+            port_ids[port['device_id']].add(port['id'])
+            if port.get('binding:vif_type') in (
+                    network_model.VIF_TYPE_UNBOUND,
+                    network_model.VIF_TYPE_BINDING_FAILED):
+                unbound.add(port['device_id'])
+
+        stale_uuids = []
+        for inst in db_instances:
+            if not self._can_heal_instance_info_cache(inst):
+                continue
+            cached_port_ids = {
+                vif['id'] for vif in inst.get_network_info() or []}
+            if (cached_port_ids != port_ids[inst.uuid] or
+                    inst.uuid in unbound):
+                stale_uuids.append(inst.uuid)
+        LOG.debug('Found %(stale)d instances with a stale network info '
+                  'cache out of %(total)d.',
+                  {'stale': len(stale_uuids), 'total': len(db_instances)})
+        return stale_uuids
 
     @periodic_task.periodic_task
     def _poll_rebooting_instances(self, context):
@@ -11125,13 +11370,28 @@ class ComputeManager(manager.Manager):
         number of virtual machines known by the database, we proceed in a lazy
         loop, one database record at a time, checking if the hypervisor has the
         same power state as is in the database.
+
+        If the virt driver can report the power states of all its instances at
+        once, the instances whose power state already matches the database are
+        left alone, and only the others are synced one at a time.
         """
         db_instances = objects.InstanceList.get_by_host(context, self.host,
                                                         expected_attrs=[],
                                                         use_slave=True)
 
         try:
-            num_vm_instances = self.driver.get_num_instances()
+            try:
+                vm_power_states = self.driver.get_power_states()
+            except NotImplementedError:
+                vm_power_states = None
+            except exception.InternalError as e:
+                LOG.warning('Unable to get the power states of all the '
+                            'instances, syncing them one at a time: %s', e)
+                vm_power_states = None
+            if vm_power_states is None:
+                num_vm_instances = self.driver.get_num_instances()
+            else:
+                num_vm_instances = len(vm_power_states)
         except exception.VirtDriverNotReady as e:
             # If the virt driver is not ready, like ironic-api not being up
             # yet in the case of ironic, just log it and exit.
@@ -11148,6 +11408,22 @@ class ComputeManager(manager.Manager):
                         {'num_db_instances': num_db_instances,
                          'num_vm_instances': num_vm_instances})
 
+        if vm_power_states is not None:
+            # NOTE: The power states were queried without holding the
+            # instance locks, so they are only used to leave out the instances
+            # which need no sync. The others, including the instances missing
+            # from the power states, are synced as usual, querying the driver
+            # again with the instance lock held.
+            db_instances = [
+                db_instance for db_instance in db_instances
+                if db_instance.uuid not in vm_power_states or
+                not self._is_power_state_in_sync(
+                    db_instance, vm_power_states[db_instance.uuid])]
+            LOG.debug('%(num_sync)d of %(num_db)d instances need their power '
+                      'state synced',
+                      {'num_sync': len(db_instances),
+                       'num_db': num_db_instances})
+
         def _sync(db_instance):
             # NOTE(melwitt): This must be synchronized as we query state from
             #                two separate sources, the driver and the database.
@@ -11179,6 +11455,18 @@ class ComputeManager(manager.Manager):
                         thread_pool_factory.ExecutorType.SYNC_POWER,
                         _sync, db_instance)
 
+    @staticmethod
+    def _is_power_state_in_sync(db_instance, vm_power_state):
+        """Whether the power state of an instance on the hypervisor matches
+        the database, and is one _sync_instance_power_state would not act on.
+        """
+        if db_instance.task_state is not None:
+            return False
+        if db_instance.power_state != vm_power_state:
+            return False
+        return vm_power_state in _POWER_STATES_IN_SYNC.get(
+            db_instance.vm_state, ())
+
     def _query_driver_power_state_and_sync(self, context, db_instance):
         if db_instance.task_state is not None:
             LOG.info("During sync_power_state the instance has a "
@@ -11545,9 +11833,94 @@ class ComputeManager(manager.Manager):
                             "Failed to delete compute node resource provider "
                             "for compute node %s: %s", cn.uuid, str(e))
 
+        start = time.monotonic()
+        if CONF.update_resources_pool_size > 1 and len(nodenames) > 1:
+            self._update_available_resource_for_nodes(
+                context, nodenames, startup=startup)
+        else:
+            for nodename in nodenames:
+                self._update_available_resource_for_node(context, nodename,
+                                                         startup=startup)
+        self.last_resource_update_duration = time.monotonic() - start
+        LOG.debug("Updated the resources of %(count)d compute nodes in "
+                  "%(duration).2f seconds",
+                  {'count': len(nodenames),
+                   'duration': self.last_resource_update_duration})
+        interval = (CONF.update_resources_interval or
+                    periodic_task.DEFAULT_INTERVAL)
+        if not startup and self.last_resource_update_duration > interval:
+            LOG.warning("Updating the resources of %(count)d compute nodes "
+                        "took %(duration).2f seconds, longer than the "
+                        "%(interval)d seconds interval of the periodic task. "
+                        "Consider increasing update_resources_pool_size.",
+                        {'count': len(nodenames),
+                         'duration': self.last_resource_update_duration,
+                         'interval': interval})
+
+    def _update_available_resource_for_nodes(self, context, nodenames,
+                                             startup=False):
+        """Update the resources of the given compute nodes concurrently in
+        the update_resources executor.
+
+        The nodes whose update is still in progress from a previous run,
+        after having exceeded update_resources_node_timeout, are skipped.
+        """
+        timeout = CONF.update_resources_node_timeout
+        # The monotonic time each node update started at, keyed by nodename
+        started_at = {}
+
+        def _update(nodename):
+            started_at[nodename] = time.monotonic()
+            try:
+                self._update_available_resource_for_node(
+                    context, nodename, startup=startup)
+            finally:
+                with self._resource_updates_in_progress_lock:
+                    self._resource_updates_in_progress.discard(nodename)
+
+        futures = {}
         for nodename in nodenames:
-            self._update_available_resource_for_node(context, nodename,
-                                                     startup=startup)
+            with self._resource_updates_in_progress_lock:
+                if nodename in self._resource_updates_in_progress:
+                    LOG.warning("The resource update of compute node %s "
+                                "started by a previous run is still in "
+                                "progress, skipping it.", nodename)
+                    continue
+                self._resource_updates_in_progress.add(nodename)
+            future = thread_pool_factory.spawn_on(
+                thread_pool_factory.ExecutorType.UPDATE_RESOURCES,
+                _update, nodename)
+            futures[future] = nodename
+
+        pending = set(futures)
+        while pending:
+            wait_timeout = None
+            if timeout:
+                # Wake up when the first running node update times out
+                now = time.monotonic()
+                deadline = min(
+                    (started_at[futures[f]] + timeout
+                     for f in pending if futures[f] in started_at),
+                    default=now + timeout)
+                wait_timeout = max(deadline - now, 0)
+            done, pending = futurist_waiters.wait_for_any(
+                pending, timeout=wait_timeout)
+            for future in done:
+                # Propagate the errors which must stop the service startup
+                future.result()
+            if not timeout:
+                continue
+            now = time.monotonic()
+            for future in list(pending):
+                nodename = futures[future]
+                if (nodename in started_at and
+                        now - started_at[nodename] >= timeout):
+                    LOG.error("Timed out after %(timeout)d seconds waiting "
+                              "for the resource update of compute node "
+                              "%(node)s. It will be skipped until the update "
+                              "completes.",
+                              {'timeout': timeout, 'node': nodename})
+                    pending.discard(future)
 
     def _get_compute_nodes_in_db(self, context, nodenames, use_slave=False,
                                  startup=False):
@@ -11962,6 +12335,19 @@ class ComputeManager(manager.Manager):
                 return
         do_power_update()
 
+    def _mark_instance_info_cache_stale(self, instance):
+        """Queue an instance whose network info cache could not be refreshed
+        to be healed by _heal_instance_info_cache.
+        """
+        if not CONF.heal_instance_info_cache_stale_only:
+            # The instance will be healed in its turn anyway
+            return
+        with self._instance_uuids_to_heal_lock:
+            instance_uuids = getattr(self, '_instance_uuids_to_heal', [])
+            if instance.uuid not in instance_uuids:
+                instance_uuids.append(instance.uuid)
+            self._instance_uuids_to_heal = instance_uuids
+
     @wrap_exception()
     def external_instance_event(self, context, instances, events):
         # NOTE(danms): Some event types are handled by the manager, such
@@ -11985,6 +12371,9 @@ class ComputeManager(manager.Manager):
                              '%(event)s due to: %(error)s',
                              {'event': event.key, 'error': str(e)},
                              instance=instance)
+                except Exception:
+                    with excutils.save_and_reraise_exception():
+                        self._mark_instance_info_cache_stale(instance)
             elif event.name == 'network-vif-deleted':
                 try:
                     self._process_instance_vif_deleted_event(context,
@@ -11,8 +11,11 @@
 #    under the License.
 
 import abc
+import collections
 import copy
 import heapq
+import itertools
+import threading
 import time
 
 from oslo_log import log as logging
@@ -26,6 +29,68 @@ LOG = logging.getLogger(__name__)
 
 CONF = nova.conf.CONF
 
+# How long, in seconds, the position of each cell at the end of a page of a
+# listing is kept for the next page to start from
+CONTINUATION_TTL = 600
+
+
+class _ListingContinuations(object):
+    """A least recently used cache of the positions of the cells at the end
+    of the pages of cross-cell listings.
+
+    The positions of a page are keyed by the listing and the identifier of
+    the last record of the page, which is the marker of the next page. They
+    map the uuid of each cell to a tuple of the identifier of the record the
+    next page starts after in the cell, or None to start at its first record,
+    and whether that record must be returned first.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._positions: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def get(self, key):
+        """Return the positions of the cells for key, or None."""
+        with self._lock:
+            try:
+                expires, positions = self._positions[key]
+            except KeyError:
+                return None
+            if expires < time.monotonic():
+                del self._positions[key]
+                return None
+            return positions
+
+    def set(self, key, positions):
+        with self._lock:
+            self._positions[key] = (time.monotonic() + CONTINUATION_TTL,
+                                    positions)
+            self._positions.move_to_end(key)
+            while len(self._positions) > self.size:
+                self._positions.popitem(last=False)
+
+
+_CONTINUATIONS: _ListingContinuations | None = None
+
+
+def get_continuations() -> _ListingContinuations | None:
+    """Return the cross-cell listing continuations cache of this process.
+
+    :returns: The cache, or None if
+        ``[api] list_records_continuation_cache_size`` is 0.
+    """
+    global _CONTINUATIONS
+    size = CONF.api.list_records_continuation_cache_size
+    if not size:
+        _CONTINUATIONS = None
+    elif _CONTINUATIONS is None or _CONTINUATIONS.size != size:
+        _CONTINUATIONS = _ListingContinuations(size)
+    return _CONTINUATIONS
+
 
 class RecordSortContext(object):
     def __init__(self, sort_keys, sort_dirs):
@@ -101,10 +166,14 @@ class CrossCellLister(metaclass=abc.ABCMeta):
 
     """
 
-    def __init__(self, sort_ctx, cells=None, batch_size=None):
+    def __init__(self, sort_ctx, cells=None, batch_size=None,
+                 adaptive_batches=False):
         self.sort_ctx = sort_ctx
         self.cells = cells
         self.batch_size = batch_size
+        # Whether the batch size of a cell doubles each time all the records
+        # of its previous batch were consumed
+        self.adaptive_batches = adaptive_batches
         self._cells_responded = set()
         self._cells_failed = set()
         self._cells_timed_out = set()
@@ -220,6 +289,47 @@ class CrossCellLister(metaclass=abc.ABCMeta):
             yield RecordWrapper(ctx, None, e.__class__(e.args))
             return
 
+    def _get_listing_key(self, ctx, filters, kwargs):
+        """Return a key identifying the listing a page belongs to, so that
+        the positions of the cells at the end of a page are only reused for
+        the next page of the same listing.
+        """
+        cells = (tuple(sorted(cell.uuid for cell in self.cells))
+                 if self.cells else None)
+        return (type(self).__name__, ctx.project_id, ctx.user_id,
+                tuple(self.sort_ctx.sort_keys),
+                tuple(self.sort_ctx.sort_dirs),
+                repr(sorted(filters.items())), repr(sorted(kwargs.items())),
+                cells)
+
+    def _get_position_by_values(self, cctx, marker, global_marker_cell,
+                                global_marker_values):
+        """Return the position a cell starts from after the global marker,
+        as a tuple of the local marker and whether the record of the local
+        marker must be returned first, or None if all the records of the cell
+        are before the global marker.
+        """
+        if cctx.cell_uuid == global_marker_cell:
+            # The global marker was returned by the previous page
+            return marker, False
+        # The local marker is an identifier of a record in a cell that is
+        # found by the special method get_marker_by_values(). It should be
+        # the next record in order according to the sort provided, but after
+        # the marker instance which may have been in another cell.
+        local_marker = self.get_marker_by_values(cctx, global_marker_values)
+        if not local_marker:
+            # There was a global marker but everything in our cell is
+            # _before_ that marker, so we return nothing. If we didn't have
+            # this clause, we'd pass marker=None to the query and return a
+            # full unpaginated set for our cell.
+            return None
+        # We did find a marker in our cell, but it wasn't the global marker.
+        # Thus, we will use it as our marker in the main query, but we also
+        # need to prefix that result with this marker instance since the
+        # query will not return it and it has not been returned to the user
+        # yet.
+        return local_marker, local_marker != marker
+
     def get_records_sorted(self, ctx, filters, limit, marker, **kwargs):
         """Get a cross-cell list of records matching filters.
 
@@ -237,8 +347,19 @@ class CrossCellLister(metaclass=abc.ABCMeta):
 
         NOTE: Since we do these in parallel, a nonzero limit will be passed
         to each database query, although the limit will be enforced in the
-        output of this function. Meaning, we will still query $limit from each
-        database, but only return $limit total results.
+        output of this function. Meaning, we may query up to $limit from each
+        database, but only return $limit total results. The records of a cell
+        are queried in batches of batch_size, and a batch is only queried
+        once the previous one was consumed, for no more records than are
+        still needed. With adaptive_batches, the batch size of a cell doubles
+        each time its previous batch was consumed.
+
+        With ``[api] list_records_continuation_cache_size``, the position of
+        each cell which returned records in a page is kept, keyed by the last
+        record of the page, so that the next page, whose marker is that
+        record, resumes these cells from it instead of looking up their local
+        marker by value. The records which sort before the marker, for
+        example because they were created since, are skipped.
 
         :param cell_down_support: True if the API (and caller) support
                                   returning a minimal instance
@@ -251,6 +372,14 @@ class CrossCellLister(metaclass=abc.ABCMeta):
         """
 
         cell_down_support = kwargs.pop('cell_down_support', False)
+        marker_id = self.marker_identifier
+
+        continuations = get_continuations()
+        if continuations is not None:
+            listing_key = self._get_listing_key(ctx, filters, kwargs)
+        # The positions of the cells at the end of the previous page, by cell
+        # uuid
+        previous_positions = {}
 
         if marker:
             # A marker identifier was provided from the API. Call this
@@ -263,76 +392,36 @@ class CrossCellLister(metaclass=abc.ABCMeta):
                 ctx, marker)
             global_marker_values = [global_marker_record[key]
                                     for key in self.sort_ctx.sort_keys]
+            if continuations is not None:
+                previous_positions = continuations.get(
+                    (listing_key, marker)) or {}
 
-        def do_query(cctx):
-            """Generate RecordWrapper(record) objects from a cell.
-
-            We do this inside the thread (created by
-            scatter_gather_all_cells()) so that we return wrappers and
-            avoid having to iterate the combined result list in the
-            caller again. This is run against each cell by the
-            scatter_gather routine.
-            """
-
-            # The local marker is an identifier of a record in a cell
-            # that is found by the special method
-            # get_marker_by_values(). It should be the next record
-            # in order according to the sort provided, but after the
-            # marker instance which may have been in another cell.
-            local_marker = None
-
-            # Since the regular DB query routines take a marker and assume that
-            # the marked record was the last entry of the previous page, we
-            # may need to prefix it to our result query if we're not the cell
-            # that had the actual marker record.
-            local_marker_prefix = []
+        # The identifier of the last record of each cell which was returned,
+        # by cell uuid
+        last_returned = {}
 
-            marker_id = self.marker_identifier
+        def query_cell(cctx, local_marker, include_marker, resumed=False):
+            """Generate the records of a cell after its local marker.
 
-            if marker:
-                if cctx.cell_uuid == global_marker_cell:
-                    local_marker = marker
-                else:
-                    local_marker = self.get_marker_by_values(
-                        cctx, global_marker_values)
-                if local_marker:
-                    if local_marker != marker:
-                        # We did find a marker in our cell, but it wasn't
-                        # the global marker. Thus, we will use it as our
-                        # marker in the main query below, but we also need
-                        # to prefix that result with this marker instance
-                        # since the result below will not return it and it
-                        # has not been returned to the user yet. Note that
-                        # we do _not_ prefix the marker instance if our
-                        # marker was the global one since that has already
-                        # been sent to the user.
-                        local_marker_filters = copy.copy(filters)
-                        if marker_id not in local_marker_filters:
-                            # If an $id filter was provided, it will
-                            # have included our marker already if this
-                            # instance is desired in the output
-                            # set. If it wasn't, we specifically query
-                            # for it. If the other filters would have
-                            # excluded it, then we'll get an empty set
-                            # here and not include it in the output as
-                            # expected.
-                            local_marker_filters[marker_id] = [local_marker]
-                        local_marker_prefix = self.get_by_filters(
-                            cctx, local_marker_filters, limit=1, marker=None,
-                            **kwargs)
-                else:
-                    # There was a global marker but everything in our
-                    # cell is _before_ that marker, so we return
-                    # nothing. If we didn't have this clause, we'd
-                    # pass marker=None to the query below and return a
-                    # full unpaginated set for our cell.
-                    return
-
-            if local_marker_prefix:
+            When resumed from the position of the previous page, the records
+            which do not sort after the global marker are skipped without
+            being counted against the limit.
+            """
+            if include_marker:
+                local_marker_filters = copy.copy(filters)
+                if marker_id not in local_marker_filters:
+                    # If an $id filter was provided, it will have included
+                    # our marker already if this instance is desired in the
+                    # output set. If it wasn't, we specifically query for
+                    # it. If the other filters would have excluded it, then
+                    # we'll get an empty set here and not include it in the
+                    # output as expected.
+                    local_marker_filters[marker_id] = [local_marker]
                 # Per above, if we had a matching marker object, that is
                 # the first result we should generate.
-                yield RecordWrapper(cctx, self.sort_ctx,
-                                    local_marker_prefix[0])
+                yield from self.get_by_filters(
+                    cctx, local_marker_filters, limit=1, marker=None,
+                    **kwargs)
 
             # If a batch size was provided, use that as the limit per
             # batch. If not, then ask for the entire $limit in a single
@@ -348,10 +437,14 @@ class CrossCellLister(metaclass=abc.ABCMeta):
             while limit is None or return_count < limit:
                 batch_count = 0
 
-                # Do not query a full batch if it would cause our total
-                # to exceed the limit
+                # Do not query a full batch if it would cause our total to
+                # exceed the limit, or if fewer records are still needed:
+                # total_limit only counts down as records are consumed, and
+                # this cell is only asked for its next batch once all the
+                # records of its previous one were consumed.
                 if limit:
-                    query_size = min(batch_size, limit - return_count)
+                    query_size = min(batch_size, limit - return_count,
+                                     max(total_limit, 1))
                 else:
                     query_size = batch_size
 
@@ -361,19 +454,29 @@ class CrossCellLister(metaclass=abc.ABCMeta):
                     limit=query_size or None, marker=local_marker,
                     **kwargs)
 
-                # Yield wrapped results from the batch, counting as we go
-                # (to avoid traversing the list to count). Also, update our
+                # Yield results from the batch, counting as we go (to avoid
+                # traversing the list to count). Also, update our
                 # local_marker each time so that local_marker is the end of
                 # this batch in order to find the next batch.
+                skip_count = 0
                 for item in query_result:
-                    local_marker = item[self.marker_identifier]
-                    yield RecordWrapper(cctx, self.sort_ctx, item)
+                    local_marker = item[marker_id]
                     batch_count += 1
+                    if resumed and (
+                            item[marker_id] == marker or
+                            self.sort_ctx.compare_records(
+                                item, global_marker_record) == -1):
+                        # The record was already returned, or sorts before
+                        # the marker since it was created or updated
+                        skip_count += 1
+                        continue
+                    yield item
 
                 # No results means we are done for this cell
                 if not batch_count:
                     break
 
+                batch_count -= skip_count
                 return_count += batch_count
                 LOG.debug(('Listed batch of %(batch)i results from cell '
                            'out of %(limit)s limit. Returned %(total)i '
@@ -382,6 +485,58 @@ class CrossCellLister(metaclass=abc.ABCMeta):
                            'total': return_count,
                            'limit': limit or 'no'})
 
+                if self.adaptive_batches:
+                    batch_size *= 2
+
+        def do_query(cctx):
+            """Generate RecordWrapper(record) objects from a cell.
+
+            We do this inside the thread (created by
+            scatter_gather_all_cells()) so that we return wrappers and
+            avoid having to iterate the combined result list in the
+            caller again. This is run against each cell by the
+            scatter_gather routine.
+            """
+            position = (None, False)
+            resumed = False
+            if marker:
+                resumed = cctx.cell_uuid in previous_positions
+                if resumed:
+                    position = previous_positions[cctx.cell_uuid]
+                else:
+                    position = self._get_position_by_values(
+                        cctx, marker, global_marker_cell,
+                        global_marker_values)
+                    if position is None:
+                        return
+            records = query_cell(cctx, *position, resumed=resumed)
+
+            if resumed:
+                try:
+                    records = itertools.chain([next(records)], records)
+                except StopIteration:
+                    return
+                except exception.MarkerNotFound:
+                    # The record the previous page stopped at in this cell
+                    # was deleted since, find the local marker by value.
+                    position = self._get_position_by_values(
+                        cctx, marker, global_marker_cell,
+                        global_marker_values)
+                    if position is None:
+                        return
+                    records = query_cell(cctx, *position)
+
+            for record in records:
+                yield RecordWrapper(cctx, self.sort_ctx, record)
+
+        # If a limit was provided, it is passed to the per-cell query
+        # routines.  That means we may have NUM_CELLS * limit items across
+        # results. So, we need to consume from that limit below and
+        # stop returning results. Call that total_limit since we will
+        # modify it in the loop below, but query_cell() above also looks
+        # at the original provided limit.
+        total_limit = limit or 0
+
         # NOTE(danms): The calls to do_query() will return immediately
         # with a generator. There is no point in us checking the
         # results for failure or timeout since we have not actually
@@ -399,14 +554,6 @@ class CrossCellLister(metaclass=abc.ABCMeta):
                                                        self.query_wrapper,
                                                        do_query)
 
-        # If a limit was provided, it was passed to the per-cell query
-        # routines.  That means we have NUM_CELLS * limit items across
-        # results. So, we need to consume from that limit below and
-        # stop returning results. Call that total_limit since we will
-        # modify it in the loop below, but do_query() above also looks
-        # at the original provided limit.
-        total_limit = limit or 0
-
         # Generate results from heapq so we can return the inner
         # instance instead of the wrapper. This is basically free
         # as it works as our caller iterates the results.
@@ -445,10 +592,22 @@ class CrossCellLister(metaclass=abc.ABCMeta):
                     self._cells_responded.remove(item.cell_uuid)
                 continue
 
+            last_returned[item.cell_uuid] = item._db_record[marker_id]
             yield item._db_record
             self._cells_responded.add(item.cell_uuid)
             total_limit -= 1
             if total_limit == 0:
                 # We'll only hit this if limit was nonzero and we just
                 # generated our last one
+                if (continuations is not None and
+                        not (self._cells_failed or self._cells_timed_out)):
+                    # Only the cells which returned records are resumed
+                    # from where they stopped, the local marker of the
+                    # others is looked up by value again: records sorting
+                    # before the marker may have been created in them since.
+                    positions = {
+                        cell_uuid: (record_id, False)
+                        for cell_uuid, record_id in last_returned.items()}
+                    continuations.set(
+                        (listing_key, item._db_record[marker_id]), positions)
                 return
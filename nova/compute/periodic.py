@@ -0,0 +1,71 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Scheduling of the compute manager periodic tasks.
+
+With ``[compute] periodic_task_spread``, every periodic task of a compute
+service runs at a phase of its interval derived from the host and task names,
+so that the services of a cloud do not all hit the conductor, the databases and
+placement at the same time, for example after they were restarted together.
+The phase is anchored to the wall clock, so it holds across restarts.
+
+With ``[compute] periodic_task_max_backoff``, the intervals of the periodic
+tasks are stretched while the latency of the calls to the conductor is well
+above its usual level.
+"""
+
+import hashlib
+import math
+import time
+
+from nova.conductor import rpcapi as conductor_rpcapi
+import nova.conf
+
+CONF = nova.conf.CONF
+
+# The ratio of the conductor latency to its baseline from which the periodic
+# tasks back off
+BACKOFF_THRESHOLD = 2.0
+
+
+def get_phase(host, task_name, spacing):
+    """Return the phase, in [0, spacing), of a periodic task on a host."""
+    digest = hashlib.sha256(
+        ('%s:%s' % (host, task_name)).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64 * spacing
+
+
+def get_first_run(host, task_name, spacing):
+    """Return the monotonic time at which a periodic task should first run
+    on a host, which is the next time the wall clock is at the phase of the
+    task.
+    """
+    phase = get_phase(host, task_name, spacing)
+    return time.monotonic() + (phase - time.time()) % spacing
+
+
+def get_backoff():
+    """Return the factor the periodic task intervals should be stretched by,
+    given the current latency of the calls to the conductor.
+
+    The factor follows the ratio of the latency to its baseline, rounded down
+    to the half, once it reaches BACKOFF_THRESHOLD, and is capped by
+    ``[compute] periodic_task_max_backoff``.
+    """
+    max_backoff = CONF.compute.periodic_task_max_backoff
+    if max_backoff <= 1:
+        return 1.0
+    ratio = conductor_rpcapi.OBJECT_CALL_LATENCY.get_ratio()
+    if ratio < BACKOFF_THRESHOLD:
+        return 1.0
+    return min(math.floor(ratio * 2) / 2, max_backoff)
@@ -75,12 +75,17 @@ class _Provider(object):
         appropriate keys.
 
         :param pdict: Dictionary representing a provider, with keys 'name',
-                      'uuid', 'generation', 'parent_provider_uuid'.  Of these,
-                      only 'name' is mandatory.
-        """
-        return cls(pdict['name'], uuid=pdict.get('uuid'),
-                   generation=pdict.get('generation'),
-                   parent_uuid=pdict.get('parent_provider_uuid'))
+                      'uuid', 'generation', 'parent_provider_uuid' and
+                      optionally 'inventories', 'traits' and 'aggregates'.
+                      Of these, only 'name' is mandatory.
+        """
+        provider = cls(pdict['name'], uuid=pdict.get('uuid'),
+                       generation=pdict.get('generation'),
+                       parent_uuid=pdict.get('parent_provider_uuid'))
+        provider.inventory = copy.deepcopy(pdict.get('inventories', {}))
+        provider.traits = set(pdict.get('traits', ()))
+        provider.aggregates = set(pdict.get('aggregates', ()))
+        return provider
 
     def data(self):
         inventory = copy.deepcopy(self.inventory)
@@ -303,7 +308,9 @@ class ProviderTree(object):
         :param provider_dicts: An iterable of dicts of resource provider
                                information.  If a provider is present in
                                provider_dicts, all its descendants must also be
-                               present.
+                               present.  The dicts may also contain the
+                               'inventories', 'traits' and 'aggregates' of the
+                               providers, see _Provider.from_dict.
         :raises: ValueError if any provider in provider_dicts has a parent that
                  is not in this ProviderTree or elsewhere in provider_dicts.
         """
@@ -20,9 +20,12 @@ model.
 """
 import collections
 import copy
+import functools
+import inspect
 
 from keystoneauth1 import exceptions as ks_exc
 import os_traits
+from oslo_concurrency import lockutils
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_utils import excutils
@@ -58,6 +61,67 @@ LOG = logging.getLogger(__name__)
 COMPUTE_RESOURCE_SEMAPHORE = "compute_resources"
 
 
+def _node_lock(nodename):
+    """Return the lock serializing the resource updates of a compute node.
+
+    Holding it guarantees the usage of the node is not recalculated by the
+    resource audit while resources are claimed or released on it, without
+    blocking the claims and audits of the other nodes of the host.
+    """
+    return lockutils.lock(
+        '%s-node-%s' % (COMPUTE_RESOURCE_SEMAPHORE, nodename), fair=True)
+
+
+def _shared_lock():
+    """Return the lock protecting the resource tracking state shared by all
+    the compute nodes of the host: the tracked instances and migrations, the
+    assigned resources and the PCI tracker.
+
+    It is only held for in-memory bookkeeping and short database updates and
+    must never be held when acquiring another lock.
+    """
+    return lockutils.lock(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+
+
+def _synchronized_node(get_nodename):
+    """Serialize calls to the decorated ResourceTracker method with the other
+    resource updates of the same compute node.
+
+    :param get_nodename: A callable returning the name of the compute node
+        updated by the call, given a dict of the call arguments by name.
+    """
+    def decorator(f):
+        signature = inspect.signature(f)
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs).arguments
+            with _node_lock(get_nodename(arguments)):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# The joined fields of the instances the resource usage is calculated from
+_INSTANCE_USAGE_ATTRS = ('system_metadata', 'numa_topology', 'flavor',
+                         'migration_context', 'resources')
+# The fields of the instances kept by the incremental resource audit
+_INSTANCE_USAGE_FIELDS = ('system_metadata', 'numa_topology', 'flavor',
+                          'old_flavor', 'new_flavor', 'resources')
+
+# The fields of an instance kept from one resource audit pass to the next,
+# with the fingerprint of the instance they were loaded with
+InstanceUsage = collections.namedtuple('InstanceUsage',
+                                       ['fingerprint', 'fields'])
+
+
+def _get_usage_fingerprint(instance):
+    """Return the fingerprint of an instance, which changes when its fields
+    the resource usage is calculated from may have changed.
+    """
+    return (instance.updated_at, instance.vm_state, instance.task_state)
+
+
 def _instance_in_resize_state(instance):
     """Returns True if the instance is in one of the resizing states.
 
@@ -102,7 +166,18 @@ class ResourceTracker(object):
         # Set of UUIDs of instances tracked on this host.
         self.tracked_instances = set()
         self.tracked_migrations = {}
+        # Nodenames of the tracked instances and migrations, keyed by
+        # instance UUID, so that the audit of a node only resets the
+        # tracking of its own instances.
+        self.tracked_instance_nodes = {}
+        self.tracked_migration_nodes = {}
         self.is_bfv = {}  # dict, keyed by instance uuid, to is_bfv boolean
+        # The InstanceUsage of the instances of each compute node, keyed by
+        # nodename then instance UUID, and the number of passes of the
+        # resource audit of each node since its last full audit. Only used
+        # with [DEFAULT]resource_tracker_full_audit_passes.
+        self.instance_usages = {}
+        self.passes_since_full_audit = {}
         monitor_handler = monitors.MonitorHandler(self)
         self.monitors = monitor_handler.monitors
         self.old_resources = collections.defaultdict(objects.ComputeNode)
@@ -158,7 +233,7 @@ class ResourceTracker(object):
                 self.reportclient.invalidate_resource_provider(
                     rp, cacheonly=True)
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+    @_synchronized_node(lambda args: args['nodename'])
     def instance_claim(self, context, instance, nodename, allocations,
                        limits=None):
         """Indicate that some resources are needed for an upcoming compute
@@ -207,33 +282,34 @@ class ResourceTracker(object):
 
         cn = self.compute_nodes[nodename]
         pci_requests = instance.pci_requests
-        claim = claims.Claim(context, instance, nodename, self, cn,
-                             pci_requests, limits=limits)
+        with _shared_lock():
+            claim = claims.Claim(context, instance, nodename, self, cn,
+                                 pci_requests, limits=limits)
+
+            # self._set_instance_host_and_node() will save instance to the DB
+            # so set instance.numa_topology first.  We need to make sure
+            # that numa_topology is saved while under the node lock so that
+            # the resource audit knows about any cpus we've pinned.
+            instance_numa_topology = claim.claimed_numa_topology
+            instance.numa_topology = instance_numa_topology
+            self._set_instance_host_and_node(instance, cn)
 
-        # self._set_instance_host_and_node() will save instance to the DB
-        # so set instance.numa_topology first.  We need to make sure
-        # that numa_topology is saved while under COMPUTE_RESOURCE_SEMAPHORE
-        # so that the resource audit knows about any cpus we've pinned.
-        instance_numa_topology = claim.claimed_numa_topology
-        instance.numa_topology = instance_numa_topology
-        self._set_instance_host_and_node(instance, cn)
-
-        if self.pci_tracker:
-            # NOTE(jaypipes): ComputeNode.pci_device_pools is set below
-            # in _update_usage_from_instance().
-            self.pci_tracker.claim_instance(context, pci_requests,
-                                            instance_numa_topology)
+            if self.pci_tracker:
+                # NOTE(jaypipes): ComputeNode.pci_device_pools is set below
+                # in _update_usage_from_instance().
+                self.pci_tracker.claim_instance(context, pci_requests,
+                                                instance_numa_topology)
 
-        claimed_resources = self._claim_resources(allocations)
-        instance.resources = claimed_resources
+            claimed_resources = self._claim_resources(allocations)
+            instance.resources = claimed_resources
 
-        # In case we have any allocations for PCI-in-placement devices, be
-        # sure to invalidate our cache of those providers before we run
-        # _update() below (which does the PCI-in-placement sync).
-        self._invalidate_pci_in_placement_cached_rps(allocations)
+            # In case we have any allocations for PCI-in-placement devices,
+            # be sure to invalidate our cache of those providers before we
+            # run _update() below (which does the PCI-in-placement sync).
+            self._invalidate_pci_in_placement_cached_rps(allocations)
 
-        # Mark resources in-use and update stats
-        self._update_usage_from_instance(context, instance, nodename)
+            # Mark resources in-use and update stats
+            self._update_usage_from_instance(context, instance, nodename)
 
         elevated = context.elevated()
         # persist changes to the compute node:
@@ -241,7 +317,7 @@ class ResourceTracker(object):
 
         return claim
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+    @_synchronized_node(lambda args: args['nodename'])
     def rebuild_claim(self, context, instance, nodename, allocations,
                       limits=None, image_meta=None, migration=None):
         """Create a claim for a rebuild operation."""
@@ -250,7 +326,7 @@ class ResourceTracker(object):
             allocations, move_type=fields.MigrationType.EVACUATION,
             image_meta=image_meta, limits=limits)
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+    @_synchronized_node(lambda args: args['nodename'])
     def resize_claim(
         self, context, instance, flavor, nodename, migration, allocations,
         image_meta=None, limits=None,
@@ -264,7 +340,7 @@ class ResourceTracker(object):
             context, instance, flavor, nodename, migration,
             allocations, image_meta=image_meta, limits=limits)
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+    @_synchronized_node(lambda args: args['nodename'])
     def live_migration_claim(
         self, context, instance, nodename, migration, limits, allocs,
     ):
@@ -349,61 +425,63 @@ class ResourceTracker(object):
             for request in instance.pci_requests.requests:
                 if request.source == objects.InstancePCIRequest.NEUTRON_PORT:
                     new_pci_requests.requests.append(request)
-        claim = claims.MoveClaim(context, instance, nodename,
-                                 new_flavor, image_meta, self, cn,
-                                 new_pci_requests, migration, limits=limits)
-
-        claimed_pci_devices_objs = []
-        # TODO(artom) The second part of this condition should not be
-        # necessary, but since SRIOV live migration is currently handled
-        # elsewhere - see for example _claim_pci_for_instance_vifs() in the
-        # compute manager - we don't do any PCI claims if this is a live
-        # migration to avoid stepping on that code's toes. Ideally,
-        # MoveClaim/this method would be used for all live migration resource
-        # claims.
-        if self.pci_tracker and not migration.is_live_migration:
-            # NOTE(jaypipes): ComputeNode.pci_device_pools is set below
-            # in _update_usage_from_instance().
-            claimed_pci_devices_objs = self.pci_tracker.claim_instance(
-                    context, new_pci_requests, claim.claimed_numa_topology)
-        claimed_pci_devices = objects.PciDeviceList(
-                objects=claimed_pci_devices_objs)
-
-        claimed_resources = self._claim_resources(allocations)
-        old_resources = instance.resources
-
-        # TODO(jaypipes): Move claimed_numa_topology out of the Claim's
-        # constructor flow so the Claim constructor only tests whether
-        # resources can be claimed, not consume the resources directly.
-        mig_context = objects.MigrationContext(
-            context=context, instance_uuid=instance.uuid,
-            migration_id=migration.id,
-            old_numa_topology=instance.numa_topology,
-            new_numa_topology=claim.claimed_numa_topology,
-            # NOTE(gibi): the _update_usage_from_migration call below appends
-            # the newly claimed pci devices to the instance.pci_devices list
-            # to keep the migration context independent we need to make a copy
-            # that list here. We need a deep copy as we need to duplicate
-            # the instance.pci_devices.objects list
-            old_pci_devices=copy.deepcopy(instance.pci_devices),
-            new_pci_devices=claimed_pci_devices,
-            old_pci_requests=instance.pci_requests,
-            new_pci_requests=new_pci_requests,
-            old_resources=old_resources,
-            new_resources=claimed_resources)
-
-        instance.migration_context = mig_context
-        instance.save()
-
-        # In case we have any allocations for PCI-in-placement devices, be
-        # sure to invalidate our cache of those providers before we run
-        # _update() below (which does the PCI-in-placement sync).
-        self._invalidate_pci_in_placement_cached_rps(allocations)
-
-        # Mark the resources in-use for the resize landing on this
-        # compute host:
-        self._update_usage_from_migration(context, instance, migration,
-                                          nodename)
+        with _shared_lock():
+            claim = claims.MoveClaim(
+                context, instance, nodename, new_flavor, image_meta, self, cn,
+                new_pci_requests, migration, limits=limits)
+
+            claimed_pci_devices_objs = []
+            # TODO(artom) The second part of this condition should not be
+            # necessary, but since SRIOV live migration is currently handled
+            # elsewhere - see for example _claim_pci_for_instance_vifs() in
+            # the compute manager - we don't do any PCI claims if this is a
+            # live migration to avoid stepping on that code's toes. Ideally,
+            # MoveClaim/this method would be used for all live migration
+            # resource claims.
+            if self.pci_tracker and not migration.is_live_migration:
+                # NOTE(jaypipes): ComputeNode.pci_device_pools is set below
+                # in _update_usage_from_instance().
+                claimed_pci_devices_objs = self.pci_tracker.claim_instance(
+                        context, new_pci_requests, claim.claimed_numa_topology)
+            claimed_pci_devices = objects.PciDeviceList(
+                    objects=claimed_pci_devices_objs)
+
+            claimed_resources = self._claim_resources(allocations)
+            old_resources = instance.resources
+
+            # TODO(jaypipes): Move claimed_numa_topology out of the Claim's
+            # constructor flow so the Claim constructor only tests whether
+            # resources can be claimed, not consume the resources directly.
+            mig_context = objects.MigrationContext(
+                context=context, instance_uuid=instance.uuid,
+                migration_id=migration.id,
+                old_numa_topology=instance.numa_topology,
+                new_numa_topology=claim.claimed_numa_topology,
+                # NOTE(gibi): the _update_usage_from_migration call below
+                # appends the newly claimed pci devices to the
+                # instance.pci_devices list to keep the migration context
+                # independent we need to make a copy that list here. We need a
+                # deep copy as we need to duplicate the
+                # instance.pci_devices.objects list
+                old_pci_devices=copy.deepcopy(instance.pci_devices),
+                new_pci_devices=claimed_pci_devices,
+                old_pci_requests=instance.pci_requests,
+                new_pci_requests=new_pci_requests,
+                old_resources=old_resources,
+                new_resources=claimed_resources)
+
+            instance.migration_context = mig_context
+            instance.save()
+
+            # In case we have any allocations for PCI-in-placement devices,
+            # be sure to invalidate our cache of those providers before we
+            # run _update() below (which does the PCI-in-placement sync).
+            self._invalidate_pci_in_placement_cached_rps(allocations)
+
+            # Mark the resources in-use for the resize landing on this
+            # compute host:
+            self._update_usage_from_migration(context, instance, migration,
+                                              nodename)
         elevated = context.elevated()
         self._update(elevated, cn)
 
@@ -413,8 +491,8 @@ class ResourceTracker(object):
         self, context, instance, new_flavor, node, move_type=None,
     ):
         """Create a migration record for the upcoming resize.  This should
-        be done while the COMPUTE_RESOURCES_SEMAPHORE is held so the resource
-        claim will not be lost if the audit process starts.
+        be done while the lock of the node is held so the resource claim will
+        not be lost if the audit process starts.
         """
         migration = objects.Migration(context=context.elevated())
         migration.dest_compute = self.host
@@ -440,8 +518,8 @@ class ResourceTracker(object):
 
         If a migration record was created already before the request made
         it to this compute host, only set up the migration so it's included in
-        resource tracking. This should be done while the
-        COMPUTE_RESOURCES_SEMAPHORE is held.
+        resource tracking. This should be done while the lock of the node is
+        held.
         """
         migration.dest_compute = self.host
         migration.dest_node = node.hypervisor_hostname
@@ -496,9 +574,11 @@ class ResourceTracker(object):
             self._add_assigned_resources(claimed_resources)
             return objects.ResourceList(objects=claimed_resources)
 
-    def _populate_assigned_resources(self, context, instance_by_uuid):
-        """Populate self.assigned_resources organized by resource class and
-        reource provider uuid, which is as following format:
+    def _populate_assigned_resources(self, context, instance_by_uuid,
+                                     nodename):
+        """Populate self.assigned_resources of the providers of a node
+        organized by resource class and reource provider uuid, which is as
+        following format:
         {
         $RP_UUID: {
             $RESOURCE_CLASS: [objects.Resource, ...],
@@ -508,7 +588,10 @@ class ResourceTracker(object):
         resources = []
 
         # Get resources assigned to migrations
-        for mig in self.tracked_migrations.values():
+        for uuid in self._get_tracked_on_node(
+                self.tracked_migrations, self.tracked_migration_nodes,
+                nodename):
+            mig = self.tracked_migrations[uuid]
             mig_ctx = mig.instance.migration_context
             # We might have a migration whose instance hasn't arrived here yet.
             # Ignore it.
@@ -520,12 +603,39 @@ class ResourceTracker(object):
                 resources.extend(mig_ctx.new_resources or [])
 
         # Get resources assigned to instances
-        for uuid in self.tracked_instances:
+        for uuid in self._get_tracked_on_node(
+                self.tracked_instances, self.tracked_instance_nodes,
+                nodename):
             resources.extend(instance_by_uuid[uuid].resources or [])
 
-        self.assigned_resources.clear()
+        for rp_uuid in self._get_node_provider_uuids(nodename):
+            self.assigned_resources.pop(rp_uuid, None)
         self._add_assigned_resources(resources)
 
+    def _get_node_provider_uuids(self, nodename):
+        """Return the UUIDs of the providers of the tree of a node."""
+        cn_uuid = self.compute_nodes[nodename].uuid
+        if self.provider_tree is not None:
+            try:
+                return self.provider_tree.get_provider_uuids(cn_uuid)
+            except ValueError:
+                # The node provider is not created yet
+                pass
+        return [cn_uuid]
+
+    @staticmethod
+    def _get_tracked_on_node(tracked, tracked_nodes, nodename):
+        """Return the UUIDs of the instances in tracked which are tracked
+        on the given node.
+
+        :param tracked: tracked_instances or tracked_migrations
+        :param tracked_nodes: The nodenames of the instances in tracked, keyed
+            by instance UUID. Instances without a nodename are considered to
+            be tracked on every node.
+        """
+        return [uuid for uuid in tracked
+                if tracked_nodes.get(uuid, nodename) == nodename]
+
     def _check_resources(self, context):
         """Check if there are assigned resources not found in provider tree"""
         notfound = set()
@@ -604,11 +714,12 @@ class ResourceTracker(object):
         instance.compute_id = None
         instance.save()
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+    @_synchronized_node(lambda args: args['nodename'])
     def abort_instance_claim(self, context, instance, nodename):
         """Remove usage from the given instance."""
-        self._update_usage_from_instance(context, instance, nodename,
-                                         is_removed=True)
+        with _shared_lock():
+            self._update_usage_from_instance(context, instance, nodename,
+                                             is_removed=True)
 
         instance.clear_numa_topology()
         self._unset_instance_host_and_node(instance)
@@ -627,7 +738,7 @@ class ResourceTracker(object):
                 dev_pools_obj = self.pci_tracker.stats.to_device_pools_obj()
                 self.compute_nodes[nodename].pci_device_pools = dev_pools_obj
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+    @_synchronized_node(lambda args: args['migration'].source_node)
     def drop_move_claim_at_source(self, context, instance, migration):
         """Drop a move claim after confirming a resize or cold migration."""
         migration.status = 'confirmed'
@@ -643,7 +754,7 @@ class ResourceTracker(object):
         # though.
         instance.drop_migration_context()
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+    @_synchronized_node(lambda args: args['migration'].dest_node)
     def drop_move_claim_at_dest(self, context, instance, migration):
         """Drop a move claim after reverting a resize or cold migration."""
 
@@ -661,7 +772,7 @@ class ResourceTracker(object):
         instance.revert_migration_context()
         instance.save(expected_task_state=[task_states.RESIZE_REVERTING])
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+    @_synchronized_node(lambda args: args['nodename'])
     def drop_move_claim(self, context, instance, nodename,
                         flavor=None, prefix='new_'):
         self._drop_move_claim(
@@ -686,36 +797,40 @@ class ResourceTracker(object):
         :param prefix: Prefix to use when accessing migration context
             attributes. 'old_' or 'new_', with 'new_' being the default.
         """
-        if instance["uuid"] in self.tracked_migrations:
+        uuid = instance['uuid']
+        if uuid in self.tracked_migrations:
             if not flavor:
                 flavor = self._get_flavor(
-                    instance, prefix, self.tracked_migrations[instance["uuid"]]
-                )
+                    instance, prefix, self.tracked_migrations[uuid])
 
         if flavor is not None:
-            numa_topology = self._get_migration_context_resource(
-                'numa_topology', instance, prefix=prefix)
-            usage = self._get_usage_dict(
-                    flavor, instance, numa_topology=numa_topology)
-            self._drop_pci_devices(instance, nodename, prefix)
-            resources = self._get_migration_context_resource(
-                'resources', instance, prefix=prefix)
-            self._release_assigned_resources(resources)
-            self._update_usage(usage, nodename, sign=-1)
+            with _shared_lock():
+                numa_topology = self._get_migration_context_resource(
+                    'numa_topology', instance, prefix=prefix)
+                usage = self._get_usage_dict(
+                        flavor, instance, numa_topology=numa_topology)
+                self._drop_pci_devices(instance, nodename, prefix)
+                resources = self._get_migration_context_resource(
+                    'resources', instance, prefix=prefix)
+                self._release_assigned_resources(resources)
+                self._update_usage(usage, nodename, sign=-1)
 
             ctxt = context.elevated()
             self._update(ctxt, self.compute_nodes[nodename])
 
-        # Remove usage for an instance that is tracked in migrations, such as
-        # on the dest node during revert resize.
-        self.tracked_migrations.pop(instance['uuid'], None)
-        # Remove usage for an instance that is not tracked in migrations (such
-        # as on the source node after a migration).
-        # NOTE(lbeliveau): On resize on the same node, the instance is
-        # included in both tracked_migrations and tracked_instances.
-        self.tracked_instances.discard(instance['uuid'])
-
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+        with _shared_lock():
+            # Remove usage for an instance that is tracked in migrations, such
+            # as on the dest node during revert resize.
+            self.tracked_migrations.pop(uuid, None)
+            self.tracked_migration_nodes.pop(uuid, None)
+            # Remove usage for an instance that is not tracked in migrations
+            # (such as on the source node after a migration).
+            # NOTE(lbeliveau): On resize on the same node, the instance is
+            # included in both tracked_migrations and tracked_instances.
+            self.tracked_instances.discard(uuid)
+            self.tracked_instance_nodes.pop(uuid, None)
+
+    @_synchronized_node(lambda args: args['nodename'])
     def update_usage(self, context, instance, nodename):
         """Update the resource usage and stats after a change in an
         instance
@@ -727,8 +842,11 @@ class ResourceTracker(object):
 
         # don't update usage for this instance unless it submitted a resource
         # claim first:
-        if uuid in self.tracked_instances:
-            self._update_usage_from_instance(context, instance, nodename)
+        with _shared_lock():
+            tracked = uuid in self.tracked_instances
+            if tracked:
+                self._update_usage_from_instance(context, instance, nodename)
+        if tracked:
             self._update(context.elevated(), self.compute_nodes[nodename])
 
     def disabled(self, nodename):
@@ -824,7 +942,9 @@ class ResourceTracker(object):
         return True
 
     def _setup_pci_tracker(self, context, compute_node, resources):
-        if not self.pci_tracker:
+        with _shared_lock():
+            if self.pci_tracker:
+                return
             self.pci_tracker = pci_manager.PciDevTracker(context, compute_node)
             if 'pci_passthrough_devices' in resources:
                 dev_json = resources.pop('pci_passthrough_devices')
@@ -888,6 +1008,8 @@ class ResourceTracker(object):
         self.stats.pop(nodename, None)
         self.compute_nodes.pop(nodename, None)
         self.old_resources.pop(nodename, None)
+        self.instance_usages.pop(nodename, None)
+        self.passes_since_full_audit.pop(nodename, None)
 
     def _get_host_metrics(self, context, nodename):
         """Get the metrics from monitors and
@@ -1000,7 +1122,8 @@ class ResourceTracker(object):
                 # the instance had other pending changes
                 instance.save()
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+    @_synchronized_node(
+        lambda args: args['resources']['hypervisor_hostname'])
     def _update_available_resource(self, context, resources, startup=False):
 
         # initialize the compute node object, creating it
@@ -1014,18 +1137,14 @@ class ResourceTracker(object):
         if self.disabled(nodename):
             return
 
-        # Grab all instances assigned to this node:
-        instances = objects.InstanceList.get_by_host_and_node(
-            context, self.host, nodename,
-            expected_attrs=['system_metadata',
-                            'numa_topology',
-                            'flavor', 'migration_context',
-                            'resources'])
-
         # Grab all in-progress migrations and error migrations:
         migrations = objects.MigrationList.get_in_progress_and_error(
             context, self.host, nodename)
 
+        # Grab all instances assigned to this node:
+        instances = self._get_instances_on_node(
+            context, nodename, migrations, startup=startup)
+
         # Check for tracked instances with in-progress, incoming, but not
         # finished migrations. For those instance the migration context
         # is not applied yet (it will be during finish_resize when the
@@ -1054,8 +1173,9 @@ class ResourceTracker(object):
                 instance.apply_migration_context()
 
         # Now calculate usage based on instance utilization:
-        instance_by_uuid = self._update_usage_from_instances(
-            context, instances, nodename)
+        with _shared_lock():
+            instance_by_uuid = self._update_usage_from_instances(
+                context, instances, nodename)
 
         cn = self.compute_nodes[nodename]
 
@@ -1080,7 +1200,8 @@ class ResourceTracker(object):
         # this periodic task, and also because the resource tracker is not
         # notified when instances are deleted, we need remove all usages
         # from deleted instances.
-        self.pci_tracker.clean_usage(instances, migrations)
+        with _shared_lock():
+            self.pci_tracker.clean_usage(instances, migrations)
 
         self._report_final_resource_view(nodename)
 
@@ -1090,7 +1211,9 @@ class ResourceTracker(object):
         cn.metrics = jsonutils.dumps(metrics)
 
         # Update assigned resources to self.assigned_resources
-        self._populate_assigned_resources(context, instance_by_uuid)
+        with _shared_lock():
+            self._populate_assigned_resources(
+                context, instance_by_uuid, nodename)
 
         # update the compute_node
         self._update(context, cn, startup=startup)
@@ -1100,7 +1223,94 @@ class ResourceTracker(object):
         # Check if there is any resource assigned but not found
         # in provider tree
         if startup:
-            self._check_resources(context)
+            with _shared_lock():
+                self._check_resources(context)
+
+    def _get_instances_on_node(self, context, nodename, migrations,
+                               startup=False):
+        """Return the instances assigned to a compute node, with the fields
+        their resource usage is calculated from.
+
+        With [DEFAULT]resource_tracker_full_audit_passes, these fields are
+        only loaded from the database for the new instances, the instances
+        whose fingerprint changed since the previous pass and the instances
+        being moved. The other instances get the fields kept from the
+        previous passes. All the instances are loaded at startup and then
+        every given number of passes.
+        """
+        full_audit_passes = CONF.resource_tracker_full_audit_passes
+        passes = self.passes_since_full_audit.get(nodename, 0) + 1
+        if (not full_audit_passes or startup or passes >= full_audit_passes or
+                nodename not in self.instance_usages):
+            instances = objects.InstanceList.get_by_host_and_node(
+                context, self.host, nodename,
+                expected_attrs=list(_INSTANCE_USAGE_ATTRS))
+            if full_audit_passes:
+                self.passes_since_full_audit[nodename] = 0
+                self._keep_instance_usages(nodename, instances, migrations)
+            return instances
+
+        self.passes_since_full_audit[nodename] = passes
+        usages = self.instance_usages[nodename]
+        moving = {migration.instance_uuid for migration in migrations}
+        instances = objects.InstanceList.get_by_host_and_node(
+            context, self.host, nodename, expected_attrs=[])
+        stale = [
+            instance.uuid for instance in instances
+            if instance.uuid in moving or instance.uuid not in usages or
+            usages[instance.uuid].fingerprint !=
+            _get_usage_fingerprint(instance)]
+        loaded = {}
+        if stale:
+            filters = {'uuid': stale, 'host': self.host, 'deleted': False}
+            loaded = {
+                instance.uuid: instance
+                for instance in objects.InstanceList.get_by_filters(
+                    context, filters,
+                    expected_attrs=list(_INSTANCE_USAGE_ATTRS))
+                if instance.node == nodename}
+        LOG.debug('Loaded %(loaded)d of the %(total)d instances of compute '
+                  'node %(node)s for the incremental resource audit.',
+                  {'loaded': len(loaded), 'total': len(instances),
+                   'node': nodename})
+
+        result = []
+        for instance in instances:
+            if instance.uuid in loaded:
+                result.append(loaded[instance.uuid])
+            elif instance.uuid not in stale:
+                # Set the kept fields on the instance, so that they are not
+                # lazy-loaded
+                for field, value in usages[instance.uuid].fields.items():
+                    setattr(instance, field, value)
+                instance.migration_context = None
+                instance.obj_reset_changes(
+                    list(_INSTANCE_USAGE_FIELDS) + ['migration_context'])
+                result.append(instance)
+            # Otherwise the instance was moved away or deleted since it was
+            # listed
+        instances = objects.InstanceList(context, objects=result)
+        self._keep_instance_usages(nodename, instances, migrations)
+        return instances
+
+    def _keep_instance_usages(self, nodename, instances, migrations):
+        """Keep the fields the resource usage of the instances of a compute
+        node is calculated from for the next passes of the resource audit.
+
+        The instances being moved or with a migration context are not kept:
+        the saves of their migration context and flavors do not change their
+        fingerprint.
+        """
+        moving = {migration.instance_uuid for migration in migrations}
+        self.instance_usages[nodename] = {
+            instance.uuid: InstanceUsage(
+                _get_usage_fingerprint(instance),
+                {field: getattr(instance, field)
+                 for field in _INSTANCE_USAGE_FIELDS
+                 if instance.obj_attr_is_set(field)})
+            for instance in instances
+            if instance.uuid not in moving and
+            instance.migration_context is None}
 
     def _get_compute_node(self, context, node_uuid):
         """Returns compute node for the host and nodename."""
@@ -1351,11 +1561,6 @@ class ResourceTracker(object):
             context, nodename, provider_tree=prov_tree)
         prov_tree.update_traits(nodename, traits)
 
-        instances_under_same_host_resize = [
-            migration.instance_uuid
-            for migration in self.tracked_migrations.values()
-            if migration.is_same_host_resize
-        ]
         # NOTE(gibi): Tracking PCI in placement is different from other
         # resources.
         #
@@ -1373,13 +1578,20 @@ class ResourceTracker(object):
         # PCI allocation without placement being involved until the prefilter
         # is enabled. So we need to be ready to heal PCI allocations at
         # every call not just at startup.
-        pci_reshaped = pci_placement_translator.update_provider_tree_for_pci(
-            prov_tree,
-            nodename,
-            self.pci_tracker,
-            allocs,
-            instances_under_same_host_resize,
-        )
+        with _shared_lock():
+            instances_under_same_host_resize = [
+                migration.instance_uuid
+                for migration in self.tracked_migrations.values()
+                if migration.is_same_host_resize
+            ]
+            pci_reshaped = (
+                pci_placement_translator.update_provider_tree_for_pci(
+                    prov_tree,
+                    nodename,
+                    self.pci_tracker,
+                    allocs,
+                    instances_under_same_host_resize,
+                ))
 
         self.provider_tree = prov_tree
 
@@ -1391,10 +1603,15 @@ class ResourceTracker(object):
             # update_provider_tree_for_pci did reshape, then we need to pass
             # allocs to update_from_provider_tree to hit placement's POST
             # /reshaper route.
+            # Only the tree of this node is flushed, so that the nodes of the
+            # host can be synced concurrently without removing the providers
+            # the others added to the report client cache in the meantime.
+            reshaped = driver_reshaped or pci_reshaped
             self.reportclient.update_from_provider_tree(
                 context,
                 prov_tree,
-                allocations=allocs if driver_reshaped or pci_reshaped else None
+                allocations=allocs if reshaped else None,
+                root_uuid=compute_node.uuid,
             )
         except exception.InventoryInUse as e:
             # This means an inventory reconfiguration (e.g.: removing a parent
@@ -1412,7 +1629,8 @@ class ResourceTracker(object):
             # sync PCI device pool state stored in the compute node with
             # the actual state from the PCI tracker as we commit changes in
             # the DB and in the PCI tracker below
-            dev_pools_obj = self.pci_tracker.stats.to_device_pools_obj()
+            with _shared_lock():
+                dev_pools_obj = self.pci_tracker.stats.to_device_pools_obj()
             compute_node.pci_device_pools = dev_pools_obj
 
         # _resource_change will update self.old_resources if it detects changes
@@ -1435,7 +1653,8 @@ class ResourceTracker(object):
                     self.old_resources[nodename] = old_compute
 
         if self.pci_tracker:
-            self.pci_tracker.save(context)
+            with _shared_lock():
+                self.pci_tracker.save(context)
 
     def _update_usage(self, usage, nodename, sign=1):
         # TODO(stephenfin): We don't use the CPU, RAM and disk fields for much
@@ -1566,11 +1785,19 @@ class ResourceTracker(object):
                 obj = objects.PciDevicePoolList()
                 cn.pci_device_pools = obj
             self.tracked_migrations[uuid] = migration
+            self.tracked_migration_nodes[uuid] = nodename
 
     def _update_usage_from_migrations(self, context, migrations, nodename):
         filtered = {}
         instances = {}
-        self.tracked_migrations.clear()
+        with _shared_lock():
+            # Only reset the migrations of this node, the other nodes of the
+            # host can be claiming resources concurrently.
+            for uuid in self._get_tracked_on_node(
+                    self.tracked_migrations, self.tracked_migration_nodes,
+                    nodename):
+                del self.tracked_migrations[uuid]
+                self.tracked_migration_nodes.pop(uuid, None)
 
         # do some defensive filtering against bad migrations records in the
         # database:
@@ -1629,8 +1856,9 @@ class ResourceTracker(object):
                 continue
 
             try:
-                self._update_usage_from_migration(context, instance, migration,
-                                                  nodename)
+                with _shared_lock():
+                    self._update_usage_from_migration(
+                        context, instance, migration, nodename)
             except exception.FlavorNotFound:
                 LOG.warning("Flavor could not be found, skipping migration.",
                             instance_uuid=instance.uuid)
@@ -1650,10 +1878,12 @@ class ResourceTracker(object):
 
         if is_new_instance:
             self.tracked_instances.add(uuid)
+            self.tracked_instance_nodes[uuid] = nodename
             sign = 1
 
         if is_removed_instance:
             self.tracked_instances.remove(uuid)
+            self.tracked_instance_nodes.pop(uuid, None)
             self._release_assigned_resources(instance.resources)
             sign = -1
 
@@ -1691,7 +1921,13 @@ class ResourceTracker(object):
         instances assigned to the local compute host, even if they are not
         currently powered on.
         """
-        self.tracked_instances.clear()
+        # Only reset the instances of this node, the other nodes of the host
+        # can be claiming resources concurrently.
+        for uuid in self._get_tracked_on_node(
+                self.tracked_instances, self.tracked_instance_nodes,
+                nodename):
+            self.tracked_instances.discard(uuid)
+            self.tracked_instance_nodes.pop(uuid, None)
 
         cn = self.compute_nodes[nodename]
         # set some initial values, reserve room for host/hypervisor:
@@ -2088,7 +2324,6 @@ class ResourceTracker(object):
         """Resets the failed_builds stats for the given node."""
         self.stats[nodename].build_succeeded()
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
     def claim_pci_devices(self, context, pci_requests, instance_numa_topology):
         """Claim instance PCI resources
 
@@ -2099,12 +2334,12 @@ class ResourceTracker(object):
             instance
         :returns: a list of nova.objects.PciDevice objects
         """
-        result = self.pci_tracker.claim_instance(
-            context, pci_requests, instance_numa_topology)
-        self.pci_tracker.save(context)
+        with _shared_lock():
+            result = self.pci_tracker.claim_instance(
+                context, pci_requests, instance_numa_topology)
+            self.pci_tracker.save(context)
         return result
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
     def unclaim_pci_devices(self, context, pci_device, instance):
         """Deallocate PCI devices
 
@@ -2113,40 +2348,41 @@ class ResourceTracker(object):
             be freed
         :param instance: the objects.Instance the PCI resources are freed from
         """
-        self.pci_tracker.free_device(pci_device, instance)
-        self.pci_tracker.save(context)
+        with _shared_lock():
+            self.pci_tracker.free_device(pci_device, instance)
+            self.pci_tracker.save(context)
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
     def allocate_pci_devices_for_instance(self, context, instance):
         """Allocate instance claimed PCI resources
 
         :param context: security context
         :param instance: instance object
         """
-        self.pci_tracker.allocate_instance(instance)
-        self.pci_tracker.save(context)
+        with _shared_lock():
+            self.pci_tracker.allocate_instance(instance)
+            self.pci_tracker.save(context)
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
     def free_pci_device_allocations_for_instance(self, context, instance):
         """Free instance allocated PCI resources
 
         :param context: security context
         :param instance: instance object
         """
-        self.pci_tracker.free_instance_allocations(context, instance)
-        self.pci_tracker.save(context)
+        with _shared_lock():
+            self.pci_tracker.free_instance_allocations(context, instance)
+            self.pci_tracker.save(context)
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
     def free_pci_device_claims_for_instance(self, context, instance):
         """Free instance claimed PCI resources
 
         :param context: security context
         :param instance: instance object
         """
-        self.pci_tracker.free_instance_claims(context, instance)
-        self.pci_tracker.save(context)
+        with _shared_lock():
+            self.pci_tracker.free_instance_claims(context, instance)
+            self.pci_tracker.save(context)
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
+    @_synchronized_node(lambda args: args['node'])
     def finish_evacuation(self, instance, node, migration):
         instance.apply_migration_context()
         # NOTE (ndipanov): This save will now update the host and node
@@ -2167,7 +2403,6 @@ class ResourceTracker(object):
             migration.status = 'done'
             migration.save()
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE, fair=True)
     def clean_compute_node_cache(self, compute_nodes_in_db):
         """Clean the compute node cache of any nodes that no longer exist.
 
@@ -2182,8 +2417,9 @@ class ResourceTracker(object):
             # compute node in the DB. This could be due to a node rebalance
             # where another compute service took ownership of the node. Clean
             # up the cache.
-            self.remove_node(stale_cn)
-            self.reportclient.invalidate_resource_provider(stale_cn)
+            with _node_lock(stale_cn):
+                self.remove_node(stale_cn)
+                self.reportclient.invalidate_resource_provider(stale_cn)
 
     def get_node_by_name(self, nodename):
         """Get a node from our list by name.
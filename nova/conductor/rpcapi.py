@@ -15,6 +15,10 @@
 
 """Client side of the conductor RPC API."""
 
+import functools
+import threading
+import time
+
 import oslo_messaging as messaging
 from oslo_serialization import jsonutils
 from oslo_versionedobjects import base as ovo_base
@@ -30,6 +34,62 @@ CONF = nova.conf.CONF
 RPC_TOPIC = 'conductor'
 
 
+class LatencyTracker(object):
+    """Track the latency of calls.
+
+    Keeps an exponentially weighted moving average of the latencies, and a
+    baseline which follows the lowest average seen and otherwise only slowly
+    rises towards the average, so that a sustained change of latency
+    eventually becomes the new normal.
+    """
+
+    # Weight of each new latency in the moving average
+    ALPHA = 0.2
+    # Fraction of its gap to the average the baseline rises by on each call
+    BASELINE_RISE = 0.001
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.average = None
+        self.baseline = None
+
+    def record(self, latency):
+        with self._lock:
+            if self.average is None:
+                self.average = self.baseline = latency
+                return
+            self.average += self.ALPHA * (latency - self.average)
+            if self.average < self.baseline:
+                self.baseline = self.average
+            else:
+                self.baseline += (
+                    self.BASELINE_RISE * (self.average - self.baseline))
+
+    def get_ratio(self):
+        """Return the ratio of the average latency to the baseline, or 1.0
+        if no latency was recorded yet.
+        """
+        with self._lock:
+            if not self.baseline:
+                return 1.0
+            return self.average / self.baseline
+
+
+# The latency of the object calls made to the conductor by this process
+OBJECT_CALL_LATENCY = LatencyTracker()
+
+
+def _record_latency(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            OBJECT_CALL_LATENCY.record(time.monotonic() - start)
+    return wrapper
+
+
 @profiler.trace_cls("rpc")
 class ConductorAPI(object):
     """Client side of the conductor RPC API
@@ -234,6 +294,7 @@ class ConductorAPI(object):
                                                  versions,
                                                  args, kwargs)
 
+    @_record_latency
     def object_class_action_versions(self, context, objname, objmethod,
                                      object_versions, args, kwargs):
         cctxt = self.client.prepare()
@@ -242,6 +303,7 @@ class ConductorAPI(object):
                           object_versions=object_versions,
                           args=args, kwargs=kwargs)
 
+    @_record_latency
     def object_action(self, context, objinst, objmethod, args, kwargs):
         cctxt = self.client.prepare()
         return cctxt.call(context, 'object_action', objinst=objinst,
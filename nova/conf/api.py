@@ -271,6 +271,12 @@ small subset of those cells, this should be True.
              "at all, setting the fixed size equal to the ``max_limit`` "
              "value will cause only one request per cell database to be "
              "issued."),
+            ("adaptive", "Divide the limit requested by the user by the "
+             "number of cells in the system, with a minimum of 10 records, "
+             "for the first batch of each cell. The batch size of a cell "
+             "then doubles each time all the records of its previous batch "
+             "were returned, so that only the cells whose records keep being "
+             "returned are queried again, with fewer queries."),
         ],
         help="""
 This controls the method by which the API queries cell databases in
@@ -281,8 +287,10 @@ re-request that same batch size as records are consumed (returned)
 from each cell as necessary. Larger batches mean less chattiness
 between the API and the database, but potentially more wasted effort
 processing the results from the database which will not be returned to
-the user. Any strategy will yield a batch size of at least 100 records,
-to avoid a user causing many tiny database queries in their request.
+the user. The ``distributed`` and ``fixed`` strategies yield a batch size of
+at least 100 records, to avoid a user causing many tiny database queries in
+their request. The ``adaptive`` strategy starts with smaller batches, whose
+size grows for the cells which need to be queried again.
 
 Related options:
 
@@ -305,6 +313,25 @@ Related options:
 
 * instance_list_cells_batch_strategy
 * max_limit
+"""),
+    cfg.IntOpt("list_records_continuation_cache_size",
+        min=0,
+        default=0,
+        help="""
+Number of pages of cross-cell listings, like the instance list, whose end
+position in every cell is kept for the next page.
+
+When a page of a listing across several cells is requested with a marker, the
+API looks up, in every cell, the record to start the page from, which sorts
+right after the marker. When the previous page was listed by the same API
+process, its end position in every cell is reused instead, keyed by the last
+record of the previous page, saving a database query per cell and page of a
+deep listing. The positions are kept for up to 10 minutes.
+
+Possible values:
+
+* 0: Disable the cache (default).
+* Any positive integer representing a number of pages.
 """),
     cfg.BoolOpt("list_records_by_skipping_down_cells",
         default=True,
@@ -170,6 +170,26 @@ pool in seconds. A value of 60 means that statistic will be logged
 from a pool maximum once every 60 seconds. The value 0 means that logging
 happens every time work is submitted to the pool. The value -1 means the
 logging is disabled.
+'''),
+    cfg.IntOpt(
+        'cell_latency_statistic_period',
+        default=-1,
+        min=-1,
+        help='''
+Interval in seconds between two logs of the cell latency statistics.
+
+For every cell, the service counts how long its cross cell (scatter-gather)
+calls waited for a cell worker and how long they ran. When a call to a cell
+completes and the statistics were not logged for this many seconds, the
+median and the 99th percentile of both latencies of every cell are logged at
+the INFO level, so that a slow cell can be told apart from a
+``cell_worker_thread_pool_size`` too small for the load. The value 0 means
+that the statistics are logged after every call to a cell. The value -1
+means the logging is disabled.
+
+Related options:
+
+* ``[DEFAULT]/cell_worker_thread_pool_size``
 '''),
     cfg.IntOpt(
         'manager_shutdown_timeout',
@@ -428,6 +428,31 @@ Related options:
 
 * ``[compute] cpu_shared_set``
 * ``[compute] cpu_dedicated_set``
+"""),
+    cfg.IntOpt('resource_tracker_full_audit_passes',
+        default=0,
+        min=0,
+        help="""
+Number of passes of the resource audit after which a full audit is made.
+
+The ``update_available_resource`` periodic task recalculates the resource
+usage of every compute node from the instances assigned to it, loading each
+instance with its flavor, NUMA topology and other joined fields from the
+database at every pass. When this option is set, the resource tracker keeps
+these fields from one pass to the next and only loads them again for the new
+instances, the instances whose ``updated_at``, ``vm_state`` or ``task_state``
+changed since the previous pass and the instances being moved. When the
+service starts, and then every given number of passes, all the instances are
+loaded again as a safety net.
+
+Possible values:
+
+* 0: Load all the instances at every pass (default).
+* Any positive integer representing a number of passes.
+
+Related options:
+
+* ``update_resources_interval``
 """),
 ]
 
@@ -766,6 +791,77 @@ for performance reasons, for example, with Ironic.
 Possible values:
 
 * Any positive integer representing threads count.
+"""),
+    cfg.IntOpt('update_resources_pool_size',
+        default=1,
+        min=1,
+        help="""
+Number of threads available for use to update the resources of the compute
+nodes of the host.
+
+The ``update_available_resource`` periodic task audits the resource usage of
+every compute node managed by the service and reports it to the database and
+placement. With virt drivers managing many compute nodes from a single
+service, for example with Ironic, updating the nodes one at a time can take
+longer than the periodic interval. Increasing this value updates that many
+nodes concurrently.
+
+Possible values:
+
+* Any positive integer representing threads count. The default of 1 updates
+  the nodes one at a time.
+
+Related options:
+
+* ``update_resources_node_timeout``
+"""),
+    cfg.IntOpt('update_resources_node_timeout',
+        default=0,
+        min=0,
+        help="""
+Maximum time in seconds the ``update_available_resource`` periodic task
+waits for the resource update of a single compute node.
+
+A compute node whose update takes longer, for example because its hypervisor
+or baremetal management controller is unresponsive, is reported and no
+longer waited for so that the periodic task can complete. Its update keeps
+running in the background and the node is skipped by the next runs of the
+periodic task until it completes.
+
+This option only applies when ``update_resources_pool_size`` is greater
+than 1.
+
+Possible values:
+
+* 0: Wait for the updates of the nodes to complete.
+* Any positive integer in seconds.
+
+Related options:
+
+* ``update_resources_pool_size``
+"""),
+    cfg.IntOpt('init_host_pool_size',
+        default=1,
+        min=1,
+        help="""
+Number of threads available for use to initialize the instances of the host
+when the compute service starts.
+
+When the service starts, it recovers every instance of the host, for example
+plugging its VIFs, checking its block devices and restoring its power state,
+before it reports itself as up. Recovering the instances one at a time can
+take many minutes on hosts running hundreds of instances. Increasing this
+value recovers that many instances concurrently.
+
+The instances evacuated away from the host are cleaned up first. The
+instances being deleted are then recovered before the other instances, so
+that the resources they hold are released before the other guests are
+resumed.
+
+Possible values:
+
+* Any positive integer representing threads count. The default of 1
+  initializes the instances one at a time.
 """),
 ]
 
@@ -841,6 +937,45 @@ process, causing it to be repopulated the next time the data is accessed.
 Possible values:
 
 * Any positive integer in seconds, or zero to disable refresh.
+"""),
+    cfg.BoolOpt('resource_provider_delta_sync',
+        default=False,
+        mutable=True,
+        help="""
+Only refresh the resource providers which changed in placement.
+
+When enabled and the cached associations expire (see
+``resource_provider_association_refresh``), the generations returned by the
+single listing of the provider tree are compared with the cached ones, and only
+the providers whose generation changed in placement have their inventories,
+aggregates and traits retrieved again. This saves three placement API calls
+per unchanged provider, which matters on hosts exposing many nested resource
+providers, for example for PCI devices or vGPUs.
+
+Related options:
+
+* ``resource_provider_association_refresh``
+"""),
+    cfg.IntOpt('resource_provider_refresh_concurrency',
+        default=1,
+        min=1,
+        help="""
+Number of resource providers whose associations are retrieved concurrently.
+
+When the compute service (re)loads the tree of resource providers of a compute
+node from placement, the inventories, aggregates and traits of every provider
+of the tree must be retrieved. When this option is greater than one, they are
+retrieved for that many providers at a time, on a dedicated pool of threads,
+and the cached tree is then repopulated in a single update. This shortens the
+startup and the periodic refreshes of hosts exposing deep trees of nested
+resource providers, for example for PCI devices or vGPUs.
+
+The default of one retrieves the associations of one provider at a time.
+
+Related options:
+
+* ``resource_provider_association_refresh``
+* ``resource_provider_delta_sync``
 """),
    cfg.StrOpt('cpu_shared_set',
         help="""
@@ -1078,6 +1213,74 @@ Possible values:
 * ``True``: Packing VM's NUMA cell on most used host NUMA cell.
 * ``False``: Spreading VM's NUMA cell on host's NUMA cells with more resources
   available.
+"""),
+    cfg.IntOpt('numa_fit_cache_size',
+        default=0,
+        min=0,
+        help="""
+Number of NUMA fitting results cached by the scheduler and compute services.
+
+Fitting the NUMA topology of an instance on a host tries every permutation of
+the host NUMA cells. Hosts with the same NUMA cell usage, which are very common
+in homogeneous deployments, repeat the same search, so when set to a positive
+value, the results of the ``NUMATopologyFilter``, of the host state updates in
+the scheduler and of the resource claims in the compute service are kept in a
+least recently used cache of that many entries, keyed by the usage of the host
+NUMA cells, the instance NUMA topology and the allocation ratios. Requests
+with PCI devices are never cached.
+
+Possible values:
+
+* 0, the default, disables the cache.
+* A positive integer, the maximum number of cached results.
+
+Related options:
+
+* ``[compute] packing_host_numa_cells_allocation_strategy``
+"""),
+    cfg.BoolOpt('periodic_task_spread',
+        default=False,
+        help="""
+Spread the periodic tasks of the compute services over their intervals.
+
+By default, the periodic tasks of a compute service first run one interval
+after the service started, so the compute services restarted together, for
+example during an upgrade, keep running them at the same time and load the
+conductor, the databases and placement in bursts. When enabled, each periodic
+task runs at a phase of its interval derived from a hash of the host and task
+names and anchored to the wall clock, which spreads the runs of the periodic
+tasks evenly across the compute services, and keeps them spread across
+restarts.
+
+The periodic tasks which run when the service starts are not affected.
+
+Related options:
+
+* ``periodic_fuzzy_delay``
+* ``[compute] periodic_task_max_backoff``
+"""),
+    cfg.FloatOpt('periodic_task_max_backoff',
+        default=1.0,
+        min=1.0,
+        help="""
+Maximum factor the intervals of the compute periodic tasks are stretched by
+when the conductor is slow.
+
+The compute service tracks the latency of its calls to the conductor. When
+this option is greater than 1 and the average latency becomes twice or more
+its usual level, the intervals of all the periodic tasks are multiplied by the
+ratio of the two, up to this value, so that an overloaded conductor gets some
+room to recover instead of being hit by the periodic tasks of every compute
+service. The intervals go back to normal once the latency does.
+
+Possible values:
+
+* 1.0, the default, disables the backoff.
+* A greater value, the maximum stretching factor.
+
+Related options:
+
+* ``[compute] periodic_task_spread``
 """),
 ]
 
@@ -1129,6 +1332,53 @@ Possible values:
 
 * Any positive integer in seconds.
 * Any value <=0 will disable the sync.
+"""),
+    cfg.BoolOpt('heal_instance_info_cache_stale_only',
+        default=False,
+        help="""
+Only heal the network information cache of instances found to be stale.
+
+By default, the task enabled by ``heal_instance_info_cache_interval`` queries
+Neutron for the networking information of one instance of the compute node
+at every run, going through all of them in turn. On compute nodes with many
+instances a full pass takes hours, while most of the caches are kept up to
+date by the network-changed external events anyway.
+
+When this option is enabled, the compute node instead lists the ports bound
+to it in a single Neutron query, at the first run of the task and then every
+``heal_instance_info_cache_audit_interval`` seconds, and only heals the cache
+of the instances whose ports do not match the cache, or whose ports are not
+bound properly. Instances whose cache failed to refresh on a network-changed
+event are healed too.
+
+This has no effect unless ``heal_instance_info_cache_interval`` is set, nor
+with virt drivers which manage the port bindings themselves, like the ironic
+driver, for which the compute node keeps going through all the instances.
+
+Related options:
+
+* ``heal_instance_info_cache_interval``
+* ``heal_instance_info_cache_audit_interval``
+"""),
+    cfg.IntOpt('heal_instance_info_cache_audit_interval',
+        default=3600,
+        min=0,
+        help="""
+Interval between the audits of the instance network information caches.
+
+Number of seconds between the Neutron port listings used to find the instances
+with a stale network information cache, when
+``heal_instance_info_cache_stale_only`` is enabled. An audit is always made at
+the first run of the task after the service started.
+
+Possible values:
+
+* Any positive integer in seconds.
+* 0 to only audit the caches when the service starts.
+
+Related options:
+
+* ``heal_instance_info_cache_stale_only``
 """),
     cfg.IntOpt('reclaim_instance_interval',
         default=0,
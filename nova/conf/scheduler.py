@@ -93,6 +93,44 @@ Defaults to the number of CPUs available.
 Possible values:
 
 * An integer, where the integer corresponds to the number of worker processes.
+"""),
+    cfg.BoolOpt("incremental_host_state_cache",
+        default=False,
+        help="""
+Keep the compute node records and host states between scheduling requests.
+
+By default the scheduler reads every compute node record of every cell and
+rebuilds the host state of each of them for every scheduling request. When
+this option is enabled, the scheduler keeps the compute node records and the
+host states built from them in memory, and only reads from the cell databases
+the compute node records created, updated or deleted since its previous read.
+Only the host states of the changed compute nodes are rebuilt. The resources
+consumed by a scheduling request are never kept in the cached host states.
+
+This reduces the database load and the scheduling time of large deployments.
+
+Related options:
+
+* ``[scheduler] host_state_cache_full_refresh_interval``
+"""),
+    cfg.IntOpt("host_state_cache_full_refresh_interval",
+        default=300,
+        min=0,
+        help="""
+Interval in seconds between two full reads of the compute node records.
+
+When ``[scheduler] incremental_host_state_cache`` is enabled, all the compute
+node records of a cell are read again once this interval has elapsed since the
+previous full read of that cell, as a safety net against missed changes.
+
+Possible values:
+
+* A positive integer, where the integer is the number of seconds between two
+  full reads. 0 makes every read a full read.
+
+Related options:
+
+* ``[scheduler] incremental_host_state_cache``
 """),
     cfg.BoolOpt("query_placement_for_routed_network_aggregates",
                 default=False,
@@ -923,6 +961,235 @@ and all nova-conductor services.
 * ``[pci] report_in_placement``
 * ``[pci] alias``
 * ``[pci] device_spec``
+"""),
+    cfg.BoolOpt(
+        "columnar_host_evaluation",
+        default=False,
+        help="""
+Evaluate the in-tree filters and weighers on packed host columns.
+
+When enabled, the numeric host state fields used by the in-tree resource
+filters and weighers (for example ``free_ram_mb``, ``free_disk_mb``,
+``vcpus_used``, ``num_io_ops`` and ``num_instances``) and the per-aggregate
+weight multipliers are packed once per filtering or weighing pass, and the
+filters and weighers supporting it are evaluated over these columns instead
+of once per host. Filters and weighers which do not support this mode,
+including any out-of-tree ones, keep being evaluated host by host. The
+selected hosts are the same in both modes.
+
+This mainly helps deployments with several thousands of compute nodes where
+the per host overhead of the filters and weighers dominates the scheduling
+time.
+
+Related options:
+
+* ``[filter_scheduler] enabled_filters``
+* ``[filter_scheduler] weight_classes``
+"""),
+    cfg.BoolOpt(
+        "batch_multi_instance_scheduling",
+        default=False,
+        help="""
+Filter and weigh the hosts only once for multi-instance requests.
+
+By default, when a request asks for several instances, the scheduler filters
+and weighs every candidate host again for each instance, even though only the
+host selected for the previous instance changed. When enabled, the hosts are
+filtered and weighed once and kept ordered by weight; after each selection only
+the selected host is filtered and weighed again before being put back in
+order. This makes large multi-instance requests scale with the number of hosts
+plus the number of instances instead of their product.
+
+The selected host is weighed again using the weight normalization range of the
+first weighing pass, so the resulting placement can slightly differ from the
+one of the default mode. Requests using a server group keep using the default
+mode as the (anti-)affinity filters and weighers depend on the previous
+selections for every host.
+
+Related options:
+
+* ``[filter_scheduler] host_subset_size``
+* ``[filter_scheduler] shuffle_best_same_weighed_hosts``
+"""),
+    cfg.IntOpt(
+        "filter_result_cache_size",
+        default=0,
+        min=0,
+        help="""
+Number of filter results cached across scheduling requests.
+
+The result of some filters for a host only depends on the host and on a few
+parts of the request, like the flavor extra specs or the image properties.
+When this is set to a positive value, the results of these filters are cached
+and reused by the subsequent requests with the same flavor extra specs or
+image properties, evicting the least recently used results once this number
+of results is reached. The cached results of a host are not used anymore once
+its compute node is updated, and all the cached results are dropped when an
+aggregate is updated or deleted.
+
+The in-tree filters supporting this are ``AggregateInstanceExtraSpecsFilter``,
+``ComputeCapabilitiesFilter``, ``ImagePropertiesFilter`` and
+``AggregateImagePropertiesIsolation``.
+
+Possible values:
+
+* 0, the default, disables the cache.
+* A positive integer, a good starting point being a few times the number of
+  compute nodes.
+
+Related options:
+
+* ``[filter_scheduler] enabled_filters``
+"""),
+    cfg.BoolOpt(
+        "adaptive_filter_ordering",
+        default=False,
+        help="""
+Order the enabled filters by their observed selectivity and cost.
+
+The scheduler records, for every filter, the ratio of hosts it rejects and the
+time it spends per host. When enabled, the filters are run by ascending cost
+per rejected host instead of in the order of the ``enabled_filters`` option,
+so that cheap filters rejecting many hosts run before expensive ones like the
+``NUMATopologyFilter`` or the ``PciPassthroughFilter``. The configured order
+is used until every filter has enough statistics. Filters declaring that they
+must keep their position, which no in-tree filter does, are not moved and the
+other filters are only reordered between them.
+
+As long as the enabled filters have no side effects and do not share state
+with each other, the selected hosts do not depend on the order of the filters,
+only the time spent filtering does. Do not enable this option if an
+out-of-tree filter depends on another filter having run before it.
+
+Related options:
+
+* ``[filter_scheduler] enabled_filters``
+* ``[filter_scheduler] filter_stats_log_interval``
+"""),
+    cfg.IntOpt(
+        "filter_stats_log_interval",
+        default=-1,
+        min=-1,
+        help="""
+Interval in seconds between two logs of the filter statistics.
+
+The statistics are the number of hosts each filter processed and rejected and
+the time it spent per host, as used by the ``adaptive_filter_ordering``
+option. They are logged at the INFO level. The statistics are only recorded
+when this option or ``adaptive_filter_ordering`` is enabled.
+
+Possible values:
+
+* -1, the default, disables the logging.
+* 0 logs the statistics at the default periodic task interval.
+* A positive integer logs the statistics at that interval in seconds.
+
+Related options:
+
+* ``[filter_scheduler] adaptive_filter_ordering``
+"""),
+    cfg.IntOpt(
+        "numa_fit_process_pool_size",
+        default=0,
+        min=0,
+        help="""
+Number of worker processes used by the ``NUMATopologyFilter``.
+
+Fitting the NUMA topology of an instance on a host tries every permutation of
+the host NUMA cells, which is expensive for pinned or huge pages flavors on
+hosts with many NUMA cells. When set to a positive value, the filter fits the
+instance on the hosts of a request in parallel in a pool of that many worker
+processes once the request is complex enough, see
+``numa_fit_process_pool_threshold``. The filter results are the same as when
+fitting the instance on each host serially.
+
+The process pool is only used when the scheduler runs in native threading
+mode, and for requests without PCI devices.
+
+Possible values:
+
+* 0, the default, disables the process pool.
+* A positive integer, typically the number of CPUs available to the scheduler.
+
+Related options:
+
+* ``[filter_scheduler] numa_fit_process_pool_threshold``
+"""),
+    cfg.IntOpt(
+        "numa_fit_process_pool_threshold",
+        default=5000,
+        min=1,
+        help="""
+Complexity of a request above which the NUMA fitting is done in parallel.
+
+The complexity of a request is the sum, over the hosts with a NUMA topology,
+of the number of permutations of the host NUMA cells tried for the instance
+NUMA cells times the number of allocation candidates of the host. Below this
+threshold, the cost of sending the host NUMA topologies to the worker
+processes outweighs the gain of fitting them in parallel.
+
+Related options:
+
+* ``[filter_scheduler] numa_fit_process_pool_size``
+"""),
+    cfg.IntOpt(
+        "request_timing_buffer_size",
+        default=0,
+        min=0,
+        help="""
+Number of slowest scheduling requests whose timings are kept.
+
+When set to a positive value, the time each scheduling request spends in each
+phase is recorded: the placement allocation candidates queries, the compute
+node reads from the cell databases, every filter and weigher and the resource
+claims. The breakdowns of the slowest requests seen by the scheduler are kept
+in memory, and can be logged or dumped to a file periodically with the
+``request_timing_dump_interval`` option.
+
+Possible values:
+
+* 0, the default, disables the recording.
+* A positive integer, the number of slowest requests to keep.
+
+Related options:
+
+* ``[filter_scheduler] request_timing_dump_interval``
+* ``[filter_scheduler] request_timing_dump_file``
+"""),
+    cfg.IntOpt(
+        "request_timing_dump_interval",
+        default=-1,
+        min=-1,
+        help="""
+Interval in seconds between two dumps of the slowest scheduling requests.
+
+The timings are written to the ``request_timing_dump_file`` file if it is set,
+where they can be displayed with the ``nova-manage scheduler
+show_request_timings`` command, or logged at the INFO level otherwise.
+
+Possible values:
+
+* -1, the default, disables the dumps.
+* 0 dumps the timings at the default periodic task interval.
+* A positive integer dumps the timings at that interval in seconds.
+
+Related options:
+
+* ``[filter_scheduler] request_timing_buffer_size``
+* ``[filter_scheduler] request_timing_dump_file``
+"""),
+    cfg.StrOpt(
+        "request_timing_dump_file",
+        help="""
+Path of the file the timings of the slowest scheduling requests are dumped to.
+
+The file is rewritten at every dump. When several scheduler services run on
+the same host, each of them must use its own file.
+
+Related options:
+
+* ``[filter_scheduler] request_timing_buffer_size``
+* ``[filter_scheduler] request_timing_dump_interval``
 """),
 ]
 
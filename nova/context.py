@@ -17,8 +17,11 @@
 
 """RequestContext: context for requests that persist through all of nova."""
 
+import bisect
 from contextlib import contextmanager
 import copy
+import threading
+import time
 
 import futurist.waiters
 from keystoneauth1.access import service_catalog as ksa_service_catalog
@@ -51,11 +54,111 @@ CELLS = []
 CELL_TIMEOUT = 60
 
 
+class LatencyHistogram(object):
+    """Count latencies in buckets of exponentially growing upper bounds."""
+
+    # The upper bounds of the buckets, in seconds, the last bucket counts the
+    # latencies above the last bound
+    BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.total = 0.0
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def record(self, latency):
+        self.counts[bisect.bisect_left(self.BOUNDS, latency)] += 1
+        self.total += latency
+
+    def percentile(self, percent):
+        """Return the upper bound of the bucket of the given percentile of
+        the latencies, infinity if it is the last bucket, or None if no
+        latency was recorded.
+        """
+        count = self.count
+        if not count:
+            return None
+        rank = max(count * percent / 100.0, 1)
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                break
+        return self.BOUNDS[i] if i < len(self.BOUNDS) else float('inf')
+
+
+class CellLatencies(object):
+    """The latencies of the scatter-gather calls made to each cell.
+
+    For every cell, the time its calls waited for a cell worker and the time
+    they ran are counted in separate histograms, so that a slow cell can be
+    told apart from a cell worker pool which is too small for the load.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._last_logged = None
+
+    def record(self, cell_uuid, queued, run):
+        with self._lock:
+            if cell_uuid not in self._histograms:
+                self._histograms[cell_uuid] = (LatencyHistogram(),
+                                               LatencyHistogram())
+            self._histograms[cell_uuid][0].record(queued)
+            self._histograms[cell_uuid][1].record(run)
+        self._log_stats()
+
+    def _log_stats(self):
+        """Log the percentiles of the latencies of every cell, at most once
+        every [DEFAULT]/cell_latency_statistic_period seconds.
+        """
+        period = CONF.cell_latency_statistic_period
+        if period < 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if (self._last_logged is not None and
+                    now - self._last_logged < period):
+                return
+            self._last_logged = now
+        for cell_uuid, histograms in sorted(self.get_histograms().items()):
+            queued, run = histograms['queued'], histograms['run']
+            LOG.info('Calls to cell %(cell)s: %(count)d, queued p50 '
+                     '%(queued_p50)s s p99 %(queued_p99)s s, run p50 '
+                     '%(run_p50)s s p99 %(run_p99)s s',
+                     {'cell': cell_uuid, 'count': run.count,
+                      'queued_p50': queued.percentile(50),
+                      'queued_p99': queued.percentile(99),
+                      'run_p50': run.percentile(50),
+                      'run_p99': run.percentile(99)})
+
+    def get_histograms(self):
+        """Return a dict, by cell uuid, of a dict of copies of the 'queued'
+        and 'run' histograms of the cell.
+        """
+        histograms = {}
+        with self._lock:
+            for cell_uuid, (queued, run) in self._histograms.items():
+                histograms[cell_uuid] = {'queued': copy.deepcopy(queued),
+                                         'run': copy.deepcopy(run)}
+        return histograms
+
+
+# The latencies of the scatter-gather calls made to the cells by this process
+CELL_LATENCIES = CellLatencies()
+
+
 def reset_globals():
     global CELL_CACHE
     global CELLS
+    global CELL_LATENCIES
     CELL_CACHE = {}
     CELLS = []
+    CELL_LATENCIES = CellLatencies()
     service_auth.reset_globals()
 
 
@@ -452,8 +555,16 @@ def scatter_gather_cells(context, cell_mappings, timeout, fn, *args, **kwargs):
     """
     tasks = {}
     results = {}
-
-    def gather_result(cell_uuid, fn, *args, **kwargs):
+    latencies = CELL_LATENCIES
+
+    def gather_result(cell_uuid, queued_at, fn, *args, **kwargs):
+        started_at = time.monotonic()
+        if started_at - queued_at > timeout / 2:
+            LOG.warning('The call to cell %(cell)s waited %(queued).1f '
+                        'seconds for a cell worker thread. The '
+                        'cell_worker_thread_pool_size may be too small for '
+                        'the load.',
+                        {'cell': cell_uuid, 'queued': started_at - queued_at})
         try:
             result = fn(*args, **kwargs)
         except Exception as e:
@@ -461,6 +572,8 @@ def scatter_gather_cells(context, cell_mappings, timeout, fn, *args, **kwargs):
             if not isinstance(e, exception.NovaException):
                 LOG.exception('Error gathering result from cell %s', cell_uuid)
             result = e
+        latencies.record(cell_uuid, started_at - queued_at,
+                         time.monotonic() - started_at)
 
         return result
 
@@ -468,8 +581,8 @@ def scatter_gather_cells(context, cell_mappings, timeout, fn, *args, **kwargs):
         with target_cell(context, cell_mapping) as cctxt:
             future = thread_pool_factory.spawn_on(
                 thread_pool_factory.ExecutorType.SCATTER_GATHER,
-                gather_result, cell_mapping.uuid, fn, cctxt, *args,
-                **kwargs)
+                gather_result, cell_mapping.uuid, time.monotonic(), fn,
+                cctxt, *args, **kwargs)
             tasks[cell_mapping.uuid] = future
 
     futurist.waiters.wait_for_all(tasks.values(), timeout)
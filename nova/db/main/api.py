@@ -1705,6 +1705,7 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
 
     sort_keys, sort_dirs = db_utils.process_sort_params(
         sort_keys, sort_dirs, default_dir='desc')
+    sort_keys, sort_dirs = _instance_keyset_sort_params(sort_keys, sort_dirs)
 
     if columns_to_join is None:
         columns_to_join_new = ['info_cache', 'security_groups']
@@ -1845,6 +1846,8 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
             )
         except exception.InstanceNotFound:
             raise exception.MarkerNotFound(marker=marker)
+        query_prefix = _instance_keyset_bound(
+            query_prefix, sort_keys[0], sort_dirs[0], marker)
     try:
         query_prefix = sqlalchemyutils.paginate_query(
             query_prefix,
@@ -1862,6 +1865,62 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
     return _instances_fill_metadata(context, instances, manual_joins)
 
 
+def _instance_keyset_sort_params(sort_keys, sort_dirs):
+    """Drop the sort keys which follow a unique key of the instances.
+
+    The instances are fully ordered once a unique key is sorted on, so the
+    keys after it cannot change the order. They would however prevent the
+    database from reading the rows in the order of an index on the leading
+    keys, such as the (created_at, id) order of the default sort keys, to
+    which the API adds the uuid as a tie-breaker across the cells.
+    """
+    # Leave the unknown sort keys to paginate_query(), which rejects them.
+    descriptors = sa.inspect(models.Instance).all_orm_descriptors
+    if any(sort_key not in descriptors for sort_key in sort_keys):
+        return sort_keys, sort_dirs
+    for index, sort_key in enumerate(sort_keys):
+        if sort_key in ('id', 'uuid'):
+            return sort_keys[:index + 1], sort_dirs[:index + 1]
+    return sort_keys, sort_dirs
+
+
+def _instance_keyset_bound(query, sort_key, sort_dir, marker):
+    """Bound the first sort key of an Instance query by the marker.
+
+    Returns the updated query.
+
+    The criteria paginate_query() builds to get the rows after the marker are
+    an OR of one term per sort key, which the database cannot use to seek in
+    an index on the sort keys, so it scans the rows of every previous page
+    before the ones of this page. All of those terms imply that the first
+    sort key is at or after the value of the marker, so filtering on it too
+    does not change the results, but it lets the database start its index
+    scan at the marker whatever the page.
+
+    :param query: query to apply the bound to
+    :param sort_key: the first sort key of the query
+    :param sort_dir: the direction of the first sort key
+    :param marker: the Instance model of the marker
+    """
+    if sort_dir not in ('asc', 'desc'):
+        return query
+    # Leave the unknown sort keys to paginate_query(), which rejects them.
+    if sort_key not in models.Instance.__table__.columns:
+        return query
+    value = getattr(marker, sort_key)
+    # The NULL values are skipped by the criteria of paginate_query() too.
+    if value is None:
+        return query
+    column_attr = getattr(models.Instance, sort_key)
+    # sqlalchemy doesn't like booleans in < >. bug/1656947
+    if isinstance(column_attr.type, sa.Boolean):
+        column_attr = expression.cast(column_attr, sa.Integer)
+        value = int(value)
+    if sort_dir == 'desc':
+        return query.filter(column_attr <= value)
+    return query.filter(column_attr >= value)
+
+
 @require_context
 @pick_context_manager_reader_allow_async
 def instance_get_by_sort_filters(context, sort_keys, sort_dirs, values):
@@ -0,0 +1,40 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""db: add keyset pagination indexes to instances
+
+Revision ID: 5c8e1a9f3b27
+Revises: ab450ba04102
+Create Date: 2026-10-18 09:12:41.517306
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5c8e1a9f3b27'
+down_revision = 'ab450ba04102'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("instances", schema=None) as batch_op:
+        batch_op.create_index(
+            "instances_project_id_deleted_created_at_id_idx",
+            ["project_id", "deleted", "created_at", "id"],
+            unique=False,
+        )
+        batch_op.create_index(
+            "instances_project_id_deleted_display_name_uuid_idx",
+            ["project_id", "deleted", "display_name", "uuid"],
+            unique=False,
+        )
@@ -17,6 +17,9 @@
 Filter support
 """
 
+import collections
+import time
+
 from oslo_log import log as logging
 
 from nova import loadables
@@ -48,6 +51,24 @@ class BaseFilter(object):
     # for each request rather than for each instance
     run_filter_once_per_request = False
 
+    # Set to true in a subclass if the result of the filter for an object
+    # only depends on the object and on the parts of the request returned by
+    # get_cache_key(), so it can be reused by other requests
+    cacheable = False
+
+    def get_cache_key(self, spec_obj):
+        """Return a hashable key of the parts of the request the filter
+        depends on, or None if the result of the filter must not be cached for
+        this request. Only called for cacheable filters.
+        """
+        return None
+
+    # Set to true in a subclass if the filter must stay at its configured
+    # position when the filters are ordered by their observed selectivity,
+    # for example because it relies on the objects left by the previous
+    # filters. The other filters are only reordered between such filters.
+    keep_order = False
+
     def run_filter_for_index(self, index):
         """Return True if the filter needs to be run for the "index-th"
         instance in a request.  Only need to override this if a filter
@@ -59,14 +80,238 @@ class BaseFilter(object):
             return True
 
 
+class FilterResultCache(object):
+    """A least recently used cache of filter results."""
+
+    def __init__(self, size):
+        self.size = size
+        self._results = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, key):
+        """Return the cached result for key, or None."""
+        try:
+            # NOTE: Re-insert the result instead of using move_to_end() in
+            # case another thread evicted it in the meantime.
+            result = self._results.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._results[key] = result
+        self.hits += 1
+        return result
+
+    def set(self, key, result):
+        self._results.pop(key, None)
+        self._results[key] = result
+        while len(self._results) > self.size:
+            try:
+                self._results.popitem(last=False)
+            except KeyError:
+                break
+
+    def clear(self):
+        self._results.clear()
+
+
+class FilterStats(object):
+    """Observed selectivity and cost of a filter."""
+
+    # The counters are halved once that many objects were filtered, so that
+    # the statistics follow the changes of the filtered objects over time.
+    WINDOW = 100000
+
+    def __init__(self):
+        self.objects_in = 0
+        self.objects_out = 0
+        self.duration_ns = 0
+
+    def record(self, objects_in, objects_out, duration_ns):
+        self.objects_in += objects_in
+        self.objects_out += objects_out
+        self.duration_ns += duration_ns
+        if self.objects_in > self.WINDOW:
+            self.objects_in //= 2
+            self.objects_out //= 2
+            self.duration_ns //= 2
+
+    @property
+    def rejection_rate(self):
+        if not self.objects_in:
+            return 0.0
+        return 1.0 - float(self.objects_out) / self.objects_in
+
+    @property
+    def ns_per_object(self):
+        if not self.objects_in:
+            return 0.0
+        return float(self.duration_ns) / self.objects_in
+
+    @property
+    def rank(self):
+        """The cost of the filter per rejected object.
+
+        Running the filters by ascending rank minimizes the expected cost of
+        filtering an object when the filters are independent.
+        """
+        rejection_rate = self.rejection_rate
+        if not rejection_rate:
+            return float('inf')
+        return self.ns_per_object / rejection_rate
+
+    def to_dict(self):
+        return {
+            'objects_in': self.objects_in,
+            'objects_out': self.objects_out,
+            'rejection_rate': self.rejection_rate,
+            'ns_per_object': self.ns_per_object,
+        }
+
+
 class BaseFilterHandler(loadables.BaseLoader):
     """Base class to handle loading filter classes.
 
     This class should be subclassed where one needs to use filters.
     """
 
+    # A FilterResultCache, set by subclasses caching the results of the
+    # cacheable filters
+    filter_cache = None
+
+    # Minimum number of objects a filter has to have filtered before its
+    # statistics are used to order the filters.
+    MIN_ORDERING_SAMPLES = 1000
+
+    def __init__(self, loadable_cls_type):
+        super(BaseFilterHandler, self).__init__(loadable_cls_type)
+        # FilterStats keyed by filter class name
+        self.filter_stats = collections.defaultdict(FilterStats)
+
+    def get_filter_stats(self):
+        """Return the observed selectivity and cost of every filter."""
+        return {name: stats.to_dict()
+                for name, stats in self.filter_stats.items()}
+
+    def _use_adaptive_ordering(self):
+        """Return True to order the filters by observed selectivity and cost.
+
+        Can be overridden in a subclass.
+        """
+        return False
+
+    def _record_filter_stats(self):
+        """Return True to record the observed selectivity and cost of every
+        filter.
+
+        Can be overridden in a subclass.
+        """
+        return self._use_adaptive_ordering()
+
+    def _time_filters(self):
+        """Return True to measure the time every filter takes to run.
+
+        Can be overridden in a subclass.
+        """
+        return self._record_filter_stats()
+
+    def _record_filter_time(self, cls_name, duration_ns):
+        """Called with the time a filter took to run during a request.
+
+        Can be overridden in a subclass.
+        """
+        pass
+
+    def _order_filters(self, filters):
+        """Order the filters by ascending cost per rejected object.
+
+        Filters declaring keep_order stay at their position, the other ones
+        are only reordered between them. A group of filters is left in its
+        configured order until every filter of the group has enough
+        statistics.
+        """
+        def _sorted(group):
+            stats = [self.filter_stats.get(f.__class__.__name__)
+                     for f in group]
+            if any(s is None or s.objects_in < self.MIN_ORDERING_SAMPLES
+                   for s in stats):
+                return group
+            return [f for _, f in sorted(zip(stats, group),
+                                         key=lambda x: x[0].rank)]
+
+        ordered_filters = []
+        group = []
+        for filter_ in filters:
+            if filter_.keep_order:
+                ordered_filters.extend(_sorted(group))
+                ordered_filters.append(filter_)
+                group = []
+            else:
+                group.append(filter_)
+        ordered_filters.extend(_sorted(group))
+        return ordered_filters
+
+    def clear_cache(self):
+        """Drop all the cached filter results."""
+        if self.filter_cache is not None:
+            self.filter_cache.clear()
+
+    def _get_object_cache_key(self, obj):
+        """Return a hashable key identifying the current state of obj, or None
+        if the filter results for obj must not be cached.
+
+        Override this in a subclass caching filter results.
+        """
+        return None
+
+    def _get_filter_cache_key(self, filter_, spec_obj):
+        """Return the key of the results of filter_ for this request, or None
+        if they must not be cached.
+        """
+        if self.filter_cache is None or not filter_.cacheable:
+            return None
+        key = filter_.get_cache_key(spec_obj)
+        if key is None:
+            return None
+        return (filter_.__class__, key)
+
+    def _filter_all_cached(self, filter_, filter_key, list_objs, spec_obj):
+        """Run filter_ only on the objects without a cached result."""
+        cache = self.filter_cache
+        obj_keys = [self._get_object_cache_key(obj) for obj in list_objs]
+        results = [None if obj_key is None
+                   else cache.get((filter_key, obj_key))
+                   for obj_key in obj_keys]
+        missing = [obj for obj, result in zip(list_objs, results)
+                   if result is None]
+        LOG.debug("%(cls_name)s: %(cached)d cached result(s)",
+                  {'cls_name': filter_.__class__.__name__,
+                   'cached': len(list_objs) - len(missing)})
+        if missing:
+            objs = filter_.filter_all(self._prepare_objects(missing), spec_obj)
+            if objs is None:
+                return None
+            passed = {id(obj) for obj in objs}
+            for i, obj in enumerate(list_objs):
+                if results[i] is None:
+                    results[i] = id(obj) in passed
+                    if obj_keys[i] is not None:
+                        cache.set((filter_key, obj_keys[i]), results[i])
+        return [obj for obj, result in zip(list_objs, results) if result]
+
+    def _prepare_objects(self, objs):
+        """Return the objects returned by a filter as a list.
+
+        Can be overridden in a subclass to pass a richer sequence type to the
+        next filter.
+        """
+        return list(objs)
+
     def get_filtered_objects(self, filters, objs, spec_obj, index=0):
-        list_objs = list(objs)
+        list_objs = self._prepare_objects(objs)
         LOG.debug("Starting with %d host(s)", len(list_objs))
         # Track the hosts as they are removed. The 'full_filter_results' list
         # contains the host/nodename info for every host that passes each
@@ -78,16 +323,33 @@ class BaseFilterHandler(loadables.BaseLoader):
         part_filter_results = []
         full_filter_results = []
         log_msg = "%(cls_name)s: (start: %(start)s, end: %(end)s)"
+        if self._use_adaptive_ordering():
+            filters = self._order_filters(filters)
+        record_stats = self._record_filter_stats()
+        timed = self._time_filters()
         for filter_ in filters:
             if filter_.run_filter_for_index(index):
                 cls_name = filter_.__class__.__name__
                 start_count = len(list_objs)
-                objs = filter_.filter_all(list_objs, spec_obj)
+                if timed:
+                    start_time = time.monotonic_ns()
+                filter_key = self._get_filter_cache_key(filter_, spec_obj)
+                if filter_key is None:
+                    objs = filter_.filter_all(list_objs, spec_obj)
+                else:
+                    objs = self._filter_all_cached(
+                        filter_, filter_key, list_objs, spec_obj)
                 if objs is None:
                     LOG.debug("Filter %s says to stop filtering", cls_name)
                     return
-                list_objs = list(objs)
+                list_objs = self._prepare_objects(objs)
                 end_count = len(list_objs)
+                if timed:
+                    duration = time.monotonic_ns() - start_time
+                    if record_stats:
+                        self.filter_stats[cls_name].record(
+                            start_count, end_count, duration)
+                    self._record_filter_time(cls_name, duration)
                 part_filter_results.append(log_msg % {"cls_name": cls_name,
                         "start": start_count, "end": end_count})
                 if list_objs:
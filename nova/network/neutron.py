@@ -18,6 +18,7 @@
 API and utilities for nova-network interactions.
 """
 
+import contextlib
 import copy
 import functools
 import inspect
@@ -56,6 +57,11 @@ CONF = nova.conf.CONF
 
 LOG = logging.getLogger(__name__)
 
+# The maximum number of IDs a single filtered listing is made with when
+# fetching the resources of several instances at once, which keeps the request
+# URLs within the limits of the Neutron API servers
+BULK_FILTER_SIZE = 100
+
 
 def _load_auth_plugin():
     auth_plugin = service_auth.get_service_auth_plugin(
@@ -277,6 +283,39 @@ def _ensure_no_port_binding_failure(port):
         raise exception.PortBindingFailed(port_id=port['id'])
 
 
+def _list_in_chunks(list_func, filter_name, values, **search_opts):
+    """Call a Neutron listing method filtering on a list of values, in chunks
+    of BULK_FILTER_SIZE values, and return the concatenated results.
+    """
+    values = list(values)
+    results = []
+    for i in range(0, len(values), BULK_FILTER_SIZE):
+        search_opts[filter_name] = values[i:i + BULK_FILTER_SIZE]
+        results.extend(list_func(**search_opts))
+    return results
+
+
+class _BulkNetworkData:
+    """The Neutron resources the network info of a set of instances is built
+    from, fetched with a few filtered listings by
+    API._get_bulk_network_data.
+    """
+
+    def __init__(self):
+        # The ports of each instance, keyed by instance UUID
+        self.ports = defaultdict(list)
+        # The networks of the ports, keyed by network ID
+        self.networks = {}
+        # The (physnet, tunneled) tuple of each network, keyed by network ID
+        self.physnets = {}
+        # The subnets of the ports, keyed by subnet ID, in the Neutron order
+        self.subnets = {}
+        # The DHCP ports of each network, keyed by network ID
+        self.dhcp_ports = defaultdict(list)
+        # The floating IPs of each fixed IP, keyed by (port ID, IP address)
+        self.floating_ips = defaultdict(list)
+
+
 class API:
     """API for interacting with the neutron 2.x API."""
 
@@ -2031,6 +2070,167 @@ class API:
                                                nw_info=result)
         return result
 
+    def get_instances_nw_info(self, context, instances):
+        """Refresh the network info of several instances from Neutron.
+
+        This is equivalent to calling ``get_instance_nw_info`` with
+        ``force_refresh=True`` for each instance, but fetches the ports,
+        networks, subnets and floating IPs of all the instances with a few
+        filtered listings, rather than with several calls per port.
+
+        :param context: The request context.
+        :param instances: The list of nova.objects.instance.Instance objects
+            to refresh the network info of.
+        :returns: A dict of NetworkInfo objects keyed by instance UUID. The
+            instances which were deleted in the meantime are left out.
+        """
+        result = {}
+        if not instances:
+            return result
+        with contextlib.ExitStack() as stack:
+            # NOTE: The locks are taken in a consistent order as, unlike the
+            # other users of these locks, we hold several of them.
+            for uuid in sorted({instance.uuid for instance in instances}):
+                stack.enter_context(lockutils.lock('refresh_cache-%s' % uuid))
+
+            LOG.debug('Forcefully refreshing network info cache for %d '
+                      'instances', len(instances))
+            client = get_client(context, admin=True)
+            data = self._get_bulk_network_data(context, client, instances)
+            for instance in instances:
+                try:
+                    compute_utils.refresh_info_cache_for_instance(
+                        context, instance)
+                    nw_info = network_model.NetworkInfo.hydrate(
+                        self._build_network_info_model_from_bulk(
+                            context, instance, data))
+                    update_instance_cache_with_nw_info(
+                        self, context, instance, nw_info=nw_info)
+                except exception.InstanceNotFound:
+                    LOG.debug('Instance no longer exists. Unable to refresh',
+                              instance=instance)
+                    continue
+                result[instance.uuid] = nw_info
+        return result
+
+    def _get_bulk_network_data(self, context, client, instances):
+        """Fetch the Neutron resources the network info of a set of instances
+        is built from.
+
+        :param context: The request context.
+        :param client: A Neutron client for the admin context.
+        :param instances: The list of instances.
+        :returns: A _BulkNetworkData object.
+        """
+        data = _BulkNetworkData()
+        project_ids = {instance.uuid: instance.project_id
+                       for instance in instances}
+
+        ports = _list_in_chunks(
+            lambda **kw: client.list_ports(**kw).get('ports', []),
+            'device_id', project_ids)
+        for port in ports:
+            # Only consider the ports of the project of the instance, like
+            # _build_network_info_model does.
+            if port.get('tenant_id') == project_ids.get(port['device_id']):
+                data.ports[port['device_id']].append(port)
+        ports = [port for instance_ports in data.ports.values()
+                 for port in instance_ports]
+        if not ports:
+            return data
+
+        net_ids = {port['network_id'] for port in ports}
+        networks = _list_in_chunks(
+            lambda **kw: client.list_networks(**kw).get('networks', []),
+            'id', net_ids)
+        multi_provider = self.has_multi_provider_extension(client=client)
+        for network in networks:
+            data.networks[network['id']] = network
+            physnet = None
+            if multi_provider:
+                physnet = self._get_physnet_from_segments(
+                    network['id'], network.get('segments', {}))
+            if physnet:
+                data.physnets[network['id']] = (physnet, False)
+            else:
+                data.physnets[network['id']] = (
+                    network.get('provider:physical_network'),
+                    network.get('provider:network_type') in
+                    constants.L3_NETWORK_TYPES)
+
+        subnet_ids = {fixed_ip['subnet_id'] for port in ports
+                      for fixed_ip in port['fixed_ips']}
+        if subnet_ids:
+            subnets = _list_in_chunks(
+                lambda **kw: client.list_subnets(**kw).get('subnets', []),
+                'id', subnet_ids)
+            data.subnets = {subnet['id']: subnet for subnet in subnets}
+            dhcp_ports = _list_in_chunks(
+                lambda **kw: client.list_ports(**kw).get('ports', []),
+                'network_id',
+                {subnet['network_id'] for subnet in subnets},
+                device_owner='network:dhcp')
+            for port in dhcp_ports:
+                data.dhcp_ports[port['network_id']].append(port)
+
+            floating_ips = _list_in_chunks(
+                lambda **kw: self._safe_get_floating_ips(client, **kw),
+                'port_id', [port['id'] for port in ports])
+            for fip in floating_ips:
+                data.floating_ips[
+                    (fip['port_id'], fip['fixed_ip_address'])].append(fip)
+        return data
+
+    def _build_network_info_model_from_bulk(self, context, instance, data):
+        """Return the list of ordered VIFs attached to an instance, built from
+        the Neutron resources fetched by _get_bulk_network_data.
+        """
+        ports = data.ports[instance.uuid]
+        port_map = {port['id']: port for port in ports}
+        port_ids = self._get_ordered_port_list(context, instance, ports)
+        networks = [data.networks[net_id]
+                    for net_id in {port['network_id'] for port in ports}
+                    if net_id in data.networks]
+        preexisting_port_ids = set(self._get_preexisting_port_ids(instance))
+
+        old_nw_info = instance.get_network_info()
+        nw_info = network_model.NetworkInfo()
+        for port_id in port_ids:
+            port = port_map[port_id]
+            network_IPs = []
+            for fixed_ip in port['fixed_ips']:
+                fixed = network_model.FixedIP(address=fixed_ip['ip_address'])
+                for ip in data.floating_ips[(port_id,
+                                             fixed_ip['ip_address'])]:
+                    fixed.add_floating_ip(network_model.IP(
+                        address=ip['floating_ip_address'], type='floating'))
+                network_IPs.append(fixed)
+
+            port_subnet_ids = {ip['subnet_id'] for ip in port['fixed_ips']}
+            subnets = []
+            for subnet_id, subnet in data.subnets.items():
+                if subnet_id not in port_subnet_ids:
+                    continue
+                subnet = self._build_subnet_model(
+                    subnet, data.dhcp_ports[subnet['network_id']])
+                subnet['ips'] = [fixed_ip for fixed_ip in network_IPs
+                                 if fixed_ip.is_in_subnet(subnet)]
+                subnets.append(subnet)
+
+            physnet, tunneled = data.physnets.get(port['network_id'],
+                                                  (None, False))
+            network, ovs_interfaceid = self._nw_info_build_network_model(
+                port, networks, subnets, physnet, tunneled)
+            vif = self._build_vif_model_from_network(
+                port, network, ovs_interfaceid, preexisting_port_ids)
+            for old_vif in old_nw_info:
+                if old_vif['id'] == port_id:
+                    self._log_error_if_vnic_type_changed(
+                        port_id, old_vif['vnic_type'], vif['vnic_type'],
+                        instance)
+            nw_info.append(vif)
+        return nw_info
+
     def _get_instance_nw_info(self, context, instance, networks=None,
                               port_ids=None, admin_client=None,
                               preexisting_port_ids=None,
@@ -2195,27 +2395,10 @@ class API:
         if self.has_multi_provider_extension(client=neutron):
             network = neutron.show_network(net_id,
                                            fields='segments').get('network')
-            segments = network.get('segments', {})
-            for net in segments:
-                # NOTE(vladikr): In general, "multi-segments" network is a
-                # combination of L2 segments. The current implementation
-                # contains a vxlan and vlan(s) segments, where only a vlan
-                # network will have a physical_network specified, but may
-                # change in the future. The purpose of this method
-                # is to find a first segment that provides a physical network.
-                # TODO(vladikr): Additional work will be required to handle the
-                # case of multiple vlan segments associated with different
-                # physical networks.
-                physnet_name = net.get('provider:physical_network')
-                if physnet_name:
-                    return physnet_name, False
-
-            # Raising here as at least one segment should
-            # have a physical network provided.
-            if segments:
-                msg = (_("None of the segments of network %s provides a "
-                         "physical_network") % net_id)
-                raise exception.NovaException(message=msg)
+            physnet_name = self._get_physnet_from_segments(
+                net_id, network.get('segments', {}))
+            if physnet_name:
+                return physnet_name, False
 
         net = neutron.show_network(
             net_id, fields=['provider:physical_network',
@@ -2223,6 +2406,33 @@ class API:
         return (net.get('provider:physical_network'),
                 net.get('provider:network_type') in constants.L3_NETWORK_TYPES)
 
+    @staticmethod
+    def _get_physnet_from_segments(net_id, segments):
+        """Return the physnet name of the first segment of a multi-segment
+        network which defines one, or None if the network has no segments.
+        """
+        for net in segments:
+            # NOTE(vladikr): In general, "multi-segments" network is a
+            # combination of L2 segments. The current implementation
+            # contains a vxlan and vlan(s) segments, where only a vlan
+            # network will have a physical_network specified, but may
+            # change in the future. The purpose of this method
+            # is to find a first segment that provides a physical network.
+            # TODO(vladikr): Additional work will be required to handle the
+            # case of multiple vlan segments associated with different
+            # physical networks.
+            physnet_name = net.get('provider:physical_network')
+            if physnet_name:
+                return physnet_name
+
+        # Raising here as at least one segment should
+        # have a physical network provided.
+        if segments:
+            msg = (_("None of the segments of network %s provides a "
+                     "physical_network") % net_id)
+            raise exception.NovaException(message=msg)
+        return None
+
     @staticmethod
     def _get_trusted_mode_from_port(port):
         """Returns whether trusted mode is requested
@@ -3284,6 +3494,13 @@ class API:
     def _nw_info_build_network(self, context, port, networks, subnets):
         # TODO(stephenfin): Pass in an existing admin client if available.
         neutron = get_client(context, admin=True)
+        physnet, tunneled = self._get_physnet_tunneled_info(
+            context, neutron, port['network_id'])
+        return self._nw_info_build_network_model(
+            port, networks, subnets, physnet, tunneled)
+
+    def _nw_info_build_network_model(self, port, networks, subnets, physnet,
+                                     tunneled):
         network_name = None
         network_mtu = None
         for net in networks:
@@ -3337,8 +3554,6 @@ class API:
         if bridge is not None and vif_type != network_model.VIF_TYPE_DVS:
             bridge = bridge[:network_model.NIC_NAME_LEN]
 
-        physnet, tunneled = self._get_physnet_tunneled_info(
-            context, neutron, port['network_id'])
         network = network_model.Network(
             id=port['network_id'],
             bridge=bridge,
@@ -3385,23 +3600,29 @@ class API:
         :return: nova.network.model.VIF object which represents a port in the
             instance network info cache.
         """
-        vif_active = False
-        if (current_neutron_port['admin_state_up'] is False or
-            current_neutron_port['status'] == 'ACTIVE'):
-            vif_active = True
-
         network_IPs = self._nw_info_get_ips(client,
                                             current_neutron_port)
         subnets = self._nw_info_get_subnets(context,
                                             current_neutron_port,
                                             network_IPs, client)
 
-        devname = "tap" + current_neutron_port['id']
-        devname = devname[:network_model.NIC_NAME_LEN]
-
         network, ovs_interfaceid = (
             self._nw_info_build_network(context, current_neutron_port,
                                         networks, subnets))
+        return self._build_vif_model_from_network(
+            current_neutron_port, network, ovs_interfaceid,
+            preexisting_port_ids)
+
+    def _build_vif_model_from_network(self, current_neutron_port, network,
+                                      ovs_interfaceid, preexisting_port_ids):
+        vif_active = False
+        if (current_neutron_port['admin_state_up'] is False or
+            current_neutron_port['status'] == 'ACTIVE'):
+            vif_active = True
+
+        devname = "tap" + current_neutron_port['id']
+        devname = devname[:network_model.NIC_NAME_LEN]
+
         preserve_on_delete = (current_neutron_port['id'] in
                               preexisting_port_ids)
 
@@ -3652,51 +3873,59 @@ class API:
         subnets = []
 
         for subnet in ipam_subnets:
-            subnet_dict = {'cidr': subnet['cidr'],
-                           'gateway': network_model.IP(
-                                address=subnet['gateway_ip'],
-                                type='gateway'),
-                           'enable_dhcp': False,
-            }
-            if subnet.get('ipv6_address_mode'):
-                subnet_dict['ipv6_address_mode'] = subnet['ipv6_address_mode']
-
             # attempt to populate DHCP server field
             dhcp_search_opts = {
                 'network_id': subnet['network_id'],
                 'device_owner': 'network:dhcp'}
             data = client.list_ports(**dhcp_search_opts)
             dhcp_ports = data.get('ports', [])
-            for p in dhcp_ports:
-                for ip_pair in p['fixed_ips']:
-                    if ip_pair['subnet_id'] == subnet['id']:
-                        subnet_dict['dhcp_server'] = ip_pair['ip_address']
-                        break
-
-            # NOTE(stblatzheim): If enable_dhcp is set on subnet, but subnet
-            # has ovn native dhcp and no dhcp-agents. Network owner will be
-            # network:distributed
-            # Just rely on enable_dhcp flag given by neutron
-            # Fix for https://bugs.launchpad.net/nova/+bug/2055245
-
-            if subnet.get('enable_dhcp'):
-                subnet_dict['enable_dhcp'] = True
-
-            subnet_object = network_model.Subnet(**subnet_dict)
-            for dns in subnet.get('dns_nameservers', []):
-                subnet_object.add_dns(
-                    network_model.IP(address=dns, type='dns'))
-
-            for route in subnet.get('host_routes', []):
-                subnet_object.add_route(
-                    network_model.Route(cidr=route['destination'],
-                                        gateway=network_model.IP(
-                                            address=route['nexthop'],
-                                            type='gateway')))
-
-            subnets.append(subnet_object)
+            subnets.append(self._build_subnet_model(subnet, dhcp_ports))
         return subnets
 
+    @staticmethod
+    def _build_subnet_model(subnet, dhcp_ports):
+        """Return the ``nova.network.model.Subnet`` of a Neutron subnet.
+
+        :param subnet: The Neutron subnet.
+        :param dhcp_ports: The DHCP ports of the network of the subnet.
+        """
+        subnet_dict = {'cidr': subnet['cidr'],
+                       'gateway': network_model.IP(
+                            address=subnet['gateway_ip'],
+                            type='gateway'),
+                       'enable_dhcp': False,
+        }
+        if subnet.get('ipv6_address_mode'):
+            subnet_dict['ipv6_address_mode'] = subnet['ipv6_address_mode']
+
+        for p in dhcp_ports:
+            for ip_pair in p['fixed_ips']:
+                if ip_pair['subnet_id'] == subnet['id']:
+                    subnet_dict['dhcp_server'] = ip_pair['ip_address']
+                    break
+
+        # NOTE(stblatzheim): If enable_dhcp is set on subnet, but subnet
+        # has ovn native dhcp and no dhcp-agents. Network owner will be
+        # network:distributed
+        # Just rely on enable_dhcp flag given by neutron
+        # Fix for https://bugs.launchpad.net/nova/+bug/2055245
+
+        if subnet.get('enable_dhcp'):
+            subnet_dict['enable_dhcp'] = True
+
+        subnet_object = network_model.Subnet(**subnet_dict)
+        for dns in subnet.get('dns_nameservers', []):
+            subnet_object.add_dns(
+                network_model.IP(address=dns, type='dns'))
+
+        for route in subnet.get('host_routes', []):
+            subnet_object.add_route(
+                network_model.Route(cidr=route['destination'],
+                                    gateway=network_model.IP(
+                                        address=route['nexthop'],
+                                        type='gateway')))
+        return subnet_object
+
     def setup_instance_network_on_host(
             self, context, instance, host, migration=None,
             provider_mappings=None):
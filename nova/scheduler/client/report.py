@@ -37,6 +37,7 @@ from nova import exception
 from nova.i18n import _
 from nova import objects
 from nova.objects import fields
+from nova import thread_pool_factory
 from nova import utils
 
 
@@ -233,6 +234,8 @@ class SchedulerReportClient(object):
         self._provider_tree: provider_tree.ProviderTree = None
         # Track the last time we updated providers' aggregates and traits
         self._association_refresh_time: dict[str, float] = {}
+        # Number of placement API calls avoided by the delta sync
+        self.placement_calls_saved = 0
         self._client = self._create_client()
         # NOTE(danms): Keep track of how naggy we've been
         self._warn_count = 0
@@ -720,10 +723,24 @@ class SchedulerReportClient(object):
                 # But do mark it as having just been "refreshed".
                 self._association_refresh_time[uuid] = time.time()
 
+            unchanged = {}
+            if CONF.compute.resource_provider_delta_sync:
+                unchanged = self._get_unchanged_providers(rps_to_refresh)
+
+            if (rps_to_refresh and
+                    CONF.compute.resource_provider_refresh_concurrency > 1):
+                self._refresh_tree_associations(
+                    context, rps_to_refresh, unchanged)
+                return uuid
+
             self._provider_tree.populate_from_iterable(
                 rps_to_refresh or [created_rp])
 
-            uuids_to_refresh = [rp['uuid'] for rp in rps_to_refresh]
+            if unchanged:
+                self._restore_unchanged_providers(context, unchanged)
+
+            uuids_to_refresh = [rp['uuid'] for rp in rps_to_refresh
+                                if rp['uuid'] not in unchanged]
 
         # At this point, the whole tree exists in the local cache.
 
@@ -846,26 +863,33 @@ class SchedulerReportClient(object):
                 rp_uuid, traits, generation=generation)
 
             if refresh_sharing:
-                # Refresh providers associated by aggregate
-                for rp in self._get_sharing_providers(context, aggs):
-                    if not self._provider_tree.exists(rp['uuid']):
-                        # NOTE(efried): Right now sharing providers are always
-                        # treated as roots. This is deliberate. From the
-                        # context of this compute's RP, it doesn't matter if a
-                        # sharing RP is part of a tree.
-                        self._provider_tree.new_root(
-                            rp['name'], rp['uuid'],
-                            generation=rp['generation'])
-                    # Now we have to (populate or) refresh that provider's
-                    # traits, aggregates, and inventories (but not *its*
-                    # aggregate-associated providers). No need to override
-                    # force=True for newly-added providers - the missing
-                    # timestamp will always trigger them to refresh.
-                    self._refresh_associations(context, rp['uuid'],
-                                               force=force,
-                                               refresh_sharing=False)
+                self._refresh_sharing_providers(context, aggs, force=force)
             self._association_refresh_time[rp_uuid] = time.time()
 
+    def _refresh_sharing_providers(self, context, aggs, force=False):
+        """Refresh the providers associated by aggregate with a provider.
+
+        :param context: The security context
+        :param aggs: The aggregate UUIDs of the provider
+        :param force: If True, force the refresh of the sharing providers
+                      already in the cache
+        """
+        for rp in self._get_sharing_providers(context, aggs):
+            if not self._provider_tree.exists(rp['uuid']):
+                # NOTE(efried): Right now sharing providers are always
+                # treated as roots. This is deliberate. From the context of
+                # this compute's RP, it doesn't matter if a sharing RP is part
+                # of a tree.
+                self._provider_tree.new_root(
+                    rp['name'], rp['uuid'], generation=rp['generation'])
+            # Now we have to (populate or) refresh that provider's traits,
+            # aggregates, and inventories (but not *its* aggregate-associated
+            # providers). No need to override force=True for newly-added
+            # providers - the missing timestamp will always trigger them to
+            # refresh.
+            self._refresh_associations(context, rp['uuid'], force=force,
+                                       refresh_sharing=False)
+
     def _associations_stale(self, uuid):
         """Respond True if aggregates and traits have not been refreshed
         "recently".
@@ -888,6 +912,140 @@ class SchedulerReportClient(object):
             return False
         return (time.time() - refresh_time) > rpar
 
+    def _get_unchanged_providers(self, rps):
+        """Return the cached data of the providers unchanged in placement.
+
+        A provider is unchanged if its associations were already retrieved
+        and placement still reports the generation, name and parent we have
+        in the cache, in which case its cached inventories, traits and
+        aggregates are still those of placement.
+
+        :param rps: The provider dicts returned by placement
+        :return: A dict, keyed by provider UUID, of the cached ProviderData of
+                 the unchanged providers.
+        """
+        unchanged = {}
+        for rp in rps:
+            uuid = rp['uuid']
+            if (uuid not in self._association_refresh_time or
+                    not self._provider_tree.exists(uuid)):
+                continue
+            data = self._provider_tree.data(uuid)
+            if (data.generation == rp['generation'] and
+                    data.name == rp['name'] and
+                    data.parent_uuid == rp.get('parent_provider_uuid')):
+                unchanged[uuid] = data
+        return unchanged
+
+    def _restore_unchanged_providers(self, context, unchanged):
+        """Restore the associations of the unchanged providers in the cache
+        after it was repopulated, instead of retrieving them again.
+
+        :param context: The security context
+        :param unchanged: A dict, keyed by provider UUID, of ProviderData as
+                          returned by _get_unchanged_providers
+        """
+        now = time.time()
+        for uuid, data in unchanged.items():
+            self._provider_tree.update_inventory(
+                uuid, data.inventory, generation=data.generation)
+            self._provider_tree.update_aggregates(
+                uuid, data.aggregates, generation=data.generation)
+            self._provider_tree.update_traits(
+                uuid, data.traits, generation=data.generation)
+            self._association_refresh_time[uuid] = now
+            # The sharing providers are not part of the tree, so they are
+            # still retrieved through the aggregates.
+            if data.aggregates:
+                self._refresh_sharing_providers(
+                    context, data.aggregates, force=True)
+        self._count_skipped_refreshes(unchanged)
+
+    def _count_skipped_refreshes(self, unchanged):
+        # The inventories, aggregates and traits of each provider
+        self.placement_calls_saved += 3 * len(unchanged)
+        LOG.debug('Skipped the refresh of %d resource providers unchanged in '
+                  'placement, %d placement API calls saved so far.',
+                  len(unchanged), self.placement_calls_saved)
+
+    def _get_associations(self, context, rp_uuid):
+        """Retrieve the inventories, aggregates and traits of a provider.
+
+        :param context: The security context
+        :param rp_uuid: UUID of the resource provider
+        :return: A dict with the 'inventories', 'aggregates' and 'traits' of
+                 the provider, and the lowest 'generation' they were retrieved
+                 at.
+        :raise: On various placement API errors, one of:
+                - ResourceProviderAggregateRetrievalFailed
+                - ResourceProviderTraitRetrievalFailed
+        """
+        inv_info = self._get_inventory(context, rp_uuid)
+        agg_info = self._get_provider_aggregates(context, rp_uuid)
+        trait_info = self.get_provider_traits(context, rp_uuid)
+        # NOTE: The provider may have changed between the calls. Keeping the
+        # lowest generation makes the next update of the provider fail with a
+        # conflict, which refreshes it again, rather than overwrite the change.
+        generations = [agg_info.generation, trait_info.generation]
+        inventories = {}
+        if inv_info is not None:
+            inventories = inv_info['inventories']
+            generations.append(inv_info['resource_provider_generation'])
+        return {
+            'inventories': inventories,
+            'aggregates': agg_info.aggregates,
+            'traits': trait_info.traits,
+            'generation': min(generations),
+        }
+
+    def _refresh_tree_associations(self, context, rps, unchanged):
+        """Refresh all the providers of a tree in bulk.
+
+        The associations of the providers which are not unchanged are
+        retrieved concurrently, then the cache is repopulated with the whole
+        tree in a single update.
+
+        :param context: The security context
+        :param rps: The provider dicts of the tree returned by placement
+        :param unchanged: A dict, keyed by provider UUID, of ProviderData as
+                          returned by _get_unchanged_providers
+        """
+        futures = {
+            rp['uuid']: thread_pool_factory.spawn_on(
+                thread_pool_factory.ExecutorType.PLACEMENT,
+                self._get_associations, context, rp['uuid'])
+            for rp in rps if rp['uuid'] not in unchanged
+        }
+
+        provider_dicts = []
+        for rp in rps:
+            pdict = dict(rp)
+            if rp['uuid'] in unchanged:
+                data = unchanged[rp['uuid']]
+                pdict.update(inventories=data.inventory,
+                             aggregates=data.aggregates, traits=data.traits)
+            else:
+                associations = futures[rp['uuid']].result()
+                pdict.update(associations)
+                pdict['generation'] = min(rp['generation'],
+                                          associations['generation'])
+            provider_dicts.append(pdict)
+
+        self._provider_tree.populate_from_iterable(provider_dicts)
+
+        now = time.time()
+        aggs = set()
+        for pdict in provider_dicts:
+            self._association_refresh_time[pdict['uuid']] = now
+            aggs |= set(pdict['aggregates'])
+        LOG.debug('Refreshed the associations of %d resource providers in '
+                  'bulk.', len(futures))
+        if unchanged:
+            self._count_skipped_refreshes(unchanged)
+
+        # The sharing providers of the whole tree are retrieved at once.
+        self._refresh_sharing_providers(context, aggs, force=True)
+
     def get_provider_tree_and_ensure_root(self, context, rp_uuid, name=None,
                                           parent_provider_uuid=None):
         """Returns a fresh ProviderTree representing all providers which are in
@@ -916,8 +1074,11 @@ class SchedulerReportClient(object):
         self._ensure_resource_provider(
             context, rp_uuid, name=name,
             parent_provider_uuid=parent_provider_uuid)
-        # Return a *copy* of the tree.
-        return copy.deepcopy(self._provider_tree)
+        # Return a *copy* of the tree, taken under its lock so that the
+        # providers updated concurrently for other compute nodes are not
+        # copied half way through.
+        with self._provider_tree.lock:
+            return copy.deepcopy(self._provider_tree)
 
     def set_inventory_for_provider(self, context, rp_uuid, inv_data):
         """Given the UUID of a provider, set the inventory records for the
@@ -1303,10 +1464,14 @@ class SchedulerReportClient(object):
 
         return resp
 
-    def _set_up_and_do_reshape(self, context, old_tree, new_tree, allocations):
+    def _set_up_and_do_reshape(self, context, old_tree, new_tree, allocations,
+                               old_uuids=None, new_uuids=None):
         LOG.info("Performing resource provider inventory and allocation "
                  "data migration.")
-        new_uuids = new_tree.get_provider_uuids()
+        if old_uuids is None:
+            old_uuids = old_tree.get_provider_uuids()
+        if new_uuids is None:
+            new_uuids = new_tree.get_provider_uuids()
         inventories = {}
         for rp_uuid in new_uuids:
             data = new_tree.data(rp_uuid)
@@ -1319,7 +1484,7 @@ class SchedulerReportClient(object):
         # reshape request so they're done atomically. This prevents races
         # where the scheduler could allocate between here and when we
         # delete the providers.
-        to_remove = set(old_tree.get_provider_uuids()) - set(new_uuids)
+        to_remove = set(old_uuids) - set(new_uuids)
         for rp_uuid in to_remove:
             inventories[rp_uuid] = {
                 "inventories": {},
@@ -1339,7 +1504,8 @@ class SchedulerReportClient(object):
             LOG.exception('Reshape failed')
             raise exception.ReshapeFailed(error=e)
 
-    def update_from_provider_tree(self, context, new_tree, allocations=None):
+    def update_from_provider_tree(self, context, new_tree, allocations=None,
+                                  root_uuid=None):
         """Flush changes from a specified ProviderTree back to placement.
 
         The specified ProviderTree is compared against the local cache.  Any
@@ -1360,6 +1526,11 @@ class SchedulerReportClient(object):
                             comprehensive final picture of the allocations for
                             each consumer therein. A value of None indicates
                             that no reshape is being performed.
+        :param root_uuid: Optional UUID of the root provider of the only tree
+                          to flush. The providers of the other trees of
+                          new_tree and of the local cache are neither flushed
+                          nor removed, so that the trees of several compute
+                          nodes can be flushed concurrently.
         :raises: ResourceProviderUpdateConflict if a generation conflict was
                  encountered - i.e. we are attempting to update placement based
                  on a stale view of it.
@@ -1420,8 +1591,17 @@ class SchedulerReportClient(object):
         # intentional) so we need to grab up front any data we need to operate
         # on in its "original" form.
         old_tree = self._provider_tree
-        old_uuids = old_tree.get_provider_uuids()
-        new_uuids = new_tree.get_provider_uuids()
+        if root_uuid is None:
+            old_uuids = old_tree.get_provider_uuids()
+            new_uuids = new_tree.get_provider_uuids()
+        else:
+            try:
+                old_uuids = old_tree.get_provider_uuids(root_uuid)
+            except ValueError:
+                # The tree was removed from the cache since new_tree was
+                # copied from it, it is added back below.
+                old_uuids = []
+            new_uuids = new_tree.get_provider_uuids(root_uuid)
         uuids_to_add = set(new_uuids) - set(old_uuids)
         uuids_to_remove = set(old_uuids) - set(new_uuids)
 
@@ -1452,7 +1632,8 @@ class SchedulerReportClient(object):
             # needs to bubble up right away and be handled specially.
             try:
                 self._set_up_and_do_reshape(
-                    context, old_tree, new_tree, allocations)
+                    context, old_tree, new_tree, allocations,
+                    old_uuids=old_uuids, new_uuids=new_uuids)
             except exception.PlacementReshapeConflict:
                 # The conflict means we need to invalidate the local caches and
                 # let the retry mechanism in _update_to_placement to re-drive
@@ -0,0 +1,69 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Columnar view of HostState objects used by the scheduler filters and weighers.
+"""
+
+
+class HostColumns(list):
+    """A list of HostState objects with lazily packed attribute columns.
+
+    Filters and weighers aware of this class can read an attribute of every
+    host at once with :meth:`column` and share the packed values during a
+    single filtering or weighing pass. For everything else this is just a list
+    of HostState objects, so out-of-tree filters and weighers keep working
+    unmodified.
+
+    The columns are a snapshot of the host states at the time they are first
+    read, so a new HostColumns object has to be built for every pass.
+    """
+
+    def __init__(self, host_states=()):
+        super(HostColumns, self).__init__(host_states)
+        self._columns = {}
+
+    def column(self, name):
+        """Return the list of the ``name`` attribute values of every host."""
+        col = self._columns.get(name)
+        if col is None:
+            col = self._columns[name] = [getattr(h, name) for h in self]
+        return col
+
+    def per_aggregates_column(self, func):
+        """Return ``func(host_state)`` for every host.
+
+        ``func`` must only depend on the aggregates of the host, as it is
+        called once per distinct set of aggregates and the result is reused
+        for every other host in the same aggregates.
+        """
+        values_by_aggs = {}
+        values = []
+        for host_state in self:
+            aggs_key = tuple(id(agg) for agg in host_state.aggregates)
+            try:
+                value = values_by_aggs[aggs_key]
+            except KeyError:
+                value = values_by_aggs[aggs_key] = func(host_state)
+            values.append(value)
+        return values
+
+    def compress(self, mask):
+        """Return a new HostColumns with the hosts whose mask value is True.
+
+        The already packed columns are carried over to the new object.
+        """
+        selected = HostColumns(h for h, keep in zip(self, mask) if keep)
+        for name, col in self._columns.items():
+            selected._columns[name] = [
+                v for v, keep in zip(col, mask) if keep]
+        return selected
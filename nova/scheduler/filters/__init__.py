@@ -18,10 +18,15 @@ Scheduler host filters
 """
 from oslo_log import log as logging
 
+import nova.conf
 from nova import filters
+from nova.scheduler import columns
+from nova.scheduler import timing
 
 LOG = logging.getLogger(__name__)
 
+CONF = nova.conf.CONF
+
 
 class BaseHostFilter(filters.BaseFilter):
     """Base class for host filters."""
@@ -56,6 +61,31 @@ class BaseHostFilter(filters.BaseFilter):
         """
         raise NotImplementedError()
 
+    def filter_columns(self, host_columns, spec_obj):
+        """Return a list of booleans telling which hosts pass the filter.
+
+        Override this in a subclass that can be evaluated on the packed
+        columns of a HostColumns object at once. Returning None, which is the
+        default, makes the filter being evaluated host by host with
+        host_passes().
+
+        :param host_columns: HostColumns object of the hosts to filter
+        :param spec_obj: RequestSpec object
+        """
+        return None
+
+    def filter_all(self, filter_obj_list, spec_obj):
+        if isinstance(filter_obj_list, columns.HostColumns):
+            # Do this here so we don't get scheduler.filters.utils
+            from nova.scheduler import utils
+            if not self.RUN_ON_REBUILD and utils.request_is_rebuild(spec_obj):
+                return filter_obj_list
+            mask = self.filter_columns(filter_obj_list, spec_obj)
+            if mask is not None:
+                return filter_obj_list.compress(mask)
+        return super(BaseHostFilter, self).filter_all(
+            filter_obj_list, spec_obj)
+
 
 class CandidateFilterMixin:
     """Mixing that helps to implement a Filter that needs to filter host by
@@ -97,6 +127,51 @@ class CandidateFilterMixin:
 class HostFilterHandler(filters.BaseFilterHandler):
     def __init__(self):
         super(HostFilterHandler, self).__init__(BaseHostFilter)
+        cache_size = CONF.filter_scheduler.filter_result_cache_size
+        if cache_size:
+            self.filter_cache = filters.FilterResultCache(cache_size)
+
+    def _get_object_cache_key(self, host_state):
+        # NOTE: The updated time of a host state changes when its compute
+        # node is updated and when resources are consumed from it, so the
+        # cached results of a host are not used anymore once it changed.
+        # Aggregate changes are handled by the HostManager clearing the
+        # cache.
+        if not host_state.updated:
+            return None
+        return (host_state.uuid, host_state.updated)
+
+    def _get_filter_cache_key(self, filter_, spec_obj):
+        # Do this here so we don't get scheduler.filters.utils
+        from nova.scheduler import utils
+        if not filter_.RUN_ON_REBUILD and utils.request_is_rebuild(spec_obj):
+            # The filter lets every host pass, don't record that.
+            return None
+        return super(HostFilterHandler, self)._get_filter_cache_key(
+            filter_, spec_obj)
+
+    def _use_adaptive_ordering(self):
+        return CONF.filter_scheduler.adaptive_filter_ordering
+
+    def _record_filter_stats(self):
+        return (super(HostFilterHandler, self)._record_filter_stats() or
+                CONF.filter_scheduler.filter_stats_log_interval >= 0)
+
+    def _time_filters(self):
+        return (super(HostFilterHandler, self)._time_filters() or
+                timing.current() is not None)
+
+    def _record_filter_time(self, cls_name, duration_ns):
+        timings = timing.current()
+        if timings is not None:
+            timings.add('filter:' + cls_name, duration_ns)
+
+    def _prepare_objects(self, objs):
+        if not CONF.filter_scheduler.columnar_host_evaluation:
+            return super(HostFilterHandler, self)._prepare_objects(objs)
+        if isinstance(objs, columns.HostColumns):
+            return objs
+        return columns.HostColumns(objs)
 
 
 def all_filters():
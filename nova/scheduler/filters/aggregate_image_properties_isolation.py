@@ -32,6 +32,15 @@ class AggregateImagePropertiesIsolation(filters.BaseHostFilter):
 
     RUN_ON_REBUILD = True
 
+    cacheable = True
+
+    def get_cache_key(self, spec_obj):
+        return (CONF.filter_scheduler.
+                    aggregate_image_properties_isolation_namespace,
+                CONF.filter_scheduler.
+                    aggregate_image_properties_isolation_separator,
+                utils.image_props_cache_key(spec_obj))
+
     def host_passes(self, host_state, spec_obj):
         """Checks a host in an aggregate that metadata key/value match
         with image properties.
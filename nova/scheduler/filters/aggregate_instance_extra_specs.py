@@ -35,6 +35,11 @@ class AggregateInstanceExtraSpecsFilter(filters.BaseHostFilter):
 
     RUN_ON_REBUILD = False
 
+    cacheable = True
+
+    def get_cache_key(self, spec_obj):
+        return utils.extra_specs_cache_key(spec_obj)
+
     def host_passes(self, host_state, spec_obj):
         """Return a list of hosts that can create flavor.
 
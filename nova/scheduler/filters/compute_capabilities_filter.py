@@ -18,6 +18,7 @@ from oslo_serialization import jsonutils
 
 from nova.scheduler import filters
 from nova.scheduler.filters import extra_specs_ops
+from nova.scheduler.filters import utils
 
 
 LOG = logging.getLogger(__name__)
@@ -31,6 +32,11 @@ class ComputeCapabilitiesFilter(filters.BaseHostFilter):
 
     RUN_ON_REBUILD = False
 
+    cacheable = True
+
+    def get_cache_key(self, spec_obj):
+        return utils.extra_specs_cache_key(spec_obj)
+
     def _get_capabilities(self, host_state, scope):
         cap = host_state
         for index in range(0, len(scope)):
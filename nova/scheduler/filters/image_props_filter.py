@@ -20,6 +20,7 @@ from oslo_utils import versionutils
 import nova.conf
 from nova.objects import fields
 from nova.scheduler import filters
+from nova.scheduler.filters import utils
 
 
 LOG = logging.getLogger(__name__)
@@ -42,6 +43,12 @@ class ImagePropertiesFilter(filters.BaseHostFilter):
     # a request
     run_filter_once_per_request = True
 
+    cacheable = True
+
+    def get_cache_key(self, spec_obj):
+        return (self._get_default_architecture(),
+                utils.image_props_cache_key(spec_obj))
+
     def _get_default_architecture(self):
         return CONF.filter_scheduler.image_properties_default_architecture
 
@@ -47,6 +47,13 @@ class IoOpsFilter(filters.BaseHostFilter):
                        'max_io_ops': max_io_ops})
         return passes
 
+    def filter_columns(self, host_columns, spec_obj):
+        max_io_ops = host_columns.per_aggregates_column(
+            lambda host_state: self._get_max_io_ops_per_host(
+                host_state, spec_obj))
+        return [num_io_ops < max_ops for num_io_ops, max_ops
+                in zip(host_columns.column('num_io_ops'), max_io_ops)]
+
 
 class AggregateIoOpsFilter(IoOpsFilter):
     """AggregateIoOpsFilter with per-aggregate the max io operations.
@@ -44,6 +44,13 @@ class NumInstancesFilter(filters.BaseHostFilter):
                        'max_instances': max_instances})
         return passes
 
+    def filter_columns(self, host_columns, spec_obj):
+        max_instances = host_columns.per_aggregates_column(
+            lambda host_state: self._get_max_instances_per_host(
+                host_state, spec_obj))
+        return [num_instances < max_inst for num_instances, max_inst
+                in zip(host_columns.column('num_instances'), max_instances)]
+
 
 class AggregateNumInstancesFilter(NumInstancesFilter):
     """AggregateNumInstancesFilter with per-aggregate the max num instances.
@@ -10,15 +10,82 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from concurrent import futures
+import math
+import multiprocessing
+import threading
+
 from oslo_log import log as logging
 
+import nova.conf
 from nova import objects
+from nova.objects import base as obj_base
 from nova.objects import fields
 from nova.scheduler import filters
+from nova import utils
 from nova.virt import hardware
 
 LOG = logging.getLogger(__name__)
 
+CONF = nova.conf.CONF
+
+_PROCESS_POOL = None
+_PROCESS_POOL_LOCK = threading.Lock()
+
+
+def _get_process_pool():
+    global _PROCESS_POOL
+    with _PROCESS_POOL_LOCK:
+        if _PROCESS_POOL is None:
+            # NOTE: Forking a multithreaded process is not safe, so the
+            # workers are started from scratch.
+            _PROCESS_POOL = futures.ProcessPoolExecutor(
+                max_workers=CONF.filter_scheduler.numa_fit_process_pool_size,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=objects.register_all)
+        return _PROCESS_POOL
+
+
+def _reset_process_pool():
+    global _PROCESS_POOL
+    with _PROCESS_POOL_LOCK:
+        if _PROCESS_POOL is not None:
+            _PROCESS_POOL.shutdown(wait=False, cancel_futures=True)
+            _PROCESS_POOL = None
+
+
+class _PciPools(object):
+    """The part of a PciDeviceStats object used by numa_fit_instance_to_host
+    when no PCI device is requested.
+    """
+
+    def __init__(self, pools):
+        self.pools = pools
+
+
+def _fit_candidates(args):
+    """Return whether the instance fits on the host for each candidate.
+
+    Runs in the process pool workers on the serialized arguments of
+    numa_fit_instance_to_host.
+    """
+    (host_topology, requested_topology, limits, pci_pools, pack,
+     mappings) = args
+    if CONF.compute.packing_host_numa_cells_allocation_strategy != pack:
+        CONF.set_override('packing_host_numa_cells_allocation_strategy', pack,
+                          group='compute')
+    host_topology = obj_base.NovaObject.obj_from_primitive(host_topology)
+    requested_topology = obj_base.NovaObject.obj_from_primitive(
+        requested_topology)
+    limits = obj_base.NovaObject.obj_from_primitive(limits)
+    pci_stats = _PciPools(pci_pools) if pci_pools is not None else None
+    return [
+        hardware.numa_fit_instance_to_host(
+            host_topology, requested_topology, limits=limits,
+            pci_stats=pci_stats, provider_mapping=mapping) is not None
+        for mapping in mappings
+    ]
+
 
 class NUMATopologyFilter(
     filters.BaseHostFilter,
@@ -32,6 +99,12 @@ class NUMATopologyFilter(
     # request and therefore do not need to run this filter on rebuild.
     RUN_ON_REBUILD = False
 
+    def __init__(self):
+        super(NUMATopologyFilter, self).__init__()
+        # The fitting results computed by the process pool for the hosts of
+        # the request being filtered by the current thread
+        self._local = threading.local()
+
     def _satisfies_cpu_policy(self, host_state, extra_specs, image_props):
         """Check that the host_state provided satisfies any available
         CPU policy requirements.
@@ -63,6 +136,94 @@ class NUMATopologyFilter(
 
         return True
 
+    @staticmethod
+    def _get_limits(host_state, spec_obj):
+        limits = objects.NUMATopologyLimits(
+            cpu_allocation_ratio=host_state.cpu_allocation_ratio,
+            ram_allocation_ratio=host_state.ram_allocation_ratio)
+        if 'network_metadata' in spec_obj and spec_obj.network_metadata:
+            limits.network_metadata = spec_obj.network_metadata
+        return limits
+
+    def _fit_in_process_pool(self, host_states, spec_obj):
+        """Fit the instance on the hosts using the process pool.
+
+        Returns a dict, keyed by the id of the host states, of the lists of
+        booleans telling whether the instance fits on the host for each of its
+        allocation candidates, or None if the process pool is not used for
+        this request.
+        """
+        pool_size = CONF.filter_scheduler.numa_fit_process_pool_size
+        if not pool_size or not utils.concurrency_mode_threading():
+            return None
+        # Do this here so we don't get scheduler.filters.utils
+        from nova.scheduler import utils as scheduler_utils
+        if scheduler_utils.request_is_rebuild(spec_obj):
+            return None
+        requested_topology = spec_obj.numa_topology
+        if not requested_topology:
+            return None
+        # NOTE: The PCI device pools are not serialized, so only requests
+        # without PCI devices are handled.
+        if spec_obj.pci_requests and spec_obj.pci_requests.requests:
+            return None
+
+        fitted_hosts = []
+        complexity = 0
+        for host_state in host_states:
+            host_topology = host_state.numa_topology
+            if not host_topology or not host_state.allocation_candidates:
+                continue
+            fitted_hosts.append(host_state)
+            complexity += math.perm(
+                len(host_topology.cells), len(requested_topology.cells)
+            ) * len(host_state.allocation_candidates)
+        if complexity < CONF.filter_scheduler.numa_fit_process_pool_threshold:
+            return None
+
+        requested_topology = requested_topology.obj_to_primitive()
+        pack = CONF.compute.packing_host_numa_cells_allocation_strategy
+        tasks = []
+        for host_state in fitted_hosts:
+            pci_pools = None
+            if host_state.pci_stats:
+                pci_pools = [{'numa_node': pool['numa_node'],
+                              'count': pool['count']}
+                             for pool in host_state.pci_stats.pools]
+            mappings = [
+                {group: list(rps) for group, rps in c['mappings'].items()}
+                for c in host_state.allocation_candidates]
+            tasks.append((
+                host_state.numa_topology.obj_to_primitive(),
+                requested_topology,
+                self._get_limits(host_state, spec_obj).obj_to_primitive(),
+                pci_pools, pack, mappings))
+
+        chunksize = max(1, len(tasks) // (pool_size * 4))
+        try:
+            results = list(_get_process_pool().map(
+                _fit_candidates, tasks, chunksize=chunksize))
+        except Exception:
+            LOG.warning("Failed to fit the instance NUMA topology in the "
+                        "process pool, falling back to the serial path.",
+                        exc_info=True)
+            _reset_process_pool()
+            return None
+        return {id(host_state): fits
+                for host_state, fits in zip(fitted_hosts, results)}
+
+    def filter_all(self, filter_obj_list, spec_obj):
+        fits = self._fit_in_process_pool(filter_obj_list, spec_obj)
+        if fits is None:
+            return super(NUMATopologyFilter, self).filter_all(
+                filter_obj_list, spec_obj)
+        self._local.fits = fits
+        try:
+            return list(super(NUMATopologyFilter, self).filter_all(
+                filter_obj_list, spec_obj))
+        finally:
+            del self._local.fits
+
     def host_passes(self, host_state, spec_obj):
         # TODO(stephenfin): The 'numa_fit_instance_to_host' function has the
         # unfortunate side effect of modifying 'spec_obj.numa_topology' - an
@@ -73,18 +234,12 @@ class NUMATopologyFilter(
         # future filter calls.
         spec_obj = spec_obj.obj_clone()
 
-        ram_ratio = host_state.ram_allocation_ratio
-        cpu_ratio = host_state.cpu_allocation_ratio
         extra_specs = spec_obj.flavor.extra_specs
         image_props = spec_obj.image.properties
         requested_topology = spec_obj.numa_topology
         host_topology = host_state.numa_topology
         pci_requests = spec_obj.pci_requests
 
-        network_metadata = None
-        if 'network_metadata' in spec_obj:
-            network_metadata = spec_obj.network_metadata
-
         if pci_requests:
             pci_requests = pci_requests.requests
 
@@ -93,24 +248,26 @@ class NUMATopologyFilter(
             return False
 
         if requested_topology and host_topology:
-            limits = objects.NUMATopologyLimits(
-                cpu_allocation_ratio=cpu_ratio,
-                ram_allocation_ratio=ram_ratio)
-
-            if network_metadata:
-                limits.network_metadata = network_metadata
-
-            good_candidates = self.filter_candidates(
-                host_state,
-                lambda candidate: hardware.numa_fit_instance_to_host(
-                    host_topology,
-                    requested_topology,
-                    limits=limits,
-                    pci_requests=pci_requests,
-                    pci_stats=host_state.pci_stats,
-                    provider_mapping=candidate["mappings"],
-                ),
-            )
+            limits = self._get_limits(host_state, spec_obj)
+
+            fits = getattr(self._local, 'fits', {}).get(id(host_state))
+            if fits is not None:
+                # The instance was already fitted on each candidate of the
+                # host by the process pool.
+                fits = iter(fits)
+                fit_func = lambda candidate: next(fits)
+            else:
+                fit_func = (
+                    lambda candidate: hardware.numa_fit_instance_to_host(
+                        host_topology,
+                        requested_topology,
+                        limits=limits,
+                        pci_requests=pci_requests,
+                        pci_stats=host_state.pci_stats,
+                        provider_mapping=candidate["mappings"],
+                    ))
+
+            good_candidates = self.filter_candidates(host_state, fit_func)
 
             if not good_candidates:
                 LOG.debug("%(host)s, %(node)s fails NUMA topology "
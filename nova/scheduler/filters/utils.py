@@ -43,6 +43,28 @@ def aggregate_metadata_get_by_host(host_state, key=None):
     return metadata
 
 
+def extra_specs_cache_key(spec_obj):
+    """Return a hashable key of the flavor extra specs of a request, for the
+    filters caching their results.
+    """
+    flavor = spec_obj.flavor
+    if 'extra_specs' not in flavor:
+        return ()
+    return tuple(sorted(flavor.extra_specs.items()))
+
+
+def image_props_cache_key(spec_obj):
+    """Return a hashable key of the image properties of a request, for the
+    filters caching their results.
+    """
+    if not spec_obj.image:
+        return ()
+    image_props = spec_obj.image.properties
+    return tuple((name, repr(getattr(image_props, name)))
+                 for name in sorted(image_props.fields)
+                 if image_props.obj_attr_is_set(name))
+
+
 def validate_num_values(vals, default=None, cast_to=int, based_on=min):
     """Returns a correctly casted value based on a set of values.
 
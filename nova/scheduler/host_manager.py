@@ -18,8 +18,10 @@ Manage hosts in the current zone.
 """
 
 import collections
+import copy
 import datetime
 import functools
+import time
 
 from oslo_log import log as logging
 from oslo_utils import timeutils
@@ -30,6 +32,7 @@ from nova import exception
 from nova import objects
 from nova.pci import stats as pci_stats
 from nova.scheduler import filters
+from nova.scheduler import timing
 from nova.scheduler import weights
 from nova import thread_pool_factory
 from nova import utils
@@ -41,6 +44,12 @@ CONF = nova.conf.CONF
 LOG = logging.getLogger(__name__)
 HOST_INSTANCE_SEMAPHORE = "host_instance"
 
+# NOTE: The created_at/updated_at/deleted_at values of the compute node
+# records are set with the clock of the service writing them, so look back a
+# bit further than the most recent change read to not miss the changes done
+# by services with a clock running behind.
+CHANGED_SINCE_MARGIN = datetime.timedelta(seconds=60)
+
 
 class ReadOnlyDict(collections.UserDict):
     """A read-only dict."""
@@ -321,6 +330,21 @@ class HostState(object):
         # is always an IO operation because we want to move the instance
         self.num_io_ops += 1
 
+    def clone(self):
+        """Return a copy of this HostState for a single scheduling request.
+
+        The compute node information is shared with the copy while the
+        fields changed by the filters and by consume_from_request() are
+        copied, so that this HostState is left untouched by the request.
+        """
+        host_state = copy.copy(self)
+        host_state.limits = dict(self.limits)
+        host_state.instances = dict(self.instances)
+        host_state.allocation_candidates = []
+        if self.pci_stats is not None:
+            host_state.pci_stats = copy.deepcopy(self.pci_stats)
+        return host_state
+
     def __repr__(self):
         return (
             "(%(host)s, %(node)s) ram: %(free_ram)sMB "
@@ -339,6 +363,109 @@ class HostState(object):
         )
 
 
+class HostStateCache(object):
+    """Long-lived store of the compute nodes and host states of the cells.
+
+    All the ComputeNode records of a cell are read the first time, and then
+    only the records created, updated or deleted since the most recent change
+    read from that cell are fetched. Every
+    ``[scheduler] host_state_cache_full_refresh_interval`` seconds all the
+    records of the cell are read again as a safety net.
+
+    The HostState built from each record is kept as well and only rebuilt
+    when the record changed. These HostState objects are never handed out
+    directly, every request gets clones of them.
+    """
+
+    def __init__(self):
+        # Dict, keyed by cell uuid, of dicts of ComputeNode objects keyed by
+        # compute node uuid
+        self.computes_by_cell = {}
+        # Dict, keyed by cell uuid, of the most recent change time of the
+        # compute node records read from the cell
+        self.changed_since = {}
+        # Dicts, keyed by cell uuid, of the time of the last full read and of
+        # the last read of the cell
+        self.last_full_refresh = {}
+        self.last_refresh = {}
+        # Dict, keyed by compute node uuid, of (ComputeNode, HostState) tuples
+        self.host_states = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _change_time(compute):
+        return max((getattr(compute, field) for field in
+                    ('created_at', 'updated_at', 'deleted_at')
+                    if field in compute and getattr(compute, field)),
+                   default=None)
+
+    @staticmethod
+    def _is_unchanged(cached, compute):
+        return (cached is not None and cached.updated_at is not None and
+                cached.updated_at == compute.updated_at)
+
+    def refresh(self, cctxt, cell_uuid):
+        """Read the compute node records of a cell changed since the last
+        read and return all the compute nodes of the cell.
+
+        :param cctxt: request context targeted at the cell
+        :param cell_uuid: uuid of the cell
+        """
+        now = time.monotonic()
+        since = self.changed_since.get(cell_uuid)
+        old_computes = self.computes_by_cell.get(cell_uuid, {})
+        if (since is None or
+                now - self.last_full_refresh[cell_uuid] >=
+                CONF.scheduler.host_state_cache_full_refresh_interval):
+            computes = objects.ComputeNodeList.get_all(cctxt)
+            cell_computes = {}
+            for compute in computes:
+                cached = old_computes.get(compute.uuid)
+                if self._is_unchanged(cached, compute):
+                    compute = cached
+                cell_computes[compute.uuid] = compute
+            for compute_uuid in set(old_computes) - set(cell_computes):
+                self.host_states.pop(compute_uuid, None)
+            self.last_full_refresh[cell_uuid] = now
+        else:
+            computes = objects.ComputeNodeList.get_all_changed_since(
+                cctxt, since - CHANGED_SINCE_MARGIN)
+            cell_computes = dict(old_computes)
+            for compute in computes:
+                if compute.deleted:
+                    cell_computes.pop(compute.uuid, None)
+                    self.host_states.pop(compute.uuid, None)
+                elif not self._is_unchanged(
+                        cell_computes.get(compute.uuid), compute):
+                    cell_computes[compute.uuid] = compute
+
+        change_times = [t for t in map(self._change_time, computes) if t]
+        if since is not None:
+            change_times.append(since)
+        if change_times:
+            self.changed_since[cell_uuid] = max(change_times)
+        elif cell_uuid in self.changed_since:
+            del self.changed_since[cell_uuid]
+        self.computes_by_cell[cell_uuid] = cell_computes
+        self.last_refresh[cell_uuid] = now
+        return list(cell_computes.values())
+
+    def get_stats(self):
+        """Return the hit ratio of the cached host states and the staleness,
+        in seconds, of the least recently read cell.
+        """
+        total = self.hits + self.misses
+        now = time.monotonic()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': float(self.hits) / total if total else 0.0,
+            'staleness': max((now - last for last in
+                              self.last_refresh.values()), default=0.0),
+        }
+
+
 class HostManager(object):
     """Base HostManager class."""
 
@@ -358,6 +485,9 @@ class HostManager(object):
         weigher_classes = self.weight_handler.get_matching_classes(
                 CONF.filter_scheduler.weight_classes)
         self.weighers = [cls() for cls in weigher_classes]
+        self.host_state_cache = None
+        if CONF.scheduler.incremental_host_state_cache:
+            self.host_state_cache = HostStateCache()
         # Dict of aggregates keyed by their ID
         self.aggs_by_id = {}
         # Dict of set of aggregate IDs keyed by the name of the host belonging
@@ -389,6 +519,9 @@ class HostManager(object):
                 self._update_aggregate(agg)
         else:
             self._update_aggregate(aggregates)
+        # The cached results of the filters depending on the aggregates are
+        # not valid anymore.
+        self.filter_handler.clear_cache()
 
     def _update_aggregate(self, aggregate):
         self.aggs_by_id[aggregate.id] = aggregate
@@ -409,6 +542,7 @@ class HostManager(object):
         for host in self.host_aggregates_map:
             if aggregate.id in self.host_aggregates_map[host]:
                 self.host_aggregates_map[host].remove(aggregate.id)
+        self.filter_handler.clear_cache()
 
     def _init_instance_info(self, computes_by_cell=None):
         """Creates the initial view of instances for all hosts.
@@ -613,13 +747,28 @@ class HostManager(object):
                     return []
             hosts = name_to_cls_map.values()
 
-        return self.filter_handler.get_filtered_objects(self.enabled_filters,
-                hosts, spec_obj, index)
+        # NOTE: The hosts are usually a generator building the host states,
+        # so the first filtering of a request includes that time.
+        with timing.phase('filtering'):
+            return self.filter_handler.get_filtered_objects(
+                self.enabled_filters, hosts, spec_obj, index)
 
     def get_weighed_hosts(self, hosts, spec_obj):
         """Weigh the hosts."""
-        return self.weight_handler.get_weighed_objects(self.weighers,
-                hosts, spec_obj)
+        with timing.phase('weighing'):
+            return self.weight_handler.get_weighed_objects(self.weighers,
+                    hosts, spec_obj)
+
+    def get_weighed_hosts_and_ranges(self, hosts, spec_obj):
+        """Weigh the hosts and return the weight normalization ranges."""
+        with timing.phase('weighing'):
+            return self.weight_handler.get_weighed_objects_and_ranges(
+                self.weighers, hosts, spec_obj)
+
+    def get_host_weight(self, host, spec_obj, ranges):
+        """Weigh a single host with the given weight normalization ranges."""
+        return self.weight_handler.get_weight(
+            self.weighers, host, spec_obj, ranges)
 
     def _get_computes_for_cells(self, context, cells, compute_uuids):
         """Get a tuple of compute node and service information.
@@ -640,6 +789,13 @@ class HostManager(object):
         def targeted_operation(cctxt):
             services = objects.ServiceList.get_by_binary(
                 cctxt, 'nova-compute', include_disabled=True)
+            if self.host_state_cache is not None:
+                computes = self.host_state_cache.refresh(
+                    cctxt, cctxt.cell_uuid)
+                if compute_uuids is not None:
+                    uuids = set(compute_uuids)
+                    computes = [cn for cn in computes if cn.uuid in uuids]
+                return services, computes
             if compute_uuids is None:
                 return services, objects.ComputeNodeList.get_all(cctxt)
             else:
@@ -782,9 +938,14 @@ class HostManager(object):
         else:
             cells = self.enabled_cells
 
-        compute_nodes, services = self._get_computes_for_cells(
-            context, cells, compute_uuids=compute_uuids)
-        return self._get_host_states(context, compute_nodes, services)
+        with timing.phase('compute_nodes'):
+            compute_nodes, services = self._get_computes_for_cells(
+                context, cells, compute_uuids=compute_uuids)
+        host_states = self._get_host_states(context, compute_nodes, services)
+        if self.host_state_cache is not None:
+            LOG.debug('Host state cache statistics: %s',
+                      self.host_state_cache.get_stats())
+        return host_states
 
     def _get_host_states(self, context, compute_nodes, services):
         """Returns a generator over HostStates given a list of computes.
@@ -807,16 +968,24 @@ class HostManager(object):
                 node = compute.hypervisor_hostname
                 state_key = (host, node)
                 host_state = host_state_map.get(state_key)
+                compute_update = compute
                 if not host_state:
-                    host_state = self.host_state_cls(host, node,
-                                                     cell_uuid,
-                                                     compute=compute)
+                    if self.host_state_cache is not None:
+                        host_state = self._get_cached_host_state(
+                            compute, cell_uuid)
+                        # The cached host state was already updated from
+                        # this compute node
+                        compute_update = None
+                    else:
+                        host_state = self.host_state_cls(host, node,
+                                                         cell_uuid,
+                                                         compute=compute)
                     host_state_map[state_key] = host_state
                 # We force to update the aggregates info each time a
                 # new request comes in, because some changes on the
                 # aggregates could have been happening after setting
                 # this field for the first time
-                host_state.update(compute,
+                host_state.update(compute_update,
                                   dict(service),
                                   self._get_aggregates_info(host),
                                   self._get_instance_info(context, compute))
@@ -825,6 +994,24 @@ class HostManager(object):
 
         return (host_state_map[host] for host in seen_nodes)
 
+    def _get_cached_host_state(self, compute, cell_uuid):
+        """Return a clone of the cached HostState of a compute node, building
+        it first if the compute node changed since it was cached.
+        """
+        cache = self.host_state_cache
+        cached = cache.host_states.get(compute.uuid)
+        if cached is not None and cached[0] is compute:
+            cache.hits += 1
+            host_state = cached[1]
+        else:
+            cache.misses += 1
+            host_state = self.host_state_cls(compute.host,
+                                             compute.hypervisor_hostname,
+                                             cell_uuid, compute=compute)
+            host_state.update(compute=compute)
+            cache.host_states[compute.uuid] = (compute, host_state)
+        return host_state.clone()
+
     def _get_aggregates_info(self, host):
         return [self.aggs_by_id[agg_id] for agg_id in
                 self.host_aggregates_map[host]]
@@ -20,7 +20,8 @@ Scheduler Service
 """
 
 import collections
-import copy
+import heapq
+import itertools
 import random
 
 from keystoneauth1 import exceptions as ks_exc
@@ -43,6 +44,7 @@ from nova import rpc
 from nova.scheduler.client import report
 from nova.scheduler import host_manager
 from nova.scheduler import request_filter
+from nova.scheduler import timing
 from nova.scheduler import utils
 from nova import servicegroup
 
@@ -54,6 +56,102 @@ QUOTAS = quota.QUOTAS
 HOST_MAPPING_EXISTS_WARNING = False
 
 
+class WeighedHostHeap(object):
+    """The filtered hosts of a multi-instance request, ordered by weight.
+
+    The hosts are filtered and weighed once, then only the host selected for
+    an instance is filtered and weighed again, with the weight normalization
+    ranges of the first weighing pass, before being put back in order.
+    """
+
+    def __init__(self, host_manager, spec_obj, hosts):
+        self.host_manager = host_manager
+        # NOTE: Hosts of the same weight are ordered the way the default mode
+        # orders them: the host selected last comes first, then the hosts
+        # in their previous order.
+        self._counter = itertools.count(-1, -1)
+        # The entries taken off the heap by iter_hosts() that have to be put
+        # back once a host is selected.
+        self._taken = []
+
+        filtered_hosts = host_manager.get_filtered_hosts(hosts, spec_obj, 0)
+        LOG.debug("Filtered %(hosts)s", {'hosts': filtered_hosts})
+        weighed_hosts, self._ranges = (
+            host_manager.get_weighed_hosts_and_ranges(
+                list(filtered_hosts), spec_obj))
+        LOG.debug("Weighed %(hosts)s", {'hosts': weighed_hosts})
+
+        # A list sorted by weight in descending order is already a heap of
+        # (-weight, counter, host) entries.
+        self._heap = [(-w.weight, i, w.obj)
+                      for i, w in enumerate(weighed_hosts)]
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _take(self):
+        entry = heapq.heappop(self._heap)
+        self._taken.append(entry)
+        return entry
+
+    def iter_hosts(self):
+        """Yield the hosts by descending weight, taking them off the heap.
+
+        As done by SchedulerManager._get_sorted_hosts(), the first host is
+        randomly chosen among the host_subset_size best hosts, after shuffling
+        the best hosts of the same weight if requested. The taken hosts are
+        put back by consume().
+        """
+        if not self._heap:
+            return
+
+        subset_size = CONF.filter_scheduler.host_subset_size
+        best = [self._take()]
+        if CONF.filter_scheduler.shuffle_best_same_weighed_hosts:
+            while self._heap and self._heap[0][0] == best[0][0]:
+                best.append(self._take())
+            random.shuffle(best)
+        while self._heap and len(best) < subset_size:
+            best.append(self._take())
+
+        chosen = random.choice(best[:subset_size])
+        best.remove(chosen)
+        yield chosen[2]
+        for entry in best:
+            yield entry[2]
+        while self._heap:
+            yield self._take()[2]
+
+    def consume(self, selected_host, spec_obj, index):
+        """Put the taken hosts back on the heap after a selection.
+
+        The selected host, which consumed the resources of an instance, is
+        filtered and weighed again, and dropped if it does not pass the
+        filters anymore.
+
+        :param selected_host: The HostState the instance was placed on
+        :param spec_obj: The RequestSpec object
+        :param index: The index of the next instance of the request
+        """
+        for entry in self._taken:
+            if entry[2] is not selected_host:
+                heapq.heappush(self._heap, entry)
+        self._taken = []
+
+        if list(self.host_manager.get_filtered_hosts(
+                [selected_host], spec_obj, index)):
+            weight = self.host_manager.get_host_weight(
+                selected_host, spec_obj, self._ranges)
+            LOG.debug("Weighed %(host)s again: %(weight)s",
+                      {'host': selected_host, 'weight': weight})
+            heapq.heappush(
+                self._heap, (-weight, next(self._counter), selected_host))
+
+    def sorted_hosts(self):
+        """Return the hosts left on the heap by descending weight."""
+        return [entry[2] for entry in sorted(self._heap + self._taken)]
+
+
 class SchedulerManager(manager.Manager):
     """Chooses a host to run instances on.
 
@@ -104,6 +202,42 @@ class SchedulerManager(manager.Manager):
     def placement_client(self):
         return report.report_client_singleton()
 
+    @periodic_task.periodic_task(
+        spacing=CONF.filter_scheduler.filter_stats_log_interval)
+    def _log_filter_stats(self, context):
+        filter_stats = self.host_manager.filter_handler.get_filter_stats()
+        for name, stats in sorted(filter_stats.items()):
+            LOG.info(
+                "Filter %(name)s: %(objects_in)d hosts processed, "
+                "rejection rate %(rejection_rate).2f, "
+                "%(ns_per_object)d ns per host",
+                dict(stats, name=name))
+
+    @periodic_task.periodic_task(
+        spacing=CONF.filter_scheduler.request_timing_dump_interval)
+    def _dump_request_timings(self, context):
+        path = CONF.filter_scheduler.request_timing_dump_file
+        if path:
+            try:
+                count = timing.dump(path)
+            except OSError as e:
+                LOG.warning('Unable to dump the request timings to %(path)s: '
+                            '%(error)s', {'path': path, 'error': e})
+            else:
+                LOG.debug('Dumped the timings of %(count)d requests to '
+                          '%(path)s', {'count': count, 'path': path})
+            return
+
+        slowest_requests = timing.get_slowest_requests()
+        if slowest_requests is None:
+            return
+        for request in slowest_requests.get():
+            LOG.info(
+                "Request %(request_id)s took %(duration_ms).1f ms: %(phases)s",
+                dict(request, phases=', '.join(
+                    '%(name)s %(duration_ms).1f ms' % phase
+                    for phase in request['phases'])))
+
     @periodic_task.periodic_task(
         spacing=CONF.scheduler.discover_hosts_in_cells_interval,
         run_immediately=True)
@@ -167,6 +301,7 @@ class SchedulerManager(manager.Manager):
         self._wait_for_in_progress_tasks(timeout)
 
     @messaging.expected_exceptions(exception.NoValidHost)
+    @timing.timed_request
     def select_destinations(
         self, context, request_spec=None,
         filter_properties=None, spec_obj=_sentinel, instance_uuids=None,
@@ -214,8 +349,9 @@ class SchedulerManager(manager.Manager):
             resources = utils.resources_from_request_spec(
                 context, spec_obj, self.host_manager,
                 enable_pinning_translate=True)
-            res = self.placement_client.get_allocation_candidates(
-                context, resources)
+            with timing.phase('allocation_candidates'):
+                res = self.placement_client.get_allocation_candidates(
+                    context, resources)
             if res is None:
                 # We have to handle the case that we failed to connect to the
                 # Placement service and the safe_connect decorator on
@@ -246,8 +382,9 @@ class SchedulerManager(manager.Manager):
                 resources = utils.resources_from_request_spec(
                     context, spec_obj, self.host_manager,
                     enable_pinning_translate=False)
-                res = self.placement_client.get_allocation_candidates(
-                    context, resources)
+                with timing.phase('allocation_candidates'):
+                    res = self.placement_client.get_allocation_candidates(
+                        context, resources)
                 if res:
                     # merge the allocation requests and provider summaries from
                     # the two requests together
@@ -266,9 +403,12 @@ class SchedulerManager(manager.Manager):
 
             # Build a dict of lists of allocation requests, keyed by
             # provider UUID, so that when we attempt to claim resources for
-            # a host, we can grab an allocation request easily
+            # a host, we can grab an allocation request easily. The allocation
+            # requests are made read-only so they can be shared by every host
+            # state of this request without copying them.
             alloc_reqs_by_rp_uuid = collections.defaultdict(list)
             for ar in alloc_reqs:
+                ar = utils.freeze_allocation_request(ar)
                 for rp_uuid in ar['allocations']:
                     alloc_reqs_by_rp_uuid[rp_uuid].append(ar)
 
@@ -360,7 +500,10 @@ class SchedulerManager(manager.Manager):
             the allocation requests of that host
             """
             for host in hosts_gen:
-                host.allocation_candidates = copy.deepcopy(
+                # NOTE: The allocation requests are not copied, filters
+                # narrowing the allocation candidates of a host replace the
+                # list instead of modifying it or the allocation requests.
+                host.allocation_candidates = list(
                     alloc_reqs_by_rp_uuid[host.uuid])
                 yield host
 
@@ -428,6 +571,15 @@ class SchedulerManager(manager.Manager):
         # The allocation request allocated on the given claimed host
         claimed_alloc_reqs = []
 
+        # In batch mode the hosts are only filtered and weighed once, and only
+        # the host selected for an instance is filtered and weighed again for
+        # the next instance. The (anti-)affinity filters and weighers depend
+        # on every previous selection for every host, so requests using a
+        # server group can't be handled that way.
+        host_heap = None
+        batch = (CONF.filter_scheduler.batch_multi_instance_scheduling and
+                 num_instances > 1 and spec_obj.instance_group is None)
+
         for num, instance_uuid in enumerate(instance_uuids):
             # In a multi-create request, the first request spec from the list
             # is passed to the scheduler and that request spec's instance_uuid
@@ -440,7 +592,13 @@ class SchedulerManager(manager.Manager):
             # Reset the field so it's not persisted accidentally.
             spec_obj.obj_reset_changes(['instance_uuid'])
 
-            hosts = self._get_sorted_hosts(spec_obj, hosts, num)
+            if batch:
+                if host_heap is None:
+                    host_heap = WeighedHostHeap(
+                        self.host_manager, spec_obj, hosts)
+                hosts = host_heap.iter_hosts() if host_heap else []
+            else:
+                hosts = self._get_sorted_hosts(spec_obj, hosts, num)
             if not hosts:
                 # NOTE(jaypipes): If we get here, that means not all instances
                 # in instance_uuids were able to be matched to a selected host.
@@ -468,11 +626,13 @@ class SchedulerManager(manager.Manager):
                 # information in the provider summaries, we'll just try to
                 # claim resources using the first allocation_request
                 alloc_req = host.allocation_candidates[0]
-                if utils.claim_resources(
-                    elevated, self.placement_client, spec_obj, instance_uuid,
-                    alloc_req,
-                    allocation_request_version=allocation_request_version,
-                ):
+                with timing.phase('claim_resources'):
+                    claimed = utils.claim_resources(
+                        elevated, self.placement_client, spec_obj,
+                        instance_uuid, alloc_req,
+                        allocation_request_version=allocation_request_version,
+                    )
+                if claimed:
                     claimed_host = host
                     break
 
@@ -494,19 +654,28 @@ class SchedulerManager(manager.Manager):
             # on this information to temporally consume PCI devices tracked in
             # placement
             for request_group in spec_obj.requested_resources:
-                request_group.provider_uuids = alloc_req[
-                    'mappings'][request_group.requester_id]
+                request_group.provider_uuids = list(alloc_req[
+                    'mappings'][request_group.requester_id])
 
             # Now consume the resources so the filter/weights will change for
             # the next instance.
             self._consume_selected_host(
                 claimed_host, spec_obj, instance_uuid=instance_uuid)
+            if host_heap is not None:
+                host_heap.consume(claimed_host, spec_obj, num + 1)
 
         # Check if we were able to fulfill the request. If not, this call will
         # raise a NoValidHost exception.
         self._ensure_sufficient_hosts(
             context, claimed_hosts, num_instances, claimed_instance_uuids)
 
+        if host_heap is not None:
+            # The heap already reflects the resources consumed by every
+            # selected host, so use an index of 0 for _get_alternate_hosts()
+            # not to filter and weigh all the hosts again.
+            hosts = host_heap.sorted_hosts()
+            num = 0
+
         # We have selected and claimed hosts for each instance along with a
         # claimed allocation request. Now we need to find alternates for each
         # host.
@@ -0,0 +1,209 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Per-phase timing of the scheduling requests.
+
+When ``[filter_scheduler] request_timing_buffer_size`` is set, the time spent
+by each ``select_destinations`` request in each scheduling phase (placement
+queries, cell database reads, every filter and weigher, resource claims) is
+recorded, and the breakdowns of the slowest requests are kept in memory so
+they can be periodically dumped and displayed with ``nova-manage``.
+
+When it is not set, :func:`current` returns None and the instrumented code
+only pays for that check.
+"""
+
+import collections
+import contextlib
+import functools
+import heapq
+import itertools
+import os
+import tempfile
+import threading
+import time
+
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
+
+import nova.conf
+
+CONF = nova.conf.CONF
+
+# The RequestTimings of the request being scheduled by the current thread
+_local = threading.local()
+
+_SLOWEST_REQUESTS = None
+_SLOWEST_REQUESTS_LOCK = threading.Lock()
+
+
+class RequestTimings(object):
+    """The time spent by a scheduling request in each phase."""
+
+    def __init__(self, request_id, num_instances):
+        self.request_id = request_id
+        self.num_instances = num_instances
+        self.started_at = timeutils.utcnow()
+        self.start_ns = time.monotonic_ns()
+        self.duration_ns = None
+        self.error = None
+        # Total duration in ns and number of runs of each phase, in the
+        # order they first ran
+        self.phases = collections.OrderedDict()
+
+    def add(self, phase, duration_ns):
+        """Account duration_ns to phase."""
+        try:
+            total, count = self.phases[phase]
+        except KeyError:
+            total, count = 0, 0
+        self.phases[phase] = (total + duration_ns, count + 1)
+
+    def finish(self, error=None):
+        self.duration_ns = time.monotonic_ns() - self.start_ns
+        self.error = error
+
+    def to_dict(self):
+        return {
+            'request_id': self.request_id,
+            'num_instances': self.num_instances,
+            'started_at': self.started_at.isoformat(),
+            'duration_ms': self.duration_ns / 1e6,
+            'error': self.error,
+            'phases': [
+                {'name': name, 'duration_ms': total / 1e6, 'count': count}
+                for name, (total, count) in self.phases.items()
+            ],
+        }
+
+
+class SlowestRequests(object):
+    """The timings of the slowest requests seen so far."""
+
+    def __init__(self, size):
+        self.size = size
+        # A min-heap of (duration, sequence number, timings) tuples, the
+        # sequence number breaking the ties without comparing the timings
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def record(self, timings):
+        entry = (timings.duration_ns, next(self._counter), timings)
+        with self._lock:
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def get(self):
+        """Return the recorded timings, slowest first, as dicts."""
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [timings.to_dict() for _, _, timings in entries]
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+
+
+def get_slowest_requests():
+    """Return the SlowestRequests of this process, or None if disabled."""
+    global _SLOWEST_REQUESTS
+    size = CONF.filter_scheduler.request_timing_buffer_size
+    with _SLOWEST_REQUESTS_LOCK:
+        if not size:
+            _SLOWEST_REQUESTS = None
+        elif _SLOWEST_REQUESTS is None or _SLOWEST_REQUESTS.size != size:
+            _SLOWEST_REQUESTS = SlowestRequests(size)
+        return _SLOWEST_REQUESTS
+
+
+def current():
+    """Return the RequestTimings of the request being scheduled, or None."""
+    return getattr(_local, 'timings', None)
+
+
+def timed_request(func):
+    """Decorate a manager method scheduling a request to record its timings.
+
+    The decorated method must take the request context as first argument and
+    may take an ``instance_uuids`` keyword argument.
+    """
+    @functools.wraps(func)
+    def wrapper(self, context, *args, **kwargs):
+        slowest_requests = get_slowest_requests()
+        if slowest_requests is None or current() is not None:
+            return func(self, context, *args, **kwargs)
+
+        instance_uuids = kwargs.get('instance_uuids')
+        timings = RequestTimings(
+            getattr(context, 'request_id', None),
+            len(instance_uuids) if instance_uuids else 1)
+        _local.timings = timings
+        error = None
+        try:
+            return func(self, context, *args, **kwargs)
+        except Exception as exc:
+            error = exc.__class__.__name__
+            raise
+        finally:
+            del _local.timings
+            timings.finish(error)
+            slowest_requests.record(timings)
+    return wrapper
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Account the time spent in the block to the phase of the current
+    request, if its timings are recorded.
+    """
+    timings = current()
+    if timings is None:
+        yield
+        return
+    start = time.monotonic_ns()
+    try:
+        yield
+    finally:
+        timings.add(name, time.monotonic_ns() - start)
+
+
+def dump(path):
+    """Atomically write the timings of the slowest requests to path as JSON.
+
+    :returns: The number of requests written.
+    """
+    slowest_requests = get_slowest_requests()
+    requests = slowest_requests.get() if slowest_requests else []
+    data = {
+        'host': CONF.host,
+        'dumped_at': timeutils.utcnow().isoformat(),
+        'requests': requests,
+    }
+    dirname = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(
+            'w', dir=dirname, prefix='.request-timings', delete=False) as f:
+        f.write(jsonutils.dumps(data, indent=2))
+    os.replace(f.name, path)
+    return len(requests)
+
+
+def load(path):
+    """Read timings written by dump()."""
+    with open(path) as f:
+        return jsonutils.loads(f.read())
@@ -15,6 +15,7 @@
 """Utility methods for scheduling."""
 
 import collections
+import copy
 import re
 import sys
 from urllib import parse
@@ -1313,6 +1314,69 @@ def request_is_rebuild(spec_obj):
     return check_type == ['rebuild']
 
 
+def _read_only(self, *args, **kwargs):
+    raise TypeError(_('Allocation requests are read-only.'))
+
+
+class _ReadOnlyList(list):
+    """A list that cannot be modified in place.
+
+    Copying it returns a regular, modifiable, list.
+    """
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = _read_only
+    sort = reverse = _read_only
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(value, memo) for value in self]
+
+
+class _ReadOnlyDict(dict):
+    """A dict that cannot be modified in place.
+
+    Copying it returns a regular, modifiable, dict.
+    """
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo)
+                for key, value in self.items()}
+
+
+def freeze_allocation_request(alloc_req):
+    """Return a read-only version of an allocation request.
+
+    The returned allocation request can be shared between the host states of
+    a scheduling request without copying it, as any attempt to modify it in
+    place raises a TypeError. It still compares equal to, and serializes
+    like, the original allocation request. Filters narrowing the allocation
+    candidates of a host have to build a new list of candidates, and code
+    needing to modify an allocation request has to copy it first.
+
+    :param alloc_req: An allocation request dict as returned by the GET
+        /allocation_candidates placement API
+    """
+    # NOTE: This is called for every allocation candidate returned by
+    # placement so it avoids the generic, and slower, isinstance() checks.
+    value_type = type(alloc_req)
+    if value_type is dict or value_type is _ReadOnlyDict:
+        return _ReadOnlyDict({key: freeze_allocation_request(value)
+                              for key, value in alloc_req.items()})
+    if value_type is list or value_type is _ReadOnlyList:
+        return _ReadOnlyList([freeze_allocation_request(value)
+                              for value in alloc_req])
+    return alloc_req
+
+
 def claim_resources(ctx, client, spec_obj, instance_uuid, alloc_req,
         allocation_request_version=None):
     """Given an instance UUID (representing the consumer of resources) and the
@@ -17,8 +17,13 @@
 Scheduler host weights
 """
 
+import nova.conf
+from nova.scheduler import columns
+from nova.scheduler import timing
 from nova import weights
 
+CONF = nova.conf.CONF
+
 
 class WeighedHost(weights.WeighedObject):
     def to_dict(self):
@@ -33,7 +38,22 @@ class WeighedHost(weights.WeighedObject):
 
 class BaseHostWeigher(weights.BaseWeigher):
     """Base class for host weights."""
-    pass
+
+    def weigh_columns(self, host_columns, weight_properties):
+        """Return the raw weights of all the hosts, or None.
+
+        Override this in a subclass that can be evaluated on the packed
+        columns of a HostColumns object at once. The weights are clamped to
+        minval and maxval by the caller. Returning None, which is the default,
+        makes the weigher being evaluated host by host with weigh_objects().
+
+        Weighers overriding this must have a weight_multiplier() that only
+        depends on the aggregates of the host.
+
+        :param host_columns: HostColumns object of the hosts to weigh
+        :param weight_properties: RequestSpec object
+        """
+        return None
 
 
 class HostWeightHandler(weights.BaseWeightHandler):
@@ -42,6 +62,32 @@ class HostWeightHandler(weights.BaseWeightHandler):
     def __init__(self):
         super(HostWeightHandler, self).__init__(BaseHostWeigher)
 
+    def _record_weigher_time(self, cls_name, duration_ns):
+        timings = timing.current()
+        if timings is not None:
+            timings.add('weigher:' + cls_name, duration_ns)
+
+    def _get_objects(self, obj_list):
+        if not CONF.filter_scheduler.columnar_host_evaluation:
+            return super(HostWeightHandler, self)._get_objects(obj_list)
+        return columns.HostColumns(obj_list)
+
+    def _get_weights(self, weigher, objs, weighed_objs, weighing_properties):
+        weight_list = None
+        if isinstance(objs, columns.HostColumns):
+            weight_list = weigher.weigh_columns(objs, weighing_properties)
+        if weight_list is None:
+            return super(HostWeightHandler, self)._get_weights(
+                weigher, objs, weighed_objs, weighing_properties)
+
+        # don't let the weight go beyond the defined max/min
+        if weigher.minval is not None:
+            weight_list = [max(w, weigher.minval) for w in weight_list]
+        if weigher.maxval is not None:
+            weight_list = [min(w, weigher.maxval) for w in weight_list]
+        multipliers = objs.per_aggregates_column(weigher.weight_multiplier)
+        return weight_list, multipliers
+
 
 def all_weighers():
     """Return a list of weight plugin classes found in this directory."""
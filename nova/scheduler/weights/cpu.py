@@ -44,3 +44,10 @@ class CPUWeigher(weights.BaseHostWeigher):
             host_state.vcpus_total * host_state.cpu_allocation_ratio -
             host_state.vcpus_used)
         return vcpus_free
+
+    def weigh_columns(self, host_columns, weight_properties):
+        return [vcpus_total * cpu_allocation_ratio - vcpus_used
+                for vcpus_total, cpu_allocation_ratio, vcpus_used in zip(
+                    host_columns.column('vcpus_total'),
+                    host_columns.column('cpu_allocation_ratio'),
+                    host_columns.column('vcpus_used'))]
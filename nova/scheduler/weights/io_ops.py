@@ -42,3 +42,6 @@ class IoOpsWeigher(weights.BaseHostWeigher):
         to be the default.
         """
         return host_state.num_io_ops
+
+    def weigh_columns(self, host_columns, weight_properties):
+        return host_columns.column('num_io_ops')
@@ -39,3 +39,6 @@ class NumInstancesWeigher(weights.BaseHostWeigher):
            as the default, hence the negative value of the multiplier.
         """
         return host_state.num_instances
+
+    def weigh_columns(self, host_columns, weight_properties):
+        return host_columns.column('num_instances')
@@ -185,6 +185,9 @@ VIR_DOMAIN_BLOCK_COMMIT_RELATIVE = 4
 VIR_CONNECT_LIST_DOMAINS_ACTIVE = 1
 VIR_CONNECT_LIST_DOMAINS_INACTIVE = 2
 
+# virConnectGetAllDomainStats stats
+VIR_DOMAIN_STATS_STATE = 1
+
 # virConnectListAllNodeDevices flags
 VIR_CONNECT_LIST_NODE_DEVICES_CAP_PCI_DEV = 2
 VIR_CONNECT_LIST_NODE_DEVICES_CAP_NET = 1 << 4
@@ -2170,6 +2173,16 @@ class Connection(object):
                     vms.append(vm)
         return vms
 
+    def getAllDomainStats(self, stats, flags=0):
+        result = []
+        for vm in self._vms.values():
+            vm_stats = {}
+            if stats & VIR_DOMAIN_STATS_STATE:
+                vm_stats['state.state'] = vm._state
+                vm_stats['state.reason'] = 0
+            result.append((vm, vm_stats))
+        return result
+
     def _emit_lifecycle(self, dom, event, detail):
         if VIR_DOMAIN_EVENT_ID_LIFECYCLE not in self._event_callbacks:
             return
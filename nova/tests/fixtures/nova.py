@@ -1742,7 +1742,8 @@ class AvailabilityZoneFixture(fixtures.Fixture):
 
     ``get_instance_availability_zone`` will return the availability_zone
     requested when creating a server otherwise the instance.availability_zone
-    or default_availability_zone is returned.
+    or default_availability_zone is returned, and so will
+    ``get_instances_availability_zones`` for each instance.
     """
 
     def __init__(self, zones):
@@ -1776,6 +1777,14 @@ class AvailabilityZoneFixture(fixtures.Fixture):
             'nova.availability_zones.get_instance_availability_zone',
             fake_get_instance_availability_zone))
 
+        def fake_get_instances_availability_zones(ctxt, instances):
+            return {instance.uuid: fake_get_instance_availability_zone(
+                        ctxt, instance)
+                    for instance in instances}
+        self.useFixture(fixtures.MonkeyPatch(
+            'nova.availability_zones.get_instances_availability_zones',
+            fake_get_instances_availability_zones))
+
 
 class KSAFixture(fixtures.Fixture):
     """Lets us initialize an openstack.connection.Connection by stubbing the
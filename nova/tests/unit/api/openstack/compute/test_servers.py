@@ -32,6 +32,8 @@ from oslo_utils import fixture as utils_fixture
 from oslo_utils.fixture import uuidsentinel as uuids
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
+from sqlalchemy import engine as sqla_engine
+from sqlalchemy import event as sqla_event
 import testtools
 import webob
 
@@ -56,6 +58,7 @@ from nova.db.main import api as db
 from nova.db.main import models
 from nova import exception
 from nova.image import glance
+from nova.network import model as network_model
 from nova import objects
 from nova.objects import instance as instance_obj
 from nova.objects.instance_group import InstanceGroup
@@ -8677,6 +8680,84 @@ class ServersViewBuilderTestV2100(_ServersViewBuilderTest):
             self.request.environ['nova.context'], self.instance.uuid)
 
 
+class ServersViewBuilderQueriesTest(test.TestCase):
+    """Verify the number of database queries of a detail view.
+
+    The side lookups of a page of servers are batched, so the number of
+    database queries is the same whatever the size of the page.
+    """
+
+    def setUp(self):
+        super().setUp()
+        fakes.stub_out_nw_api(self)
+        fakes.stub_out_secgroup_api(
+            self, security_groups=[{'name': 'default'}])
+        self.flags(group='glance', api_servers=['http://localhost:9292'])
+        availability_zones.reset_cache()
+        self.ctxt = context.RequestContext(
+            'fake', fakes.FAKE_PROJECT_ID, is_admin=True)
+        self.view_builder = views.servers.ViewBuilder()
+        self.flavor = objects.Flavor.get_by_name(self.ctxt, 'm1.small')
+        self.queries = 0
+
+        def _count_query(*args, **kwargs):
+            self.queries += 1
+
+        sqla_event.listen(sqla_engine.Engine, 'before_cursor_execute',
+                          _count_query)
+        self.addCleanup(sqla_event.remove, sqla_engine.Engine,
+                        'before_cursor_execute', _count_query)
+
+    def _create_instances(self, count):
+        instance_uuids = []
+        for i in range(count):
+            # Every instance is on its own host, in its own aggregate.
+            host = 'host-%d-%d' % (count, i)
+            agg = objects.Aggregate(self.ctxt, name='agg-%d-%d' % (count, i),
+                                    metadata={'availability_zone': 'az%d' % i})
+            agg.create()
+            agg.add_host(host)
+            inst = objects.Instance(
+                self.ctxt, uuid=uuidutils.generate_uuid(),
+                project_id=self.ctxt.project_id, user_id=self.ctxt.user_id,
+                host=host, availability_zone='az%d' % i,
+                vm_state=vm_states.ACTIVE, power_state=1,
+                display_name='server-%d' % i, image_ref=uuids.image,
+                flavor=self.flavor, instance_type_id=self.flavor.id,
+                memory_mb=self.flavor.memory_mb, vcpus=self.flavor.vcpus,
+                root_gb=self.flavor.root_gb,
+                ephemeral_gb=self.flavor.ephemeral_gb,
+                info_cache=objects.InstanceInfoCache(
+                    network_info=network_model.NetworkInfo()))
+            inst.create()
+            objects.InstanceMapping(
+                self.ctxt, instance_uuid=inst.uuid,
+                project_id=inst.project_id,
+                cell_mapping=self.cell_mappings[test.CELL1_NAME]).create()
+            instance_uuids.append(inst.uuid)
+        return objects.InstanceList.get_by_filters(
+            self.ctxt, {'uuid': instance_uuids},
+            expected_attrs=self.view_builder.get_show_expected_attrs(
+                ['services', 'tags', 'trusted_certs', 'system_metadata']))
+
+    def _count_detail_queries(self, count):
+        instances = self._create_instances(count)
+        request = fakes.HTTPRequest.blank(
+            '/servers/detail', version='2.96', use_admin_context=True)
+        self.queries = 0
+        output = self.view_builder.detail(request, instances)
+        self.assertEqual(count, len(output['servers']))
+        self.assertCountEqual(
+            ['az%d' % i for i in range(count)],
+            [server['OS-EXT-AZ:availability_zone']
+             for server in output['servers']])
+        return self.queries
+
+    def test_detail_queries_constant(self):
+        self.assertEqual(self._count_detail_queries(2),
+                         self._count_detail_queries(6))
+
+
 class ServersActionsJsonTestV239(test.NoDBTestCase):
 
     def setUp(self):
@@ -30,7 +30,10 @@ from unittest import mock
 
 import fixtures as fx
 import testtools
+import webob
+import webob.dec
 
+from nova.api.openstack import requestlog
 from nova.tests import fixtures
 
 
@@ -123,6 +126,51 @@ class TestRequestLogMiddleware(testtools.TestCase):
                 ' status: 500 len: 0 microversion: - time:')
         self.assertIn(log1, self.stdlog.logger.output)
 
+    @mock.patch('nova.api.openstack.requestlog.RequestLog._should_emit')
+    def test_logs_streamed_response(self, emit):
+        """Ensure the length of a streamed response is logged.
+
+        A streamed response has no Content-Length, the request is logged
+        with the number of bytes sent once its body is sent.
+        """
+
+        emit.return_value = True
+
+        @webob.dec.wsgify
+        def app(req):
+            return webob.Response(app_iter=iter([b'{"servers": [', b']}']))
+
+        req = webob.Request.blank('/servers')
+        resp = req.get_response(requestlog.RequestLog(app))
+        self.assertNotIn('requestlog', self.stdlog.logger.output)
+
+        self.assertEqual(b'{"servers": []}', resp.body)
+        log1 = ('INFO [nova.api.openstack.requestlog] - "GET /servers" '
+                'status: 200 len: 15 microversion: - time:')
+        self.assertIn(log1, self.stdlog.logger.output)
+
+    @mock.patch('nova.api.openstack.requestlog.RequestLog._should_emit')
+    def test_logs_streamed_response_closed(self, emit):
+        """Ensure a streamed response is logged when it is closed early."""
+
+        emit.return_value = True
+        body = mock.MagicMock()
+        body.__iter__.return_value = iter([b'{"servers": [', b']}'])
+
+        @webob.dec.wsgify
+        def app(req):
+            return webob.Response(app_iter=body)
+
+        req = webob.Request.blank('/servers')
+        app_iter = requestlog.RequestLog(app)(req.environ, mock.Mock())
+        self.assertEqual(b'{"servers": [', next(app_iter))
+        app_iter.close()
+
+        body.close.assert_called_once_with()
+        log1 = ('INFO [nova.api.openstack.requestlog] - "GET /servers" '
+                'status: 200 len: 13 microversion: - time:')
+        self.assertIn(log1, self.stdlog.logger.output)
+
     @mock.patch('nova.api.openstack.requestlog.RequestLog._should_emit')
     def test_no_log_under_eventlet(self, emit):
         """Ensure that logs don't end up under eventlet.
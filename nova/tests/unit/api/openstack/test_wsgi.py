@@ -10,8 +10,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import datetime
 from unittest import mock
 
+import fixtures
 from oslo_serialization import jsonutils
 import testscenarios
 import webob
@@ -193,6 +196,42 @@ class JSONDictSerializerTest(test.NoDBTestCase):
         result = result.replace('\n', '').replace(' ', '')
         self.assertEqual(result, expected_json)
 
+    def test_iterserialize(self):
+        now = datetime.datetime(2024, 1, 2, 3, 4, 5)
+        serializer = wsgi.JSONDictSerializer()
+        for data in (
+            {},
+            {'servers': []},
+            {'servers': [{'id': 1, 'name': '\u6982\u5ff5', 'created': now}],
+             'servers_links': [{'href': 'http://host/', 'rel': 'next'}]},
+            {'servers': [{'id': i, 'tags': ['a', 'b']} for i in range(3)],
+             'count': 3},
+            [1, 2],
+            {1: 'a'},
+        ):
+            expected = serializer.serialize(copy.deepcopy(data))
+            result = b''.join(serializer.iterserialize(data))
+            self.assertEqual(expected.encode('utf-8'), result)
+
+    def test_iterserialize_chunks(self):
+        self.useFixture(fixtures.MonkeyPatch(
+            'nova.api.openstack.wsgi.STREAM_CHUNK_SIZE', 100))
+        servers = [{'id': i, 'name': 'server-%03d' % i} for i in range(50)]
+        data = {'servers': servers}
+        expected = wsgi.JSONDictSerializer().serialize(copy.deepcopy(data))
+
+        chunks = wsgi.JSONDictSerializer().iterserialize(data)
+        first = next(chunks)
+        self.assertGreaterEqual(len(first), 100)
+        self.assertLess(len(first), 150)
+        # The servers are dropped as they are serialized
+        self.assertIsNone(servers[0])
+        self.assertEqual({'id': 49, 'name': 'server-049'}, servers[-1])
+
+        self.assertEqual(expected.encode('utf-8'),
+                         first + b''.join(chunks))
+        self.assertEqual([None] * 50, servers)
+
 
 class JSONDeserializerTest(test.NoDBTestCase):
     def test_json(self):
@@ -753,6 +792,29 @@ class ResourceTest(MicroversionedTest):
         self.assertEqual('header2', response.headers['x-header2'])
         self.assertEqual('header3', response.headers['x-header3'])
 
+    def test_resource_stream_response(self):
+        class Controller(object):
+            @wsgi.stream_response
+            def index(self, req):
+                return {'servers': [{'id': 1}, {'id': 2}]}
+
+            def show(self, req, id):
+                return {'server': {'id': id}}
+
+        app = fakes.TestRouter(Controller())
+        response = webob.Request.blank('/tests').get_response(app)
+        self.assertEqual(200, response.status_int)
+        self.assertIsNone(response.content_length)
+        self.assertEqual(b'{"servers": [{"id": 1}, {"id": 2}]}',
+                         response.body)
+        self.assertEqual('application/json',
+                         response.headers['Content-Type'])
+
+        # The other methods are not streamed
+        response = webob.Request.blank('/tests/1').get_response(app)
+        self.assertEqual(b'{"server": {"id": "1"}}', response.body)
+        self.assertEqual(len(response.body), response.content_length)
+
     def test_resource_valid_utf8_body(self):
         class Controller(object):
             def update(self, req, id, body):
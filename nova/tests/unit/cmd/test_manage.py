@@ -4439,3 +4439,67 @@ class ImagePropertyCommandsTestCase(test.NoDBTestCase):
             instance_uuid=uuidsentinel.instance,
             image_properties=['hw_disk_bus=bar'])
         self.assertEqual(6, ret, 'return code')
+
+
+class SchedulerCommandsTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.output = StringIO()
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout', self.output))
+        self.commands = manage.SchedulerCommands()
+        self.timings = {
+            'host': 'sched1',
+            'dumped_at': '2025-01-01T00:00:00',
+            'requests': [{
+                'request_id': 'req-1',
+                'num_instances': 1,
+                'started_at': '2025-01-01T00:00:00',
+                'duration_ms': 12.5,
+                'error': None,
+                'phases': [
+                    {'name': 'allocation_candidates', 'duration_ms': 10.0,
+                     'count': 1},
+                    {'name': 'filter:RamFilter', 'duration_ms': 2.0,
+                     'count': 1},
+                ],
+            }],
+        }
+
+    def test_show_request_timings_no_file(self):
+        ret = self.commands.show_request_timings()
+        self.assertEqual(2, ret)
+        self.assertIn('request_timing_dump_file', self.output.getvalue())
+
+    def test_show_request_timings_file_not_found(self):
+        ret = self.commands.show_request_timings(path='/nonexistent/file')
+        self.assertEqual(2, ret)
+        self.assertIn('/nonexistent/file not found', self.output.getvalue())
+
+    @mock.patch('nova.scheduler.timing.load')
+    def test_show_request_timings(self, mock_load):
+        self.flags(request_timing_dump_file='/fake/timings.json',
+                   group='filter_scheduler')
+        mock_load.return_value = self.timings
+        ret = self.commands.show_request_timings()
+        self.assertEqual(0, ret)
+        mock_load.assert_called_once_with('/fake/timings.json')
+        output = self.output.getvalue()
+        self.assertIn('Slowest requests of sched1', output)
+        self.assertIn('req-1', output)
+        self.assertIn('allocation_candidates', output)
+        self.assertIn('filter:RamFilter', output)
+
+    @mock.patch('nova.scheduler.timing.load')
+    def test_show_request_timings_json(self, mock_load):
+        mock_load.return_value = self.timings
+        ret = self.commands.show_request_timings(
+            path='/fake/timings.json', json=True)
+        self.assertEqual(0, ret)
+        self.assertEqual(self.timings,
+                         jsonutils.loads(self.output.getvalue()))
+
+    @mock.patch('nova.scheduler.timing.load', side_effect=ValueError)
+    def test_show_request_timings_unexpected_error(self, mock_load):
+        ret = self.commands.show_request_timings(path='/fake/timings.json')
+        self.assertEqual(1, ret)
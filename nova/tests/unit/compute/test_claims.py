@@ -27,6 +27,7 @@ from nova.pci import manager as pci_manager
 from nova import test
 from nova.tests.unit import fake_instance
 from nova.tests.unit.pci import fakes as pci_fakes
+from nova.virt import hardware
 
 _NODENAME = 'fake-node'
 
@@ -217,6 +218,24 @@ class ClaimTestCase(test.NoDBTestCase):
         self._claim(limits={'numa_topology': limit_topo},
                     numa_topology=huge_instance)
 
+    @mock.patch('nova.virt.hardware._NUMA_FIT_CACHE', new=None)
+    def test_numa_topology_cached(self):
+        self.flags(numa_fit_cache_size=1, group='compute')
+        huge_instance = objects.InstanceNUMATopology(
+                cells=[objects.InstanceNUMACell(
+                    id=1, cpuset=set([1, 2]), pcpuset=set(), memory=512)])
+        limit_topo = objects.NUMATopologyLimits(
+            cpu_allocation_ratio=1, ram_allocation_ratio=1)
+        with mock.patch('nova.virt.hardware._numa_fit_instance_to_host',
+                        wraps=hardware._numa_fit_instance_to_host) as mock_fit:
+            claim1 = self._claim(limits={'numa_topology': limit_topo},
+                                 numa_topology=huge_instance)
+            claim2 = self._claim(limits={'numa_topology': limit_topo},
+                                 numa_topology=huge_instance)
+        mock_fit.assert_called_once()
+        self.assertEqual(claim1.claimed_numa_topology.obj_to_primitive(),
+                         claim2.claimed_numa_topology.obj_to_primitive())
+
     @pci_fakes.patch_pci_whitelist
     @mock.patch('nova.objects.InstancePCIRequests.get_by_instance')
     def test_numa_topology_with_pci(self, mock_get_by_instance):
@@ -7879,6 +7879,175 @@ class ComputeTestCase(BaseTestCase,
         self._heal_instance_info_cache(_require_nw_info_update=True,
                                        _task_state_not_none=True)
 
+    def _get_heal_instance(self, uuid, port_ids, **kwargs):
+        nw_info = network_model.NetworkInfo(
+            [network_model.VIF(id=port_id) for port_id in port_ids])
+        kwargs.setdefault('vm_state', vm_states.ACTIVE)
+        return objects.Instance(
+            uuid=uuid, host=self.compute.host, task_state=None,
+            info_cache=objects.InstanceInfoCache(network_info=nw_info),
+            **kwargs)
+
+    @mock.patch.object(compute_manager.ComputeManager,
+                       '_refresh_instance_info_cache')
+    @mock.patch.object(objects.Instance, 'get_by_uuid')
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_heal_instance_info_cache_stale_only(self, mock_get_by_host,
+                                                 mock_get_by_uuid,
+                                                 mock_refresh):
+        self.flags(heal_instance_info_cache_stale_only=True,
+                   heal_instance_info_cache_audit_interval=600)
+        ctxt = context.get_admin_context()
+        instances = [
+            # The cache matches the ports
+            self._get_heal_instance(uuids.inst0, [uuids.port0]),
+            # The cache is missing a port
+            self._get_heal_instance(uuids.inst1, []),
+            # The port is not bound properly
+            self._get_heal_instance(uuids.inst2, [uuids.port2]),
+            # The cache has a port which is gone
+            self._get_heal_instance(uuids.inst3, [uuids.port3a,
+                                                  uuids.port3b]),
+            # The instance is building
+            self._get_heal_instance(uuids.inst4, [],
+                                    vm_state=vm_states.BUILDING),
+        ]
+        ports = [
+            {'id': uuids.port0, 'device_id': uuids.inst0,
+             'binding:vif_type': network_model.VIF_TYPE_OVS},
+            {'id': uuids.port1, 'device_id': uuids.inst1,
+             'binding:vif_type': network_model.VIF_TYPE_OVS},
+            {'id': uuids.port2, 'device_id': uuids.inst2,
+             'binding:vif_type': network_model.VIF_TYPE_BINDING_FAILED},
+            {'id': uuids.port3a, 'device_id': uuids.inst3,
+             'binding:vif_type': network_model.VIF_TYPE_OVS},
+            {'id': uuids.port4, 'device_id': uuids.inst4,
+             'binding:vif_type': network_model.VIF_TYPE_OVS},
+        ]
+        mock_get_by_host.return_value = instances
+        instances_by_uuid = {inst.uuid: inst for inst in instances}
+        mock_get_by_uuid.side_effect = (
+            lambda ctxt, uuid, **kwargs: instances_by_uuid[uuid])
+
+        with test.nested(
+            mock.patch.object(self.compute.network_api, 'list_ports',
+                              return_value={'ports': ports}),
+            mock.patch('time.monotonic', return_value=1000),
+        ) as (mock_list_ports, mock_monotonic):
+            # The first run audits the caches, then heals the stale ones one
+            # run at a time
+            for expected in (uuids.inst1, uuids.inst2, uuids.inst3):
+                self.compute._heal_instance_info_cache(ctxt)
+                mock_refresh.assert_called_once_with(
+                    ctxt, instances_by_uuid[expected])
+                mock_refresh.reset_mock()
+
+            mock_get_by_host.assert_called_once_with(
+                ctxt, self.compute.host, expected_attrs=['info_cache'],
+                use_slave=True)
+            mock_list_ports.assert_called_once_with(
+                ctxt, **{'binding:host_id': self.compute.host,
+                         'fields': ['id', 'device_id', 'binding:vif_type']})
+
+            # Nothing is left to heal before the next audit
+            mock_monotonic.return_value = 1599
+            self.compute._heal_instance_info_cache(ctxt)
+            mock_refresh.assert_not_called()
+            self.assertEqual(1, mock_list_ports.call_count)
+
+            # The next audit finds the caches healed
+            instances[1].info_cache.network_info = network_model.NetworkInfo(
+                [network_model.VIF(id=uuids.port1)])
+            instances[3].info_cache.network_info = network_model.NetworkInfo(
+                [network_model.VIF(id=uuids.port3a)])
+            ports[2]['binding:vif_type'] = network_model.VIF_TYPE_OVS
+            mock_monotonic.return_value = 1600
+            self.compute._heal_instance_info_cache(ctxt)
+            mock_refresh.assert_not_called()
+            self.assertEqual(2, mock_list_ports.call_count)
+
+    @mock.patch.object(compute_manager.ComputeManager,
+                       '_refresh_instance_info_cache')
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_heal_instance_info_cache_stale_only_audit_error(
+            self, mock_get_by_host, mock_refresh):
+        self.flags(heal_instance_info_cache_stale_only=True)
+        ctxt = context.get_admin_context()
+        mock_get_by_host.return_value = [
+            self._get_heal_instance(uuids.inst0, [])]
+
+        with mock.patch.object(self.compute.network_api, 'list_ports',
+                               side_effect=test.TestingException):
+            self.compute._heal_instance_info_cache(ctxt)
+
+        mock_refresh.assert_not_called()
+        self.assertIsNotNone(self.compute._last_info_cache_audit)
+
+    @mock.patch.object(compute_manager.ComputeManager,
+                       '_heal_stale_instance_info_cache',
+                       new_callable=mock.NonCallableMock)
+    @mock.patch.object(objects.InstanceList, 'get_by_host', return_value=[])
+    def test_heal_instance_info_cache_stale_only_driver_binds_ports(
+            self, mock_get_by_host, _mock_heal_stale):
+        self.flags(heal_instance_info_cache_stale_only=True)
+        ctxt = context.get_admin_context()
+        with mock.patch.object(self.compute.driver,
+                               'manages_network_binding_host_id',
+                               return_value=True):
+            self.compute._heal_instance_info_cache(ctxt)
+        mock_get_by_host.assert_called_once_with(
+            ctxt, self.compute.host, expected_attrs=[], use_slave=True)
+
+    def test_external_instance_event_network_changed_marks_stale(self):
+        self.flags(heal_instance_info_cache_stale_only=True)
+        instance = objects.Instance(id=1, uuid=uuids.instance)
+        event = objects.InstanceExternalEvent(
+            name='network-changed', tag=uuids.port,
+            instance_uuid=uuids.instance)
+        self.compute._instance_uuids_to_heal = [uuids.other]
+        with mock.patch.object(self.compute.network_api,
+                               'get_instance_nw_info',
+                               side_effect=test.TestingException):
+            self.assertRaises(test.TestingException,
+                              self.compute.external_instance_event,
+                              self.context, [instance], [event])
+        self.assertEqual([uuids.other, uuids.instance],
+                         self.compute._instance_uuids_to_heal)
+
+    @mock.patch.object(compute_manager.ComputeManager,
+                       '_refresh_instance_info_cache')
+    @mock.patch.object(objects.Instance, 'get_by_uuid')
+    @mock.patch.object(compute_manager.ComputeManager,
+                       '_get_stale_instance_info_caches')
+    def test_heal_stale_instance_info_cache_marked_while_healing(
+            self, mock_get_stale, mock_get_by_uuid, mock_refresh):
+        self.flags(heal_instance_info_cache_stale_only=True)
+        ctxt = context.get_admin_context()
+        inst0 = self._get_heal_instance(uuids.inst0, [])
+        inst1 = self._get_heal_instance(uuids.inst1, [])
+        lock = self.compute._instance_uuids_to_heal_lock
+
+        def get_stale(ctxt):
+            # An external event marks a cache stale during the audit
+            self.assertFalse(lock.locked())
+            self.compute._mark_instance_info_cache_stale(inst1)
+            return [uuids.inst0, uuids.inst1]
+
+        def get_by_uuid(ctxt, uuid, **kwargs):
+            # and another one while the instance to heal is fetched
+            self.assertFalse(lock.locked())
+            self.compute._mark_instance_info_cache_stale(inst0)
+            return inst1
+
+        mock_get_stale.side_effect = get_stale
+        mock_get_by_uuid.side_effect = get_by_uuid
+
+        self.compute._heal_instance_info_cache(ctxt)
+
+        mock_refresh.assert_called_once_with(ctxt, inst1)
+        self.assertEqual([uuids.inst0],
+                         self.compute._instance_uuids_to_heal)
+
     @mock.patch('nova.objects.InstanceList.get_by_filters')
     @mock.patch('nova.compute.api.API.unrescue')
     def test_poll_rescued_instances(self, unrescue, get):
@@ -8168,8 +8337,9 @@ class ComputeTestCase(BaseTestCase,
         }
 
         with mock.patch.object(
-                self.compute.network_api, 'get_instance_nw_info',
-                return_value='fake_network_info') as mock_get_nw:
+                self.compute.network_api, 'get_instances_nw_info',
+                return_value={evacuated_instance.uuid: 'fake_network_info'}
+        ) as mock_get_nw:
             self.compute._destroy_evacuated_instances(fake_context, node_cache)
 
         mock_get_filter.assert_called_once_with(fake_context,
@@ -8180,7 +8350,8 @@ class ComputeTestCase(BaseTestCase,
                                               'done'],
                                           'migration_type': 'evacuation'})
         mock_get_inst.assert_called_once_with(fake_context)
-        mock_get_nw.assert_called_once_with(fake_context, evacuated_instance)
+        mock_get_nw.assert_called_once_with(fake_context,
+                                            [evacuated_instance])
         mock_get_blk.assert_called_once_with(fake_context, evacuated_instance)
         mock_is_inst.assert_called_once_with(
             fake_context, evacuated_instance, host='dest-host')
@@ -8243,12 +8414,14 @@ class ComputeTestCase(BaseTestCase,
         }
 
         with mock.patch.object(
-                self.compute.network_api, 'get_instance_nw_info',
-                return_value='fake_network_info') as mock_get_nw:
+                self.compute.network_api, 'get_instances_nw_info',
+                return_value={evacuated_instance.uuid: 'fake_network_info'}
+        ) as mock_get_nw:
             self.compute._destroy_evacuated_instances(fake_context, node_cache)
 
         mock_get_drv.assert_called_once_with(fake_context)
-        mock_get_nw.assert_called_once_with(fake_context, evacuated_instance)
+        mock_get_nw.assert_called_once_with(fake_context,
+                                            [evacuated_instance])
         mock_get_blk.assert_called_once_with(fake_context, evacuated_instance)
         mock_check_local.assert_called_once_with(fake_context,
                                                  evacuated_instance)
@@ -8315,12 +8488,14 @@ class ComputeTestCase(BaseTestCase,
         }
 
         with mock.patch.object(
-                self.compute.network_api, 'get_instance_nw_info',
-                return_value='fake_network_info') as mock_get_nw:
+                self.compute.network_api, 'get_instances_nw_info',
+                return_value={evacuated_instance.uuid: 'fake_network_info'}
+        ) as mock_get_nw:
             self.compute._destroy_evacuated_instances(fake_context, node_cache)
 
         mock_get_inst.assert_called_once_with(fake_context)
-        mock_get_nw.assert_called_once_with(fake_context, evacuated_instance)
+        mock_get_nw.assert_called_once_with(fake_context,
+                                            [evacuated_instance])
         mock_get_blk.assert_called_once_with(fake_context, evacuated_instance)
         mock_check_local.assert_called_once_with(fake_context,
                                                  evacuated_instance)
@@ -1351,9 +1351,8 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
         mock_get_inst.return_value = [deleted_instance]
         with test.nested(
             mock.patch.object(
-                self.compute.network_api, 'get_instance_nw_info',
-                side_effect = exception.InstanceNotFound(
-                    instance_id=deleted_instance['uuid'])),
+                self.compute.network_api, 'get_instances_nw_info',
+                return_value={}),
             mock.patch.object(
                 self.compute.reportclient,
                 'remove_provider_tree_from_instance_allocation')
@@ -1371,7 +1370,8 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
         mock_init_virt.assert_called_once_with()
         mock_temp_mut.assert_called_once_with(self.context, read_deleted='yes')
         mock_get_inst.assert_called_once_with(self.context)
-        mock_get_net.assert_called_once_with(self.context, deleted_instance)
+        mock_get_net.assert_called_once_with(self.context,
+                                             [deleted_instance])
 
         # ensure driver.destroy is called so that driver may
         # clean up any dangling files
@@ -4160,12 +4160,104 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
         """"Tests that the periodic task exits early if the driver raises
         VirtDriverNotReady.
         """
-        with mock.patch.object(
+        with test.nested(
+            mock.patch.object(
+                self.compute.driver, 'get_power_states',
+                side_effect=NotImplementedError),
+            mock.patch.object(
                 self.compute.driver, 'get_num_instances',
-                side_effect=exception.VirtDriverNotReady) as gni:
+                side_effect=exception.VirtDriverNotReady),
+        ) as (gps, gni):
             self.compute._sync_power_states(mock.sentinel.context)
+        gps.assert_called_once_with()
         gni.assert_called_once_with()
 
+    @mock.patch('nova.objects.InstanceList.get_by_host', new=mock.Mock())
+    @mock.patch('nova.compute.manager.ComputeManager.'
+                '_query_driver_power_state_and_sync',
+                new_callable=mock.NonCallableMock)
+    def test_sync_power_states_bulk_virt_driver_not_ready(self, _mock_sync):
+        with test.nested(
+            mock.patch.object(
+                self.compute.driver, 'get_power_states',
+                side_effect=exception.VirtDriverNotReady),
+            mock.patch.object(
+                self.compute.driver, 'get_num_instances',
+                new_callable=mock.NonCallableMock),
+        ) as (gps, gni):
+            self.compute._sync_power_states(mock.sentinel.context)
+        gps.assert_called_once_with()
+
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_sync_power_states_bulk(self, mock_get):
+        self.compute._syncs_in_progress_lock = threading.RLock()
+        in_sync = [
+            self._get_sync_instance(power_state.RUNNING, vm_states.ACTIVE),
+            self._get_sync_instance(power_state.SHUTDOWN, vm_states.STOPPED),
+            self._get_sync_instance(power_state.NOSTATE, vm_states.STOPPED),
+            self._get_sync_instance(power_state.RUNNING, vm_states.ERROR),
+        ]
+        out_of_sync = [
+            # The power state changed
+            self._get_sync_instance(power_state.RUNNING, vm_states.ACTIVE),
+            # The power state does not match the vm_state
+            self._get_sync_instance(power_state.SHUTDOWN, vm_states.ACTIVE),
+            # The instance is gone from the hypervisor
+            self._get_sync_instance(power_state.RUNNING, vm_states.ACTIVE),
+            # The instance has a pending task
+            self._get_sync_instance(power_state.RUNNING, vm_states.ACTIVE,
+                                    task_state=task_states.POWERING_OFF),
+        ]
+        for i, instance in enumerate(in_sync + out_of_sync):
+            instance.uuid = getattr(uuids, 'instance%d' % i)
+        vm_power_states = {
+            instance.uuid: instance.power_state for instance in in_sync}
+        vm_power_states[in_sync[2].uuid] = power_state.NOSTATE
+        vm_power_states[out_of_sync[0].uuid] = power_state.SHUTDOWN
+        vm_power_states[out_of_sync[1].uuid] = power_state.SHUTDOWN
+        vm_power_states[out_of_sync[3].uuid] = power_state.RUNNING
+        mock_get.return_value = in_sync + out_of_sync
+
+        with test.nested(
+            mock.patch.object(
+                self.compute.driver, 'get_power_states',
+                return_value=vm_power_states),
+            mock.patch.object(
+                self.compute.driver, 'get_num_instances',
+                new_callable=mock.NonCallableMock),
+            mock.patch.object(
+                self.compute, '_query_driver_power_state_and_sync'),
+        ) as (mock_get_power_states, _mock_gni, mock_sync):
+            self.compute._sync_power_states(mock.sentinel.context)
+
+        mock_get_power_states.assert_called_once_with()
+        mock_sync.assert_has_calls(
+            [mock.call(mock.sentinel.context, instance)
+             for instance in out_of_sync])
+        self.assertEqual(len(out_of_sync), mock_sync.call_count)
+
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_sync_power_states_bulk_error(self, mock_get):
+        self.compute._syncs_in_progress_lock = threading.RLock()
+        instance = self._get_sync_instance(power_state.RUNNING,
+                                           vm_states.ACTIVE)
+        mock_get.return_value = [instance]
+
+        with test.nested(
+            mock.patch.object(
+                self.compute.driver, 'get_power_states',
+                side_effect=exception.InternalError('error')),
+            mock.patch.object(
+                self.compute.driver, 'get_num_instances', return_value=1),
+            mock.patch.object(
+                self.compute, '_query_driver_power_state_and_sync'),
+        ) as (_mock_get_power_states, mock_gni, mock_sync):
+            self.compute._sync_power_states(mock.sentinel.context)
+
+        # The instances are synced one at a time
+        mock_gni.assert_called_once_with()
+        mock_sync.assert_called_once_with(mock.sentinel.context, instance)
+
     def _get_sync_instance(self, power_state, vm_state, task_state=None):
         instance = objects.Instance()
         instance.uuid = uuids.instance
@@ -6857,8 +6949,9 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
             mock.patch.object(self.compute, '_get_instances_on_driver',
                                return_value=[instance_1,
                                              instance_2]),
-            mock.patch.object(self.compute.network_api, 'get_instance_nw_info',
-                               return_value=None),
+            mock.patch.object(self.compute.network_api,
+                              'get_instances_nw_info',
+                              return_value={instance_2.uuid: None}),
             mock.patch.object(self.compute, '_get_instance_block_device_info',
                                return_value={}),
             mock.patch.object(self.compute, '_is_instance_storage_shared',
@@ -6929,8 +7022,10 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
             mock.patch.object(self.compute, '_get_instances_on_driver',
                                return_value=[instance_1,
                                              instance_2]),
-            mock.patch.object(self.compute.network_api, 'get_instance_nw_info',
-                               return_value=None),
+            mock.patch.object(self.compute.network_api,
+                              'get_instances_nw_info',
+                              return_value={instance_1.uuid: None,
+                                            instance_2.uuid: None}),
             mock.patch.object(self.compute, '_get_instance_block_device_info',
                                return_value={}),
             mock.patch.object(self.compute, '_is_instance_storage_shared',
@@ -8489,6 +8584,289 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
             m.assert_called_once_with(mock_nodes.return_value)
 
 
+class ComputeManagerUpdateResourcesTestCase(test.NoDBTestCase):
+    """Tests of update_available_resource updating the nodes concurrently,
+    which requires a real executor.
+    """
+
+    def setUp(self):
+        super(ComputeManagerUpdateResourcesTestCase, self).setUp()
+        self.compute = manager.ComputeManager()
+        self.context = context.RequestContext(fakes.FAKE_USER_ID,
+                                              fakes.FAKE_PROJECT_ID)
+        self.useFixture(std_fixtures.MockPatchObject(self.compute, 'rt'))
+
+    @mock.patch.object(manager.ComputeManager,
+                       '_update_available_resource_for_node')
+    @mock.patch.object(fake_driver.FakeDriver, 'get_available_nodes')
+    @mock.patch.object(manager.ComputeManager, '_get_compute_nodes_in_db')
+    def test_update_available_resource_concurrent(
+            self, get_db_nodes, get_avail_nodes, update_mock):
+        self.flags(update_resources_pool_size=4)
+        nodenames = {'node%d' % i for i in range(4)}
+        get_db_nodes.return_value = [
+            mock.Mock(hypervisor_hostname=nodename) for nodename in nodenames]
+        get_avail_nodes.return_value = nodenames
+        started = []
+        all_started = threading.Event()
+
+        def update(context, nodename, startup=False):
+            started.append(nodename)
+            if len(started) == len(nodenames):
+                all_started.set()
+            # Every node update waits for the others to start, which only
+            # completes if they run concurrently
+            self.assertTrue(all_started.wait(10))
+
+        update_mock.side_effect = update
+        self.compute.update_available_resource(self.context)
+
+        self.assertEqual(nodenames, set(started))
+        update_mock.assert_has_calls(
+            [mock.call(self.context, nodename, startup=False)
+             for nodename in nodenames], any_order=True)
+        self.assertIsNotNone(self.compute.last_resource_update_duration)
+        self.assertEqual(set(), self.compute._resource_updates_in_progress)
+
+    @mock.patch.object(resource_tracker.ResourceTracker,
+                       '_report_hypervisor_resource_view', new=mock.Mock())
+    @mock.patch.object(resource_tracker.ResourceTracker,
+                       '_verify_resources', new=mock.Mock())
+    @mock.patch.object(resource_tracker.ResourceTracker, '_init_compute_node')
+    @mock.patch.object(fake_driver.FakeDriver, 'get_available_resource')
+    @mock.patch.object(fake_driver.FakeDriver, 'get_available_nodes')
+    @mock.patch.object(manager.ComputeManager, '_get_compute_nodes_in_db')
+    def test_update_available_resource_concurrent_node_locks(
+            self, get_db_nodes, get_avail_nodes, get_resources, init_node):
+        self.flags(update_resources_pool_size=2)
+        self.compute.rt = resource_tracker.ResourceTracker(
+            self.compute.host, self.compute.driver, mock.Mock())
+        get_db_nodes.return_value = []
+        get_avail_nodes.return_value = {'node1', 'node2'}
+        get_resources.side_effect = lambda nodename: {
+            'hypervisor_hostname': nodename, 'uuid': getattr(uuids, nodename)}
+        # Both audits have to reach the resource tracker and hold the lock of
+        # their node at the same time for the barrier to be passed
+        barrier = threading.Barrier(2, timeout=10)
+
+        def init_compute_node(context, resources):
+            barrier.wait()
+            # The node is left disabled so that the audit stops there
+            return False
+
+        init_node.side_effect = init_compute_node
+        self.compute.update_available_resource(self.context)
+
+        self.assertEqual(2, init_node.call_count)
+        self.assertFalse(barrier.broken)
+
+    @mock.patch.object(manager.ComputeManager,
+                       '_update_available_resource_for_node')
+    @mock.patch.object(fake_driver.FakeDriver, 'get_available_nodes')
+    @mock.patch.object(manager.ComputeManager, '_get_compute_nodes_in_db')
+    def test_update_available_resource_concurrent_startup_error(
+            self, get_db_nodes, get_avail_nodes, update_mock):
+        self.flags(update_resources_pool_size=2)
+        get_db_nodes.return_value = []
+        get_avail_nodes.return_value = {'node1', 'node2'}
+
+        def update(context, nodename, startup=False):
+            if nodename == 'node2':
+                raise exception.ReshapeFailed(error='fake')
+
+        update_mock.side_effect = update
+        self.assertRaises(exception.ReshapeFailed,
+                          self.compute.update_available_resource,
+                          self.context, startup=True)
+
+    @mock.patch.object(manager, 'LOG')
+    @mock.patch.object(manager.ComputeManager,
+                       '_update_available_resource_for_node')
+    @mock.patch.object(fake_driver.FakeDriver, 'get_available_nodes')
+    @mock.patch.object(manager.ComputeManager, '_get_compute_nodes_in_db')
+    def test_update_available_resource_node_timeout(
+            self, get_db_nodes, get_avail_nodes, update_mock, mock_log):
+        self.flags(update_resources_pool_size=2,
+                   update_resources_node_timeout=1)
+        get_db_nodes.return_value = []
+        get_avail_nodes.return_value = {'node1', 'node2'}
+        unblock = threading.Event()
+        self.addCleanup(unblock.set)
+
+        def update(context, nodename, startup=False):
+            if nodename == 'node2':
+                unblock.wait(10)
+
+        update_mock.side_effect = update
+        self.compute.update_available_resource(self.context)
+        mock_log.error.assert_called_once_with(
+            mock.ANY, {'timeout': 1, 'node': 'node2'})
+        self.assertEqual({'node2'},
+                         self.compute._resource_updates_in_progress)
+
+        # The stuck node is skipped until its update completes
+        update_mock.reset_mock()
+        self.compute.update_available_resource(self.context)
+        update_mock.assert_called_once_with(
+            self.context, 'node1', startup=False)
+        mock_log.warning.assert_any_call(mock.ANY, 'node2')
+
+
+class ComputeManagerPeriodicTasksTestCase(test.NoDBTestCase):
+
+    @mock.patch('nova.compute.periodic.get_first_run', return_value=1000.0)
+    def test_spread_periodic_tasks(self, mock_first_run):
+        self.flags(periodic_task_spread=True, group='compute')
+        compute = manager.ComputeManager()
+        spacing = compute._periodic_spacing['_poll_unconfirmed_resizes']
+        self.assertEqual(
+            1000.0 - spacing,
+            compute._periodic_last_run['_poll_unconfirmed_resizes'])
+        mock_first_run.assert_any_call(
+            compute.host, '_poll_unconfirmed_resizes', spacing)
+        # The tasks running at startup are left alone
+        self.assertIsNone(compute._periodic_last_run['_sync_power_states'])
+
+    def test_no_spread_periodic_tasks(self):
+        compute = manager.ComputeManager()
+        self.assertEqual(
+            manager.ComputeManager._poll_unconfirmed_resizes.
+            _periodic_last_run,
+            compute._periodic_last_run['_poll_unconfirmed_resizes'])
+
+    @mock.patch('nova.manager.Manager.periodic_tasks')
+    @mock.patch('nova.compute.periodic.get_backoff')
+    def test_periodic_tasks_backoff(self, mock_backoff, mock_periodic_tasks):
+        compute = manager.ComputeManager()
+        ctxt = context.get_admin_context()
+        base_spacing = dict(manager.ComputeManager._periodic_spacing)
+
+        mock_backoff.return_value = 2.5
+        compute.periodic_tasks(ctxt)
+        mock_periodic_tasks.assert_called_once_with(
+            ctxt, raise_on_error=False)
+        self.assertEqual(
+            {name: spacing * 2.5 for name, spacing in base_spacing.items()},
+            compute._periodic_spacing)
+        # The class attribute is left alone
+        self.assertEqual(base_spacing,
+                         manager.ComputeManager._periodic_spacing)
+
+        mock_backoff.return_value = 1.0
+        compute.periodic_tasks(ctxt)
+        self.assertEqual(base_spacing, compute._periodic_spacing)
+
+
+class ComputeManagerInitInstancesTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(ComputeManagerInitInstancesTestCase, self).setUp()
+        self.compute = manager.ComputeManager()
+        self.context = context.RequestContext(fakes.FAKE_USER_ID,
+                                              fakes.FAKE_PROJECT_ID)
+
+    def _make_instances(self):
+        return [
+            fake_instance.fake_instance_obj(
+                self.context, uuid=uuids.active, vm_state=vm_states.ACTIVE,
+                task_state=None),
+            fake_instance.fake_instance_obj(
+                self.context, uuid=uuids.resizing, vm_state=vm_states.ACTIVE,
+                task_state=task_states.RESIZE_MIGRATING),
+            fake_instance.fake_instance_obj(
+                self.context, uuid=uuids.deleted, vm_state=vm_states.DELETED,
+                task_state=None),
+            fake_instance.fake_instance_obj(
+                self.context, uuid=uuids.stopped, vm_state=vm_states.STOPPED,
+                task_state=None),
+            fake_instance.fake_instance_obj(
+                self.context, uuid=uuids.deleting, vm_state=vm_states.ACTIVE,
+                task_state=task_states.DELETING),
+            fake_instance.fake_instance_obj(
+                self.context, uuid=uuids.migrating, vm_state=vm_states.ACTIVE,
+                task_state=task_states.MIGRATING),
+        ]
+
+    def test_get_init_instance_phases(self):
+        phases = self.compute._get_init_instance_phases(
+            self._make_instances())
+        self.assertEqual(
+            [[uuids.deleted, uuids.deleting],
+             [uuids.resizing, uuids.migrating],
+             [uuids.active, uuids.stopped]],
+            [[instance.uuid for instance in phase] for phase in phases])
+
+    def test_get_init_instance_phases_skips_empty(self):
+        instances = self._make_instances()[::3]
+        phases = self.compute._get_init_instance_phases(instances)
+        self.assertEqual(
+            [[uuids.active, uuids.stopped]],
+            [[instance.uuid for instance in phase] for phase in phases])
+
+    @mock.patch.object(thread_pool_factory, 'spawn_on')
+    @mock.patch.object(manager.ComputeManager, '_init_instance')
+    def test_init_instances_sequential(self, mock_init, mock_spawn):
+        instances = self._make_instances()
+        self.compute._init_instances(self.context, instances)
+        # The instances are initialized in their original order
+        self.assertEqual(
+            [mock.call(self.context, instance) for instance in instances],
+            mock_init.call_args_list)
+        mock_spawn.assert_not_called()
+
+    @mock.patch.object(manager.ComputeManager, '_init_instance')
+    def test_init_instances_concurrent(self, mock_init):
+        self.flags(init_host_pool_size=2)
+        instances = self._make_instances()
+        started = []
+        barriers = [threading.Barrier(2) for _ in range(3)]
+        phase_of = {
+            uuids.deleted: 0, uuids.deleting: 0,
+            uuids.resizing: 1, uuids.migrating: 1,
+            uuids.active: 2, uuids.stopped: 2,
+        }
+
+        def init(context, instance):
+            started.append(instance.uuid)
+            # Both instances of a phase wait for each other, which only
+            # completes if they run concurrently
+            barriers[phase_of[instance.uuid]].wait(10)
+
+        mock_init.side_effect = init
+        self.compute._init_instances(self.context, instances)
+
+        # A phase only starts once the previous one completed
+        self.assertEqual([0, 0, 1, 1, 2, 2],
+                         [phase_of[uuid] for uuid in started])
+        self.assertEqual(6, mock_init.call_count)
+
+    @mock.patch.object(manager.ComputeManager, '_init_instance')
+    def test_init_instances_concurrent_error(self, mock_init):
+        self.flags(init_host_pool_size=2)
+        instances = self._make_instances()
+
+        def init(context, instance):
+            if instance.uuid == uuids.deleting:
+                raise test.TestingException()
+
+        mock_init.side_effect = init
+        self.assertRaises(test.TestingException,
+                          self.compute._init_instances,
+                          self.context, instances)
+        # The failed phase completes, but the next ones are not started
+        self.assertEqual(
+            {uuids.deleted, uuids.deleting},
+            {call.args[1].uuid for call in mock_init.call_args_list})
+
+    @mock.patch.object(manager, 'LOG')
+    def test_log_init_host_phase(self, mock_log):
+        with mock.patch('time.monotonic', side_effect=[10.0, 12.5]):
+            with self.compute._log_init_host_phase('fake phase'):
+                pass
+        mock_log.info.assert_called_once_with(
+            mock.ANY, {'phase': 'fake phase', 'duration': 2.5})
+
+
 class ComputeManagerBuildInstanceTestCase(test.NoDBTestCase):
     def setUp(self):
         super(ComputeManagerBuildInstanceTestCase, self).setUp()
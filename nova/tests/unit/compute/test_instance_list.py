@@ -320,6 +320,38 @@ class TestInstanceList(test.NoDBTestCase):
         ret = instance_list.get_instance_list_cells_batch_size(1000, [])
         self.assertEqual(1000, ret)
 
+    def test_batch_size_adaptive(self):
+        self.flags(instance_list_cells_batch_strategy='adaptive',
+                   group='api')
+
+        # One cell, so batch at $limit
+        ret = instance_list.get_instance_list_cells_batch_size(1000, [1])
+        self.assertEqual(1000, ret)
+
+        # Four cells so the first batches are $limit/4
+        ret = instance_list.get_instance_list_cells_batch_size(1000, [1, 2,
+                                                                      3, 4])
+        self.assertEqual(250, ret)
+
+        # Many cells, so batch at the lower threshold
+        ret = instance_list.get_instance_list_cells_batch_size(
+            1000, list(range(200)))
+        self.assertEqual(10, ret)
+
+        # Tiny limit, so batch at $limit
+        ret = instance_list.get_instance_list_cells_batch_size(5, [1, 2, 3])
+        self.assertEqual(5, ret)
+
+    @mock.patch('nova.compute.instance_list.InstanceLister')
+    def test_get_instances_sorted_adaptive(self, mock_lister):
+        self.flags(instance_list_cells_batch_strategy='adaptive',
+                   group='api')
+        instance_list.get_instances_sorted(self.context, {}, 10, None, [],
+                                           ['id'], ['asc'])
+        mock_lister.assert_called_once_with(['id'], ['asc'], cells=None,
+                                            batch_size=None,
+                                            adaptive_batches=True)
+
 
 class TestInstanceListBig(test.NoDBTestCase):
     def setUp(self):
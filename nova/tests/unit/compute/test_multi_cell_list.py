@@ -454,3 +454,200 @@ class TestBaseClass(test.NoDBTestCase):
         self.assertEqual(sorted([cell.uuid for cell in cells
                                  if cell.uuid != uuids.cell1]),
                          gmbv_summary['called_in_cell'])
+
+
+class SortedLister(multi_cell_list.CrossCellLister):
+    """A lister of records sorted by id, spread across cells."""
+
+    def __init__(self, data_by_cell, cells, **kwargs):
+        self._data_by_cell = data_by_cell
+        self.calls = []
+        super(SortedLister, self).__init__(
+            multi_cell_list.RecordSortContext(['id'], ['asc']), cells=cells,
+            **kwargs)
+
+    @property
+    def marker_identifier(self):
+        return 'id'
+
+    def get_marker_record(self, ctx, marker):
+        for cell_uuid, data in self._data_by_cell.items():
+            for record in data:
+                if record['id'] == marker:
+                    return cell_uuid, record
+        raise exception.MarkerNotFound(marker=marker)
+
+    def get_marker_by_values(self, ctx, values):
+        self.calls.append(('get_marker_by_values', ctx.cell_uuid))
+        for record in self._data_by_cell[ctx.cell_uuid]:
+            if record['id'] >= values[0]:
+                return record['id']
+
+    def get_by_filters(self, ctx, filters, limit, marker, **kwargs):
+        self.calls.append(('get_by_filters', ctx.cell_uuid, limit))
+        data = self._data_by_cell[ctx.cell_uuid]
+        if 'id' in filters:
+            data = [record for record in data if record['id'] in filters['id']]
+        if marker is not None:
+            ids = [record['id'] for record in data]
+            if marker not in ids:
+                raise exception.MarkerNotFound(marker=marker)
+            data = data[ids.index(marker) + 1:]
+        return copy.deepcopy(data[:limit])
+
+    def fetched(self):
+        return sum(limit or 0 for call in self.calls
+                   if call[0] == 'get_by_filters'
+                   for limit in call[2:])
+
+
+@mock.patch('nova.context.target_cell', new=target_cell_cheater)
+class TestCellBatches(test.NoDBTestCase):
+    def setUp(self):
+        super(TestCellBatches, self).setUp()
+        self.cells = [objects.CellMapping(uuid=getattr(uuids, 'cell%i' % i),
+                                          name='cell%i' % i)
+                      for i in range(0, 30)]
+        self.ctx = context.RequestContext()
+
+    def _interleaved(self, count):
+        # The records are spread evenly across the cells
+        return {cell.uuid: [{'id': i} for i in range(n, count, 30)]
+                for n, cell in enumerate(self.cells)}
+
+    def _list(self, lister, limit, marker=None):
+        return [record['id'] for record in
+                lister.get_records_sorted(self.ctx, {}, limit, marker)]
+
+    def test_adaptive_batches_interleaved(self):
+        lister = SortedLister(self._interleaved(3000), self.cells,
+                              batch_size=5, adaptive_batches=True)
+        self.assertEqual(list(range(100)), self._list(lister, 100))
+        # The first batch of every cell is enough
+        self.assertEqual(30, len(lister.calls))
+        self.assertEqual(150, lister.fetched())
+
+    def test_adaptive_batches_skewed(self):
+        data = {cell.uuid: [{'id': 10000 + i}] for i, cell in
+                enumerate(self.cells)}
+        data[uuids.cell0] = [{'id': i} for i in range(1000)]
+        lister = SortedLister(data, self.cells, batch_size=10,
+                              adaptive_batches=True)
+        self.assertEqual(list(range(1000)), self._list(lister, 1000))
+        cell0_limits = [call[2] for call in lister.calls
+                        if call[1] == uuids.cell0]
+        # The batch size of the cell doubles as it keeps being consumed,
+        # without exceeding the number of records still needed
+        self.assertEqual([10, 20, 40, 80, 160, 320, 370], cell0_limits)
+
+    def test_batches_capped_by_remaining(self):
+        data = {cell.uuid: [{'id': 10000 + i}] for i, cell in
+                enumerate(self.cells)}
+        data[uuids.cell0] = [{'id': i} for i in range(1000)]
+        lister = SortedLister(data, self.cells, batch_size=40)
+        self.assertEqual(list(range(100)), self._list(lister, 100))
+        cell0_limits = [call[2] for call in lister.calls
+                        if call[1] == uuids.cell0]
+        self.assertEqual([40, 40, 20], cell0_limits)
+
+
+@mock.patch('nova.context.target_cell', new=target_cell_cheater)
+class TestContinuations(test.NoDBTestCase):
+    def setUp(self):
+        super(TestContinuations, self).setUp()
+        self.flags(list_records_continuation_cache_size=10, group='api')
+        self.cells = [objects.CellMapping(uuid=getattr(uuids, 'cell%i' % i),
+                                          name='cell%i' % i)
+                      for i in range(0, 3)]
+        # Cell 2 only has records at the end of the listing
+        self.data = {
+            uuids.cell0: [{'id': i} for i in range(0, 40, 2)],
+            uuids.cell1: [{'id': i} for i in range(1, 40, 2)],
+            uuids.cell2: [{'id': i} for i in range(100, 105)],
+        }
+        self.ctx = context.RequestContext()
+
+    def _page(self, limit, marker=None, filters=None):
+        lister = SortedLister(self.data, self.cells, batch_size=4)
+        page = [record['id'] for record in lister.get_records_sorted(
+            self.ctx, filters or {}, limit, marker)]
+        return page, lister
+
+    def _marker_lookups(self, lister):
+        return [call[1] for call in lister.calls
+                if call[0] == 'get_marker_by_values']
+
+    def test_cache_size(self):
+        self.assertEqual(10, multi_cell_list.get_continuations().size)
+        self.flags(list_records_continuation_cache_size=0, group='api')
+        self.assertIsNone(multi_cell_list.get_continuations())
+
+    def test_pages(self):
+        result = []
+        page, lister = self._page(7)
+        while len(page) == 7:
+            result.extend(page)
+            page, lister = self._page(7, marker=page[-1])
+            # The cells which returned records resume from the end of the
+            # previous page, cell 2 is looked up by value until it did
+            self.assertNotIn(uuids.cell0, self._marker_lookups(lister))
+            self.assertNotIn(uuids.cell1, self._marker_lookups(lister))
+        result.extend(page)
+        self.assertEqual(list(range(40)) + list(range(100, 105)), result)
+
+    def test_pages_without_cache(self):
+        self.flags(list_records_continuation_cache_size=0, group='api')
+        page, lister = self._page(7)
+        page, lister = self._page(7, marker=page[-1])
+        self.assertEqual(list(range(7, 14)), page)
+        # Cell 0 has the marker, the others are looked up by value
+        self.assertEqual(sorted([uuids.cell1, uuids.cell2]),
+                         sorted(self._marker_lookups(lister)))
+
+    def test_other_listing(self):
+        page, lister = self._page(7)
+        page, lister = self._page(7, marker=page[-1],
+                                  filters={'deleted': False})
+        self.assertEqual(list(range(7, 14)), page)
+        self.assertEqual(2, len(self._marker_lookups(lister)))
+
+    def test_skips_records_before_marker(self):
+        page, lister = self._page(7)
+        # A record sorting before the marker is created in cell 1
+        self.data[uuids.cell1].insert(3, {'id': 5.5})
+        page, lister = self._page(7, marker=page[-1])
+        self.assertEqual(list(range(7, 14)), page)
+
+    def test_records_created_before_marker_in_empty_cell(self):
+        self.data[uuids.cell2] = [{'id': 9.5}, {'id': 10.5}, {'id': 11.5}]
+        page, lister = self._page(7)
+        self.assertEqual(list(range(7)), page)
+        # Records sorting before the marker are created in cell 2, which
+        # returned nothing in the first page
+        self.data[uuids.cell2][:0] = [{'id': i / 10.0} for i in range(10)]
+        page, lister = self._page(7, marker=page[-1])
+        self.assertEqual([7, 8, 9, 9.5, 10, 10.5, 11], page)
+        self.assertEqual([uuids.cell2], self._marker_lookups(lister))
+
+    def test_skipped_records_not_counted(self):
+        self.data[uuids.cell2] = [{'id': 2.5}, {'id': 9.5}, {'id': 10.5}]
+        page, lister = self._page(7)
+        self.assertEqual([0, 1, 2, 2.5, 3, 4, 5], page)
+        # Records sorting before the marker are created in cell 2 after the
+        # record it stopped at
+        self.data[uuids.cell2][1:1] = [
+            {'id': 2.5 + i / 100.0} for i in range(1, 11)]
+        page, lister = self._page(7, marker=page[-1])
+        self.assertEqual([6, 7, 8, 9, 9.5, 10, 10.5], page)
+        self.assertEqual([], self._marker_lookups(lister))
+
+    def test_local_marker_deleted(self):
+        page, lister = self._page(7)
+        self.assertEqual(list(range(7)), page)
+        # The last record returned from cell 1 is deleted
+        self.data[uuids.cell1].remove({'id': 5})
+        page, lister = self._page(7, marker=page[-1])
+        self.assertEqual(list(range(7, 14)), page)
+        # Cell 2 returned nothing in the first page either
+        self.assertEqual(sorted([uuids.cell1, uuids.cell2]),
+                         sorted(self._marker_lookups(lister)))
@@ -0,0 +1,79 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+from unittest import mock
+
+import fixtures
+
+from nova.compute import periodic
+from nova.conductor import rpcapi as conductor_rpcapi
+from nova import test
+
+
+class PeriodicTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(PeriodicTestCase, self).setUp()
+        self.tracker = conductor_rpcapi.LatencyTracker()
+        self.useFixture(fixtures.MockPatchObject(
+            conductor_rpcapi, 'OBJECT_CALL_LATENCY', self.tracker))
+
+    def test_get_phase(self):
+        phase = periodic.get_phase('host1', 'task', 60)
+        self.assertEqual(phase, periodic.get_phase('host1', 'task', 60))
+        self.assertGreaterEqual(phase, 0)
+        self.assertLess(phase, 60)
+        self.assertNotEqual(phase, periodic.get_phase('host2', 'task', 60))
+        self.assertNotEqual(phase, periodic.get_phase('host1', 'other', 60))
+
+    def test_get_phase_spread(self):
+        buckets = collections.Counter(
+            int(periodic.get_phase('host%d' % i, 'task', 10))
+            for i in range(1000))
+        self.assertEqual(set(range(10)), set(buckets))
+        for count in buckets.values():
+            self.assertGreater(count, 60)
+            self.assertLess(count, 140)
+
+    @mock.patch('time.monotonic', return_value=1000.0)
+    @mock.patch.object(periodic, 'get_phase', return_value=15.0)
+    def test_get_first_run(self, mock_phase, mock_monotonic):
+        with mock.patch('time.time', return_value=6010.0):
+            self.assertEqual(1005.0,
+                             periodic.get_first_run('host1', 'task', 60))
+        with mock.patch('time.time', return_value=6020.0):
+            self.assertEqual(1055.0,
+                             periodic.get_first_run('host1', 'task', 60))
+        mock_phase.assert_called_with('host1', 'task', 60)
+
+    def test_get_backoff(self):
+        self.flags(periodic_task_max_backoff=4.0, group='compute')
+        self.assertEqual(1.0, periodic.get_backoff())
+
+        self.tracker.record(0.01)
+        self.tracker.record(0.015)
+        self.assertEqual(1.0, periodic.get_backoff())
+
+        for _ in range(5):
+            self.tracker.record(0.05)
+        # The average latency is now 3.7 times the baseline
+        self.assertEqual(3.5, periodic.get_backoff())
+
+        for _ in range(10):
+            self.tracker.record(0.2)
+        self.assertEqual(4.0, periodic.get_backoff())
+
+    def test_get_backoff_disabled(self):
+        self.tracker.record(0.01)
+        self.tracker.record(1)
+        self.assertEqual(1.0, periodic.get_backoff())
@@ -170,6 +170,25 @@ class TestProviderTree(test.NoDBTestCase):
         pt.populate_from_iterable([])
         self.assertEqual([], pt.get_provider_uuids())
 
+    def test_populate_from_iterable_associations(self):
+        pt = provider_tree.ProviderTree()
+        inv = {'VCPU': {'total': 8}}
+        pt.populate_from_iterable([
+            {'uuid': uuids.root, 'name': 'root', 'generation': 1,
+             'inventories': inv, 'traits': ['CUSTOM_GOLD'],
+             'aggregates': [uuids.agg]},
+            {'uuid': uuids.child, 'name': 'child', 'generation': 2,
+             'parent_provider_uuid': uuids.root},
+        ])
+        root = pt.data(uuids.root)
+        self.assertEqual(inv, root.inventory)
+        self.assertEqual(set(['CUSTOM_GOLD']), root.traits)
+        self.assertEqual(set([uuids.agg]), root.aggregates)
+        child = pt.data(uuids.child)
+        self.assertEqual({}, child.inventory)
+        self.assertEqual(set(), child.traits)
+        self.assertEqual(set(), child.aggregates)
+
     def test_populate_from_iterable_error_orphan_cycle(self):
         pt = provider_tree.ProviderTree()
 
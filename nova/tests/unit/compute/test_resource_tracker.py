@@ -13,6 +13,7 @@
 import copy
 import datetime
 import ddt
+import threading
 from unittest import mock
 
 from keystoneauth1 import exceptions as ks_exc
@@ -23,6 +24,7 @@ from oslo_serialization import jsonutils
 from oslo_utils.fixture import uuidsentinel as uuids
 from oslo_utils import timeutils
 from oslo_utils import units
+from oslo_utils import uuidutils
 
 from nova.compute import claims
 from nova.compute.monitors import base as monitor_base
@@ -45,6 +47,7 @@ from nova.tests import fixtures
 from nova.tests.unit import fake_instance
 from nova.tests.unit.objects import test_pci_device as fake_pci_device
 from nova.tests.unit import utils
+from nova import thread_pool_factory
 from nova import utils as nova_utils
 from nova.virt import driver
 
@@ -1790,7 +1793,8 @@ class TestUpdateComputeNode(BaseTestCase):
         self.driver_mock.update_provider_tree.assert_called_once_with(
             ptree, new_compute.hypervisor_hostname)
         self.rt.reportclient.update_from_provider_tree.assert_called_once_with(
-            mock.sentinel.ctx, ptree, allocations=None)
+            mock.sentinel.ctx, ptree, allocations=None,
+            root_uuid=new_compute.uuid)
         ptree.update_traits.assert_called_once_with(
             new_compute.hypervisor_hostname,
             utils.ItemsMatcher(
@@ -1909,7 +1913,9 @@ class TestUpdateComputeNode(BaseTestCase):
             [],
         )
         upt = self.rt.reportclient.update_from_provider_tree
-        upt.assert_called_once_with(mock.sentinel.ctx, ptree, allocations=None)
+        upt.assert_called_once_with(
+            mock.sentinel.ctx, ptree, allocations=None,
+            root_uuid=compute_obj.uuid)
 
     @mock.patch(
         'nova.compute.resource_tracker.ResourceTracker.'
@@ -1950,7 +1956,8 @@ class TestUpdateComputeNode(BaseTestCase):
         )
         upt = self.rt.reportclient.update_from_provider_tree
         upt.assert_called_once_with(
-            mock.sentinel.ctx, ptree, allocations=mock_get_allocs.return_value)
+            mock.sentinel.ctx, ptree, allocations=mock_get_allocs.return_value,
+            root_uuid=compute_obj.uuid)
 
     @ddt.data(True, False)
     @mock.patch(
@@ -1996,7 +2003,8 @@ class TestUpdateComputeNode(BaseTestCase):
         )
         upt = self.rt.reportclient.update_from_provider_tree
         upt.assert_called_once_with(
-            mock.sentinel.ctx, ptree, allocations=mock_get_allocs.return_value)
+            mock.sentinel.ctx, ptree, allocations=mock_get_allocs.return_value,
+            root_uuid=compute_obj.uuid)
 
     @mock.patch(
         'nova.compute.resource_tracker.ResourceTracker.'
@@ -2056,7 +2064,9 @@ class TestUpdateComputeNode(BaseTestCase):
             [uuids.inst1],
         )
         upt = self.rt.reportclient.update_from_provider_tree
-        upt.assert_called_once_with(mock.sentinel.ctx, ptree, allocations=None)
+        upt.assert_called_once_with(
+            mock.sentinel.ctx, ptree, allocations=None,
+            root_uuid=compute_obj.uuid)
 
     @mock.patch(
         'nova.compute.resource_tracker.ResourceTracker.'
@@ -4698,3 +4708,349 @@ class TestCleanComputeNodeCache(BaseTestCase):
 
         mock_remove.assert_called_once_with(invalid_nodename)
         mock_invalidate.assert_called_once_with(invalid_nodename)
+
+
+@mock.patch('nova.compute.utils.is_volume_backed_instance',
+            new=mock.Mock(return_value=False))
+@mock.patch('nova.objects.ComputeNode.save', new=mock.Mock())
+@mock.patch('nova.objects.Instance.save', new=mock.Mock())
+@mock.patch.object(resource_tracker.ResourceTracker, '_update_to_placement',
+                   new=mock.Mock())
+class TestNodeLocking(BaseTestCase):
+    """Claims and audits on the different nodes of a host run concurrently
+    without losing each other's updates.
+    """
+
+    def setUp(self):
+        super(TestNodeLocking, self).setUp()
+        self._setup_rt()
+        self.ctx = context.get_admin_context()
+        self.nodenames = ('node1', 'node2')
+        fixture = _COMPUTE_NODE_FIXTURES[0]
+        fields = {name: getattr(fixture, name) for name in fixture.fields
+                  if fixture.obj_attr_is_set(name)}
+        for i, nodename in enumerate(self.nodenames):
+            fields.update(id=i + 1, uuid=getattr(uuids, nodename),
+                          hypervisor_hostname=nodename)
+            self.rt.compute_nodes[nodename] = objects.ComputeNode(**fields)
+        self.rt.pci_tracker = mock.create_autospec(
+            pci_manager.PciDevTracker, instance=True)
+        self.rt.pci_tracker.stats = mock.MagicMock()
+        self.rt.pci_tracker.stats.to_device_pools_obj.return_value = (
+            objects.PciDevicePoolList())
+
+    def _new_instance(self, flavor_id=1):
+        instance = _INSTANCE_FIXTURES[0].obj_clone()
+        instance.uuid = uuidutils.generate_uuid()
+        instance.host = None
+        instance.node = None
+        instance.compute_id = None
+        instance.numa_topology = None
+        instance.pci_requests = objects.InstancePCIRequests(requests=[])
+        flavor = _FLAVOR_OBJ_FIXTURES[flavor_id]
+        instance.flavor = flavor
+        instance.memory_mb = flavor.memory_mb
+        instance.vcpus = flavor.vcpus
+        instance.root_gb = flavor.root_gb
+        instance.ephemeral_gb = flavor.ephemeral_gb
+        return instance
+
+    def _audit(self, nodename, instances):
+        resources = copy.deepcopy(_VIRT_DRIVER_AVAIL_RESOURCES)
+        resources['hypervisor_hostname'] = nodename
+        resources['uuid'] = self.rt.compute_nodes[nodename].uuid
+        with test.nested(
+            mock.patch('nova.objects.InstanceList.get_by_host_and_node',
+                       return_value=instances),
+            mock.patch('nova.objects.MigrationList.'
+                       'get_in_progress_and_error', return_value=[]),
+            mock.patch.object(self.rt,
+                              '_remove_deleted_instances_allocations'),
+        ):
+            self.rt._update_available_resource(self.ctx, resources)
+
+    def test_audit_keeps_other_node_claims(self):
+        instance = self._new_instance()
+        self.rt.instance_claim(self.ctx, instance, 'node2', None)
+
+        # The audit of node1 must not forget the claim made on node2
+        self._audit('node1', [])
+        self.assertIn(instance.uuid, self.rt.tracked_instances)
+        cn2 = self.rt.compute_nodes['node2']
+        self.assertEqual(instance.memory_mb, cn2.memory_mb_used)
+
+        # so that aborting the claim returns its resources
+        self.rt.abort_instance_claim(self.ctx, instance, 'node2')
+        self.assertNotIn(instance.uuid, self.rt.tracked_instances)
+        self.assertEqual(0, cn2.memory_mb_used)
+        self.assertEqual(0, cn2.vcpus_used)
+
+    def test_claim_not_blocked_by_other_node_audit(self):
+        audit_started = threading.Event()
+        finish_audit = threading.Event()
+
+        def slow_get_instances(context, host, nodename, expected_attrs):
+            audit_started.set()
+            finish_audit.wait()
+            return []
+
+        def audit():
+            with mock.patch.object(
+                    self.rt, '_remove_deleted_instances_allocations'):
+                resources = copy.deepcopy(_VIRT_DRIVER_AVAIL_RESOURCES)
+                resources['hypervisor_hostname'] = 'node1'
+                resources['uuid'] = uuids.node1
+                self.rt._update_available_resource(self.ctx, resources)
+
+        with test.nested(
+            mock.patch('nova.objects.InstanceList.get_by_host_and_node',
+                       side_effect=slow_get_instances),
+            mock.patch('nova.objects.MigrationList.'
+                       'get_in_progress_and_error', return_value=[]),
+        ):
+            future = thread_pool_factory.spawn(audit)
+            self.assertTrue(audit_started.wait(10))
+            try:
+                # node1 is locked by its audit, node2 can still be claimed
+                claim = thread_pool_factory.spawn(
+                    self.rt.instance_claim, self.ctx, self._new_instance(),
+                    'node2', None)
+                claim.result(timeout=10)
+                self.assertFalse(future.done())
+            finally:
+                finish_audit.set()
+            future.result()
+
+        self.assertEqual(1, len(self.rt.tracked_instances))
+
+    def test_concurrent_claims_no_lost_updates(self):
+        orig_update_usage = self.rt._update_usage
+
+        def yielding_update_usage(*args, **kwargs):
+            # Let the other claims run while the usage is being updated
+            nova_utils.cooperative_yield()
+            return orig_update_usage(*args, **kwargs)
+
+        instances = [self._new_instance(flavor_id=i % 2 + 1)
+                     for i in range(20)]
+        nodenames = [self.nodenames[i % 2] for i in range(len(instances))]
+
+        with mock.patch.object(self.rt, '_update_usage',
+                               side_effect=yielding_update_usage):
+            futures = [
+                thread_pool_factory.spawn(
+                    self.rt.instance_claim, self.ctx, instance, nodename,
+                    None)
+                for instance, nodename in zip(instances, nodenames)]
+            for future in futures:
+                future.result()
+
+        self.assertEqual({i.uuid for i in instances},
+                         self.rt.tracked_instances)
+        for nodename in self.nodenames:
+            cn = self.rt.compute_nodes[nodename]
+            claimed = [i for i, n in zip(instances, nodenames)
+                       if n == nodename]
+            self.assertEqual(sum(i.memory_mb for i in claimed),
+                             cn.memory_mb_used)
+            self.assertEqual(sum(i.vcpus for i in claimed), cn.vcpus_used)
+            self.assertEqual(len(claimed), cn.running_vms)
+
+
+@mock.patch.object(resource_tracker.ResourceTracker,
+                   '_sync_compute_service_disabled_trait', new=mock.Mock())
+class TestProviderTreeSync(BaseTestCase):
+    """The placement syncs of the different nodes of a host run
+    concurrently.
+    """
+
+    def setUp(self):
+        super(TestProviderTreeSync, self).setUp()
+        self._setup_rt()
+        self.ctx = context.get_admin_context()
+        fixture = _COMPUTE_NODE_FIXTURES[0]
+        fields = {name: getattr(fixture, name) for name in fixture.fields
+                  if fixture.obj_attr_is_set(name)}
+        self.nodes = []
+        for i, nodename in enumerate(('node1', 'node2')):
+            fields.update(id=i + 1, uuid=getattr(uuids, nodename),
+                          hypervisor_hostname=nodename)
+            cn = objects.ComputeNode(**fields)
+            self.rt.compute_nodes[nodename] = cn
+            self.rt.old_resources[nodename] = cn
+            self.nodes.append(cn)
+
+        def get_provider_tree(context, rp_uuid, name=None):
+            ptree = provider_tree.ProviderTree()
+            ptree.new_root(name, rp_uuid)
+            return ptree
+
+        self.rt.reportclient.get_provider_tree_and_ensure_root.side_effect = (
+            get_provider_tree)
+
+    def test_placement_syncs_overlap(self):
+        # Each flush waits for the flush of the other node to start, so the
+        # syncs fail unless they run at the same time.
+        barrier = threading.Barrier(2, timeout=10)
+
+        def update_from_provider_tree(context, ptree, allocations=None,
+                                      root_uuid=None):
+            barrier.wait()
+
+        ufpt = self.rt.reportclient.update_from_provider_tree
+        ufpt.side_effect = update_from_provider_tree
+
+        futures = [thread_pool_factory.spawn(self.rt._update, self.ctx, cn)
+                   for cn in self.nodes]
+        for future in futures:
+            future.result(timeout=20)
+
+        self.assertEqual(
+            {uuids.node1, uuids.node2},
+            {c.kwargs['root_uuid'] for c in ufpt.call_args_list})
+
+
+class TestIncrementalResourceAudit(BaseTestCase):
+
+    def setUp(self):
+        super(TestIncrementalResourceAudit, self).setUp()
+        self.flags(resource_tracker_full_audit_passes=3)
+        self._setup_rt()
+        self.ctx = context.get_admin_context()
+        self.updated_at = datetime.datetime(
+            2024, 1, 1, tzinfo=datetime.timezone.utc)
+        self.instances = [self._new_instance() for _ in range(3)]
+
+    def _new_instance(self):
+        instance = _INSTANCE_FIXTURES[0].obj_clone()
+        instance.uuid = uuidutils.generate_uuid()
+        instance.updated_at = self.updated_at
+        instance.system_metadata = {}
+        instance.migration_context = None
+        return instance
+
+    @staticmethod
+    def _listed(instance):
+        # The instance as listed without its joined fields
+        listed = objects.Instance(
+            uuid=instance.uuid, host=instance.host, node=instance.node,
+            updated_at=instance.updated_at, vm_state=instance.vm_state,
+            task_state=instance.task_state)
+        listed.obj_reset_changes()
+        return listed
+
+    def _get_instances(self, listed, loaded=None, migrations=(),
+                       startup=False):
+        with test.nested(
+            mock.patch('nova.objects.InstanceList.get_by_host_and_node',
+                       return_value=listed),
+            mock.patch('nova.objects.InstanceList.get_by_filters',
+                       return_value=loaded or []),
+        ) as (get_mock, filters_mock):
+            instances = self.rt._get_instances_on_node(
+                self.ctx, _NODENAME, list(migrations), startup=startup)
+        return instances, get_mock, filters_mock
+
+    def _assert_full_load(self, get_mock, filters_mock):
+        get_mock.assert_called_once_with(
+            self.ctx, _HOSTNAME, _NODENAME,
+            expected_attrs=['system_metadata', 'numa_topology', 'flavor',
+                            'migration_context', 'resources'])
+        filters_mock.assert_not_called()
+
+    def test_disabled(self):
+        self.flags(resource_tracker_full_audit_passes=0)
+        for _ in range(2):
+            instances, get_mock, filters_mock = self._get_instances(
+                self.instances)
+            self._assert_full_load(get_mock, filters_mock)
+            self.assertEqual(self.instances, instances)
+        self.assertEqual({}, self.rt.instance_usages)
+
+    def test_incremental(self):
+        # The first pass is a full audit
+        instances, get_mock, filters_mock = self._get_instances(
+            self.instances)
+        self._assert_full_load(get_mock, filters_mock)
+        self.assertEqual({i.uuid for i in self.instances},
+                         set(self.rt.instance_usages[_NODENAME]))
+
+        # The next pass only loads the new and changed instances
+        changed = self.instances[1].obj_clone()
+        changed.task_state = task_states.REBOOTING
+        new = self._new_instance()
+        listed = [self._listed(i)
+                  for i in (self.instances[0], changed, new,
+                            self.instances[2])]
+        # The last instance is moved away before it is loaded
+        listed[3].updated_at = timeutils.utcnow()
+        instances, get_mock, filters_mock = self._get_instances(
+            listed, loaded=[changed, new])
+        get_mock.assert_called_once_with(
+            self.ctx, _HOSTNAME, _NODENAME, expected_attrs=[])
+        filters_mock.assert_called_once_with(
+            self.ctx, {'uuid': [changed.uuid, new.uuid, listed[3].uuid],
+                       'host': _HOSTNAME, 'deleted': False},
+            expected_attrs=['system_metadata', 'numa_topology', 'flavor',
+                            'migration_context', 'resources'])
+        self.assertEqual(3, len(instances))
+        kept, loaded_changed, loaded_new = instances
+        self.assertIs(changed, loaded_changed)
+        self.assertIs(new, loaded_new)
+        # The unchanged instance gets its fields from the previous pass
+        self.assertIs(listed[0], kept)
+        with mock.patch.object(objects.Instance,
+                               'obj_load_attr') as load_mock:
+            self.assertEqual(self.instances[0].flavor, kept.flavor)
+            self.assertEqual(self.instances[0].numa_topology,
+                             kept.numa_topology)
+            self.assertEqual({}, kept.system_metadata)
+            self.assertIsNone(kept.migration_context)
+            self.assertIsNone(kept.resources)
+        load_mock.assert_not_called()
+        self.assertEqual({i.uuid for i in instances},
+                         set(self.rt.instance_usages[_NODENAME]))
+        self.assertEqual(
+            (self.updated_at, vm_states.ACTIVE, task_states.REBOOTING),
+            self.rt.instance_usages[_NODENAME][changed.uuid].fingerprint)
+
+        # The third pass is incremental again
+        instances, get_mock, filters_mock = self._get_instances(
+            [self._listed(i) for i in instances])
+        get_mock.assert_called_once_with(
+            self.ctx, _HOSTNAME, _NODENAME, expected_attrs=[])
+        filters_mock.assert_not_called()
+        self.assertEqual(2, self.rt.passes_since_full_audit[_NODENAME])
+
+        # and the fourth one is a full audit
+        instances, get_mock, filters_mock = self._get_instances(
+            self.instances)
+        self._assert_full_load(get_mock, filters_mock)
+        self.assertEqual(0, self.rt.passes_since_full_audit[_NODENAME])
+
+    def test_startup_full_audit(self):
+        self._get_instances(self.instances)
+        instances, get_mock, filters_mock = self._get_instances(
+            self.instances, startup=True)
+        self._assert_full_load(get_mock, filters_mock)
+
+    def test_moving_instances_always_loaded(self):
+        self.instances[2].migration_context = objects.MigrationContext()
+        migrations = [objects.Migration(instance_uuid=self.instances[1].uuid)]
+        self._get_instances(self.instances, migrations=migrations)
+        self.assertEqual({self.instances[0].uuid},
+                         set(self.rt.instance_usages[_NODENAME]))
+
+        listed = [self._listed(i) for i in self.instances]
+        instances, get_mock, filters_mock = self._get_instances(
+            listed, loaded=self.instances[1:], migrations=migrations)
+        self.assertEqual(
+            [self.instances[1].uuid, self.instances[2].uuid],
+            filters_mock.call_args[0][1]['uuid'])
+        self.assertEqual([listed[0]] + self.instances[1:], list(instances))
+
+    def test_remove_node(self):
+        self._get_instances(self.instances)
+        self.rt.remove_node(_NODENAME)
+        self.assertNotIn(_NODENAME, self.rt.instance_usages)
+        self.assertNotIn(_NODENAME, self.rt.passes_since_full_audit)
@@ -321,6 +321,41 @@ class ConductorTestCase(_BaseTestCase, test.TestCase):
         self.assertEqual(CONF.host, self.conductor_manager.host)
 
 
+class LatencyTrackerTestCase(test.NoDBTestCase):
+
+    def test_record(self):
+        tracker = conductor_rpcapi.LatencyTracker()
+        self.assertEqual(1.0, tracker.get_ratio())
+        tracker.record(0.1)
+        self.assertEqual(1.0, tracker.get_ratio())
+        tracker.record(0.6)
+        self.assertAlmostEqual(0.2, tracker.average)
+        # The baseline only slowly rises
+        self.assertAlmostEqual(0.1001, tracker.baseline)
+        self.assertAlmostEqual(2.0, tracker.get_ratio(), places=2)
+        # The baseline follows the average down
+        for _ in range(50):
+            tracker.record(0.05)
+        self.assertAlmostEqual(tracker.average, tracker.baseline)
+
+    @mock.patch.object(conductor_rpcapi, 'OBJECT_CALL_LATENCY',
+                       new_callable=conductor_rpcapi.LatencyTracker)
+    @mock.patch('time.monotonic', side_effect=[10.0, 10.5, 20.0, 20.25])
+    def test_object_calls_latency(self, mock_monotonic, tracker):
+        conductor = conductor_rpcapi.ConductorAPI()
+        with mock.patch.object(conductor, 'client') as mock_client:
+            conductor.object_action(mock.sentinel.ctxt, mock.sentinel.obj,
+                                    'save', (), {})
+            self.assertEqual(0.5, tracker.average)
+            mock_client.prepare.return_value.call.side_effect = (
+                messaging.MessagingTimeout)
+            self.assertRaises(
+                messaging.MessagingTimeout,
+                conductor.object_class_action_versions, mock.sentinel.ctxt,
+                'Instance', 'get_by_uuid', {}, (), {})
+        self.assertEqual(0.45, tracker.average)
+
+
 class ConductorRPCAPITestCase(_BaseTestCase, test.TestCase):
     """Conductor RPC API Tests."""
 
@@ -591,6 +591,59 @@ class UnsupportedDbRegexpTestCase(DbTestCase):
                     marker = insts[-1]['uuid']
                     self.assertEqual(correct[-1]['uuid'], marker)
 
+    def _assert_paginate_keyset(self, correct_order, sort_keys, sort_dirs):
+        # Limits of 1, 2, and 3, verify that the instances returned are in the
+        # correct sorted order, update the marker to get the next correct page
+        for limit in range(1, 4):
+            marker = None
+            for i in range(0, len(correct_order) + 1, limit):
+                correct = correct_order[i:i + limit]
+                insts = self._assert_equals_inst_order(
+                    correct, {}, sort_keys=sort_keys, sort_dirs=sort_dirs,
+                    limit=limit, marker=marker)
+                if correct:
+                    marker = insts[-1]['uuid']
+
+    def test_instance_get_all_by_filters_sort_keys_paginate_ties(self,
+            mock_get_regexp):
+        '''Verifies pagination through instances with equal sort keys.'''
+        early = timeutils.utcnow() - datetime.timedelta(hours=1)
+        late = timeutils.utcnow()
+        insts = [self.create_instance_with_args(
+                     display_name='test%d' % (i % 2),
+                     created_at=early if i < 3 else late)
+                 for i in range(6)]
+
+        # The sort keys of the API, 'uuid' is the tie-breaker across cells
+        correct_order = sorted(
+            insts, key=lambda inst: (inst['created_at'], inst['id']),
+            reverse=True)
+        self._assert_paginate_keyset(
+            correct_order, ['created_at', 'id', 'uuid'],
+            ['desc', 'desc', 'desc'])
+
+        correct_order = sorted(
+            insts, key=lambda inst: (inst['display_name'], inst['uuid']))
+        self._assert_paginate_keyset(
+            correct_order, ['display_name', 'uuid'], ['asc', 'asc'])
+
+    def test_instance_get_all_by_filters_sort_keys_after_unique_key(self,
+            mock_get_regexp):
+        '''Verifies the sort keys after a unique key are not used.'''
+        self.create_instance_with_args()
+        with mock.patch('oslo_db.sqlalchemy.utils.paginate_query',
+                        wraps=sqlalchemyutils.paginate_query) as paginate:
+            db.instance_get_all_by_filters_sort(
+                self.context, {}, sort_keys=['created_at', 'id', 'uuid'],
+                sort_dirs=['desc', 'desc', 'desc'])
+            db.instance_get_all_by_filters_sort(
+                self.context, {}, sort_keys=['display_name'],
+                sort_dirs=['asc'])
+        self.assertEqual(['created_at', 'id'],
+                         paginate.call_args_list[0].args[3])
+        self.assertEqual(['display_name', 'created_at', 'id'],
+                         paginate.call_args_list[1].args[3])
+
 
 class ModelQueryTestCase(DbTestCase):
     def test_model_query_invalid_arguments(self):
@@ -391,6 +391,18 @@ class NovaMigrationsWalk(
             'migrations_by_dest_host_nodes_and_status_idx'
         )
 
+    def _check_5c8e1a9f3b27(self, connection):
+        self.assertIndexExists(
+            connection,
+            'instances',
+            'instances_project_id_deleted_created_at_id_idx'
+        )
+        self.assertIndexExists(
+            connection,
+            'instances',
+            'instances_project_id_deleted_display_name_uuid_idx'
+        )
+
     def test_single_base_revision(self):
         """Ensure we only have a single base revision.
 
@@ -18,6 +18,7 @@ import collections
 import copy
 from unittest import mock
 
+import fixtures
 from keystoneauth1.fixture import V2Token
 from keystoneauth1 import loading as ks_loading
 from keystoneauth1 import service_token
@@ -10256,3 +10257,184 @@ class TestGetInstanceNetworkInfo(test.NoDBTestCase):
                self.context, self.instance, current_neutron_ports)
             self.assertEqual(expected_port_list,
                              port_list)
+
+
+class _FakeNeutronClient(object):
+    """A Neutron client listing a fixed set of resources, applying the
+    filters of the listings.
+    """
+
+    def __init__(self, ports, networks, subnets, floatingips):
+        self.resources = {'ports': ports, 'networks': networks,
+                          'subnets': subnets, 'floatingips': floatingips}
+        self.calls = collections.Counter()
+
+    def _list(self, collection, **filters):
+        self.calls[collection] += 1
+        filters.pop('fields', None)
+        result = []
+        for resource in self.resources[collection]:
+            for key, value in filters.items():
+                values = value if isinstance(value, list) else [value]
+                if resource.get(key) not in values:
+                    break
+            else:
+                result.append(resource)
+        return {collection: result}
+
+    def list_ports(self, **filters):
+        return self._list('ports', **filters)
+
+    def list_networks(self, **filters):
+        return self._list('networks', **filters)
+
+    def list_subnets(self, **filters):
+        return self._list('subnets', **filters)
+
+    def list_floatingips(self, **filters):
+        return self._list('floatingips', **filters)
+
+    def show_network(self, net_id, fields=None):
+        self.calls['show_network'] += 1
+        return {'network': self._list('networks', id=net_id)['networks'][0]}
+
+
+class TestGetInstancesNetworkInfo(test.NoDBTestCase):
+    """Tests refreshing the network info of several instances at once."""
+
+    def setUp(self):
+        super(TestGetInstancesNetworkInfo, self).setUp()
+        self.api = neutronapi.API()
+        self.context = context.RequestContext(uuids.user_id, uuids.project_id)
+        self.instances = [
+            fake_instance.fake_instance_obj(
+                self.context, uuid=getattr(uuids, 'instance%d' % i),
+                project_id=uuids.project_id)
+            for i in range(3)]
+        for instance in self.instances:
+            instance.info_cache = objects.InstanceInfoCache(
+                network_info=model.NetworkInfo())
+
+        ports = []
+        for i, instance in enumerate(self.instances):
+            for j in range(2):
+                port_id = 'port%d-%d' % (i, j)
+                ports.append({
+                    'id': port_id,
+                    'device_id': instance.uuid,
+                    'tenant_id': uuids.project_id,
+                    'network_id': getattr(uuids, 'net%d' % j),
+                    'admin_state_up': True,
+                    'status': 'ACTIVE',
+                    'fixed_ips': [{'ip_address': '10.%d.0.%d' % (j, i + 2),
+                                   'subnet_id': getattr(uuids,
+                                                        'subnet%d' % j)}],
+                    'mac_address': 'de:ad:be:ef:%02d:%02d' % (i, j),
+                    'binding:vif_type': model.VIF_TYPE_OVS,
+                    'binding:vnic_type': model.VNIC_TYPE_NORMAL,
+                    'binding:vif_details': {},
+                })
+        # A port of another project claiming to belong to an instance
+        ports.append(dict(ports[0], id='foreign-port',
+                          tenant_id=uuids.other_project))
+        networks = [
+            {'id': getattr(uuids, 'net%d' % j), 'name': 'net%d' % j,
+             'tenant_id': uuids.project_id, 'mtu': 1450,
+             'provider:physical_network': 'physnet%d' % j if j else None,
+             'provider:network_type': 'vlan' if j else 'vxlan'}
+            for j in range(2)]
+        subnets = [
+            {'id': getattr(uuids, 'subnet%d' % j),
+             'network_id': getattr(uuids, 'net%d' % j),
+             'cidr': '10.%d.0.0/24' % j, 'gateway_ip': '10.%d.0.1' % j,
+             'enable_dhcp': True, 'dns_nameservers': ['8.8.8.8'],
+             'host_routes': []}
+            for j in range(2)]
+        ports.extend(
+            {'id': 'dhcp%d' % j, 'device_id': 'dhcp',
+             'device_owner': 'network:dhcp',
+             'network_id': getattr(uuids, 'net%d' % j),
+             'fixed_ips': [{'ip_address': '10.%d.0.254' % j,
+                            'subnet_id': getattr(uuids, 'subnet%d' % j)}]}
+            for j in range(2))
+        floatingips = [
+            {'port_id': 'port1-0', 'fixed_ip_address': '10.0.0.3',
+             'floating_ip_address': '172.24.4.10'}]
+        self.client = _FakeNeutronClient(ports, networks, subnets,
+                                         floatingips)
+
+        self.useFixture(fixtures.MockPatch(
+            'nova.network.neutron.get_client', return_value=self.client))
+        self.useFixture(fixtures.MockPatch(
+            'nova.compute.utils.refresh_info_cache_for_instance'))
+        self.useFixture(fixtures.MockPatchObject(
+            self.api, 'has_multi_provider_extension', return_value=False))
+        self.useFixture(fixtures.MockPatchObject(
+            self.api, 'get_vifs_by_instance', return_value=[]))
+        self.mock_update_cache = self.useFixture(fixtures.MockPatch(
+            'nova.network.neutron.update_instance_cache_with_nw_info')).mock
+
+    def test_get_instances_nw_info(self):
+        nw_infos = self.api.get_instances_nw_info(self.context,
+                                                  self.instances)
+
+        self.assertEqual({instance.uuid for instance in self.instances},
+                         set(nw_infos))
+        # One listing per kind of resource, and two of ports, whatever the
+        # number of instances
+        self.assertEqual({'ports': 2, 'networks': 1, 'subnets': 1,
+                          'floatingips': 1}, dict(self.client.calls))
+
+        nw_info = nw_infos[uuids.instance1]
+        self.assertEqual(['port1-0', 'port1-1'],
+                         [vif['id'] for vif in nw_info])
+        self.assertEqual(['10.0.0.3', '10.1.0.3'],
+                         [ip['address'] for ip in nw_info.fixed_ips()])
+        self.assertEqual(['172.24.4.10'],
+                         [ip['address'] for ip in nw_info.floating_ips()])
+        network = nw_info[1]['network']
+        self.assertEqual(uuids.net1, network['id'])
+        self.assertEqual('net1', network['label'])
+        self.assertEqual('physnet1', network['meta']['physical_network'])
+        self.assertFalse(network['meta']['tunneled'])
+        self.assertTrue(nw_info[0]['network']['meta']['tunneled'])
+        self.assertEqual('10.1.0.254',
+                         network['subnets'][0]['meta']['dhcp_server'])
+        self.assertNotIn('foreign-port',
+                         [vif['id'] for nw_info in nw_infos.values()
+                          for vif in nw_info])
+
+        self.mock_update_cache.assert_has_calls(
+            [mock.call(self.api, self.context, instance,
+                       nw_info=nw_infos[instance.uuid])
+             for instance in self.instances])
+
+    def test_get_instances_nw_info_matches_get_instance_nw_info(self):
+        nw_infos = self.api.get_instances_nw_info(self.context,
+                                                  self.instances)
+        for instance in self.instances:
+            nw_info = self.api.get_instance_nw_info(
+                self.context, instance, force_refresh=True)
+            self.assertEqual(nw_info, nw_infos[instance.uuid])
+
+    def test_get_instances_nw_info_chunks(self):
+        with mock.patch.object(neutronapi, 'BULK_FILTER_SIZE', 2):
+            nw_infos = self.api.get_instances_nw_info(self.context,
+                                                      self.instances)
+        self.assertEqual(3, len(nw_infos))
+        # Two listings of the ports of the 3 instances, one of the 2 networks,
+        # subnets and DHCP ports, and three of the floating IPs of the 6 ports
+        self.assertEqual({'ports': 3, 'networks': 1, 'subnets': 1,
+                          'floatingips': 3}, dict(self.client.calls))
+
+    def test_get_instances_nw_info_instance_deleted(self):
+        self.mock_update_cache.side_effect = [
+            None, exception.InstanceNotFound(instance_id=uuids.instance1),
+            None]
+        nw_infos = self.api.get_instances_nw_info(self.context,
+                                                  self.instances)
+        self.assertEqual({uuids.instance0, uuids.instance2}, set(nw_infos))
+
+    def test_get_instances_nw_info_no_instances(self):
+        self.assertEqual({}, self.api.get_instances_nw_info(self.context, []))
+        self.assertEqual({}, dict(self.client.calls))
@@ -13,11 +13,13 @@
 #    under the License.
 
 import copy
+import datetime
 from unittest import mock
 
 import netaddr
 from oslo_db import exception as db_exc
 from oslo_serialization import jsonutils
+from oslo_utils import fixture as utils_fixture
 from oslo_utils.fixture import uuidsentinel
 from oslo_utils import timeutils
 from oslo_versionedobjects import base as ovo_base
@@ -744,6 +746,37 @@ class _TestComputeNodeObject(object):
         self.assertEqual(3, len(nodes))
         self.assertEqual([0, 1, 1], sorted([x.mapped for x in nodes]))
 
+    def test_get_all_changed_since(self):
+        t0 = datetime.datetime(2024, 1, 1, 0, 0, 0)
+        t1 = t0 + datetime.timedelta(minutes=1)
+        t2 = t0 + datetime.timedelta(minutes=2)
+        time_fixture = self.useFixture(utils_fixture.TimeFixture(t0))
+        computes = []
+        for nodename in ('node1', 'node2', 'node3'):
+            compute = fake_compute_with_resources.obj_clone()
+            compute._context = self.context
+            compute.hypervisor_hostname = nodename
+            compute.create()
+            computes.append(compute)
+
+        time_fixture.advance_time_delta(t1 - t0)
+        computes[1].vcpus_used = 2
+        computes[1].save()
+        time_fixture.advance_time_delta(t2 - t1)
+        computes[2].destroy()
+
+        nodes = compute_node.ComputeNodeList.get_all_changed_since(
+            self.context, t0)
+        self.assertEqual(3, len(nodes))
+        nodes = compute_node.ComputeNodeList.get_all_changed_since(
+            self.context, t1)
+        self.assertEqual(
+            [('node2', False), ('node3', True)],
+            sorted((x.hypervisor_hostname, x.deleted) for x in nodes))
+        nodes = compute_node.ComputeNodeList.get_all_changed_since(
+            self.context, t2 + datetime.timedelta(seconds=1))
+        self.assertEqual(0, len(nodes))
+
 
 class TestComputeNodeObject(test_objects._LocalTest,
                             _TestComputeNodeObject):
@@ -2841,6 +2841,45 @@ class TestProviderOperations(SchedulerReportClientTestCase):
         self.assertTrue(self.client._associations_stale(rp_uuid))
         self.assertTrue(self.client._provider_tree.exists(rp_uuid))
 
+    @mock.patch.object(report.SchedulerReportClient, 'set_traits_for_provider')
+    @mock.patch.object(report.SchedulerReportClient,
+                       'set_aggregates_for_provider')
+    @mock.patch.object(report.SchedulerReportClient,
+                       'set_inventory_for_provider')
+    @mock.patch.object(report.SchedulerReportClient, '_delete_provider')
+    @mock.patch.object(report.SchedulerReportClient,
+                       '_ensure_resource_provider')
+    def test_update_from_provider_tree_root_uuid(
+            self, mock_ensure, mock_delete, mock_set_inv, mock_set_aggs,
+            mock_set_traits):
+        cache = self.client._provider_tree
+        cache.new_root('cn1', uuids.cn1, generation=1)
+        cache.new_root('cn2', uuids.cn2, generation=1)
+        new_tree = copy.deepcopy(cache)
+        new_tree.new_child('cn1_child', uuids.cn1, uuid=uuids.cn1_child)
+        # The tree of the other node changed since new_tree was copied
+        cache.new_child('cn2_child', uuids.cn2, uuid=uuids.cn2_child)
+
+        def ensure(context, uuid, name=None, parent_provider_uuid=None):
+            cache.new_child(name, parent_provider_uuid, uuid=uuid)
+        mock_ensure.side_effect = ensure
+
+        self.client.update_from_provider_tree(
+            self.context, new_tree, root_uuid=uuids.cn1)
+
+        mock_ensure.assert_called_once_with(
+            self.context, uuids.cn1_child, name='cn1_child',
+            parent_provider_uuid=uuids.cn1)
+        # The providers added to the cache for the other node are kept
+        mock_delete.assert_not_called()
+        self.assertTrue(cache.exists(uuids.cn2_child))
+        # Only the tree of the node is flushed
+        self.assertEqual(
+            [uuids.cn1_child, uuids.cn1],
+            [c[0][1] for c in mock_set_inv.call_args_list])
+        self.assertEqual(2, mock_set_aggs.call_count)
+        self.assertEqual(2, mock_set_traits.call_count)
+
 
 class TestAggregates(SchedulerReportClientTestCase):
     def test_get_provider_aggregates_found(self):
@@ -3311,6 +3350,150 @@ class TestAssociations(SchedulerReportClientTestCase):
         self.assert_getters_were_called(uuid)
 
 
+class TreeRefreshTestCase(SchedulerReportClientTestCase):
+    def setUp(self):
+        super(TreeRefreshTestCase, self).setUp()
+        self.inv = {'VCPU': {'total': 16}}
+        self.mock_get_inv = self.useFixture(fixtures.MockPatchObject(
+            self.client, '_get_inventory', return_value={
+                'resource_provider_generation': 43,
+                'inventories': self.inv})).mock
+        self.mock_get_aggs = self.useFixture(fixtures.MockPatchObject(
+            self.client, '_get_provider_aggregates',
+            return_value=report.AggInfo(
+                aggregates=set([uuids.agg1]), generation=43))).mock
+        self.mock_get_traits = self.useFixture(fixtures.MockPatchObject(
+            self.client, 'get_provider_traits',
+            return_value=report.TraitInfo(
+                traits=set(['CUSTOM_GOLD']), generation=43))).mock
+        self.mock_get_sharing = self.useFixture(fixtures.MockPatchObject(
+            self.client, '_get_sharing_providers', return_value=[])).mock
+        self.mock_gpit = self.useFixture(fixtures.MockPatchObject(
+            self.client, 'get_providers_in_tree')).mock
+        self.set_listing(43, 43)
+
+    def set_listing(self, root_generation, child_generation):
+        self.mock_gpit.return_value = [
+            {'uuid': uuids.root, 'name': 'root',
+             'generation': root_generation, 'parent_provider_uuid': None},
+            {'uuid': uuids.child, 'name': 'child',
+             'generation': child_generation,
+             'parent_provider_uuid': uuids.root},
+        ]
+
+    def expire_associations(self):
+        for uuid in self.client._association_refresh_time:
+            self.client._association_refresh_time[uuid] = 1
+        for getter in (self.mock_get_inv, self.mock_get_aggs,
+                       self.mock_get_traits, self.mock_get_sharing):
+            getter.reset_mock()
+
+
+class TestDeltaSync(TreeRefreshTestCase):
+    def setUp(self):
+        super(TestDeltaSync, self).setUp()
+        self.flags(resource_provider_delta_sync=True, group='compute')
+
+    def test_refresh_skips_unchanged_providers(self):
+        self.client._ensure_resource_provider(self.context, uuids.root)
+        self.assertEqual(2, self.mock_get_inv.call_count)
+        self.assertEqual(0, self.client.placement_calls_saved)
+
+        # The child changed in placement, the root did not
+        self.set_listing(43, 44)
+        self.expire_associations()
+        self.client._ensure_resource_provider(self.context, uuids.root)
+
+        self.mock_get_inv.assert_called_once_with(self.context, uuids.child)
+        self.mock_get_aggs.assert_called_once_with(self.context, uuids.child)
+        self.mock_get_traits.assert_called_once_with(
+            self.context, uuids.child)
+        # The sharing providers of both are still retrieved
+        self.assertEqual(2, self.mock_get_sharing.call_count)
+        self.assertEqual(3, self.client.placement_calls_saved)
+        self.assertGreater(
+            self.client._association_refresh_time[uuids.root], 1)
+        # The cached associations of the root were kept
+        self._validate_provider(
+            uuids.root, generation=43, inventory=self.inv,
+            aggregates=set([uuids.agg1]), traits=set(['CUSTOM_GOLD']))
+
+    def test_refresh_delta_sync_disabled(self):
+        self.flags(resource_provider_delta_sync=False, group='compute')
+        self.client._ensure_resource_provider(self.context, uuids.root)
+        self.expire_associations()
+        self.client._ensure_resource_provider(self.context, uuids.root)
+
+        self.assertEqual(2, self.mock_get_inv.call_count)
+        self.assertEqual(2, self.mock_get_aggs.call_count)
+        self.assertEqual(2, self.mock_get_traits.call_count)
+        self.assertEqual(0, self.client.placement_calls_saved)
+
+
+class TestBulkRefresh(TreeRefreshTestCase):
+    def setUp(self):
+        super(TestBulkRefresh, self).setUp()
+        self.flags(resource_provider_refresh_concurrency=4, group='compute')
+        self.mock_get_sharing.return_value = [
+            {'uuid': uuids.sharing, 'name': 'sharing', 'generation': 7}]
+
+    @mock.patch.object(report.SchedulerReportClient, '_refresh_associations')
+    def test_refresh_tree(self, mock_refresh):
+        pt = self.client._provider_tree
+        with mock.patch.object(pt, 'populate_from_iterable',
+                               wraps=pt.populate_from_iterable) as mock_pop:
+            self.client._ensure_resource_provider(self.context, uuids.root)
+
+        self.mock_get_inv.assert_has_calls(
+            [mock.call(self.context, uuids.root),
+             mock.call(self.context, uuids.child)], any_order=True)
+        self.assertEqual(2, self.mock_get_aggs.call_count)
+        self.assertEqual(2, self.mock_get_traits.call_count)
+        # The whole tree is cached at once
+        mock_pop.assert_called_once_with(mock.ANY)
+        for uuid in (uuids.root, uuids.child):
+            self._validate_provider(
+                uuid, generation=43, inventory=self.inv,
+                aggregates=set([uuids.agg1]), traits=set(['CUSTOM_GOLD']))
+            self.assertIn(uuid, self.client._association_refresh_time)
+        # The sharing providers of the whole tree are retrieved once
+        self.mock_get_sharing.assert_called_once_with(
+            self.context, set([uuids.agg1]))
+        mock_refresh.assert_called_once_with(
+            self.context, uuids.sharing, force=True, refresh_sharing=False)
+        self.assertTrue(self.client._provider_tree.exists(uuids.sharing))
+
+    def test_refresh_tree_lowest_generation(self):
+        # The traits changed after the listing and the other calls
+        self.mock_get_traits.return_value = report.TraitInfo(
+            traits=set(['CUSTOM_GOLD']), generation=44)
+        self.client._ensure_resource_provider(self.context, uuids.root)
+        self._validate_provider(uuids.root, generation=43)
+
+    def test_refresh_tree_error(self):
+        self.mock_get_traits.side_effect = (
+            exception.ResourceProviderTraitRetrievalFailed(uuid=uuids.child))
+        self.assertRaises(
+            exception.ResourceProviderTraitRetrievalFailed,
+            self.client._ensure_resource_provider, self.context, uuids.root)
+        self.assertFalse(self.client._provider_tree.exists(uuids.root))
+        self.assertEqual({}, self.client._association_refresh_time)
+
+    def test_refresh_tree_delta_sync(self):
+        self.flags(resource_provider_delta_sync=True, group='compute')
+        self.mock_get_sharing.return_value = []
+        self.client._ensure_resource_provider(self.context, uuids.root)
+        self.set_listing(43, 44)
+        self.expire_associations()
+        self.client._ensure_resource_provider(self.context, uuids.root)
+
+        self.mock_get_inv.assert_called_once_with(self.context, uuids.child)
+        self.assertEqual(3, self.client.placement_calls_saved)
+        self._validate_provider(
+            uuids.root, generation=43, inventory=self.inv,
+            aggregates=set([uuids.agg1]), traits=set(['CUSTOM_GOLD']))
+
+
 class TestAllocations(SchedulerReportClientTestCase):
 
     @mock.patch("nova.scheduler.client.report.SchedulerReportClient."
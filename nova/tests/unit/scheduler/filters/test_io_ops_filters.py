@@ -14,6 +14,7 @@
 from unittest import mock
 
 from nova import objects
+from nova.scheduler import columns
 from nova.scheduler.filters import io_ops_filter
 from nova import test
 from nova.tests.unit.scheduler import fakes
@@ -60,3 +61,26 @@ class TestIoOpsFilter(test.NoDBTestCase):
         spec_obj = objects.RequestSpec(context=mock.sentinel.ctx)
         self.assertTrue(self.filt_cls.host_passes(host, spec_obj))
         agg_mock.assert_called_once_with(host, 'max_io_ops_per_host')
+
+    @mock.patch('nova.scheduler.filters.utils.aggregate_values_from_key')
+    def test_aggregate_filter_num_iops_columns(self, agg_mock):
+        self.flags(max_io_ops_per_host=7, group='filter_scheduler')
+        self.filt_cls = io_ops_filter.AggregateIoOpsFilter()
+        agg1 = objects.Aggregate(id=1, metadata={})
+        agg2 = objects.Aggregate(id=2, metadata={})
+        hosts = columns.HostColumns([
+            fakes.FakeHostState('host1', 'node1',
+                                {'num_io_ops': 7, 'aggregates': [agg1]}),
+            fakes.FakeHostState('host2', 'node2',
+                                {'num_io_ops': 7, 'aggregates': [agg2]}),
+            fakes.FakeHostState('host3', 'node3',
+                                {'num_io_ops': 6, 'aggregates': [agg1]}),
+        ])
+        spec_obj = objects.RequestSpec(context=mock.sentinel.ctx)
+        agg_mock.side_effect = lambda host, key: (
+            set(['8']) if host.aggregates == [agg2] else set())
+        result = self.filt_cls.filter_all(hosts, spec_obj)
+        self.assertIsInstance(result, columns.HostColumns)
+        self.assertEqual([hosts[1], hosts[2]], result)
+        # The aggregate values are only looked up once per aggregates set
+        self.assertEqual(2, agg_mock.call_count)
@@ -10,16 +10,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from concurrent import futures
 import itertools
 from unittest import mock
 
+import fixtures
 from oslo_utils.fixture import uuidsentinel as uuids
 
 from nova import objects
+from nova.objects import base
 from nova.objects import fields
 from nova.scheduler.filters import numa_topology_filter
 from nova import test
 from nova.tests.unit.scheduler import fakes
+from nova.virt import hardware
 
 
 class TestNUMATopologyFilter(test.NoDBTestCase):
@@ -59,6 +63,31 @@ class TestNUMATopologyFilter(test.NoDBTestCase):
                                     })
         self.assertTrue(self.filt_cls.host_passes(host, spec_obj))
 
+    @mock.patch('nova.virt.hardware._NUMA_FIT_CACHE', new=None)
+    def test_numa_topology_filter_cached(self):
+        self.flags(numa_fit_cache_size=10, group='compute')
+        instance_topology = objects.InstanceNUMATopology(cells=[
+            objects.InstanceNUMACell(id=0, cpuset=set([1]), pcpuset=set(),
+                memory=512),
+            objects.InstanceNUMACell(id=1, cpuset=set([3]), pcpuset=set(),
+                memory=512),
+            ])
+        spec_obj = self._get_spec_obj(numa_topology=instance_topology)
+        hosts = [fakes.FakeHostState('host%d' % i, 'node%d' % i,
+                                     {'numa_topology': fakes.NUMA_TOPOLOGY,
+                                      'pci_stats': None,
+                                      'cpu_allocation_ratio': 16.0,
+                                      'ram_allocation_ratio': 1.5,
+                                      'allocation_candidates': [
+                                          {"mappings": {}}]})
+                 for i in range(3)]
+        with mock.patch('nova.virt.hardware._numa_fit_instance_to_host',
+                        wraps=hardware._numa_fit_instance_to_host) as mock_fit:
+            self.assertEqual(
+                hosts, list(self.filt_cls.filter_all(hosts, spec_obj)))
+        # hosts with the same NUMA cell usage are fitted once
+        mock_fit.assert_called_once()
+
     def test_numa_topology_filter_numa_instance_no_numa_host_fail(self):
         instance_topology = objects.InstanceNUMATopology(cells=[
             objects.InstanceNUMACell(id=0, cpuset=set([1]), pcpuset=set(),
@@ -416,3 +445,124 @@ class TestNUMATopologyFilter(test.NoDBTestCase):
         self.assertEqual(1, len(mock_numa_fit.mock_calls))
         # and also it made the candidates list empty in the host state
         self.assertEqual(0, len(host.allocation_candidates))
+
+
+class TestNUMATopologyFilterProcessPool(test.NoDBTestCase):
+
+    def setUp(self):
+        super(TestNUMATopologyFilterProcessPool, self).setUp()
+        self.flags(numa_fit_process_pool_size=2,
+                   numa_fit_process_pool_threshold=1,
+                   group='filter_scheduler')
+        self.useFixture(fixtures.MockPatch(
+            'nova.utils.concurrency_mode_threading', return_value=True))
+        # run the tasks in this process, through the serialization the
+        # workers get
+        self.mock_pool = mock.Mock()
+        self.mock_pool.map.side_effect = (
+            lambda func, tasks, chunksize: map(func, tasks))
+        self.useFixture(fixtures.MockPatch(
+            'nova.scheduler.filters.numa_topology_filter._get_process_pool',
+            return_value=self.mock_pool))
+        self.filt_cls = numa_topology_filter.NUMATopologyFilter()
+
+        instance_topology = objects.InstanceNUMATopology(cells=[
+            objects.InstanceNUMACell(id=0, cpuset=set([1]), pcpuset=set(),
+                memory=512),
+            objects.InstanceNUMACell(id=1, cpuset=set([3]), pcpuset=set(),
+                memory=512),
+        ])
+        self.spec_obj = objects.RequestSpec(
+            numa_topology=instance_topology,
+            pci_requests=None,
+            instance_uuid=uuids.fake,
+            flavor=objects.Flavor(extra_specs={}),
+            image=objects.ImageMeta(properties=objects.ImageMetaProps()),
+            scheduler_hints={})
+
+    def _get_hosts(self):
+        full_topology = fakes.NUMA_TOPOLOGY.obj_clone()
+        for cell in full_topology.cells:
+            cell.memory_usage = cell.memory
+        hosts = []
+        for i, topology in enumerate([fakes.NUMA_TOPOLOGY, full_topology,
+                                      full_topology, fakes.NUMA_TOPOLOGY]):
+            hosts.append(fakes.FakeHostState(
+                'host%d' % i, 'node%d' % i,
+                {'numa_topology': topology,
+                 'pci_stats': None,
+                 'cpu_allocation_ratio': 16.0,
+                 'ram_allocation_ratio': 1.5,
+                 'limits': {},
+                 'allocation_candidates': [
+                     {'mappings': {'': [getattr(uuids, 'host%d' % i)]}}]}))
+        hosts.append(fakes.FakeHostState(
+            'host4', 'node4', {'numa_topology': None, 'pci_stats': None,
+                               'limits': {}}))
+        return hosts
+
+    def _filter(self, hosts):
+        return [h.host for h in self.filt_cls.filter_all(hosts, self.spec_obj)]
+
+    def test_same_results_as_serial(self):
+        with mock.patch.object(
+                self.filt_cls, '_fit_in_process_pool', return_value=None):
+            serial_hosts = self._get_hosts()
+            expected = self._filter(serial_hosts)
+        self.assertEqual(['host0', 'host3'], expected)
+
+        hosts = self._get_hosts()
+        with mock.patch(
+                'nova.virt.hardware.numa_fit_instance_to_host',
+                wraps=hardware.numa_fit_instance_to_host) as mock_fit:
+            self.assertEqual(expected, self._filter(hosts))
+            # the instance was only fitted by the pool workers, not again by
+            # the filter itself
+            self.assertEqual(4, mock_fit.call_count)
+        self.mock_pool.map.assert_called_once()
+        self.assertEqual(
+            [h.allocation_candidates for h in serial_hosts],
+            [h.allocation_candidates for h in hosts])
+        self.assertEqual(
+            [base.obj_to_primitive(h.limits.get('numa_topology'))
+             for h in serial_hosts],
+            [base.obj_to_primitive(h.limits.get('numa_topology'))
+             for h in hosts])
+
+    def test_below_threshold(self):
+        self.flags(numa_fit_process_pool_threshold=100,
+                   group='filter_scheduler')
+        self.assertEqual(['host0', 'host3'], self._filter(self._get_hosts()))
+        self.mock_pool.map.assert_not_called()
+
+    def test_disabled(self):
+        self.flags(numa_fit_process_pool_size=0, group='filter_scheduler')
+        self.assertEqual(['host0', 'host3'], self._filter(self._get_hosts()))
+        self.mock_pool.map.assert_not_called()
+
+    def test_pci_requests(self):
+        self.spec_obj.pci_requests = objects.InstancePCIRequests(
+            requests=[objects.InstancePCIRequest(count=1)])
+        with mock.patch.object(
+                self.filt_cls, 'host_passes', return_value=True):
+            self._filter(self._get_hosts())
+        self.mock_pool.map.assert_not_called()
+
+    @mock.patch(
+        'nova.scheduler.filters.numa_topology_filter._reset_process_pool')
+    def test_pool_failure(self, mock_reset):
+        self.mock_pool.map.side_effect = futures.process.BrokenProcessPool()
+        self.assertEqual(['host0', 'host3'], self._filter(self._get_hosts()))
+        mock_reset.assert_called_once_with()
+
+    def test_fit_candidates(self):
+        host = self._get_hosts()[0]
+        task = (
+            host.numa_topology.obj_to_primitive(),
+            self.spec_obj.numa_topology.obj_to_primitive(),
+            objects.NUMATopologyLimits(
+                cpu_allocation_ratio=16.0,
+                ram_allocation_ratio=1.5).obj_to_primitive(),
+            [{'numa_node': 0, 'count': 1}], False, [{}, {'': [uuids.rp]}])
+        self.assertEqual([True, True],
+                         numa_topology_filter._fit_candidates(task))
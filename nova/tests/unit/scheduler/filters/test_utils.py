@@ -107,3 +107,26 @@ class TestUtils(test.NoDBTestCase):
         self.assertTrue(utils.instance_uuids_overlap(host_state,
                                                      [uuids.instance_1]))
         self.assertFalse(utils.instance_uuids_overlap(host_state, ['zz']))
+
+    def test_extra_specs_cache_key(self):
+        spec_obj = objects.RequestSpec(flavor=objects.Flavor(
+            extra_specs={'b': '2', 'a': '1'}))
+        self.assertEqual((('a', '1'), ('b', '2')),
+                         utils.extra_specs_cache_key(spec_obj))
+        spec_obj = objects.RequestSpec(flavor=objects.Flavor())
+        self.assertEqual((), utils.extra_specs_cache_key(spec_obj))
+
+    def test_image_props_cache_key(self):
+        def _spec(**props):
+            return objects.RequestSpec(image=objects.ImageMeta(
+                properties=objects.ImageMetaProps(**props)))
+
+        key = utils.image_props_cache_key(
+            _spec(hw_architecture='x86_64', img_hv_type='kvm'))
+        self.assertEqual(
+            key, utils.image_props_cache_key(
+                _spec(img_hv_type='kvm', hw_architecture='x86_64')))
+        self.assertNotEqual(
+            key, utils.image_props_cache_key(_spec(hw_architecture='x86_64')))
+        self.assertEqual(
+            (), utils.image_props_cache_key(objects.RequestSpec(image=None)))
@@ -0,0 +1,73 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests For the scheduler HostColumns.
+"""
+
+from unittest import mock
+
+from nova import objects
+from nova.scheduler import columns
+from nova import test
+from nova.tests.unit.scheduler import fakes
+
+
+class HostColumnsTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(HostColumnsTestCase, self).setUp()
+        self.agg1 = objects.Aggregate(id=1, metadata={'foo': '1'})
+        self.agg2 = objects.Aggregate(id=2, metadata={'foo': '2'})
+        self.hosts = [
+            fakes.FakeHostState('host1', 'node1',
+                                {'free_ram_mb': 512,
+                                 'aggregates': [self.agg1]}),
+            fakes.FakeHostState('host2', 'node2',
+                                {'free_ram_mb': 1024,
+                                 'aggregates': [self.agg2]}),
+            fakes.FakeHostState('host3', 'node3',
+                                {'free_ram_mb': 2048,
+                                 'aggregates': [self.agg1]}),
+        ]
+
+    def test_is_a_list_of_host_states(self):
+        host_columns = columns.HostColumns(iter(self.hosts))
+        self.assertIsInstance(host_columns, list)
+        self.assertEqual(self.hosts, host_columns)
+
+    def test_column_is_packed_once(self):
+        host_columns = columns.HostColumns(self.hosts)
+        col = host_columns.column('free_ram_mb')
+        self.assertEqual([512, 1024, 2048], col)
+        # The column is a snapshot of the host states
+        self.hosts[0].free_ram_mb = 0
+        self.assertIs(col, host_columns.column('free_ram_mb'))
+        self.assertEqual([512, 1024, 2048], host_columns.column('free_ram_mb'))
+
+    def test_per_aggregates_column(self):
+        host_columns = columns.HostColumns(self.hosts)
+        func = mock.Mock(
+            side_effect=lambda h: h.aggregates[0].metadata['foo'])
+        self.assertEqual(['1', '2', '1'],
+                         host_columns.per_aggregates_column(func))
+        # host1 and host3 are in the same aggregates
+        self.assertEqual(2, func.call_count)
+        func.assert_has_calls([mock.call(self.hosts[0]),
+                               mock.call(self.hosts[1])])
+
+    def test_compress(self):
+        host_columns = columns.HostColumns(self.hosts)
+        host_columns.column('free_ram_mb')
+        selected = host_columns.compress([True, False, True])
+        self.assertIsInstance(selected, columns.HostColumns)
+        self.assertEqual([self.hosts[0], self.hosts[2]], selected)
+        self.assertEqual({'free_ram_mb': [512, 2048]}, selected._columns)
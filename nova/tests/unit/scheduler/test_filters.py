@@ -233,3 +233,218 @@ class FiltersTestCase(test.NoDBTestCase):
             cargs = mock_log.call_args[0][0]
             self.assertIn("with instance ID '%s'" % fake_uuid, cargs)
             self.assertIn(exp_output, cargs)
+
+
+class FilterResultCacheTestCase(test.NoDBTestCase):
+
+    def test_lru_eviction(self):
+        cache = filters.FilterResultCache(2)
+        cache.set('a', True)
+        cache.set('b', False)
+        self.assertTrue(cache.get('a'))
+        cache.set('c', True)
+        self.assertEqual(2, len(cache))
+        # 'b' was the least recently used result
+        self.assertIsNone(cache.get('b'))
+        self.assertTrue(cache.get('a'))
+        self.assertTrue(cache.get('c'))
+        self.assertEqual(3, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+
+class CachedFiltersTestCase(test.NoDBTestCase):
+
+    class CountingFilter(filters.BaseFilter):
+        cacheable = True
+
+        def __init__(self):
+            self.calls = []
+
+        def get_cache_key(self, spec_obj):
+            return spec_obj.flavor.flavorid
+
+        def _filter_one(self, obj, spec_obj):
+            self.calls.append(obj)
+            return obj.endswith('pass')
+
+    class Handler(filters.BaseFilterHandler):
+        def _get_object_cache_key(self, obj):
+            return obj if not obj.startswith('nocache') else None
+
+    def setUp(self):
+        super(CachedFiltersTestCase, self).setUp()
+        with mock.patch.object(loadables.BaseLoader, "__init__") as mock_load:
+            mock_load.return_value = None
+            self.filter_handler = self.Handler(filters.BaseFilter)
+        self.filter_handler.filter_cache = filters.FilterResultCache(100)
+        self.filter = self.CountingFilter()
+        self.spec_obj = objects.RequestSpec(
+            flavor=objects.Flavor(flavorid='small'))
+        self.objs = ['host1-pass', 'host2-fail', 'host3-pass',
+                     'nocache-pass']
+
+    def _filter(self, objs=None, spec_obj=None):
+        return self.filter_handler.get_filtered_objects(
+            [self.filter], objs or self.objs, spec_obj or self.spec_obj)
+
+    def test_results_cached(self):
+        expected = ['host1-pass', 'host3-pass', 'nocache-pass']
+        self.assertEqual(expected, self._filter())
+        self.assertEqual(self.objs, self.filter.calls)
+
+        self.filter.calls = []
+        self.assertEqual(expected, self._filter())
+        # only the object without a cache key is filtered again
+        self.assertEqual(['nocache-pass'], self.filter.calls)
+
+        # a new object is filtered, the order of the objects is kept
+        self.filter.calls = []
+        self.assertEqual(['host0-pass'] + expected,
+                         self._filter(['host0-pass'] + self.objs))
+        self.assertEqual(['host0-pass', 'nocache-pass'], self.filter.calls)
+
+    def test_results_cached_per_request_key(self):
+        self._filter()
+        self.filter.calls = []
+        self._filter(spec_obj=objects.RequestSpec(
+            flavor=objects.Flavor(flavorid='large')))
+        self.assertEqual(self.objs, self.filter.calls)
+
+    def test_not_cacheable(self):
+        self.filter.cacheable = False
+        self._filter()
+        self._filter()
+        self.assertEqual(self.objs * 2, self.filter.calls)
+
+    def test_no_request_key(self):
+        with mock.patch.object(self.filter, 'get_cache_key',
+                               return_value=None):
+            self._filter()
+            self._filter()
+        self.assertEqual(self.objs * 2, self.filter.calls)
+
+    def test_clear_cache(self):
+        self._filter()
+        self.filter_handler.clear_cache()
+        self._filter()
+        self.assertEqual(self.objs * 2, self.filter.calls)
+
+
+class FilterOrderingTestCase(test.NoDBTestCase):
+
+    class Handler(filters.BaseFilterHandler):
+        def _use_adaptive_ordering(self):
+            return True
+
+    def setUp(self):
+        super(FilterOrderingTestCase, self).setUp()
+        with mock.patch.object(loadables.BaseLoader, "__init__") as mock_load:
+            mock_load.return_value = None
+            self.filter_handler = self.Handler(filters.BaseFilter)
+        self.calls = []
+
+    def _filter_class(self, name, keep_order=False):
+        calls = self.calls
+
+        def _filter_one(self, obj, spec_obj):
+            calls.append(name)
+            return True
+
+        return type(name, (filters.BaseFilter,),
+                    {'_filter_one': _filter_one, 'keep_order': keep_order})()
+
+    def _set_stats(self, name, objects_in, objects_out, duration_ns):
+        stats = self.filter_handler.filter_stats[name]
+        stats.objects_in = objects_in
+        stats.objects_out = objects_out
+        stats.duration_ns = duration_ns
+
+    def test_filter_stats(self):
+        stats = filters.FilterStats()
+        self.assertEqual(float('inf'), stats.rank)
+        stats.record(100, 25, 2000)
+        self.assertEqual(0.75, stats.rejection_rate)
+        self.assertEqual(20.0, stats.ns_per_object)
+        self.assertAlmostEqual(20.0 / 0.75, stats.rank)
+        stats.record(filters.FilterStats.WINDOW, 0, 0)
+        self.assertEqual((filters.FilterStats.WINDOW + 100) // 2,
+                         stats.objects_in)
+        self.assertEqual(12, stats.objects_out)
+
+    def test_stats_recorded(self):
+        filter_a = self._filter_class('FilterA')
+        self.filter_handler.get_filtered_objects(
+            [filter_a], ['host1', 'host2'], objects.RequestSpec())
+        self.assertEqual(
+            {'FilterA': {'objects_in': 2, 'objects_out': 2,
+                         'rejection_rate': 0.0, 'ns_per_object': mock.ANY}},
+            self.filter_handler.get_filter_stats())
+
+    @mock.patch('time.monotonic_ns')
+    def test_stats_not_recorded(self, mock_time):
+        filter_a = self._filter_class('FilterA')
+        with mock.patch.object(self.filter_handler, '_use_adaptive_ordering',
+                               return_value=False):
+            self.filter_handler.get_filtered_objects(
+                [filter_a], ['host1', 'host2'], objects.RequestSpec())
+        self.assertEqual({}, self.filter_handler.get_filter_stats())
+        mock_time.assert_not_called()
+
+    def test_order_filters(self):
+        # expensive and not selective
+        filter_a = self._filter_class('FilterA')
+        self._set_stats('FilterA', 1000, 900, 1000 * 1000)
+        # cheap and very selective
+        filter_b = self._filter_class('FilterB')
+        self._set_stats('FilterB', 1000, 10, 1000 * 10)
+        # never rejects anything
+        filter_c = self._filter_class('FilterC')
+        self._set_stats('FilterC', 1000, 1000, 1000)
+        # cheap and selective
+        filter_d = self._filter_class('FilterD')
+        self._set_stats('FilterD', 1000, 500, 1000 * 10)
+
+        self.filter_handler.get_filtered_objects(
+            [filter_a, filter_b, filter_c, filter_d], ['host1'],
+            objects.RequestSpec())
+        self.assertEqual(['FilterB', 'FilterD', 'FilterA', 'FilterC'],
+                         self.calls)
+
+    def test_order_filters_keep_order(self):
+        filter_a = self._filter_class('FilterA')
+        self._set_stats('FilterA', 1000, 900, 1000 * 1000)
+        filter_b = self._filter_class('FilterB', keep_order=True)
+        self._set_stats('FilterB', 1000, 900, 1000 * 1000)
+        filter_c = self._filter_class('FilterC')
+        self._set_stats('FilterC', 1000, 900, 1000 * 1000)
+        filter_d = self._filter_class('FilterD')
+        self._set_stats('FilterD', 1000, 10, 1000)
+
+        self.assertEqual(
+            [filter_a, filter_b, filter_d, filter_c],
+            self.filter_handler._order_filters(
+                [filter_a, filter_b, filter_c, filter_d]))
+
+    def test_order_filters_not_enough_samples(self):
+        filter_a = self._filter_class('FilterA')
+        self._set_stats('FilterA', 1000, 900, 1000 * 1000)
+        filter_b = self._filter_class('FilterB')
+        self._set_stats('FilterB', 10, 1, 10)
+
+        self.assertEqual(
+            [filter_a, filter_b],
+            self.filter_handler._order_filters([filter_a, filter_b]))
+
+    def test_adaptive_ordering_disabled(self):
+        filter_a = self._filter_class('FilterA')
+        self._set_stats('FilterA', 1000, 900, 1000 * 1000)
+        filter_b = self._filter_class('FilterB')
+        self._set_stats('FilterB', 1000, 10, 1000)
+        with mock.patch.object(self.filter_handler, '_use_adaptive_ordering',
+                               return_value=False):
+            self.filter_handler.get_filtered_objects(
+                [filter_a, filter_b], ['host1'], objects.RequestSpec())
+        self.assertEqual(['FilterA', 'FilterB'], self.calls)
@@ -14,8 +14,15 @@
 """
 Tests For Scheduler Host Filters.
 """
+import datetime
+from unittest import mock
+
+from oslo_utils.fixture import uuidsentinel as uuids
+
+from nova import objects
 from nova.scheduler import filters
 from nova.scheduler.filters import all_hosts_filter
+from nova.scheduler.filters import compute_capabilities_filter
 from nova.scheduler.filters import compute_filter
 from nova import test
 from nova.tests.unit.scheduler import fakes
@@ -31,7 +38,75 @@ class HostFiltersTestCase(test.NoDBTestCase):
         self.assertIn(all_hosts_filter.AllHostsFilter, classes)
         self.assertIn(compute_filter.ComputeFilter, classes)
 
+    def test_filter_stats(self):
+        host = fakes.FakeHostState('host1', 'node1', {})
+        filt_cls = all_hosts_filter.AllHostsFilter()
+        filter_handler = filters.HostFilterHandler()
+        filter_handler.get_filtered_objects([filt_cls], [host], {})
+        self.assertEqual({}, filter_handler.get_filter_stats())
+
+        self.flags(filter_stats_log_interval=0, group='filter_scheduler')
+        filter_handler.get_filtered_objects([filt_cls], [host], {})
+        self.assertEqual(
+            {'AllHostsFilter': {'objects_in': 1, 'objects_out': 1,
+                                'rejection_rate': 0.0,
+                                'ns_per_object': mock.ANY}},
+            filter_handler.get_filter_stats())
+
+    def test_filter_stats_adaptive_ordering(self):
+        self.flags(adaptive_filter_ordering=True, group='filter_scheduler')
+        host = fakes.FakeHostState('host1', 'node1', {})
+        filter_handler = filters.HostFilterHandler()
+        filter_handler.get_filtered_objects(
+            [all_hosts_filter.AllHostsFilter()], [host], {})
+        self.assertIn('AllHostsFilter', filter_handler.get_filter_stats())
+
     def test_all_host_filter(self):
         filt_cls = all_hosts_filter.AllHostsFilter()
         host = fakes.FakeHostState('host1', 'node1', {})
         self.assertTrue(filt_cls.host_passes(host, {}))
+
+
+class HostFilterCacheTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(HostFilterCacheTestCase, self).setUp()
+        self.flags(filter_result_cache_size=100, group='filter_scheduler')
+        self.filter_handler = filters.HostFilterHandler()
+        self.filter = compute_capabilities_filter.ComputeCapabilitiesFilter()
+        self.host = fakes.FakeHostState(
+            'host1', 'node1',
+            {'uuid': uuids.host1, 'stats': {'opt1': '1'},
+             'updated': datetime.datetime(2024, 1, 1)})
+        self.spec_obj = objects.RequestSpec(
+            flavor=objects.Flavor(extra_specs={'opt1': '1'}),
+            scheduler_hints={}, instance_uuid=uuids.instance)
+
+    def _filter(self):
+        return self.filter_handler.get_filtered_objects(
+            [self.filter], [self.host], self.spec_obj)
+
+    def test_cache_disabled_by_default(self):
+        self.flags(filter_result_cache_size=0, group='filter_scheduler')
+        self.assertIsNone(filters.HostFilterHandler().filter_cache)
+
+    def test_compute_node_update(self):
+        with mock.patch.object(self.filter, 'host_passes',
+                               wraps=self.filter.host_passes) as mock_passes:
+            self.assertEqual([self.host], self._filter())
+            self.assertEqual([self.host], self._filter())
+            self.assertEqual(1, mock_passes.call_count)
+
+            # the cached result is not used once the host is updated
+            self.host.stats = {'opt1': '2'}
+            self.host.updated = datetime.datetime(2024, 1, 1, 0, 1)
+            self.assertEqual([], self._filter())
+            self.assertEqual(2, mock_passes.call_count)
+
+    def test_rebuild_not_cached(self):
+        self.spec_obj.scheduler_hints = {'_nova_check_type': ['rebuild']}
+        self.host.stats = {'opt1': '2'}
+        # the filter does not run on rebuild, don't cache that the host passed
+        self.assertEqual([self.host], self._filter())
+        self.spec_obj.scheduler_hints = {}
+        self.assertEqual([], self._filter())
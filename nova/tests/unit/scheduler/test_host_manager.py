@@ -300,6 +300,16 @@ class HostManagerTestCase(test.NoDBTestCase):
         self.assertEqual({'fake-host': set([])},
                          self.host_manager.host_aggregates_map)
 
+    def test_aggregate_changes_clear_filter_cache(self):
+        fake_agg = objects.Aggregate(id=1, hosts=['fake-host'])
+        with mock.patch.object(self.host_manager.filter_handler,
+                               'clear_cache') as mock_clear:
+            self.host_manager.update_aggregates([fake_agg])
+            mock_clear.assert_called_once_with()
+            mock_clear.reset_mock()
+            self.host_manager.delete_aggregate(fake_agg)
+            mock_clear.assert_called_once_with()
+
     def test_choose_host_filters_not_found(self):
         self.assertRaises(exception.SchedulerHostFilterNotFound,
                           self.host_manager._choose_host_filters,
@@ -1709,3 +1719,112 @@ class HostStateTestCase(test.NoDBTestCase):
         self.assertEqual(0, host.free_ram_mb)
         # same with failed_builds
         self.assertEqual(0, host.failed_builds)
+
+
+class HostStateCacheTestCase(test.NoDBTestCase):
+    """Test case for the incremental HostStateCache of the HostManager."""
+
+    @mock.patch.object(host_manager.HostManager, '_init_instance_info')
+    @mock.patch.object(host_manager.HostManager, '_init_aggregates')
+    def setUp(self, mock_init_agg, mock_init_inst):
+        super(HostStateCacheTestCase, self).setUp()
+        self.flags(incremental_host_state_cache=True, group='scheduler')
+        self.host_manager = host_manager.HostManager()
+        self.cache = self.host_manager.host_state_cache
+        self.context = nova_context.get_admin_context()
+        self.cell_uuid = self.host_manager.enabled_cells[0].uuid
+        self.computes = [cn.obj_clone() for cn in fakes.COMPUTE_NODES]
+        self.useFixture(fixtures.SpawnIsSynchronousFixture())
+        patcher = mock.patch('nova.objects.InstanceList.get_uuids_by_host',
+                             return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_host_states(self, compute_uuids=None):
+        with mock.patch('nova.objects.ServiceList.get_by_binary',
+                        return_value=fakes.SERVICES):
+            compute_nodes, services = (
+                self.host_manager._get_computes_for_cells(
+                    self.context, self.host_manager.enabled_cells,
+                    compute_uuids=compute_uuids))
+            return {state.nodename: state for state in
+                    self.host_manager._get_host_states(
+                        self.context, compute_nodes, services)}
+
+    @mock.patch('nova.objects.ComputeNodeList.get_all_changed_since')
+    @mock.patch('nova.objects.ComputeNodeList.get_all')
+    def test_only_changed_nodes_are_read_and_rebuilt(self, mock_get_all,
+                                                     mock_changed):
+        mock_get_all.return_value = self.computes
+        host_states = self._get_host_states()
+        self.assertEqual(4, len(host_states))
+        mock_get_all.assert_called_once()
+        mock_changed.assert_not_called()
+        self.assertEqual(4, self.cache.misses)
+        self.assertEqual(
+            datetime.datetime(2015, 11, 11, 11, 0, 0,
+                              tzinfo=datetime.timezone.utc),
+            self.cache.changed_since[self.cell_uuid])
+
+        # node2 got updated and node4 got deleted
+        updated = self.computes[1].obj_clone()
+        updated.updated_at = datetime.datetime(2015, 11, 11, 11, 5, 0)
+        updated.free_ram_mb = 0
+        updated.deleted = False
+        deleted = self.computes[3].obj_clone()
+        deleted.deleted = True
+        mock_changed.return_value = [updated, deleted]
+
+        host_states = self._get_host_states(
+            compute_uuids=[cn.uuid for cn in self.computes[1:]])
+        mock_get_all.assert_called_once()
+        mock_changed.assert_called_once_with(
+            mock.ANY,
+            datetime.datetime(2015, 11, 11, 11, 0, 0,
+                              tzinfo=datetime.timezone.utc) -
+            host_manager.CHANGED_SINCE_MARGIN)
+        self.assertEqual(['node2', 'node3'], sorted(host_states))
+        self.assertEqual(0, host_states['node2'].free_ram_mb)
+        # Only node2 was rebuilt
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(5, self.cache.misses)
+        self.assertNotIn(self.computes[3].uuid, self.cache.host_states)
+        self.assertEqual(
+            {'hits': 1, 'misses': 5, 'hit_ratio': 1 / 6.0,
+             'staleness': mock.ANY},
+            self.cache.get_stats())
+
+    @mock.patch('nova.objects.ComputeNodeList.get_all_changed_since')
+    @mock.patch('nova.objects.ComputeNodeList.get_all')
+    def test_full_refresh(self, mock_get_all, mock_changed):
+        self.flags(host_state_cache_full_refresh_interval=0,
+                   group='scheduler')
+        mock_get_all.side_effect = [
+            self.computes, [cn.obj_clone() for cn in self.computes[:2]]]
+        self._get_host_states()
+        host_states = self._get_host_states()
+        self.assertEqual(['node1', 'node2'], sorted(host_states))
+        self.assertEqual(2, mock_get_all.call_count)
+        mock_changed.assert_not_called()
+        # The unchanged compute nodes are kept
+        self.assertEqual(2, self.cache.hits)
+        self.assertEqual(2, len(self.cache.host_states))
+
+    @mock.patch('nova.objects.ComputeNodeList.get_all_changed_since',
+                return_value=[])
+    @mock.patch('nova.objects.ComputeNodeList.get_all')
+    def test_consumed_resources_not_cached(self, mock_get_all, mock_changed):
+        mock_get_all.return_value = self.computes
+        spec_obj = objects.RequestSpec(
+            instance_uuid=uuids.instance, flavor=objects.Flavor(
+                root_gb=0, ephemeral_gb=0, memory_mb=128, vcpus=1),
+            numa_topology=None, pci_requests=None)
+        host_state = self._get_host_states()['node1']
+        host_state.consume_from_request(spec_obj)
+        host_state.limits['foo'] = 'bar'
+        self.assertEqual(384, host_state.free_ram_mb)
+
+        host_state = self._get_host_states()['node1']
+        self.assertEqual(512, host_state.free_ram_mb)
+        self.assertEqual({}, host_state.limits)
+        self.assertEqual(0, host_state.num_io_ops)
@@ -19,6 +19,7 @@ Tests For Scheduler
 
 from unittest import mock
 
+import fixtures
 from keystoneauth1 import exceptions as ks_exc
 import oslo_messaging as messaging
 from oslo_serialization import jsonutils
@@ -33,8 +34,11 @@ from nova.objects import service
 from nova.scheduler import filters
 from nova.scheduler import host_manager
 from nova.scheduler import manager
+from nova.scheduler import timing
 from nova.scheduler import utils as scheduler_utils
 from nova.scheduler import weights
+from nova.scheduler.weights import num_instances
+from nova.scheduler.weights import ram
 from nova import servicegroup
 from nova import test
 from nova.tests.unit import fake_server_actions
@@ -1607,6 +1611,58 @@ class SchedulerManagerTestCase(test.NoDBTestCase):
         get_host_states.assert_called_once_with(
             mock.sentinel.ctxt, [], mock.sentinel.spec_obj)
 
+    @mock.patch.object(manager.LOG, 'info')
+    def test_log_filter_stats(self, mock_log):
+        stats = self.manager.host_manager.filter_handler.filter_stats
+        stats['FilterB'].record(100, 10, 5000)
+        stats['FilterA'].record(100, 50, 1000)
+        self.manager._log_filter_stats(self.context)
+        self.assertEqual(2, mock_log.call_count)
+        self.assertEqual(
+            {'name': 'FilterA', 'objects_in': 100, 'objects_out': 50,
+             'rejection_rate': 0.5, 'ns_per_object': 10.0},
+            mock_log.call_args_list[0][0][1])
+        self.assertEqual('FilterB', mock_log.call_args_list[1][0][1]['name'])
+
+    @mock.patch.object(manager.LOG, 'info')
+    def test_dump_request_timings_log(self, mock_log):
+        slowest_requests = mock.Mock()
+        slowest_requests.get.return_value = [
+            {'request_id': 'req-1', 'duration_ms': 12.5,
+             'phases': [{'name': 'filtering', 'duration_ms': 2.0,
+                         'count': 1},
+                        {'name': 'claim_resources', 'duration_ms': 10.0,
+                         'count': 1}]}]
+        with mock.patch('nova.scheduler.timing.get_slowest_requests',
+                        return_value=slowest_requests):
+            self.manager._dump_request_timings(self.context)
+        mock_log.assert_called_once()
+        self.assertEqual(
+            'Request req-1 took 12.5 ms: filtering 2.0 ms, '
+            'claim_resources 10.0 ms',
+            mock_log.call_args[0][0] % mock_log.call_args[0][1])
+
+    @mock.patch.object(manager.LOG, 'info')
+    def test_dump_request_timings_disabled(self, mock_log):
+        self.flags(request_timing_buffer_size=0, group='filter_scheduler')
+        self.manager._dump_request_timings(self.context)
+        mock_log.assert_not_called()
+
+    @mock.patch('nova.scheduler.timing.dump', return_value=3)
+    def test_dump_request_timings_file(self, mock_dump):
+        self.flags(request_timing_dump_file='/fake/timings.json',
+                   group='filter_scheduler')
+        self.manager._dump_request_timings(self.context)
+        mock_dump.assert_called_once_with('/fake/timings.json')
+
+    @mock.patch.object(manager.LOG, 'warning')
+    @mock.patch('nova.scheduler.timing.dump', side_effect=PermissionError)
+    def test_dump_request_timings_file_error(self, mock_dump, mock_warning):
+        self.flags(request_timing_dump_file='/fake/timings.json',
+                   group='filter_scheduler')
+        self.manager._dump_request_timings(self.context)
+        mock_warning.assert_called_once()
+
     def test_update_aggregates(self):
         with mock.patch.object(
             self.manager.host_manager, 'update_aggregates',
@@ -2284,3 +2340,162 @@ class SchedulerManagerAllocationCandidateTestCase(test.NoDBTestCase):
                 uuids.group_req1
             ],
         )
+
+
+class SchedulerManagerBatchTestCase(test.NoDBTestCase):
+    """Test case for the batch multi-instance scheduling mode."""
+
+    class CountingRamFilter(filters.BaseHostFilter):
+        """A filter passing the hosts with 512MB of free RAM"""
+
+        def __init__(self):
+            super().__init__()
+            self.calls = 0
+
+        def host_passes(self, host_state, spec_obj):
+            self.calls += 1
+            return host_state.free_ram_mb >= 512
+
+    @mock.patch.object(
+        host_manager.HostManager, '_init_instance_info', new=mock.Mock())
+    @mock.patch.object(
+        host_manager.HostManager, '_init_aggregates', new=mock.Mock())
+    def setUp(self):
+        super().setUp()
+        self.context = context.RequestContext('fake_user', 'fake_project')
+        self.manager = manager.SchedulerManager()
+        self.filter = self.CountingRamFilter()
+        self.manager.host_manager.enabled_filters = [self.filter]
+        self.manager.host_manager.weighers = [
+            ram.RAMWeigher(), num_instances.NumInstancesWeigher()]
+        self.request_spec = objects.RequestSpec(
+            ignore_hosts=[],
+            force_hosts=[],
+            force_nodes=[],
+            requested_resources=[],
+            instance_group=None,
+        )
+
+        self.hosts = []
+        self.alloc_reqs_by_rp_uuid = {}
+        for i, free_ram_mb in enumerate((2048, 1536, 1024, 512, 256)):
+            host = fakes.FakeHostState(
+                'host%d' % i, 'node%d' % i,
+                {'uuid': getattr(uuids, 'host%d' % i),
+                 'cell_uuid': uuids.cell, 'free_ram_mb': free_ram_mb,
+                 'num_instances': 0, 'instances': {}, 'limits': {},
+                 'updated': None})
+            self.hosts.append(host)
+            self.alloc_reqs_by_rp_uuid[host.uuid] = [
+                {'allocations': {host.uuid: {'resources': {'MEMORY_MB': 512}}},
+                 'mappings': {}}]
+
+        def consume(host, spec_obj, instance_uuid=None):
+            host.free_ram_mb -= 512
+            host.num_instances += 1
+
+        self.useFixture(fixtures.MockPatchObject(
+            manager.SchedulerManager, '_consume_selected_host',
+            side_effect=consume))
+        self.useFixture(fixtures.MockPatchObject(
+            manager.SchedulerManager, '_get_all_host_states',
+            side_effect=lambda *a: iter(self.hosts)))
+        self.useFixture(fixtures.MockPatch(
+            'nova.scheduler.utils.claim_resources', return_value=True))
+
+    def _schedule(self, num_instances, batch):
+        self.flags(batch_multi_instance_scheduling=batch,
+                   group='filter_scheduler')
+        instance_uuids = [getattr(uuids, 'inst%d' % i)
+                          for i in range(num_instances)]
+        return self.manager._schedule(
+            self.context, self.request_spec, instance_uuids,
+            self.alloc_reqs_by_rp_uuid, mock.sentinel.provider_summaries,
+            'fake-alloc-req-version', return_alternates=True)
+
+    def _selected_hosts(self, selections):
+        return [[s.service_host for s in selection]
+                for selection in selections]
+
+    @mock.patch('nova.scheduler.timing._SLOWEST_REQUESTS', new=None)
+    @mock.patch('nova.compute.utils.notify_about_scheduler_action',
+                new=mock.Mock())
+    @mock.patch('nova.scheduler.request_filter.process_reqspec')
+    @mock.patch('nova.scheduler.utils.resources_from_request_spec')
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                'get_allocation_candidates')
+    def test_request_timings(self, mock_get_ac, mock_rfrs, mock_process):
+        self.flags(request_timing_buffer_size=1, group='filter_scheduler')
+        mock_rfrs.return_value.cpu_pinning_requested = False
+        alloc_reqs = [ar for ars in self.alloc_reqs_by_rp_uuid.values()
+                      for ar in ars]
+        mock_get_ac.return_value = (
+            alloc_reqs, {h.uuid: {} for h in self.hosts}, '1.36')
+        self.manager.notifier = mock.Mock()
+        self.manager.select_destinations(
+            self.context, spec_obj=self.request_spec,
+            instance_uuids=[uuids.inst0, uuids.inst1],
+            return_objects=True, return_alternates=True)
+
+        request = timing.get_slowest_requests().get()[0]
+        self.assertEqual(2, request['num_instances'])
+        # The hosts are filtered and weighed once per instance and once more
+        # for the alternates
+        self.assertEqual(
+            {'allocation_candidates': 1, 'filtering': 3,
+             'filter:CountingRamFilter': 3, 'weighing': 3,
+             'weigher:RAMWeigher': 3, 'weigher:NumInstancesWeigher': 3,
+             'claim_resources': 2},
+            {p['name']: p['count'] for p in request['phases']})
+
+    def test_same_selections_as_default_mode(self):
+        default = self._selected_hosts(self._schedule(6, batch=False))
+        for host, free_ram_mb in zip(
+                self.hosts, (2048, 1536, 1024, 512, 256)):
+            host.free_ram_mb = free_ram_mb
+            host.num_instances = 0
+
+        batch = self._selected_hosts(self._schedule(6, batch=True))
+        self.assertEqual(default, batch)
+        self.assertEqual(
+            ['host0', 'host0', 'host1', 'host1', 'host0', 'host2'],
+            [hosts[0] for hosts in batch])
+
+    def test_hosts_filtered_once(self):
+        self._schedule(6, batch=True)
+        # every host once, then the host selected for each instance
+        self.assertEqual(len(self.hosts) + 6, self.filter.calls)
+
+    def test_consumed_host_dropped(self):
+        # stack the instances so the host with the least free RAM is
+        # selected until it does not pass the filters anymore
+        self.flags(ram_weight_multiplier=-1.0, group='filter_scheduler')
+        selections = self._schedule(3, batch=True)
+        self.assertEqual([['host3', 'host1', 'host0'],
+                          ['host2', 'host1', 'host0'],
+                          ['host2', 'host1', 'host0']],
+                         self._selected_hosts(selections))
+        self.assertEqual(0, self.hosts[3].free_ram_mb)
+        self.assertEqual(0, self.hosts[2].free_ram_mb)
+
+    @mock.patch('random.choice', side_effect=lambda hosts: hosts[-1])
+    def test_host_subset_size(self, mock_choice):
+        self.flags(host_subset_size=3, group='filter_scheduler')
+        selections = self._schedule(2, batch=True)
+        # the last of the 3 best hosts is picked each time, host2 being still
+        # third once it consumed the first instance
+        self.assertEqual(['host2', 'host2'],
+                         [hosts[0] for hosts in
+                          self._selected_hosts(selections)])
+
+    def test_not_enough_hosts(self):
+        self.assertRaises(exception.NoValidHost, self._schedule, 11, True)
+
+    @mock.patch.object(manager, 'WeighedHostHeap')
+    def test_instance_group_uses_default_mode(self, mock_heap):
+        self.request_spec.instance_group = objects.InstanceGroup(
+            policy='anti-affinity', hosts=[])
+        self.request_spec.instance_group.obj_reset_changes()
+        selections = self._schedule(2, batch=True)
+        self.assertEqual(2, len(selections))
+        mock_heap.assert_not_called()
@@ -0,0 +1,159 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+from unittest import mock
+
+import fixtures
+
+from nova import context as nova_context
+from nova import exception
+from nova import objects
+from nova.scheduler import filters
+from nova.scheduler import timing
+from nova.scheduler import weights
+from nova.scheduler.weights import ram
+from nova import test
+from nova.tests.unit.scheduler import fakes
+
+
+class FakeManager(object):
+
+    def __init__(self, test_case):
+        self.test_case = test_case
+        self.timings = None
+
+    @timing.timed_request
+    def select_destinations(self, context, spec_obj=None,
+                            instance_uuids=None, durations=None, error=None):
+        self.timings = timing.current()
+        for name, duration in durations or []:
+            with timing.phase(name):
+                self.test_case.clock += duration
+        if error:
+            raise error
+        return mock.sentinel.selections
+
+
+class TimingTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(TimingTestCase, self).setUp()
+        self.flags(request_timing_buffer_size=2, group='filter_scheduler')
+        self.useFixture(fixtures.MockPatch(
+            'nova.scheduler.timing._SLOWEST_REQUESTS', new=None))
+        self.clock = 0
+        self.useFixture(fixtures.MockPatch(
+            'time.monotonic_ns', side_effect=lambda: self.clock))
+        self.context = nova_context.RequestContext(
+            'fake-user', 'fake-project')
+        self.manager = FakeManager(self)
+
+    def _schedule(self, durations, **kwargs):
+        return self.manager.select_destinations(
+            self.context, spec_obj=mock.sentinel.spec_obj,
+            durations=durations, **kwargs)
+
+    def test_disabled(self):
+        self.flags(request_timing_buffer_size=0, group='filter_scheduler')
+        self.assertEqual(mock.sentinel.selections,
+                         self._schedule([('filtering', 10)]))
+        self.assertIsNone(self.manager.timings)
+        self.assertIsNone(timing.get_slowest_requests())
+
+    def test_phases(self):
+        self.assertEqual(
+            mock.sentinel.selections,
+            self._schedule(
+                [('allocation_candidates', 5000000), ('filtering', 1000000),
+                 ('claim_resources', 2000000), ('filtering', 500000)],
+                instance_uuids=['inst1', 'inst2']))
+        self.assertIsNone(timing.current())
+
+        requests = timing.get_slowest_requests().get()
+        self.assertEqual(1, len(requests))
+        request = requests[0]
+        self.assertEqual(self.context.request_id, request['request_id'])
+        self.assertEqual(2, request['num_instances'])
+        self.assertEqual(8.5, request['duration_ms'])
+        self.assertIsNone(request['error'])
+        self.assertEqual(
+            [{'name': 'allocation_candidates', 'duration_ms': 5.0,
+              'count': 1},
+             {'name': 'filtering', 'duration_ms': 1.5, 'count': 2},
+             {'name': 'claim_resources', 'duration_ms': 2.0, 'count': 1}],
+            request['phases'])
+
+    def test_error(self):
+        self.assertRaises(
+            exception.NoValidHost, self._schedule, [('filtering', 10)],
+            error=exception.NoValidHost(reason=''))
+        self.assertIsNone(timing.current())
+        requests = timing.get_slowest_requests().get()
+        self.assertEqual('NoValidHost', requests[0]['error'])
+
+    def test_keeps_slowest(self):
+        for duration in (3, 1, 4, 2):
+            self._schedule([('filtering', duration * 1000000)])
+        self.assertEqual(
+            [4.0, 3.0],
+            [r['duration_ms'] for r in timing.get_slowest_requests().get()])
+
+    def test_resize(self):
+        self._schedule([('filtering', 10)])
+        self.flags(request_timing_buffer_size=5, group='filter_scheduler')
+        slowest_requests = timing.get_slowest_requests()
+        self.assertEqual(5, slowest_requests.size)
+        self.assertEqual(0, len(slowest_requests))
+
+    def test_phase_outside_request(self):
+        with timing.phase('filtering'):
+            pass
+        self.assertIsNone(timing.current())
+
+    def test_filters_and_weighers(self):
+        class FakeFilter(filters.BaseHostFilter):
+            def host_passes(inner_self, host_state, spec_obj):
+                self.clock += 1000
+                return True
+
+        hosts = [fakes.FakeHostState('host%d' % i, 'node%d' % i,
+                                     {'free_ram_mb': 1024 * i})
+                 for i in range(2)]
+        spec_obj = objects.RequestSpec(ignore_hosts=None)
+        filter_handler = filters.HostFilterHandler()
+        weight_handler = weights.HostWeightHandler()
+
+        @timing.timed_request
+        def select_destinations(manager, context):
+            filter_handler.get_filtered_objects(
+                [FakeFilter()], hosts, spec_obj)
+            weight_handler.get_weighed_objects(
+                [ram.RAMWeigher()], hosts, spec_obj)
+
+        select_destinations(None, self.context)
+        phases = {
+            p['name']: p['count']
+            for p in timing.get_slowest_requests().get()[0]['phases']}
+        self.assertEqual({'filter:FakeFilter': 1, 'weigher:RAMWeigher': 1},
+                         phases)
+
+    def test_dump_and_load(self):
+        self.flags(host='sched1')
+        self._schedule([('filtering', 1000000)])
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'timings.json')
+        self.assertEqual(1, timing.dump(path))
+        data = timing.load(path)
+        self.assertEqual('sched1', data['host'])
+        self.assertEqual(timing.get_slowest_requests().get(),
+                         data['requests'])
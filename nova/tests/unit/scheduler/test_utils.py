@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
 import itertools
 from unittest import mock
 
@@ -2302,6 +2303,64 @@ class TestUtils(TestUtilsBase):
         mock_map.assert_called_once_with(allocation, {uuids.rp_uuid: traits})
 
 
+class TestFreezeAllocationRequest(test.NoDBTestCase):
+
+    def setUp(self):
+        super(TestFreezeAllocationRequest, self).setUp()
+        self.alloc_req = {
+            'allocations': {
+                uuids.compute_node: {
+                    'resources': {'VCPU': 1, 'MEMORY_MB': 512},
+                },
+                uuids.pf: {
+                    'resources': {'NET_BW_EGR_KILOBIT_PER_SEC': 1000},
+                },
+            },
+            'mappings': {
+                '': [uuids.compute_node],
+                uuids.port: [uuids.pf],
+            },
+        }
+        self.frozen = utils.freeze_allocation_request(self.alloc_req)
+
+    def test_equal_to_original(self):
+        self.assertEqual(self.alloc_req, self.frozen)
+        self.assertEqual(jsonutils.dumps(self.alloc_req, sort_keys=True),
+                         jsonutils.dumps(self.frozen, sort_keys=True))
+
+    def test_modifications_raise(self):
+        resources = self.frozen['allocations'][uuids.compute_node][
+            'resources']
+        mapping = self.frozen['mappings'][uuids.port]
+        self.assertRaises(TypeError, self.frozen.__setitem__, 'foo', 1)
+        self.assertRaises(TypeError, self.frozen.pop, 'mappings')
+        self.assertRaises(TypeError, resources.update, {'VCPU': 2})
+        self.assertRaises(TypeError, resources.__delitem__, 'VCPU')
+        self.assertRaises(TypeError, mapping.append, uuids.other)
+        self.assertRaises(TypeError, mapping.__setitem__, 0, uuids.other)
+        self.assertEqual(self.alloc_req, self.frozen)
+
+    def test_copies_are_modifiable(self):
+        copied = copy.deepcopy(self.frozen)
+        self.assertIs(dict, type(copied))
+        self.assertIs(
+            list, type(copied['mappings'][uuids.port]))
+        copied['allocations'][uuids.compute_node]['resources']['VCPU'] = 2
+        copied['mappings'][uuids.port].append(uuids.other)
+        # the frozen allocation request is left untouched
+        self.assertEqual(self.alloc_req, self.frozen)
+
+        shallow = copy.copy(self.frozen)
+        self.assertIs(dict, type(shallow))
+        shallow['foo'] = 'bar'
+        self.assertNotIn('foo', self.frozen)
+
+    def test_original_untouched(self):
+        self.assertIsNot(self.alloc_req['mappings'], self.frozen['mappings'])
+        self.alloc_req['mappings'][''].append(uuids.other)
+        self.assertEqual([uuids.compute_node], self.frozen['mappings'][''])
+
+
 @ddt.ddt
 class TestEncryptedMemoryTranslation(TestUtilsBase):
     flavor_name = 'm1.test'
@@ -16,10 +16,16 @@
 Tests For Scheduler weights.
 """
 
+from unittest import mock
+
+from nova import objects
 from nova.scheduler import weights
 from nova.scheduler.weights import affinity
+from nova.scheduler.weights import cpu
+from nova.scheduler.weights import disk
 from nova.scheduler.weights import io_ops
 from nova.scheduler.weights import metrics
+from nova.scheduler.weights import num_instances
 from nova.scheduler.weights import ram
 from nova import test
 from nova.tests.unit import matchers
@@ -41,3 +47,98 @@ class TestWeighedHost(test.NoDBTestCase):
         self.assertIn(io_ops.IoOpsWeigher, classes)
         self.assertIn(affinity.ServerGroupSoftAffinityWeigher, classes)
         self.assertIn(affinity.ServerGroupSoftAntiAffinityWeigher, classes)
+
+
+class TestColumnarWeighing(test.NoDBTestCase):
+
+    def _get_all_hosts(self):
+        agg = objects.Aggregate(
+            id=1, metadata={'ram_weight_multiplier': '-1.0'})
+        host_values = [
+            ('host1', 'node1', {'free_ram_mb': 512, 'free_disk_mb': 4096,
+                                'vcpus_total': 8, 'vcpus_used': 2,
+                                'cpu_allocation_ratio': 4.0,
+                                'num_io_ops': 3, 'num_instances': 5}),
+            ('host2', 'node2', {'free_ram_mb': 1024, 'free_disk_mb': 1024,
+                                'vcpus_total': 16, 'vcpus_used': 30,
+                                'cpu_allocation_ratio': 2.0,
+                                'num_io_ops': 0, 'num_instances': 2,
+                                'aggregates': [agg]}),
+            ('host3', 'node3', {'free_ram_mb': 3072, 'free_disk_mb': 2048,
+                                'vcpus_total': 4, 'vcpus_used': 0,
+                                'cpu_allocation_ratio': 16.0,
+                                'num_io_ops': 1, 'num_instances': 9}),
+            ('host4', 'node4', {'free_ram_mb': 8192, 'free_disk_mb': 0,
+                                'vcpus_total': 8, 'vcpus_used': 8,
+                                'cpu_allocation_ratio': 1.0,
+                                'num_io_ops': 8, 'num_instances': 0,
+                                'aggregates': [agg]}),
+        ]
+        return [fakes.FakeHostState(host, node, values)
+                for host, node, values in host_values]
+
+    def test_columnar_matches_per_host(self):
+        weighers = [ram.RAMWeigher(), disk.DiskWeigher(), cpu.CPUWeigher(),
+                    io_ops.IoOpsWeigher(), num_instances.NumInstancesWeigher(),
+                    affinity.ServerGroupSoftAffinityWeigher()]
+        weight_handler = weights.HostWeightHandler()
+        spec_obj = objects.RequestSpec(instance_group=None)
+
+        expected = [
+            (w.obj.host, w.weight)
+            for w in weight_handler.get_weighed_objects(
+                weighers, self._get_all_hosts(), spec_obj)]
+
+        self.flags(columnar_host_evaluation=True, group='filter_scheduler')
+        with mock.patch.object(
+            ram.RAMWeigher, 'weigh_objects',
+            side_effect=AssertionError('per host path used'),
+        ):
+            result = [
+                (w.obj.host, w.weight)
+                for w in weight_handler.get_weighed_objects(
+                    weighers, self._get_all_hosts(), spec_obj)]
+
+        self.assertEqual(expected, result)
+
+    def test_columnar_ranges(self):
+        weighers = [ram.RAMWeigher(), disk.DiskWeigher()]
+        weight_handler = weights.HostWeightHandler()
+        spec_obj = objects.RequestSpec(instance_group=None)
+
+        expected = weight_handler.get_weighed_objects_and_ranges(
+            weighers, self._get_all_hosts(), spec_obj)
+
+        self.flags(columnar_host_evaluation=True, group='filter_scheduler')
+        with mock.patch.object(
+            ram.RAMWeigher, 'weigh_objects',
+            side_effect=AssertionError('per host path used'),
+        ):
+            weighed_hosts, ranges = (
+                weight_handler.get_weighed_objects_and_ranges(
+                    weighers, self._get_all_hosts(), spec_obj))
+
+        self.assertEqual([(w.obj.host, w.weight) for w in expected[0]],
+                         [(w.obj.host, w.weight) for w in weighed_hosts])
+        self.assertEqual(expected[1], ranges)
+        self.assertEqual([(0, 8192), (0, 4096)], ranges)
+
+    @mock.patch('nova.weights.LOG.debug')
+    def test_columnar_debug_logs(self, mock_debug):
+        self.flags(columnar_host_evaluation=True, group='filter_scheduler')
+        weight_handler = weights.HostWeightHandler()
+        spec_obj = objects.RequestSpec(instance_group=None)
+
+        with mock.patch('nova.weights.LOG.isEnabledFor', return_value=True):
+            weight_handler.get_weighed_objects(
+                [ram.RAMWeigher()], self._get_all_hosts(), spec_obj)
+
+        self.assertEqual(
+            ['%s: raw weights %s', '%s: normalized weights %s',
+             '%s: score (multiplier * weight) %s'],
+            [call.args[0] for call in mock_debug.call_args_list])
+        self.assertEqual(
+            ('RAMWeigher', {('host1', 'node1'): 512, ('host2', 'node2'): 1024,
+                            ('host3', 'node3'): 3072,
+                            ('host4', 'node4'): 8192}),
+            mock_debug.call_args_list[0].args[1:])
@@ -294,3 +294,70 @@ class AvailabilityZoneTestCases(test.TestCase):
 
         result = az.get_instance_availability_zone(self.context, fake_inst)
         self.assertIsNone(result)
+
+    def test_get_instances_availability_zones(self):
+        az.reset_cache()
+        host = 'host170'
+        service = self._create_service_with_topic('compute', host)
+        self._add_to_aggregate(service, self.agg)
+        instances = [
+            objects.Instance(uuid=uuidsentinel.inst1, host=host,
+                             availability_zone=None),
+            objects.Instance(uuid=uuidsentinel.inst2, host=host,
+                             availability_zone=None),
+            objects.Instance(uuid=uuidsentinel.inst3, host=self.host,
+                             availability_zone=None),
+            objects.Instance(uuid=uuidsentinel.inst4, host=None,
+                             availability_zone='inst-az'),
+            objects.Instance(uuid=uuidsentinel.inst5,
+                             availability_zone='inst-az'),
+        ]
+        expected = {
+            uuidsentinel.inst1: self.availability_zone,
+            uuidsentinel.inst2: self.availability_zone,
+            uuidsentinel.inst3: self.default_az,
+            uuidsentinel.inst4: 'inst-az',
+            uuidsentinel.inst5: 'inst-az',
+        }
+
+        with mock.patch.object(
+                objects.AggregateList, 'get_by_metadata_key',
+                wraps=objects.AggregateList.get_by_metadata_key) as mock_get:
+            self.assertEqual(
+                expected,
+                az.get_instances_availability_zones(self.context, instances))
+            # The availability zones of both hosts are looked up at once
+            mock_get.assert_called_once_with(
+                mock.ANY, 'availability_zone', hosts={host, self.host})
+
+            # The availability zones are now cached
+            self.assertEqual(
+                expected,
+                az.get_instances_availability_zones(self.context, instances))
+            mock_get.assert_called_once()
+
+        self.assertEqual(
+            self.availability_zone,
+            az._get_cache().get(az._make_cache_key(host)))
+
+    def test_get_instances_availability_zones_cache_differs(self):
+        az.reset_cache()
+        host = 'host170'
+        service = self._create_service_with_topic('compute', host)
+        self._add_to_aggregate(service, self.agg)
+        az._get_cache().set(az._make_cache_key(host), self.default_az)
+
+        instances = [
+            objects.Instance(uuid=uuidsentinel.inst1, host=host,
+                             availability_zone=None),
+            objects.Instance(uuid=uuidsentinel.inst2, host=host,
+                             availability_zone=self.availability_zone),
+        ]
+        self.assertEqual(
+            {uuidsentinel.inst1: self.availability_zone,
+             uuidsentinel.inst2: self.availability_zone},
+            az.get_instances_availability_zones(self.context, instances))
+
+    def test_get_instances_availability_zones_no_instances(self):
+        self.assertEqual(
+            {}, az.get_instances_availability_zones(self.context, []))
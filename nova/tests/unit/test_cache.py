@@ -57,3 +57,9 @@ class TestOsloCache(test.NoDBTestCase):
 
         methods_called = [a[0] for n, a, k in mock_cacheregion.mock_calls]
         self.assertEqual(['dogpile.cache.null'], methods_called)
+
+    def test_get_multi_set_multi(self):
+        client = cache_utils.get_client(expiration_time=60)
+        self.assertEqual([None, None], client.get_multi(['a', 'b']))
+        client.set_multi({'a': 1, 'c': 3})
+        self.assertEqual([1, None, 3], client.get_multi(['a', 'b', 'c']))
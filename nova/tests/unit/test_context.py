@@ -621,6 +621,91 @@ class ContextTestCase(test.NoDBTestCase):
         # NovaExceptions are not logged, the caller should handle them.
         mock_log_exception.assert_not_called()
 
+    def test_scatter_gather_cells_latencies(self):
+        ctxt = context.get_context()
+        mappings = [objects.CellMapping(database_connection='fake://db',
+                                        transport_url='none:///',
+                                        uuid=cell_uuid)
+                    for cell_uuid in (uuids.cell0, uuids.cell1)]
+
+        def task(cctxt):
+            if cctxt.cell_uuid == uuids.cell1:
+                raise test.TestingException()
+
+        for _ in range(3):
+            context.scatter_gather_cells(ctxt, mappings, 30, task)
+
+        histograms = context.CELL_LATENCIES.get_histograms()
+        self.assertEqual({uuids.cell0, uuids.cell1}, set(histograms))
+        for cell_histograms in histograms.values():
+            # Failed calls are counted too
+            self.assertEqual(3, cell_histograms['queued'].count)
+            self.assertEqual(3, cell_histograms['run'].count)
+
+    def test_latency_histogram(self):
+        histogram = context.LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+
+        for latency in (0.001, 0.004, 0.02, 0.02, 0.3, 0.3, 0.3, 3, 3, 100):
+            histogram.record(latency)
+        self.assertEqual(10, histogram.count)
+        self.assertAlmostEqual(106.945, histogram.total)
+        self.assertEqual(0.005, histogram.percentile(0))
+        self.assertEqual(0.005, histogram.percentile(20))
+        self.assertEqual(0.025, histogram.percentile(40))
+        self.assertEqual(0.5, histogram.percentile(50))
+        self.assertEqual(5, histogram.percentile(90))
+        self.assertEqual(float('inf'), histogram.percentile(99))
+
+    @mock.patch('nova.context.LOG.info')
+    def test_cell_latencies_log_stats(self, mock_info):
+        self.flags(cell_latency_statistic_period=60)
+        latencies = context.CellLatencies()
+
+        with mock.patch('time.monotonic', return_value=100):
+            latencies.record(uuids.cell1, 0.001, 0.2)
+            latencies.record(uuids.cell0, 0.001, 0.02)
+        # Logged on the first call only, then at most once a minute
+        mock_info.assert_called_once_with(
+            'Calls to cell %(cell)s: %(count)d, queued p50 %(queued_p50)s s '
+            'p99 %(queued_p99)s s, run p50 %(run_p50)s s p99 %(run_p99)s s',
+            {'cell': uuids.cell1, 'count': 1, 'queued_p50': 0.005,
+             'queued_p99': 0.005, 'run_p50': 0.25, 'run_p99': 0.25})
+
+        mock_info.reset_mock()
+        with mock.patch('time.monotonic', return_value=160):
+            latencies.record(uuids.cell1, 0.001, 2)
+        self.assertEqual(2, mock_info.call_count)
+        self.assertEqual(
+            {'cell': uuids.cell1, 'count': 2, 'queued_p50': 0.005,
+             'queued_p99': 0.005, 'run_p50': 0.25, 'run_p99': 2.5},
+            mock_info.call_args_list[
+                sorted((uuids.cell0, uuids.cell1)).index(uuids.cell1)][0][1])
+
+    @mock.patch('nova.context.LOG.info')
+    def test_cell_latencies_log_stats_disabled(self, mock_info):
+        latencies = context.CellLatencies()
+        latencies.record(uuids.cell0, 0.001, 0.02)
+        mock_info.assert_not_called()
+
+    @mock.patch('nova.context.LOG.warning')
+    def test_scatter_gather_cells_queued_warning(self, mock_warning):
+        ctxt = context.get_context()
+        mapping = objects.CellMapping(database_connection='fake://db',
+                                      transport_url='none:///',
+                                      uuid=uuids.cell0)
+
+        # The task is queued at 0 and only starts after 20 seconds
+        with mock.patch('time.monotonic', side_effect=[0, 20, 20, 20]):
+            results = context.scatter_gather_cells(
+                ctxt, [mapping], 30, lambda cctxt: None)
+
+        self.assertEqual({uuids.cell0: None}, results)
+        mock_warning.assert_called_once_with(
+            'The call to cell %(cell)s waited %(queued).1f seconds for a '
+            'cell worker thread. The cell_worker_thread_pool_size may be '
+            'too small for the load.', {'cell': uuids.cell0, 'queued': 20})
+
     @mock.patch('nova.context.scatter_gather_cells')
     @mock.patch('nova.objects.CellMappingList.get_all')
     def test_scatter_gather_all_cells(self, mock_get_all, mock_scatter):
@@ -305,6 +305,54 @@ class SyncPowerExecutorTestCase(test.NoDBTestCase):
         self.assertEqual(9, executor._max_workers)
 
 
+class UpdateResourcesExecutorTestCase(test.NoDBTestCase):
+    def test_executor_is_named(self):
+        executor = thread_pool_factory.get_executor(
+            thread_pool_factory.ExecutorType.UPDATE_RESOURCES)
+        self.assertRegex(executor.name,
+            "nova.tests.unit.test_thread_pool_factory."
+            "UpdateResourcesExecutor.*test_executor_is_named.update_resources")
+
+    def test_executor_type_and_size(self):
+        self.flags(update_resources_pool_size=9)
+        executor = thread_pool_factory.get_executor(
+            thread_pool_factory.ExecutorType.UPDATE_RESOURCES)
+
+        self.assertEqual(9, executor._max_workers)
+
+
+class InitHostExecutorTestCase(test.NoDBTestCase):
+    def test_executor_is_named(self):
+        executor = thread_pool_factory.get_executor(
+            thread_pool_factory.ExecutorType.INIT_HOST)
+        self.assertRegex(executor.name,
+            "nova.tests.unit.test_thread_pool_factory."
+            "InitHostExecutor.*test_executor_is_named.init_host")
+
+    def test_executor_type_and_size(self):
+        self.flags(init_host_pool_size=9)
+        executor = thread_pool_factory.get_executor(
+            thread_pool_factory.ExecutorType.INIT_HOST)
+
+        self.assertEqual(9, executor._max_workers)
+
+
+class PlacementExecutorTestCase(test.NoDBTestCase):
+    def test_executor_is_named(self):
+        executor = thread_pool_factory.get_executor(
+            thread_pool_factory.ExecutorType.PLACEMENT)
+        self.assertRegex(executor.name,
+            "nova.tests.unit.test_thread_pool_factory."
+            "PlacementExecutor.*test_executor_is_named.placement")
+
+    def test_executor_type_and_size(self):
+        self.flags(resource_provider_refresh_concurrency=7, group='compute')
+        executor = thread_pool_factory.get_executor(
+            thread_pool_factory.ExecutorType.PLACEMENT)
+
+        self.assertEqual(7, executor._max_workers)
+
+
 class LiveMigrationExecutorTestCase(test.NoDBTestCase):
     def test_executor_is_named(self):
         executor = thread_pool_factory.get_executor(
@@ -72,3 +72,41 @@ class TestWeigher(test.NoDBTestCase):
         self.assertEqual(1, len(weighed_host))
         self.assertEqual('host1', weighed_host[0].obj.host)
         self.assertFalse(mock_weigh.called)
+
+    def test_get_weighed_objects_and_ranges(self):
+        host_values = [
+            ('host1', 'node1', {'free_ram_mb': 512}),
+            ('host2', 'node2', {'free_ram_mb': 2048}),
+            ('host3', 'node3', {'free_ram_mb': 1024}),
+        ]
+        hostinfo = [fakes.FakeHostState(host, node, values)
+                    for host, node, values in host_values]
+
+        weight_handler = scheduler_weights.HostWeightHandler()
+        weighers = [ram.RAMWeigher()]
+        weighed_hosts, ranges = weight_handler.get_weighed_objects_and_ranges(
+            weighers, hostinfo, {})
+        expected = weight_handler.get_weighed_objects(weighers, hostinfo, {})
+        self.assertEqual([(w.obj, w.weight) for w in expected],
+                         [(w.obj, w.weight) for w in weighed_hosts])
+        self.assertEqual([(0.0, 2048)], ranges)
+
+        # weighing a single host again uses the ranges of the whole list
+        self.assertEqual(
+            1.0, weight_handler.get_weight(weighers, hostinfo[1], {}, ranges))
+        hostinfo[1].free_ram_mb = 1024
+        self.assertEqual(
+            0.5, weight_handler.get_weight(weighers, hostinfo[1], {}, ranges))
+
+    def test_get_weighed_objects_and_ranges_only_one_host(self):
+        hostinfo = [fakes.FakeHostState('host1', 'node1',
+                                        {'free_ram_mb': 512})]
+
+        weight_handler = scheduler_weights.HostWeightHandler()
+        weighers = [ram.RAMWeigher()]
+        weighed_hosts, ranges = weight_handler.get_weighed_objects_and_ranges(
+            weighers, hostinfo, {})
+        self.assertEqual(1, len(weighed_hosts))
+        self.assertIsNone(ranges)
+        self.assertEqual(
+            0.0, weight_handler.get_weight(weighers, hostinfo[0], {}, ranges))
@@ -10366,6 +10366,31 @@ class LibvirtConnTestCase(test.NoDBTestCase,
         self.assertEqual(uuids[3], vm4.UUIDString())
         mock_list.assert_called_with(only_running=False)
 
+    @mock.patch.object(host.Host, "get_domains_states")
+    def test_get_power_states(self, mock_states):
+        mock_states.return_value = {
+            uuids.vm1: fakelibvirt.VIR_DOMAIN_RUNNING,
+            uuids.vm2: fakelibvirt.VIR_DOMAIN_SHUTOFF,
+            # An unknown state is left out
+            uuids.vm3: 42,
+        }
+        drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+
+        power_states = drvr.get_power_states()
+
+        self.assertEqual({uuids.vm1: power_state.RUNNING,
+                          uuids.vm2: power_state.SHUTDOWN}, power_states)
+        mock_states.assert_called_once_with()
+
+    @mock.patch.object(host.Host, "get_domains_states")
+    def test_get_power_states_error(self, mock_states):
+        mock_states.side_effect = fakelibvirt.make_libvirtError(
+            fakelibvirt.libvirtError, "Connection broken",
+            error_code=fakelibvirt.VIR_ERR_INTERNAL_ERROR)
+        drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+
+        self.assertRaises(exception.InternalError, drvr.get_power_states)
+
     @mock.patch('nova.virt.libvirt.host.Host.get_online_cpus',
                 return_value=set([0, 1, 2, 3]))
     def test_get_pcpu_available(self, get_online_cpus):
@@ -654,6 +654,34 @@ class HostTestCase(test.NoDBTestCase):
         self.assertEqual(doms[2].name(), vm3.name())
         self.assertEqual(doms[3].name(), vm4.name())
 
+    @mock.patch.object(fakelibvirt.Connection, "getAllDomainStats")
+    def test_get_domains_states(self, mock_get_stats):
+        vm1 = FakeVirtDomain(id=3)
+        vm2 = FakeVirtDomain()
+        vm3 = FakeVirtDomain()
+        vm4 = FakeVirtDomain()
+        error = fakelibvirt.make_libvirtError(
+            fakelibvirt.libvirtError, "Domain not found",
+            error_code=fakelibvirt.VIR_ERR_NO_DOMAIN)
+        mock_get_stats.return_value = [
+            (vm1, {'state.state': fakelibvirt.VIR_DOMAIN_RUNNING,
+                   'state.reason': 1}),
+            (vm2, {'state.state': fakelibvirt.VIR_DOMAIN_SHUTOFF,
+                   'state.reason': 1}),
+            # The state of the third domain could not be read
+            (vm3, {}),
+            (vm4, {'state.state': fakelibvirt.VIR_DOMAIN_RUNNING}),
+        ]
+
+        with mock.patch.object(vm4, 'UUIDString', side_effect=error):
+            states = self.host.get_domains_states()
+
+        self.assertEqual(
+            {vm1.UUIDString(): fakelibvirt.VIR_DOMAIN_RUNNING,
+             vm2.UUIDString(): fakelibvirt.VIR_DOMAIN_SHUTOFF}, states)
+        mock_get_stats.assert_called_once_with(
+            fakelibvirt.VIR_DOMAIN_STATS_STATE)
+
     @mock.patch.object(host.Host, "list_instance_domains")
     def test_list_guests(self, mock_list_domains):
         dom0 = mock.Mock(spec=fakelibvirt.virDomain)
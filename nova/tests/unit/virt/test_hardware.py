@@ -17,6 +17,7 @@ import copy
 from unittest import mock
 
 import ddt
+import fixtures
 import testtools
 
 import nova.conf
@@ -2868,6 +2869,119 @@ class VirtNUMAHostTopologyTestCase(test.NoDBTestCase):
         self.assertEqual(1, instance_topology.cells[0].id)
 
 
+class NUMAFitCacheTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(NUMAFitCacheTestCase, self).setUp()
+        self.flags(numa_fit_cache_size=2, group='compute')
+        self.useFixture(fixtures.MockPatch(
+            'nova.virt.hardware._NUMA_FIT_CACHE', new=None))
+        self.mock_fit = self.useFixture(fixtures.MockPatch(
+            'nova.virt.hardware._numa_fit_instance_to_host',
+            wraps=hw._numa_fit_instance_to_host)).mock
+
+        self.limits = objects.NUMATopologyLimits(
+            cpu_allocation_ratio=2, ram_allocation_ratio=2)
+        self.instance = objects.InstanceNUMATopology(cells=[
+            objects.InstanceNUMACell(
+                id=0, cpuset=set([1, 2]), pcpuset=set(), memory=1024),
+        ])
+
+    def _get_host(self, memory_usage=0):
+        return objects.NUMATopology(cells=[
+            objects.NUMACell(
+                id=cell_id,
+                cpuset=set([cell_id * 2, cell_id * 2 + 1]),
+                pcpuset=set(),
+                memory=2048,
+                cpu_usage=0,
+                memory_usage=memory_usage,
+                socket=0,
+                pinned_cpus=set(),
+                mempages=[objects.NUMAPagesTopology(
+                    size_kb=4, total=524288, used=0)],
+                siblings=[set([cell_id * 2]), set([cell_id * 2 + 1])])
+            for cell_id in range(2)])
+
+    def test_disabled(self):
+        self.flags(numa_fit_cache_size=0, group='compute')
+        for _ in range(2):
+            hw.numa_fit_instance_to_host(
+                self._get_host(), self.instance, {}, self.limits)
+        self.assertIsNone(hw.get_numa_fit_cache())
+        self.assertEqual(2, self.mock_fit.call_count)
+
+    def test_same_host_usage(self):
+        fitted1 = hw.numa_fit_instance_to_host(
+            self._get_host(), self.instance, {}, self.limits)
+        fitted2 = hw.numa_fit_instance_to_host(
+            self._get_host(), self.instance, {}, self.limits)
+        self.assertEqual(1, self.mock_fit.call_count)
+        self.assertEqual(
+            fitted1.obj_to_primitive(), fitted2.obj_to_primitive())
+        # The callers own the returned topologies
+        self.assertIsNot(fitted1, fitted2)
+        cache = hw.get_numa_fit_cache()
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_different_host_usage(self):
+        hw.numa_fit_instance_to_host(
+            self._get_host(), self.instance, {}, self.limits)
+        hw.numa_fit_instance_to_host(
+            self._get_host(memory_usage=1024), self.instance, {}, self.limits)
+        self.assertEqual(2, self.mock_fit.call_count)
+
+    def test_different_limits(self):
+        hw.numa_fit_instance_to_host(
+            self._get_host(), self.instance, {}, self.limits)
+        hw.numa_fit_instance_to_host(
+            self._get_host(), self.instance, {},
+            objects.NUMATopologyLimits(
+                cpu_allocation_ratio=2, ram_allocation_ratio=1))
+        self.assertEqual(2, self.mock_fit.call_count)
+
+    def test_allocation_strategy(self):
+        hw.numa_fit_instance_to_host(
+            self._get_host(), self.instance, {}, self.limits)
+        self.flags(packing_host_numa_cells_allocation_strategy=True,
+                   group='compute')
+        hw.numa_fit_instance_to_host(
+            self._get_host(), self.instance, {}, self.limits)
+        self.assertEqual(2, self.mock_fit.call_count)
+
+    def test_no_fit(self):
+        for _ in range(2):
+            self.assertIsNone(hw.numa_fit_instance_to_host(
+                self._get_host(memory_usage=2048), self.instance, {},
+                objects.NUMATopologyLimits(
+                    cpu_allocation_ratio=1, ram_allocation_ratio=1)))
+        self.assertEqual(1, self.mock_fit.call_count)
+
+    def test_pci_requests(self):
+        pci_requests = [objects.InstancePCIRequest(count=1)]
+        pci_stats = mock.Mock(pools=[])
+        pci_stats.support_requests.return_value = True
+        for _ in range(2):
+            self.assertIsNotNone(hw.numa_fit_instance_to_host(
+                self._get_host(), self.instance, {}, self.limits,
+                pci_requests=pci_requests, pci_stats=pci_stats))
+        self.assertEqual(2, self.mock_fit.call_count)
+        self.assertEqual(0, len(hw.get_numa_fit_cache()))
+
+    def test_eviction(self):
+        for memory_usage in (0, 512, 1024, 0):
+            hw.numa_fit_instance_to_host(
+                self._get_host(memory_usage=memory_usage), self.instance, {})
+        self.assertEqual(4, self.mock_fit.call_count)
+        self.assertEqual(2, len(hw.get_numa_fit_cache()))
+
+    def test_resize_cache(self):
+        cache = hw.get_numa_fit_cache()
+        self.assertIs(cache, hw.get_numa_fit_cache())
+        self.flags(numa_fit_cache_size=10, group='compute')
+        self.assertIsNot(cache, hw.get_numa_fit_cache())
+        self.assertEqual(10, hw.get_numa_fit_cache().size)
+
+
 class NumberOfSerialPortsTest(test.NoDBTestCase):
     def test_flavor(self):
         flavor = objects.Flavor(vcpus=8, memory_mb=2048,
@@ -115,6 +115,9 @@ class ExecutorType(enum.Enum):
     LONG_TASK = "long_task"
     SYNC_POWER = "sync_power_state"
     LIVE_MIGRATION = "live_migration"
+    UPDATE_RESOURCES = "update_resources"
+    PLACEMENT = "placement"
+    INIT_HOST = "init_host"
 
 
 class ExecutorsPoolSize:
@@ -140,6 +143,18 @@ class ExecutorsPoolSize:
     def _sync_power_pool_size():
         return CONF.sync_power_state_pool_size
 
+    @staticmethod
+    def _update_resources_pool_size():
+        return CONF.update_resources_pool_size
+
+    @staticmethod
+    def _init_host_pool_size():
+        return CONF.init_host_pool_size
+
+    @staticmethod
+    def _placement_pool_size():
+        return CONF.compute.resource_provider_refresh_concurrency
+
     @staticmethod
     def _long_task_pool_size():
         max_builds = get_max_concurrent_builds()
@@ -172,6 +187,9 @@ class ExecutorsPoolSize:
         ExecutorType.LONG_TASK: _long_task_pool_size,
         ExecutorType.SYNC_POWER: _sync_power_pool_size,
         ExecutorType.LIVE_MIGRATION: get_max_concurrent_live_migrations,
+        ExecutorType.UPDATE_RESOURCES: _update_resources_pool_size,
+        ExecutorType.PLACEMENT: _placement_pool_size,
+        ExecutorType.INIT_HOST: _init_host_pool_size,
     }
 
     @classmethod
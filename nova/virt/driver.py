@@ -404,6 +404,24 @@ class ComputeDriver(object):
         # TODO(Vek): Need to pass context in for access to auth_token
         raise NotImplementedError()
 
+    def get_power_states(self):
+        """Get the power state of all the instances known to the
+        virtualization layer.
+
+        This lets the compute manager sync the power states of all the
+        instances on the host with a single query to the hypervisor, rather
+        than one ``get_info`` call per instance. Drivers which do not
+        implement it get the latter.
+
+        The instances whose power state could not be read are left out, and
+        are synced one instance at a time.
+
+        :raises: nova.exception.InternalError if the power states could not
+                 be read at all, the instances are then synced one at a time
+        :returns: A dict of instance UUIDs to their nova.compute.power_state
+        """
+        raise NotImplementedError()
+
     @classmethod
     def get_instance_driver_metadata(
         cls, instance: 'nova.objects.instance.Instance',
@@ -16,6 +16,7 @@ import abc
 import collections
 import itertools
 import re
+import threading
 import typing as ty
 
 import os_resource_classes as orc
@@ -29,6 +30,7 @@ import nova.conf
 from nova import exception
 from nova.i18n import _
 from nova import objects
+from nova.objects import base as obj_base
 from nova.objects import compute_node
 from nova.objects import fields
 from nova.objects import service
@@ -2629,6 +2631,94 @@ def _numa_cells_support_network_metadata(
     return True
 
 
+class _NUMAFitCache(object):
+    """A least recently used cache of numa_fit_instance_to_host results."""
+
+    def __init__(self, size):
+        self.size = size
+        self._results: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, key):
+        """Return a (found, result) tuple for key."""
+        with self._lock:
+            try:
+                self._results.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, self._results[key]
+
+    def set(self, key, result):
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+
+
+_NUMA_FIT_CACHE: _NUMAFitCache | None = None
+
+
+def get_numa_fit_cache() -> _NUMAFitCache | None:
+    """Return the numa_fit_instance_to_host cache of this process.
+
+    :returns: The cache, or None if ``[compute] numa_fit_cache_size`` is 0.
+    """
+    global _NUMA_FIT_CACHE
+    size = CONF.compute.numa_fit_cache_size
+    if not size:
+        _NUMA_FIT_CACHE = None
+    elif _NUMA_FIT_CACHE is None or _NUMA_FIT_CACHE.size != size:
+        _NUMA_FIT_CACHE = _NUMAFitCache(size)
+    return _NUMA_FIT_CACHE
+
+
+def _numa_fingerprint(value):
+    """Return a hashable canonical representation of a NUMA related value.
+
+    The fingerprint of an object holds the values of all its set fields, so
+    two objects with the same fingerprint are interchangeable as far as
+    numa_fit_instance_to_host is concerned.
+    """
+    if isinstance(value, obj_base.NovaObject):
+        return (value.obj_name(),) + tuple(
+            (name, _numa_fingerprint(getattr(value, name)))
+            for name in value.fields if value.obj_attr_is_set(name))
+    if isinstance(value, (list, tuple)):
+        return tuple(_numa_fingerprint(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if isinstance(value, dict):
+        return tuple(sorted(
+            (k, _numa_fingerprint(v)) for k, v in value.items()))
+    return value
+
+
+def _numa_fit_cache_key(host_topology, instance_topology, limits, pci_stats):
+    # NOTE: The provider mapping and the PCI device pools are only used to
+    # fit the PCI requests, so without PCI requests the only PCI related
+    # input is the number of free devices per NUMA node, used to sort the
+    # host cells.
+    total_pci_in_cell: dict[int, int] = collections.Counter()
+    if pci_stats:
+        for pool in pci_stats.pools:
+            total_pci_in_cell[pool['numa_node']] += pool['count']
+    return (
+        _numa_fingerprint(host_topology.cells),
+        _numa_fingerprint(instance_topology),
+        _numa_fingerprint(limits),
+        tuple(sorted(total_pci_in_cell.items(), key=str)),
+        CONF.compute.packing_host_numa_cells_allocation_strategy,
+    )
+
+
 def numa_fit_instance_to_host(
     host_topology: 'objects.NUMATopology',
     instance_topology: 'objects.InstanceNUMATopology',
@@ -2639,6 +2729,49 @@ def numa_fit_instance_to_host(
 ):
     """Fit the instance topology onto the host topology.
 
+    This is a memoized version of :func:`_numa_fit_instance_to_host`, see
+    there for the parameters. Hosts with the same NUMA cell usage are very
+    common in homogeneous deployments, so when ``[compute]
+    numa_fit_cache_size`` is set, the result of fitting an instance topology
+    without PCI requests is cached, keyed by a fingerprint of the host cells,
+    the instance topology and the limits.
+
+    :returns: objects.InstanceNUMATopology with its cell IDs set to host
+              cell ids of the first successful permutation, or None
+    """
+    cache = get_numa_fit_cache()
+    if (cache is None or pci_requests or
+            not (host_topology and instance_topology)):
+        return _numa_fit_instance_to_host(
+            host_topology, instance_topology, provider_mapping,
+            limits=limits, pci_requests=pci_requests, pci_stats=pci_stats)
+
+    key = _numa_fit_cache_key(
+        host_topology, instance_topology, limits, pci_stats)
+    found, result = cache.get(key)
+    if not found:
+        result = _numa_fit_instance_to_host(
+            host_topology, instance_topology, provider_mapping,
+            limits=limits, pci_requests=pci_requests, pci_stats=pci_stats)
+        # The callers own the returned object, so the cache keeps a copy
+        if result is not None:
+            cache.set(key, result.obj_clone())
+        else:
+            cache.set(key, None)
+        return result
+    return result.obj_clone() if result is not None else None
+
+
+def _numa_fit_instance_to_host(
+    host_topology: 'objects.NUMATopology',
+    instance_topology: 'objects.InstanceNUMATopology',
+    provider_mapping: dict[str, list[str]] | None,
+    limits: 'objects.NUMATopologyLimits | None' = None,
+    pci_requests: 'objects.InstancePCIRequests | None' = None,
+    pci_stats: stats.PciDeviceStats | None = None,
+):
+    """Fit the instance topology onto the host topology.
+
     Given a host, instance topology, and (optional) limits, attempt to
     fit instance cells onto all permutations of host cells by calling
     the _fit_instance_cell method, and return a new InstanceNUMATopology
@@ -8292,6 +8292,21 @@ class LibvirtDriver(driver.ComputeDriver):
         # workaround, see libvirt/compat.py
         return guest.get_info(self._host)
 
+    def get_power_states(self):
+        try:
+            domains_states = self._host.get_domains_states()
+        except libvirt.libvirtError as ex:
+            msg = (_('Error from libvirt while getting the state of the '
+                     'domains: [Error Code %(error_code)s] %(ex)s') %
+                   {'error_code': ex.get_error_code(), 'ex': ex})
+            raise exception.InternalError(msg)
+
+        # The domains in an unknown state are left out, so that they are
+        # synced one at a time.
+        return {uuid: libvirt_guest.LIBVIRT_POWER_STATE[state]
+                for uuid, state in domains_states.items()
+                if state in libvirt_guest.LIBVIRT_POWER_STATE}
+
     def _create_domain_setup_lxc(self, context, instance, image_meta,
                                  block_device_info):
         inst_path = libvirt_utils.get_instance_path(instance)
@@ -809,6 +809,29 @@ class Host(object):
 
         return doms
 
+    def get_domains_states(self):
+        """Get the state of all the libvirt domains with a single call.
+
+        :returns: dict of domain UUID to libvirt domain state, the domains
+                  whose state could not be read are left out
+        """
+        # getAllDomainStats() returns <list of (virDomain, dict)>, which
+        # tpool.Proxy's autowrap won't catch, but only the UUID of the
+        # domains is read, which does not call libvirtd.
+        all_stats = self.get_connection().getAllDomainStats(
+            libvirt.VIR_DOMAIN_STATS_STATE)
+
+        states = {}
+        for dom, stats in all_stats:
+            try:
+                uuid = dom.UUIDString()
+            except libvirt.libvirtError as ex:
+                LOG.debug('Unable to get the UUID of a domain: %s', ex)
+                continue
+            if 'state.state' in stats:
+                states[uuid] = stats['state.state']
+        return states
+
     def get_available_cpus(self):
         """Get the set of CPUs that exist on the host.
 
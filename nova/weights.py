@@ -18,6 +18,7 @@ Pluggable Weighing support
 """
 
 import abc
+import time
 
 from oslo_log import log as logging
 
@@ -123,50 +124,127 @@ class BaseWeigher(metaclass=abc.ABCMeta):
 class BaseWeightHandler(loadables.BaseLoader):
     object_class = WeighedObject
 
+    def _record_weigher_time(self, cls_name, duration_ns):
+        """Called with the time a weigher took to weigh the objects of a
+        request.
+
+        Can be overridden in a subclass.
+        """
+        pass
+
     def get_weighed_objects(self, weighers, obj_list, weighing_properties):
         """Return a sorted (descending), normalized list of WeighedObjects."""
-        weighed_objs = [self.object_class(obj, 0.0) for obj in obj_list]
+        weighed_objs, _ranges = self.get_weighed_objects_and_ranges(
+            weighers, obj_list, weighing_properties)
+        return weighed_objs
+
+    def _get_objects(self, obj_list):
+        """Return the sequence of the objects to weigh.
+
+        Can be overridden in a subclass.
+        """
+        return list(obj_list)
+
+    def _get_weights(self, weigher, objs, weighed_objs, weighing_properties):
+        """Return the raw weights of the objects for a weigher, along with
+        their multipliers, or None to get them from the weigher.
+
+        Can be overridden in a subclass.
+
+        :param objs: The objects returned by _get_objects()
+        :param weighed_objs: The WeighedObjects of the objects
+        """
+        weights = weigher.weigh_objects(weighed_objs, weighing_properties)
+        return weights, None
+
+    def get_weighed_objects_and_ranges(
+            self, weighers, obj_list, weighing_properties):
+        """Return a sorted (descending), normalized list of WeighedObjects
+        along with the normalization range used for each weigher.
+
+        The ranges can be passed to get_weight() in order to weigh again an
+        object that changed, consistently with the other objects and without
+        weighing all of them again. They are None when there was nothing to
+        normalize.
+        """
+        objs = self._get_objects(obj_list)
+        weighed_objs = [self.object_class(obj, 0.0) for obj in objs]
 
         if len(weighed_objs) <= 1:
-            return weighed_objs
+            return weighed_objs, None
 
+        debug = LOG.isEnabledFor(logging.DEBUG)
+        ranges = []
         for weigher in weighers:
-            weights = weigher.weigh_objects(weighed_objs, weighing_properties)
-
-            LOG.debug(
-                "%s: raw weights %s",
-                weigher.__class__.__name__,
-                {(obj.obj.host, obj.obj.nodename): weight
-                 for obj, weight in zip(weighed_objs, weights)}
-            )
+            start_time = time.monotonic_ns()
+            weights, multipliers = self._get_weights(
+                weigher, objs, weighed_objs, weighing_properties)
+            if multipliers is None:
+                multipliers = [weigher.weight_multiplier(obj.obj)
+                               for obj in weighed_objs]
+
+            if debug:
+                LOG.debug(
+                    "%s: raw weights %s",
+                    weigher.__class__.__name__,
+                    {(obj.obj.host, obj.obj.nodename): weight
+                     for obj, weight in zip(weighed_objs, weights)}
+                )
 
             # Normalize the weights
-            weights = list(
-                normalize(
-                    weights, minval=weigher.minval, maxval=weigher.maxval))
-
-            LOG.debug(
-                "%s: normalized weights %s",
-                weigher.__class__.__name__,
-                {(obj.obj.host, obj.obj.nodename): weight
-                 for obj, weight in zip(weighed_objs, weights)}
-            )
+            minval = weigher.minval
+            if minval is None:
+                minval = min(weights)
+            maxval = weigher.maxval
+            if maxval is None:
+                maxval = max(weights)
+            ranges.append((minval, maxval))
+            weights = list(normalize(weights, minval=minval, maxval=maxval))
+
+            if debug:
+                LOG.debug(
+                    "%s: normalized weights %s",
+                    weigher.__class__.__name__,
+                    {(obj.obj.host, obj.obj.nodename): weight
+                     for obj, weight in zip(weighed_objs, weights)}
+                )
 
             log_data = {}
 
-            for i, weight in enumerate(weights):
-                obj = weighed_objs[i]
-                multiplier = weigher.weight_multiplier(obj.obj)
-                weigher_score = multiplier * weight
-                obj.weight += weigher_score
+            for obj, multiplier, weight in zip(
+                    weighed_objs, multipliers, weights):
+                obj.weight += multiplier * weight
+
+                if debug:
+                    log_data[(obj.obj.host, obj.obj.nodename)] = (
+                        f"{multiplier} * {weight}")
+
+            if debug:
+                LOG.debug(
+                    "%s: score (multiplier * weight) %s",
+                    weigher.__class__.__name__,
+                    log_data
+                )
+            self._record_weigher_time(
+                weigher.__class__.__name__,
+                time.monotonic_ns() - start_time)
 
-                log_data[(obj.obj.host, obj.obj.nodename)] = (
-                    f"{multiplier} * {weight}")
+        weighed_objs.sort(key=lambda x: x.weight, reverse=True)
+        return weighed_objs, ranges
 
-            LOG.debug(
-                "%s: score (multiplier * weight) %s",
-                weigher.__class__.__name__,
-                {name: log for name, log in log_data.items()}
-            )
+    def get_weight(self, weighers, obj, weighing_properties, ranges):
+        """Return the weight of a single object.
 
-        return sorted(weighed_objs, key=lambda x: x.weight, reverse=True)
+        :param ranges: The normalization ranges returned by
+            get_weighed_objects_and_ranges() for the same weighers.
+        """
+        if ranges is None:
+            return 0.0
+
+        weighed_obj = self.object_class(obj, 0.0)
+        for weigher, (minval, maxval) in zip(weighers, ranges):
+            weights = weigher.weigh_objects(
+                [weighed_obj], weighing_properties)
+            weight = list(normalize(weights, minval=minval, maxval=maxval))[0]
+            weighed_obj.weight += weigher.weight_multiplier(obj) * weight
+        return weighed_obj.weight
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the load the compute periodic tasks put on the conductor.
+
+A fleet of compute services using the fake virt driver, all restarted at the
+same time, runs its periodic tasks over a window of virtual time. Every
+compute service is a real ``ComputeManager`` whose periodic task loop, that is
+``ComputeManager.periodic_tasks`` and the oslo.service scheduling behind it,
+runs on a virtual clock. The periodic tasks themselves are replaced by
+stand-ins which count their runs and report a simulated conductor latency,
+which rises with the number of runs in the last second beyond the conductor
+capacity, and is multiplied during a degraded period in the middle of the
+window.
+
+Each scenario reports the number of periodic task runs per second of the
+window: the mean, the p99 and the peak, their ratio to the mean, and the mean
+during the degraded period. The scenarios are:
+
+* ``default``: the periodic tasks are neither spread nor backed off;
+* ``spread``: ``[compute] periodic_task_spread`` is enabled;
+* ``spread+backoff``: ``[compute] periodic_task_max_backoff`` is also set.
+
+Usage::
+
+    python tools/benchmarks/compute_periodic_load.py \\
+        --hosts 500 --duration 3600 --capacity 20
+"""
+
+import argparse
+import collections
+import heapq
+import logging
+import random
+import time
+from unittest import mock
+
+from oslo_service import periodic_task
+
+from nova.compute import manager
+from nova.conductor import rpcapi as conductor_rpcapi
+from nova import config
+from nova import context as nova_context
+from nova import rpc
+from nova.scheduler.client import report
+
+CONF = config.CONF
+
+SCENARIOS = (
+    # name, spread, max backoff
+    ('default', False, 1.0),
+    ('spread', True, 1.0),
+    ('spread+backoff', True, 4.0),
+)
+
+
+class VirtualClock(object):
+    """The monotonic and wall clocks of the simulation."""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.wall_start = time.time()
+        self.now = self.start
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.wall_start + self.now - self.start
+
+
+class Conductor(object):
+    """A conductor whose latency rises with its load."""
+
+    def __init__(self, clock, args):
+        self.clock = clock
+        self.args = args
+        self.recent = collections.deque()
+        self.runs = collections.Counter()
+
+    def degraded(self, second):
+        third = self.args.duration // 3
+        return third <= second < 2 * third
+
+    def call(self):
+        second = int(self.clock.now - self.clock.start)
+        self.runs[second] += 1
+        self.recent.append(self.clock.now)
+        while self.recent[0] < self.clock.now - 1:
+            self.recent.popleft()
+        latency = self.args.latency * max(
+            1.0, len(self.recent) / self.args.capacity)
+        if self.degraded(second):
+            latency *= self.args.degradation
+        conductor_rpcapi.OBJECT_CALL_LATENCY.record(latency)
+
+
+def _stub_task(conductor, task):
+    def stub(self, context):
+        conductor.call()
+    stub._periodic_external_ok = task._periodic_external_ok
+    return stub
+
+
+def run_scenario(args, spread, max_backoff):
+    CONF.set_override('periodic_task_spread', spread, group='compute')
+    CONF.set_override('periodic_task_max_backoff', max_backoff,
+                      group='compute')
+    conductor_rpcapi.OBJECT_CALL_LATENCY = conductor_rpcapi.LatencyTracker()
+    clock = VirtualClock()
+    conductor = Conductor(clock, args)
+    rand = random.Random(args.seed)
+
+    with mock.patch.object(periodic_task, 'now', clock.monotonic), \
+            mock.patch('time.monotonic', clock.monotonic), \
+            mock.patch('time.time', clock.time):
+        computes = []
+        for i in range(args.hosts):
+            compute = manager.ComputeManager(host='compute%05d' % i)
+            compute._periodic_tasks = [
+                (name, _stub_task(conductor, task))
+                for name, task in compute._periodic_tasks]
+            computes.append(compute)
+
+        # Every service starts its periodic task loop after a random delay,
+        # then sleeps for as long as the loop says, like nova.service.Service
+        # does.
+        ctxt = nova_context.get_admin_context()
+        end = clock.start + args.duration
+        wakeups = [(clock.start + rand.uniform(0, CONF.periodic_fuzzy_delay),
+                    i) for i in range(args.hosts)]
+        heapq.heapify(wakeups)
+        while wakeups[0][0] < end:
+            clock.now, i = heapq.heappop(wakeups)
+            idle_for = computes[i].periodic_tasks(ctxt)
+            heapq.heappush(wakeups, (clock.now + idle_for, i))
+
+    counts = sorted(conductor.runs.get(second, 0)
+                    for second in range(args.duration))
+    degraded = [conductor.runs.get(second, 0)
+                for second in range(args.duration)
+                if conductor.degraded(second)]
+    mean = sum(counts) / len(counts)
+    p99 = counts[int(len(counts) * 0.99) - 1]
+    return (sum(counts), mean, p99, counts[-1], sum(degraded) / len(degraded))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--config-file', action='append',
+                        help='nova configuration file, can be repeated')
+    parser.add_argument('--hosts', type=int, default=500,
+                        help='number of compute services')
+    parser.add_argument('--duration', type=int, default=3600,
+                        help='simulated seconds')
+    parser.add_argument('--capacity', type=float, default=20,
+                        help='periodic task runs per second the conductor '
+                             'serves at its nominal latency')
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help='nominal conductor latency in seconds')
+    parser.add_argument('--degradation', type=float, default=5,
+                        help='latency factor during the degraded period')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    argv = []
+    for config_file in args.config_file or []:
+        argv.extend(['--config-file', config_file])
+    config.parse_args(argv, configure_db=False, init_rpc=False)
+    CONF.set_override('compute_driver', 'fake.FakeDriver')
+    # The managers create RPC clients, but never call them
+    rpc.init(CONF)
+    # Every manager warns when its periodic tasks back off
+    logging.getLogger('nova').setLevel(logging.ERROR)
+
+    print('%d hosts over %d s' % (args.hosts, args.duration))
+    print('%-16s %8s %8s %8s %8s %10s %10s' % (
+        'scenario', 'runs', 'mean/s', 'p99/s', 'peak/s', 'peak/mean',
+        'degraded/s'))
+    # NOTE: The placement client is never used by the stand-in tasks, so it is
+    # not connected.
+    with mock.patch.object(report.SchedulerReportClient, '_create_client'):
+        for name, spread, max_backoff in SCENARIOS:
+            runs, mean, p99, peak, degraded = run_scenario(
+                args, spread, max_backoff)
+            print('%-16s %8d %8.2f %8d %8d %10.1f %10.2f' % (
+                name, runs, mean, p99, peak, peak / mean, degraded))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the latency of the pages of instance_get_all_by_filters_sort().
+
+An instances table of a single project is created in a SQLite database
+file, then pages of its instances are listed the way the servers API lists
+them for a user of the project, from markers at several depths of the list.
+Both sort orders below are listed:
+
+* ``created_at``: the default sort keys of the API, created_at and id, to
+  which the API adds the uuid as a tie-breaker across the cells, in the
+  descending direction;
+* ``display_name``: the display_name sort key, with the uuid tie-breaker,
+  in the ascending direction.
+
+The scenarios are:
+
+* ``before``: without the keyset pagination indexes, without the trimming of
+  the sort keys and without the bound of the first sort key by the marker;
+* ``keyset``: as the database API lists them now.
+
+Each page is listed several times and the median latency is reported.
+
+Usage::
+
+    python tools/benchmarks/instance_list_keyset.py --rows 5000000
+"""
+
+import argparse
+import contextlib
+import datetime
+import os
+import statistics
+import tempfile
+import time
+from unittest import mock
+
+from oslo_utils import uuidutils
+
+from nova import config
+from nova import context as nova_context
+from nova.db.main import api as db
+from nova.db.main import models
+
+CONF = config.CONF
+
+PROJECT_ID = 'project'
+USER_ID = 'user'
+
+SORTS = (
+    # name, sort keys, sort dirs
+    ('created_at', ['created_at', 'id', 'uuid'], ['desc', 'desc', 'desc']),
+    ('display_name', ['display_name', 'uuid'], ['asc', 'asc']),
+)
+
+INDEXES = ('instances_project_id_deleted_created_at_id_idx',
+           'instances_project_id_deleted_display_name_uuid_idx')
+
+DEPTHS = (0, 0.1, 0.5, 0.9)
+
+
+def populate(engine, rows):
+    """Insert rows instances, created three at a time."""
+    table = models.Instance.__table__
+    start = datetime.datetime(2020, 1, 1)
+    chunk = 10000
+    with engine.begin() as conn:
+        for first in range(0, rows, chunk):
+            conn.execute(table.insert(), [
+                {'uuid': uuidutils.generate_uuid(),
+                 'project_id': PROJECT_ID,
+                 'user_id': USER_ID,
+                 'display_name': 'server-%d' % (i % (rows // 2 or 1)),
+                 'created_at': start + datetime.timedelta(seconds=i // 3),
+                 'vm_state': 'active',
+                 'hidden': False,
+                 'deleted': 0}
+                for i in range(first, min(first + chunk, rows))])
+
+
+def markers(engine, sort_keys, sort_dirs, rows):
+    """Return the uuid of the instances at DEPTHS of the sort order."""
+    table = models.Instance.__table__
+    order = [getattr(table.c[key], direction)()
+             for key, direction in zip(sort_keys, sort_dirs)]
+    result = []
+    with engine.connect() as conn:
+        for depth in DEPTHS:
+            if not depth:
+                result.append(None)
+                continue
+            query = table.select().with_only_columns(table.c.uuid).order_by(
+                *order).offset(int(rows * depth)).limit(1)
+            result.append(conn.execute(query).scalar())
+    return result
+
+
+def list_pages(ctxt, sort_keys, sort_dirs, page_markers, limit, repeat):
+    """Return the median latency of the page after each marker."""
+    latencies = []
+    for marker in page_markers:
+        samples = []
+        for _ in range(repeat):
+            start = time.monotonic()
+            instances = db.instance_get_all_by_filters_sort(
+                ctxt, {'deleted': False, 'project_id': PROJECT_ID},
+                limit=limit, marker=marker, sort_keys=sort_keys,
+                sort_dirs=sort_dirs)
+            samples.append(time.monotonic() - start)
+            assert len(instances) == limit
+        latencies.append(statistics.median(samples))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=5000000,
+                        help='number of instances')
+    parser.add_argument('--limit', type=int, default=100,
+                        help='number of instances per page')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of times each page is listed')
+    parser.add_argument('--database', help='SQLite database file, created '
+                        'and populated when it does not exist')
+    args = parser.parse_args()
+
+    config.parse_args([], configure_db=False, init_rpc=False)
+    tmpdir = None
+    path = args.database
+    if path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, 'nova.sqlite')
+    exists = os.path.exists(path)
+    CONF.set_override('connection', 'sqlite:///%s' % path, group='database')
+    db.configure(CONF)
+    engine = db.get_engine()
+    if not exists:
+        print('Populating %d instances...' % args.rows)
+        models.BASE.metadata.create_all(engine)
+        populate(engine, args.rows)
+
+    ctxt = nova_context.RequestContext(USER_ID, PROJECT_ID)
+    page_markers = {
+        name: markers(engine, sort_keys, sort_dirs, args.rows)
+        for name, sort_keys, sort_dirs in SORTS}
+
+    print('%d instances, %d per page, median of %d' % (
+        args.rows, args.limit, args.repeat))
+    print('%-10s %-14s %s' % ('scenario', 'sort', ' '.join(
+        '%10s' % ('%d%% ms' % (depth * 100)) for depth in DEPTHS)))
+    table = models.Instance.__table__
+    for scenario in ('before', 'keyset'):
+        with engine.begin() as conn:
+            for index in table.indexes:
+                if index.name not in INDEXES:
+                    continue
+                if scenario == 'before':
+                    index.drop(conn, checkfirst=True)
+                else:
+                    index.create(conn, checkfirst=True)
+            conn.exec_driver_sql('ANALYZE')
+        with contextlib.ExitStack() as stack:
+            if scenario == 'before':
+                stack.enter_context(mock.patch.object(
+                    db, '_instance_keyset_sort_params',
+                    lambda sort_keys, sort_dirs: (sort_keys, sort_dirs)))
+                stack.enter_context(mock.patch.object(
+                    db, '_instance_keyset_bound',
+                    lambda query, sort_key, sort_dir, marker: query))
+            for name, sort_keys, sort_dirs in SORTS:
+                latencies = list_pages(
+                    ctxt, sort_keys, sort_dirs, page_markers[name],
+                    args.limit, args.repeat)
+                print('%-10s %-14s %s' % (scenario, name, ' '.join(
+                    '%10.1f' % (latency * 1000) for latency in latencies)))
+
+
+if __name__ == '__main__':
+    main()
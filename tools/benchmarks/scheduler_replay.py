@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Replay scheduling requests against a snapshot of a cloud, offline.
+
+A snapshot file holds the compute nodes, services, aggregates and instance
+UUIDs of every cell, along with a stream of scheduling requests: the
+RequestSpec, the instance UUIDs and the allocation candidates placement
+returned for it. Snapshots are either taken from a live deployment or
+generated from a fleet shape with the fake virt driver.
+
+The replay runs every request through ``SchedulerManager._schedule``, and
+so through ``HostManager.get_filtered_hosts`` and ``get_weighed_hosts``,
+with a host manager reading the snapshot instead of the cell databases and an
+in-process placement stand-in returning the recorded allocation candidates and
+accepting every claim. Every request sees the snapshot as it was taken: the
+claims of a request are not carried over to the next ones. The scheduler
+options, such as the enabled filters and weighers, are read from the given
+configuration files.
+
+It reports the request throughput and the p50/p99 latencies of the whole
+request, of the filtering and weighing phases and of every filter and weigher,
+as recorded by ``nova.scheduler.timing``.
+
+Usage::
+
+    # Snapshot a live deployment, with the last 200 scheduled instances as
+    # the request stream
+    python tools/benchmarks/scheduler_replay.py snapshot \\
+        --config-file /etc/nova/nova.conf --requests 200 fleet.json
+
+    # Or generate a snapshot of 2 cells of 1000 hosts
+    python tools/benchmarks/scheduler_replay.py generate \\
+        --cells 2 --hosts 1000 --aggregates 10 --requests 200 fleet.json
+
+    # Replay it 5 times with the given scheduler configuration
+    python tools/benchmarks/scheduler_replay.py replay \\
+        --config-file scheduler.conf --repeat 5 fleet.json
+"""
+
+import argparse
+import collections
+import random
+import sys
+import time
+
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+
+from nova import config
+from nova import context as nova_context
+from nova import exception
+from nova import objects
+from nova.objects import base as obj_base
+from nova.scheduler.client import report
+from nova.scheduler import host_manager
+from nova.scheduler import manager
+from nova.scheduler import timing
+from nova.scheduler import utils as scheduler_utils
+from nova.virt import fake
+
+CONF = config.CONF
+
+SNAPSHOT_VERSION = 1
+
+FLAVORS = (
+    # name, vcpus, memory_mb, root_gb
+    ('small', 1, 2048, 20),
+    ('medium', 2, 4096, 40),
+    ('large', 4, 8192, 80),
+    ('xlarge', 8, 16384, 160),
+)
+
+
+def _primitive(obj):
+    return obj.obj_to_primitive()
+
+
+def _from_primitive(primitive):
+    return obj_base.NovaObject.obj_from_primitive(primitive)
+
+
+def _parse_config(args, configure_db=True):
+    argv = [sys.argv[0]]
+    for config_file in args.config_file or []:
+        argv.extend(['--config-file', config_file])
+    config.parse_args(argv, configure_db=configure_db, init_rpc=False)
+
+
+# Snapshot of a live deployment
+
+
+def _snapshot_requests(ctxt, cells, num_requests):
+    """Return the most recently created instances along with the allocation
+    candidates placement would return for their RequestSpec now.
+    """
+    instances = []
+    for cell in cells:
+        with nova_context.target_cell(ctxt, cell) as cctxt:
+            instances.extend(objects.InstanceList.get_by_filters(
+                cctxt, {'deleted': False}, sort_key='created_at',
+                sort_dir='desc', limit=num_requests, expected_attrs=[]))
+    instances.sort(key=lambda i: i.created_at, reverse=True)
+
+    hm = host_manager.HostManager()
+    client = report.report_client_singleton()
+    requests = []
+    for instance in instances[:num_requests]:
+        try:
+            spec_obj = objects.RequestSpec.get_by_instance_uuid(
+                ctxt, instance.uuid)
+        except exception.RequestSpecNotFound:
+            continue
+        resources = scheduler_utils.resources_from_request_spec(
+            ctxt, spec_obj, hm)
+        alloc_reqs, provider_summaries, version = (
+            client.get_allocation_candidates(ctxt, resources) or
+            (None, None, None))
+        requests.append({
+            'request_spec': _primitive(spec_obj),
+            'instance_uuids': [instance.uuid],
+            'allocation_requests': alloc_reqs or [],
+            'provider_summaries': provider_summaries or {},
+            'allocation_request_version': version,
+        })
+    # Replay the requests in the order they were scheduled
+    requests.reverse()
+    return requests
+
+
+def snapshot(args):
+    _parse_config(args)
+    objects.register_all()
+    ctxt = nova_context.get_admin_context()
+
+    cells = [cell for cell in objects.CellMappingList.get_all(ctxt)
+             if not cell.is_cell0() and not cell.disabled]
+    snap = {
+        'version': SNAPSHOT_VERSION,
+        'cells': [],
+        'aggregates': [_primitive(agg)
+                       for agg in objects.AggregateList.get_all(ctxt)],
+        'instances': {},
+    }
+    for cell in cells:
+        with nova_context.target_cell(ctxt, cell) as cctxt:
+            compute_nodes = objects.ComputeNodeList.get_all(cctxt)
+            services = objects.ServiceList.get_by_binary(
+                cctxt, 'nova-compute', include_disabled=True)
+            for service in services:
+                snap['instances'][service.host] = (
+                    objects.InstanceList.get_uuids_by_host(
+                        cctxt, service.host))
+        snap['cells'].append({
+            'uuid': cell.uuid,
+            'name': cell.name,
+            'compute_nodes': [_primitive(cn) for cn in compute_nodes],
+            'services': [_primitive(service) for service in services],
+        })
+    snap['requests'] = _snapshot_requests(ctxt, cells, args.requests)
+    _write(args.snapshot, snap)
+
+
+# Generated snapshot
+
+
+def _fleet_driver(vcpus, memory_mb, local_gb):
+    return type('FleetDriver', (fake.FakeDriver,), {
+        'vcpus': vcpus, 'memory_mb': memory_mb, 'local_gb': local_gb,
+    })(None)
+
+
+def _generate_host(rand, args, hostname, compute_id, now):
+    """Return the ComputeNode and Service objects of a host, as reported by
+    the fake virt driver with a random usage.
+    """
+    driver = _fleet_driver(args.vcpus, args.memory_mb, args.disk_gb)
+    driver._set_nodes([hostname])
+    num_instances = 0
+    while True:
+        _, vcpus, memory_mb, root_gb = rand.choice(FLAVORS)
+        if (driver.resources.memory_mb_used + memory_mb >
+                args.memory_mb * args.fill):
+            break
+        driver.resources.claim(vcpus=vcpus, mem=memory_mb, disk=root_gb)
+        num_instances += 1
+
+    compute = objects.ComputeNode(
+        id=compute_id, host=hostname, created_at=now, updated_at=now,
+        deleted=False)
+    compute.update_from_virt_driver(
+        driver.get_available_resource(hostname))
+    compute.free_ram_mb = compute.memory_mb - compute.memory_mb_used
+    compute.free_disk_gb = compute.local_gb - compute.local_gb_used
+    compute.disk_available_least = compute.free_disk_gb
+    compute.running_vms = num_instances
+    compute.current_workload = 0
+    compute.cpu_allocation_ratio = 4.0
+    compute.ram_allocation_ratio = 1.0
+    compute.disk_allocation_ratio = 1.0
+    compute.stats = {'num_instances': str(num_instances),
+                     'io_workload': '0'}
+    compute.metrics = '[]'
+    compute.host_ip = '192.0.2.%d' % (compute_id % 250 + 1)
+    compute.pci_device_pools = objects.PciDevicePoolList(objects=[])
+
+    service = objects.Service(
+        id=compute_id, host=hostname, binary='nova-compute',
+        topic='compute', report_count=1, disabled=False,
+        disabled_reason=None, forced_down=False,
+        last_seen_up=now, created_at=now, updated_at=now, deleted=False)
+    return compute, service, num_instances
+
+
+def _generate_candidates(computes, flavor):
+    """Return what placement would return for flavor on the computes."""
+    _, vcpus, memory_mb, root_gb = flavor
+    alloc_reqs = []
+    provider_summaries = {}
+    for cn in computes:
+        if (cn.vcpus * cn.cpu_allocation_ratio - cn.vcpus_used < vcpus or
+                cn.free_ram_mb < memory_mb or cn.free_disk_gb < root_gb):
+            continue
+        resources = {'VCPU': vcpus, 'MEMORY_MB': memory_mb,
+                     'DISK_GB': root_gb}
+        alloc_reqs.append({
+            'allocations': {cn.uuid: {'resources': resources}},
+            'mappings': {'': [cn.uuid]},
+        })
+        provider_summaries[cn.uuid] = {
+            'resources': {
+                'VCPU': {'capacity': int(cn.vcpus * cn.cpu_allocation_ratio),
+                         'used': cn.vcpus_used},
+                'MEMORY_MB': {'capacity': cn.memory_mb,
+                              'used': cn.memory_mb_used},
+                'DISK_GB': {'capacity': cn.local_gb,
+                            'used': cn.local_gb_used},
+            },
+            'traits': [],
+            'parent_provider_uuid': None,
+            'root_provider_uuid': cn.uuid,
+        }
+    return alloc_reqs, provider_summaries
+
+
+def generate(args):
+    objects.register_all()
+    rand = random.Random(args.seed)
+    now = timeutils.utcnow().replace(microsecond=0)
+
+    snap = {
+        'version': SNAPSHOT_VERSION,
+        'cells': [],
+        'aggregates': [],
+        'instances': {},
+    }
+    computes = []
+    hostnames = []
+    compute_id = 0
+    for cell_index in range(args.cells):
+        cell = {
+            'uuid': uuidutils.generate_uuid(),
+            'name': 'cell%d' % (cell_index + 1),
+            'compute_nodes': [],
+            'services': [],
+        }
+        for _ in range(args.hosts):
+            compute_id += 1
+            hostname = 'compute%05d' % compute_id
+            compute, service, num_instances = _generate_host(
+                rand, args, hostname, compute_id, now)
+            cell['compute_nodes'].append(_primitive(compute))
+            cell['services'].append(_primitive(service))
+            snap['instances'][hostname] = [
+                uuidutils.generate_uuid() for _ in range(num_instances)]
+            computes.append(compute)
+            hostnames.append(hostname)
+        snap['cells'].append(cell)
+
+    for agg_index in range(args.aggregates):
+        hosts = rand.sample(hostnames, max(1, len(hostnames) // 10))
+        snap['aggregates'].append(_primitive(objects.Aggregate(
+            id=agg_index + 1, uuid=uuidutils.generate_uuid(),
+            name='agg%d' % (agg_index + 1), hosts=hosts,
+            metadata={'availability_zone': 'az%d' % (agg_index % 3)},
+            created_at=now, updated_at=None, deleted_at=None,
+            deleted=False)))
+
+    snap['requests'] = []
+    for _ in range(args.requests):
+        flavor = rand.choice(FLAVORS)
+        name, vcpus, memory_mb, root_gb = flavor
+        num_instances = rand.choice((1, 1, 1, args.max_instances))
+        spec_obj = objects.RequestSpec(
+            project_id=uuidutils.generate_uuid(dashed=False),
+            user_id=uuidutils.generate_uuid(dashed=False),
+            flavor=objects.Flavor(
+                id=FLAVORS.index(flavor) + 1, flavorid=name, name=name,
+                vcpus=vcpus, memory_mb=memory_mb, root_gb=root_gb,
+                ephemeral_gb=0, swap=0, rxtx_factor=1.0,
+                vcpu_weight=None, disabled=False, is_public=True,
+                extra_specs={}),
+            image=objects.ImageMeta(properties=objects.ImageMetaProps()),
+            num_instances=num_instances,
+            ignore_hosts=None,
+            force_hosts=None,
+            force_nodes=None,
+            requested_destination=None,
+            instance_group=None,
+            availability_zone=None,
+            numa_topology=None,
+            pci_requests=None,
+            scheduler_hints={},
+            is_bfv=False,
+            requested_resources=[])
+        alloc_reqs, provider_summaries = _generate_candidates(
+            computes, flavor)
+        snap['requests'].append({
+            'request_spec': _primitive(spec_obj),
+            'instance_uuids': [uuidutils.generate_uuid()
+                               for _ in range(num_instances)],
+            'allocation_requests': alloc_reqs,
+            'provider_summaries': provider_summaries,
+            'allocation_request_version': '1.36',
+        })
+    _write(args.snapshot, snap)
+
+
+# Replay
+
+
+class ReplayHostManager(host_manager.HostManager):
+    """A HostManager reading the compute nodes, services, aggregates and
+    instances from a snapshot instead of the databases.
+    """
+
+    def __init__(self, snap):
+        self._snap = snap
+        self._computes = {}
+        self._services = {}
+        for cell in snap['cells']:
+            self._computes[cell['uuid']] = [
+                _from_primitive(cn) for cn in cell['compute_nodes']]
+            for service in cell['services']:
+                service = _from_primitive(service)
+                self._services[service.host] = service
+        super(ReplayHostManager, self).__init__()
+        self._instance_info = {
+            host: {'instances': {uuid: objects.Instance(uuid=uuid)
+                                 for uuid in uuids},
+                   'updated': True}
+            for host, uuids in snap['instances'].items()}
+
+    def refresh_cells_caches(self):
+        cells = [objects.CellMapping(uuid=cell['uuid'], name=cell['name'],
+                                     disabled=False)
+                 for cell in self._snap['cells']]
+        self.cells = {cell.uuid: cell for cell in cells}
+        self.enabled_cells = cells
+        self.host_to_cell_uuid = {}
+
+    def _init_aggregates(self):
+        for agg in self._snap['aggregates']:
+            agg = _from_primitive(agg)
+            self.aggs_by_id[agg.id] = agg
+            for host in agg.hosts:
+                self.host_aggregates_map[host].add(agg.id)
+
+    def _init_instance_info(self, computes_by_cell=None):
+        pass
+
+    def _get_instances_by_host(self, context, host_name):
+        return {}
+
+    def _get_computes_for_cells(self, context, cells, compute_uuids):
+        uuids = set(compute_uuids) if compute_uuids is not None else None
+        compute_nodes = collections.defaultdict(list)
+        for cell in cells:
+            compute_nodes[cell.uuid] = [
+                cn for cn in self._computes.get(cell.uuid, [])
+                if uuids is None or cn.uuid in uuids]
+        return compute_nodes, self._services
+
+
+class ReplayPlacementClient(object):
+    """An in-process stand-in of the placement API accepting every claim."""
+
+    def claim_resources(self, context, consumer_uuid, alloc_request,
+                        project_id, user_id, allocation_request_version=None,
+                        consumer_generation=None):
+        return True
+
+    def delete_allocation_for_instance(self, context, uuid, force=False):
+        pass
+
+
+class ReplaySchedulerManager(manager.SchedulerManager):
+    """A SchedulerManager scheduling the requests of a snapshot."""
+
+    def __init__(self, snap):
+        # NOTE: The parent initializer is not called as it connects to
+        # placement and sets up the notifier and servicegroup API, none of
+        # which _schedule uses.
+        self.host_manager = ReplayHostManager(snap)
+        self._placement_client = ReplayPlacementClient()
+
+    @property
+    def placement_client(self):
+        return self._placement_client
+
+    @timing.timed_request
+    def replay(self, context, request, instance_uuids=None):
+        alloc_reqs_by_rp_uuid = collections.defaultdict(list)
+        for ar in request['allocation_requests']:
+            ar = scheduler_utils.freeze_allocation_request(ar)
+            for rp_uuid in ar['allocations']:
+                alloc_reqs_by_rp_uuid[rp_uuid].append(ar)
+        return self._schedule(
+            context, _from_primitive(request['request_spec']),
+            instance_uuids, alloc_reqs_by_rp_uuid,
+            request['provider_summaries'],
+            request['allocation_request_version'], return_alternates=True)
+
+
+def _percentile(sorted_values, percent):
+    """Return the nearest-rank percentile of a sorted list."""
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[int(index)]
+
+
+def replay(args):
+    _parse_config(args, configure_db=False)
+    objects.register_all()
+    snap = _read(args.snapshot)
+    if snap.get('version') != SNAPSHOT_VERSION:
+        sys.exit('Unsupported snapshot version %s' % snap.get('version'))
+
+    num_requests = len(snap['requests']) * args.repeat
+    CONF.set_override('request_timing_buffer_size', num_requests,
+                      group='filter_scheduler')
+    scheduler = ReplaySchedulerManager(snap)
+    ctxt = nova_context.get_admin_context()
+
+    failures = 0
+    num_instances = 0
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for request in snap['requests']:
+            num_instances += len(request['instance_uuids'])
+            try:
+                scheduler.replay(ctxt, request,
+                                 instance_uuids=request['instance_uuids'])
+            except exception.NoValidHost:
+                failures += 1
+    elapsed = time.perf_counter() - start
+
+    durations = collections.defaultdict(list)
+    for request in timing.get_slowest_requests().get():
+        durations['request'].append(request['duration_ms'])
+        for phase in request['phases']:
+            durations[phase['name']].append(phase['duration_ms'])
+
+    num_hosts = sum(len(cell['compute_nodes']) for cell in snap['cells'])
+    print('%d hosts, %d requests (%d instances, %d failed) in %.2f s: '
+          '%.1f requests/s, %.1f instances/s' % (
+              num_hosts, num_requests, num_instances, failures, elapsed,
+              num_requests / elapsed, num_instances / elapsed))
+    print('%-45s %8s %10s %10s' % ('phase', 'count', 'p50 (ms)', 'p99 (ms)'))
+    for name, values in sorted(
+            durations.items(), key=lambda item: -sum(item[1])):
+        values.sort()
+        print('%-45s %8d %10.3f %10.3f' % (
+            name, len(values), _percentile(values, 50),
+            _percentile(values, 99)))
+
+
+def _write(path, snap):
+    with open(path, 'w') as f:
+        f.write(jsonutils.dumps(snap))
+    print('Wrote %d hosts and %d requests to %s' % (
+        sum(len(cell['compute_nodes']) for cell in snap['cells']),
+        len(snap['requests']), path))
+
+
+def _read(path):
+    with open(path) as f:
+        return jsonutils.loads(f.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser(
+        'snapshot', help='Snapshot a live deployment')
+    p.add_argument('--config-file', action='append',
+                   help='nova configuration file, can be repeated')
+    p.add_argument('--requests', type=int, default=100,
+                   help='number of most recent instances to record the '
+                        'scheduling requests of')
+    p.add_argument('snapshot', help='path of the snapshot file to write')
+    p.set_defaults(func=snapshot)
+
+    p = subparsers.add_parser(
+        'generate', help='Generate a snapshot with the fake virt driver')
+    p.add_argument('--cells', type=int, default=1)
+    p.add_argument('--hosts', type=int, default=1000,
+                   help='number of hosts per cell')
+    p.add_argument('--vcpus', type=int, default=64)
+    p.add_argument('--memory-mb', type=int, default=262144)
+    p.add_argument('--disk-gb', type=int, default=2048)
+    p.add_argument('--fill', type=float, default=0.7,
+                   help='average memory usage ratio of the hosts')
+    p.add_argument('--aggregates', type=int, default=0)
+    p.add_argument('--requests', type=int, default=100)
+    p.add_argument('--max-instances', type=int, default=10,
+                   help='number of instances of multi-create requests')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('snapshot', help='path of the snapshot file to write')
+    p.set_defaults(func=generate)
+
+    p = subparsers.add_parser(
+        'replay', help='Replay the requests of a snapshot')
+    p.add_argument('--config-file', action='append',
+                   help='nova configuration file, can be repeated')
+    p.add_argument('--repeat', type=int, default=1,
+                   help='number of times to replay the requests')
+    p.add_argument('snapshot', help='path of the snapshot file to read')
+    p.set_defaults(func=replay)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the serialization of a GET /servers/detail response.
+
+A page of server views is built from the API sample of the latest server
+detail response, then serialized into a response and sent to a sink the way
+a WSGI server does, either at once, as before, or streamed, as the servers
+API does with ``wsgi.stream_response``. Only the serialization is measured:
+the listing of the instances and the building of their views, which happen
+before the first byte of the body is sent in both cases, are not. Each
+scenario runs in its own process and reports:
+
+* the time to serialize and send the whole body;
+* the peak RSS the serialization added to the process;
+* whether the body is the same as the one serialized at once.
+
+Usage::
+
+    python tools/benchmarks/servers_detail_stream.py --servers 1000
+"""
+
+import argparse
+import copy
+import hashlib
+import multiprocessing
+import os
+import resource
+import time
+
+from oslo_serialization import jsonutils
+
+from nova.api.openstack import wsgi
+
+SAMPLE = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'doc', 'api_samples', 'servers',
+    'v2.100', 'servers-details-resp.json')
+
+SCENARIOS = ('at once', 'streamed')
+
+
+def build_page(count):
+    """Return a servers detail response dict of count servers."""
+    with open(SAMPLE, 'rb') as f:
+        sample = jsonutils.load(f)
+    template = sample['servers'][0]
+    servers = []
+    for i in range(count):
+        server = copy.deepcopy(template)
+        server['id'] = '%08x-0000-4000-8000-%012x' % (i, i)
+        server['name'] = 'server-%d' % i
+        server['metadata'] = {'key%d' % j: 'value%d' % j for j in range(10)}
+        servers.append(server)
+    return {'servers': servers,
+            'servers_links': [{'href': 'http://openstack.example.com/v2.1/'
+                                       'servers/detail?marker=%s' %
+                                       servers[-1]['id'],
+                               'rel': 'next'}]}
+
+
+def run_scenario(name, count):
+    page = build_page(count)
+    resp_obj = wsgi.ResponseObject(page)
+    resp_obj.stream = name == 'streamed'
+    del page
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.monotonic()
+    response = resp_obj.serialize(None, 'application/json')
+    del resp_obj
+    digest = hashlib.sha256()
+    for chunk in response.app_iter:
+        digest.update(chunk)
+    duration = time.monotonic() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    return duration, peak, digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--servers', type=int, default=1000,
+                        help='number of servers in the page')
+    args = parser.parse_args()
+
+    print('%d servers' % args.servers)
+    print('%-10s %10s %14s %6s' % (
+        'scenario', 'total ms', 'peak RSS KiB', 'same'))
+    ctx = multiprocessing.get_context('fork')
+    expected = None
+    for name in SCENARIOS:
+        # A new process for each scenario, so that their peak RSS are apart
+        with ctx.Pool(1) as pool:
+            duration, peak, digest = pool.apply(
+                run_scenario, (name, args.servers))
+        if expected is None:
+            expected = digest
+        print('%-10s %10.1f %14d %6s' % (
+            name, duration * 1000, peak, digest == expected))
+
+
+if __name__ == '__main__':
+    main()